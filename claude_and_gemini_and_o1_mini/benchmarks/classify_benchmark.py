@@ -0,0 +1,90 @@
+"""
+Microbenchmark of the columnar branch classification.
+
+Generates synthetic branch columns (a mix of protected, archived and feature
+branches with ages spread over a year) and reports the cost per branch of
+`classify_branches`, with NumPy when it is installed and with plain Python
+arrays, next to the per-branch checks (one `datetime.now()` and one datetime
+comparison per branch) it replaces.
+
+    PYTHONPATH=src python benchmarks/classify_benchmark.py --branches 1000000
+"""
+import argparse
+import random
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+from github_branch_manager.classify import DAY, BranchColumns, classify_branches, np
+from github_branch_manager.policy import BranchMatcher, RepoPolicy, compile_patterns
+
+
+def synthetic_columns(count: int, seed: int = 0) -> BranchColumns:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).timestamp()
+    names, shas, committed = [], [], array('d')
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.01:
+            name = f"release/{i}"
+        elif kind < 0.2:
+            name = f"archived/feature/{i}"
+        else:
+            name = f"feature/team-{i % 50}/{i}"
+        names.append(name)
+        shas.append(f"{i:040x}")
+        committed.append(now - rng.uniform(0, 365) * DAY)
+    return BranchColumns(names, shas, committed)
+
+
+def per_branch(columns: BranchColumns, policy: RepoPolicy, prefix: str) -> Tuple[int, float]:
+    """The checks of `should_archive_branch` that the columnar pass covers, one branch at a time."""
+    dates = [datetime.fromtimestamp(ts, timezone.utc) for ts in columns.committed]
+    start = time.perf_counter()
+    count = 0
+    for name, date in zip(columns.names, dates):
+        if policy.is_protected(name) or name.startswith(prefix):
+            continue
+        if date < datetime.now(timezone.utc) - timedelta(days=policy.inactivity_days):
+            count += 1
+    return count, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--branches', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    policy = RepoPolicy(
+        protected=BranchMatcher(['main', 'develop', 'release/*', 'hotfix/**']),
+        inactivity_days=30,
+        retention_days=60,
+        critical_tag_patterns=('v*',),
+        critical_tags=compile_patterns(['v*']),
+        allow_auto_purge_critical=False,
+    )
+    start = time.perf_counter()
+    columns = synthetic_columns(args.branches)
+    print(f"Generated {len(columns)} branches in {time.perf_counter() - start:.2f}s")
+
+    count, elapsed = per_branch(columns, policy, 'archived/')
+    print(f"per-branch: {elapsed:.3f}s, {elapsed / len(columns) * 1e9:.0f} ns/branch, {count} to archive")
+
+    backends = [('python', False)] + ([('numpy', True)] if np is not None else [])
+    now = datetime.now(timezone.utc)
+    for label, vectorized in backends:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = classify_branches(columns, policy, 'archived/', now, vectorized=vectorized)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{label:>10}: {best:.3f}s best of {args.repeat}, {best / len(columns) * 1e9:.0f} ns/branch, "
+              f"{len(result.archive_indices())} to archive, {len(result.purge_indices())} to purge")
+    if np is None:
+        print("NumPy is not installed; only the plain Python pass was measured")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,867 @@
+"""
+Local stand-in for the GitHub REST and GraphQL APIs, serving a synthetic organization.
+
+The organization is generated from an `OrgSpec` (repository count, branches,
+tags and pull requests per repository, and how branch ages are distributed)
+and served over HTTP with GitHub's rate limiting behaviour: hourly quotas for
+the core and GraphQL resources reported in `X-RateLimit-*` headers, 403s once
+a quota is spent, secondary limits on concurrent requests and on content
+creation, conditional requests that cost no quota, and per-request latency.
+Writes change the organization, so a run sees the effects of its own archives
+and purges. The Slack Web API is served under `/slack/api/`.
+
+Every request is counted by endpoint, so benchmarks can report and compare
+the API calls a strategy makes.
+
+    with FakeGitHub(OrgSpec(repos=10, branches_per_repo=200)) as server:
+        github = Github(base_url=server.url)
+        ...
+        print(server.stats())
+"""
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urlparse
+
+AGE_DISTRIBUTIONS = ('uniform', 'exponential')
+PROTECTED = ('main', 'develop')
+ARCHIVE_PREFIX = 'archived/'
+
+PRIMARY_LIMIT_MESSAGE = "API rate limit exceeded for installation ID 1."
+SECONDARY_LIMIT_MESSAGE = "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."
+
+
+@dataclass
+class OrgSpec:
+    """
+    Parameters of a synthetic organization.
+
+    Each repository has `main` and `develop` plus `branches_per_repo` feature
+    branches, of which about `archived_fraction` already carry the archive
+    prefix. Head commit ages follow `age_distribution`: uniform over
+    `age_days`, or exponential with a mean of `age_days`. Tags alternate
+    between critical (`v*`) and build tags, half of them annotated, and point
+    at branch heads. Pull requests go from feature branches into `main` or
+    `develop`; 60% are merged, 20% closed and 20% open.
+    """
+    name: str = 'bench-org'
+    repos: int = 3
+    branches_per_repo: int = 30
+    tags_per_repo: int = 10
+    prs_per_repo: int = 20
+    age_distribution: str = 'uniform'
+    age_days: float = 180.0
+    archived_fraction: float = 0.1
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.age_distribution not in AGE_DISTRIBUTIONS:
+            raise ValueError(f"age_distribution must be one of {', '.join(AGE_DISTRIBUTIONS)}")
+
+    def sample_age(self, rng: random.Random) -> float:
+        """Draws the age of a head commit, in days."""
+        if self.age_distribution == 'exponential':
+            return rng.expovariate(1 / self.age_days)
+        return rng.uniform(0, self.age_days)
+
+
+@dataclass
+class RateLimits:
+    """
+    The limits the stand-in enforces; the defaults are GitHub's for a token.
+
+    Attributes:
+        core (int): REST requests per window.
+        graphql (int): GraphQL points per window (every query costs one point).
+        window_seconds (float): Length of a quota window; shorten it to compress
+            an hour of quota into a shorter benchmark.
+        max_concurrent (int): Requests in flight before the secondary limit applies.
+        writes_per_minute (int): Content-creating requests (REST writes and GraphQL
+            mutations) per minute before the secondary limit applies; 0 disables it.
+    """
+    core: int = 5000
+    graphql: int = 5000
+    window_seconds: float = 3600.0
+    max_concurrent: int = 100
+    writes_per_minute: int = 80
+
+
+@dataclass
+class Latency:
+    """Response times in milliseconds, varied by up to `jitter` either way; `scale` 0 disables them."""
+    read_ms: float = 80.0
+    write_ms: float = 300.0
+    graphql_ms: float = 250.0
+    jitter: float = 0.25
+    scale: float = 1.0
+
+    def delay(self, kind: str, rng: random.Random) -> float:
+        base = {'read': self.read_ms, 'write': self.write_ms, 'graphql': self.graphql_ms}[kind]
+        return max(base * self.scale * (1 + self.jitter * rng.uniform(-1, 1)), 0.0) / 1000
+
+
+@dataclass
+class FakePull:
+    number: int
+    head: str
+    base: str
+    state: str
+    merged_at: Optional[datetime]
+    updated_at: datetime
+
+    @property
+    def graphql_state(self) -> str:
+        if self.merged_at is not None:
+            return 'MERGED'
+        return 'OPEN' if self.state == 'open' else 'CLOSED'
+
+
+@dataclass
+class FakeRepo:
+    name: str
+    full_name: str
+    node_id: str
+    pushed_at: datetime
+    # Commit SHA -> commit date
+    commits: Dict[str, datetime] = field(default_factory=dict)
+    # Branch name -> head commit SHA
+    branches: Dict[str, str] = field(default_factory=dict)
+    # Tag name -> SHA the ref points at (a commit, or a tag object for annotated tags)
+    tags: Dict[str, str] = field(default_factory=dict)
+    # Tag object SHA -> (tag name, commit SHA)
+    tag_objects: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    pulls: List[FakePull] = field(default_factory=list)
+    releases: List[str] = field(default_factory=list)
+
+    def commit_of(self, sha: str) -> str:
+        """Dereferences an annotated tag object to its commit."""
+        return self.tag_objects[sha][1] if sha in self.tag_objects else sha
+
+    def refs(self, prefix: str = 'refs/') -> List[Tuple[str, str]]:
+        """All refs starting with `prefix`, sorted by name as GitHub lists them."""
+        refs = [(f"refs/heads/{name}", sha) for name, sha in self.branches.items()]
+        refs += [(f"refs/tags/{name}", sha) for name, sha in self.tags.items()]
+        return sorted(ref for ref in refs if ref[0].startswith(prefix))
+
+    def get_ref(self, ref: str) -> Optional[str]:
+        if ref.startswith('refs/heads/'):
+            return self.branches.get(ref[len('refs/heads/'):])
+        if ref.startswith('refs/tags/'):
+            return self.tags.get(ref[len('refs/tags/'):])
+        return None
+
+    def set_ref(self, ref: str, sha: str) -> None:
+        if ref.startswith('refs/heads/'):
+            self.branches[ref[len('refs/heads/'):]] = sha
+        else:
+            self.tags[ref[len('refs/tags/'):]] = sha
+        self.pushed_at = datetime.now(timezone.utc)
+
+    def delete_ref(self, ref: str) -> None:
+        if ref.startswith('refs/heads/'):
+            del self.branches[ref[len('refs/heads/'):]]
+        else:
+            del self.tags[ref[len('refs/tags/'):]]
+        self.pushed_at = datetime.now(timezone.utc)
+
+
+def _sha(*parts: Any) -> str:
+    return hashlib.sha1('/'.join(map(str, parts)).encode()).hexdigest()
+
+
+def generate_org(spec: OrgSpec, now: Optional[datetime] = None) -> Dict[str, FakeRepo]:
+    """
+    Generates the repositories of a synthetic organization.
+
+    The same spec and seed always give the same organization, relative to `now`.
+    """
+    now = now or datetime.now(timezone.utc)
+    rng = random.Random(spec.seed)
+    repos = {}
+    for r in range(spec.repos):
+        name = f"repo-{r:04d}"
+        full_name = f"{spec.name}/{name}"
+        repo = FakeRepo(name, full_name, f"R_{_sha(full_name)[:16]}", now)
+
+        def commit(age_days: float) -> str:
+            sha = _sha(full_name, 'commit', len(repo.commits))
+            repo.commits[sha] = (now - timedelta(days=age_days)).replace(microsecond=0)
+            return sha
+
+        for base in PROTECTED:
+            repo.branches[base] = commit(rng.uniform(0, 3))
+        features = []
+        for i in range(spec.branches_per_repo):
+            feature = f"feature/{i:05d}"
+            features.append(feature)
+            branch = f"{ARCHIVE_PREFIX}{feature}" if rng.random() < spec.archived_fraction else feature
+            repo.branches[branch] = commit(spec.sample_age(rng))
+
+        heads = list(repo.branches.values())
+        for i in range(spec.tags_per_repo):
+            tag = f"v1.{i}.0" if i % 2 == 0 else f"build-{i}"
+            target = rng.choice(heads)
+            if rng.random() < 0.5:
+                tag_sha = _sha(full_name, 'tag', tag)
+                repo.tag_objects[tag_sha] = (tag, target)
+                target = tag_sha
+            repo.tags[tag] = target
+
+        for number in range(1, spec.prs_per_repo + 1):
+            if not features:
+                break
+            kind = rng.random()
+            updated_at = (now - timedelta(days=rng.uniform(0, spec.age_days))).replace(microsecond=0)
+            repo.pulls.append(FakePull(
+                number=number,
+                head=rng.choice(features),
+                base=rng.choice(PROTECTED),
+                state='open' if kind >= 0.8 else 'closed',
+                merged_at=updated_at if kind < 0.6 else None,
+                updated_at=updated_at,
+            ))
+        repo.pushed_at = max(repo.commits.values())
+        repos[name] = repo
+    return repos
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return None if value is None else value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+Response = Tuple[int, Any, Dict[str, str]]
+
+
+class FakeGitHub:
+    """
+    Serves a synthetic organization over HTTP on a local port.
+
+    Args:
+        spec (OrgSpec): The organization to generate.
+        limits (Optional[RateLimits]): The rate limits to enforce.
+        latency (Optional[Latency]): The response times to simulate.
+    """
+
+    def __init__(self, spec: OrgSpec, limits: Optional[RateLimits] = None, latency: Optional[Latency] = None):
+        self.spec = spec
+        self.limits = limits or RateLimits()
+        self.latency = latency or Latency()
+        self._lock = threading.Lock()
+        self._rng = random.Random(spec.seed)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._routes: List[Tuple[str, re.Pattern, str, Callable[..., Response]]] = []
+        for method, pattern, handler in (
+            ('GET', '/orgs/{org}', self._get_org),
+            ('GET', '/orgs/{org}/repos', self._list_repos),
+            ('GET', '/repos/{owner}/{repo}', self._get_repo),
+            ('GET', '/repos/{owner}/{repo}/branches', self._list_branches),
+            ('GET', '/repos/{owner}/{repo}/branches/{branch}', self._get_branch),
+            ('GET', '/repos/{owner}/{repo}/commits/{sha}', self._get_commit),
+            ('GET', '/repos/{owner}/{repo}/tags', self._list_tags),
+            ('GET', '/repos/{owner}/{repo}/git/matching-refs/{ref}', self._matching_refs),
+            ('GET', '/repos/{owner}/{repo}/git/refs/{ref}', self._get_ref),
+            ('GET', '/repos/{owner}/{repo}/git/tags/{sha}', self._get_tag),
+            ('GET', '/repos/{owner}/{repo}/pulls', self._list_pulls),
+            ('GET', '/repos/{owner}/{repo}/pulls/{number}', self._get_pull),
+            ('POST', '/repos/{owner}/{repo}/git/refs', self._create_ref),
+            ('DELETE', '/repos/{owner}/{repo}/git/refs/{ref}', self._delete_ref),
+            ('POST', '/repos/{owner}/{repo}/git/tags', self._create_tag),
+            ('POST', '/repos/{owner}/{repo}/releases', self._create_release),
+            ('POST', '/graphql', self._graphql),
+        ):
+            # Branch and ref names may contain slashes
+            regex = re.sub(r'\{(branch|ref)\}', r'(?P<\1>.+)', pattern)
+            regex = re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', regex)
+            self._routes.append((method, re.compile(f"^{regex}$"), f"{method} {pattern}", handler))
+        self.reset()
+
+    def reset(self) -> None:
+        """Regenerates the organization and clears the counters and quotas."""
+        with self._lock:
+            self.repos = generate_org(self.spec)
+            self._calls: Counter = Counter()
+            self._not_modified: Counter = Counter()
+            self._slack_calls: Counter = Counter()
+            self._rejected: Counter = Counter()
+            self._window_start = time.time()
+            self._used = {'core': 0, 'graphql': 0}
+            self._consumed = {'core': 0, 'graphql': 0}
+            self._in_flight = 0
+            self._writes: Deque[float] = deque()
+            self._tag_count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        The requests served since the last reset.
+
+        Returns:
+            Dict[str, Any]: `calls` by endpoint (requests answered, conditional ones
+            excluded), `not_modified` (conditional requests answered with 304),
+            `quota_used` per resource over all windows, `rate_limited` (rejected requests by kind)
+            and `slack` calls by method.
+        """
+        with self._lock:
+            return {
+                'calls': dict(sorted(self._calls.items())),
+                'not_modified': dict(sorted(self._not_modified.items())),
+                'quota_used': dict(self._consumed),
+                'rate_limited': dict(self._rejected),
+                'slack': dict(sorted(self._slack_calls.items())),
+            }
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def slack_url(self) -> str:
+        return f"{self.url}/slack/api/"
+
+    def start(self) -> str:
+        """Starts serving in a background thread; returns the API base URL."""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        server.daemon_threads = True
+        server.github = self
+        self._server = server
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FakeGitHub':
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # Rate limiting
+
+    def _roll_window(self, now: float) -> None:
+        while now >= self._window_start + self.limits.window_seconds:
+            self._window_start += self.limits.window_seconds
+            self._used = {'core': 0, 'graphql': 0}
+
+    def rate_headers(self, resource: str) -> Dict[str, str]:
+        with self._lock:
+            self._roll_window(time.time())
+            limit = self.limits.core if resource == 'core' else self.limits.graphql
+            used = self._used[resource]
+            return {
+                'X-RateLimit-Limit': str(limit),
+                'X-RateLimit-Remaining': str(max(limit - used, 0)),
+                'X-RateLimit-Reset': str(int(math.ceil(self._window_start + self.limits.window_seconds))),
+                'X-RateLimit-Used': str(used),
+                'X-RateLimit-Resource': resource,
+            }
+
+    def admit(self, resource: str, write: bool) -> Optional[Tuple[str, Optional[float]]]:
+        """
+        Takes a concurrency slot for a request; returns the kind of limit hit
+        (and how long to wait) instead if the request is to be rejected.
+        """
+        now = time.time()
+        with self._lock:
+            self._roll_window(now)
+            limit = self.limits.core if resource == 'core' else self.limits.graphql
+            if self._used[resource] >= limit:
+                self._rejected['primary'] += 1
+                return 'primary', None
+            if self._in_flight >= self.limits.max_concurrent:
+                self._rejected['secondary'] += 1
+                return 'secondary', 60.0
+            if write and self.limits.writes_per_minute:
+                while self._writes and self._writes[0] <= now - 60:
+                    self._writes.popleft()
+                if len(self._writes) >= self.limits.writes_per_minute:
+                    self._rejected['secondary'] += 1
+                    return 'secondary', self._writes[0] + 60 - now
+                self._writes.append(now)
+            self._in_flight += 1
+        return None
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def charge(self, resource: str, endpoint: str, not_modified: bool) -> None:
+        with self._lock:
+            if not_modified:
+                # Conditional requests answered with 304 do not count against the quota
+                self._not_modified[endpoint] += 1
+                return
+            self._used[resource] += 1
+            self._consumed[resource] += 1
+            self._calls[endpoint] += 1
+
+    def count_slack(self, method: str) -> None:
+        with self._lock:
+            self._slack_calls[method] += 1
+
+    def delay(self, kind: str) -> None:
+        seconds = self.latency.delay(kind, self._rng)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # Routing
+
+    def route(self, method: str, path: str) -> Tuple[str, Optional[Callable[..., Response]], Dict[str, str]]:
+        for route_method, regex, endpoint, handler in self._routes:
+            match = regex.match(path)
+            if match and route_method == method:
+                return endpoint, handler, {k: unquote(v) for k, v in match.groupdict().items()}
+        return f"{method} (unknown)", None, {}
+
+    def dispatch(self, handler: Callable[..., Response], args: Dict[str, str], params: Dict[str, str],
+                 body: Any) -> Response:
+        with self._lock:
+            try:
+                return handler(params=params, body=body, **args)
+            except ApiError as e:
+                return e.status, {'message': e.message}, {}
+
+    def _repo(self, owner: str, repo: str) -> FakeRepo:
+        found = self.repos.get(repo)
+        if owner != self.spec.name or found is None:
+            raise ApiError(404, 'Not Found')
+        return found
+
+    # Payloads
+
+    def _repo_url(self, repo: FakeRepo) -> str:
+        return f"{self.url}/repos/{repo.full_name}"
+
+    def _repo_payload(self, repo: FakeRepo) -> Dict[str, Any]:
+        url = self._repo_url(repo)
+        return {
+            'id': int(repo.node_id[2:10], 16), 'node_id': repo.node_id, 'name': repo.name,
+            'full_name': repo.full_name, 'private': True, 'default_branch': 'main',
+            'owner': {'login': self.spec.name, 'type': 'Organization', 'url': f"{self.url}/orgs/{self.spec.name}"},
+            'url': url, 'html_url': f"https://github.com/{repo.full_name}",
+            'clone_url': f"{self.url}/{repo.full_name}.git",
+            'pushed_at': _iso(repo.pushed_at), 'updated_at': _iso(repo.pushed_at),
+        }
+
+    def _commit_payload(self, repo: FakeRepo, sha: str) -> Dict[str, Any]:
+        url = f"{self._repo_url(repo)}/commits/{sha}"
+        person = {'name': 'Developer', 'email': 'dev@example.com', 'date': _iso(repo.commits[sha])}
+        return {
+            'sha': sha, 'node_id': f"C_{sha}", 'url': url, 'html_url': f"https://github.com/{repo.full_name}/commit/{sha}",
+            'commit': {
+                'author': person, 'committer': person, 'message': f"Commit {sha[:7]}",
+                'tree': {'sha': sha, 'url': f"{self._repo_url(repo)}/git/trees/{sha}"},
+                'url': f"{self._repo_url(repo)}/git/commits/{sha}", 'comment_count': 0,
+            },
+            'author': None, 'committer': None, 'parents': [],
+            'stats': {'total': 2, 'additions': 1, 'deletions': 1}, 'files': [],
+        }
+
+    def _ref_payload(self, repo: FakeRepo, ref: str, sha: str) -> Dict[str, Any]:
+        kind = 'tag' if sha in repo.tag_objects else 'commit'
+        return {
+            'ref': ref, 'node_id': self._ref_id(repo, ref), 'url': f"{self._repo_url(repo)}/git/{ref}",
+            'object': {'sha': sha, 'type': kind, 'url': f"{self._repo_url(repo)}/git/{kind}s/{sha}"},
+        }
+
+    def _pull_payload(self, repo: FakeRepo, pull: FakePull, complete: bool = False) -> Dict[str, Any]:
+        payload = {
+            'number': pull.number, 'id': pull.number, 'node_id': f"PR_{repo.node_id}_{pull.number}",
+            'url': f"{self._repo_url(repo)}/pulls/{pull.number}", 'state': pull.state,
+            'title': f"Pull request {pull.number}",
+            'head': {'ref': pull.head, 'label': f"{self.spec.name}:{pull.head}", 'sha': repo.branches.get(pull.head),
+                     'repo': self._repo_payload(repo)},
+            'base': {'ref': pull.base, 'label': f"{self.spec.name}:{pull.base}", 'sha': repo.branches.get(pull.base)},
+            'created_at': _iso(pull.updated_at), 'updated_at': _iso(pull.updated_at),
+            'closed_at': _iso(pull.updated_at) if pull.state == 'closed' else None,
+            'merged_at': _iso(pull.merged_at),
+        }
+        if complete:
+            # `merged` is only part of a single pull request, as on GitHub
+            payload['merged'] = pull.merged_at is not None
+        return payload
+
+    @staticmethod
+    def _ref_id(repo: FakeRepo, ref: str) -> str:
+        return 'REF_' + base64.urlsafe_b64encode(f"{repo.name}:{ref}".encode()).decode()
+
+    def _page(self, path: str, params: Dict[str, str], items: List[Any]) -> Response:
+        """Serves one page of a listing, with GitHub's `Link` header."""
+        per_page = min(max(int(params.get('per_page', 30)), 1), 100)
+        page = max(int(params.get('page', 1)), 1)
+        last = max(math.ceil(len(items) / per_page), 1)
+        links = []
+        for rel, number in (('next', page + 1), ('last', last)) if page < last else ():
+            links.append(f'<{self.url}{path}?{urlencode({**params, "page": number})}>; rel="{rel}"')
+        for rel, number in (('prev', page - 1), ('first', 1)) if page > 1 else ():
+            links.append(f'<{self.url}{path}?{urlencode({**params, "page": number})}>; rel="{rel}"')
+        headers = {'Link': ', '.join(links)} if links else {}
+        return 200, items[(page - 1) * per_page:page * per_page], headers
+
+    # REST endpoints
+
+    def _get_org(self, org: str, params, body) -> Response:
+        if org != self.spec.name:
+            raise ApiError(404, 'Not Found')
+        return 200, {'login': org, 'id': 1, 'node_id': 'O_1', 'type': 'Organization',
+                     'url': f"{self.url}/orgs/{org}", 'repos_url': f"{self.url}/orgs/{org}/repos"}, {}
+
+    def _list_repos(self, org: str, params, body) -> Response:
+        if org != self.spec.name:
+            raise ApiError(404, 'Not Found')
+        return self._page(f"/orgs/{org}/repos", params, [self._repo_payload(repo) for repo in self.repos.values()])
+
+    def _get_repo(self, owner: str, repo: str, params, body) -> Response:
+        return 200, self._repo_payload(self._repo(owner, repo)), {}
+
+    def _list_branches(self, owner: str, repo: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        items = [
+            {'name': name, 'commit': {'sha': sha, 'url': f"{self._repo_url(found)}/commits/{sha}"},
+             'protected': name in PROTECTED}
+            for name, sha in sorted(found.branches.items())
+        ]
+        return self._page(f"/repos/{owner}/{repo}/branches", params, items)
+
+    def _get_branch(self, owner: str, repo: str, branch: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        if branch not in found.branches:
+            raise ApiError(404, 'Branch not found')
+        return 200, {'name': branch, 'commit': self._commit_payload(found, found.branches[branch]),
+                     'protected': branch in PROTECTED}, {}
+
+    def _get_commit(self, owner: str, repo: str, sha: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        if sha not in found.commits:
+            raise ApiError(404, f"No commit found for SHA: {sha}")
+        return 200, self._commit_payload(found, sha), {}
+
+    def _list_tags(self, owner: str, repo: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        items = [
+            {'name': name, 'node_id': self._ref_id(found, f"refs/tags/{name}"),
+             'commit': {'sha': found.commit_of(sha), 'url': f"{self._repo_url(found)}/commits/{found.commit_of(sha)}"}}
+            for name, sha in sorted(found.tags.items())
+        ]
+        return self._page(f"/repos/{owner}/{repo}/tags", params, items)
+
+    def _matching_refs(self, owner: str, repo: str, ref: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        return 200, [self._ref_payload(found, name, sha) for name, sha in found.refs(f"refs/{ref}")], {}
+
+    def _get_ref(self, owner: str, repo: str, ref: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        sha = found.get_ref(f"refs/{ref}")
+        if sha is None:
+            raise ApiError(404, 'Not Found')
+        return 200, self._ref_payload(found, f"refs/{ref}", sha), {}
+
+    def _get_tag(self, owner: str, repo: str, sha: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        if sha not in found.tag_objects:
+            raise ApiError(404, 'Not Found')
+        name, commit = found.tag_objects[sha]
+        return 200, {'sha': sha, 'node_id': f"TAG_{sha}", 'tag': name, 'message': name,
+                     'url': f"{self._repo_url(found)}/git/tags/{sha}",
+                     'object': {'sha': commit, 'type': 'commit', 'url': f"{self._repo_url(found)}/git/commits/{commit}"},
+                     'tagger': {'name': 'Developer', 'email': 'dev@example.com', 'date': _iso(found.commits[commit])}}, {}
+
+    def _list_pulls(self, owner: str, repo: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        state = params.get('state', 'open')
+        head = params.get('head', '').split(':', 1)[-1]
+        base = params.get('base')
+        pulls = [
+            pull for pull in found.pulls
+            if (state == 'all' or pull.state == state) and (not head or pull.head == head)
+            and (not base or pull.base == base)
+        ]
+        key = (lambda pull: (pull.updated_at, pull.number)) if params.get('sort') == 'updated' else (lambda pull: pull.number)
+        pulls.sort(key=key, reverse=params.get('direction', 'desc') == 'desc')
+        return self._page(f"/repos/{owner}/{repo}/pulls", params, [self._pull_payload(found, pull) for pull in pulls])
+
+    def _get_pull(self, owner: str, repo: str, number: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        for pull in found.pulls:
+            if str(pull.number) == number:
+                return 200, self._pull_payload(found, pull, complete=True), {}
+        raise ApiError(404, 'Not Found')
+
+    def _create_ref(self, owner: str, repo: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        ref, sha = body.get('ref', ''), body.get('sha', '')
+        if not ref.startswith(('refs/heads/', 'refs/tags/')):
+            raise ApiError(422, 'Reference name must start with refs/heads/ or refs/tags/')
+        if found.get_ref(ref) is not None:
+            raise ApiError(422, 'Reference already exists')
+        if sha not in found.commits and sha not in found.tag_objects:
+            raise ApiError(422, 'Object does not exist')
+        found.set_ref(ref, sha)
+        return 201, self._ref_payload(found, ref, sha), {}
+
+    def _delete_ref(self, owner: str, repo: str, ref: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        if found.get_ref(f"refs/{ref}") is None:
+            raise ApiError(422, 'Reference does not exist')
+        found.delete_ref(f"refs/{ref}")
+        return 204, None, {}
+
+    def _create_tag(self, owner: str, repo: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        target = body.get('object', '')
+        if target not in found.commits:
+            raise ApiError(422, 'Object does not exist')
+        self._tag_count += 1
+        sha = _sha(found.full_name, 'tag object', self._tag_count)
+        found.tag_objects[sha] = (body.get('tag', ''), target)
+        _, payload, headers = self._get_tag(owner, repo, sha, params, None)
+        return 201, payload, headers
+
+    def _create_release(self, owner: str, repo: str, params, body) -> Response:
+        found = self._repo(owner, repo)
+        tag = body.get('tag_name', '')
+        if tag in found.releases:
+            raise ApiError(422, 'Validation Failed')
+        if tag not in found.tags:
+            target = body.get('target_commitish') or found.branches['main']
+            found.set_ref(f"refs/tags/{tag}", found.branches.get(target, target))
+        found.releases.append(tag)
+        number = len(found.releases)
+        return 201, {'id': number, 'tag_name': tag, 'name': body.get('name'), 'body': body.get('body'),
+                     'draft': body.get('draft', False), 'prerelease': body.get('prerelease', False),
+                     'target_commitish': body.get('target_commitish'),
+                     'url': f"{self._repo_url(found)}/releases/{number}",
+                     'html_url': f"https://github.com/{found.full_name}/releases/tag/{tag}",
+                     'upload_url': f"{self._repo_url(found)}/releases/{number}/assets{{?name,label}}",
+                     'created_at': _iso(datetime.now(timezone.utc)), 'published_at': _iso(datetime.now(timezone.utc)),
+                     'author': None, 'assets': []}, {}
+
+    # GraphQL
+
+    def _graphql(self, params, body) -> Response:
+        query = body.get('query', '')
+        variables = body.get('variables') or {}
+        if 'refs(refPrefix' in query:
+            return 200, self._branch_inventory(variables), {}
+        if 'createRef' in query:
+            return 200, self._create_refs(query, variables), {}
+        if 'deleteRef' in query:
+            return 200, self._delete_refs(query, variables), {}
+        if 'ref(qualifiedName' in query and 'associatedPullRequests' in query:
+            return 200, self._branch_pull_requests(variables), {}
+        if 'ref(qualifiedName' in query:
+            return 200, self._lookup_refs(query, variables), {}
+        return 200, {'errors': [{'message': 'Query not supported by the stand-in'}]}, {}
+
+    def _branch_inventory(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        repo = self.repos.get(variables.get('name')) if variables.get('owner') == self.spec.name else None
+        if repo is None:
+            return {'data': {'repository': None},
+                    'errors': [{'type': 'NOT_FOUND', 'path': ['repository'], 'message': 'Could not resolve to a Repository'}]}
+        page_size = min(int(variables.get('pageSize') or 100), 100)
+        # Cursors name the last ref returned, so refs written between pages do not shift them
+        cursor = variables.get('cursor')
+        after = base64.b64decode(cursor).decode() if cursor else None
+        names = [name for name in sorted(repo.branches) if after is None or name > after]
+        page = names[:page_size]
+        nodes = []
+        for name in page:
+            sha = repo.branches[name]
+            date = _iso(repo.commits[sha])
+            nodes.append({
+                'name': name,
+                'target': {'oid': sha, 'committedDate': date, 'authoredDate': date},
+                'associatedPullRequests': self._pull_request_page(repo, name, 0, 20),
+            })
+        end_cursor = base64.b64encode(page[-1].encode()).decode() if page else cursor
+        return {'data': {'repository': {'refs': {
+            'pageInfo': {'hasNextPage': len(names) > len(page), 'endCursor': end_cursor},
+            'nodes': nodes,
+        }}}}
+
+    @staticmethod
+    def _pull_request_page(repo: FakeRepo, branch: str, offset: int, size: int) -> Dict[str, Any]:
+        pulls = [pull for pull in repo.pulls if pull.head == branch]
+        page = pulls[offset:offset + size]
+        return {
+            'pageInfo': {'hasNextPage': len(pulls) > offset + size,
+                         'endCursor': base64.b64encode(str(offset + len(page)).encode()).decode()},
+            'nodes': [{'state': pull.graphql_state, 'merged': pull.merged_at is not None, 'baseRefName': pull.base}
+                      for pull in page],
+        }
+
+    def _branch_pull_requests(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        repo = self.repos.get(variables.get('name')) if variables.get('owner') == self.spec.name else None
+        if repo is None:
+            return {'data': {'repository': None},
+                    'errors': [{'type': 'NOT_FOUND', 'path': ['repository'], 'message': 'Could not resolve to a Repository'}]}
+        ref = variables.get('ref', '')
+        branch = ref[len('refs/heads/'):]
+        if repo.get_ref(ref) is None:
+            return {'data': {'repository': {'branch': None}}}
+        cursor = variables.get('cursor')
+        offset = int(base64.b64decode(cursor).decode()) if cursor else 0
+        return {'data': {'repository': {'branch': {
+            'associatedPullRequests': self._pull_request_page(repo, branch, offset, 100),
+        }}}}
+
+    def _repo_by_node_id(self, node_id: str) -> Optional[FakeRepo]:
+        return next((repo for repo in self.repos.values() if repo.node_id == node_id), None)
+
+    def _create_refs(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        repo = self._repo_by_node_id(variables.get('repositoryId', ''))
+        data: Dict[str, Any] = {}
+        errors = []
+        for alias, name_var, oid_var in re.findall(r'(\w+): createRef\(input: \{[^}]*name: \$(\w+), oid: \$(\w+)', query):
+            ref, sha = variables.get(name_var, ''), variables.get(oid_var, '')
+            data[alias] = None
+            if repo is None:
+                errors.append({'path': [alias], 'type': 'NOT_FOUND', 'message': 'Could not resolve to a Repository'})
+            elif repo.get_ref(ref) is not None:
+                errors.append({'path': [alias], 'type': 'UNPROCESSABLE', 'message': f"A ref named \"{ref}\" already exists"})
+            elif sha not in repo.commits:
+                errors.append({'path': [alias], 'type': 'UNPROCESSABLE', 'message': 'Object does not exist'})
+            else:
+                repo.set_ref(ref, sha)
+                data[alias] = {'ref': {'name': ref.split('/', 2)[-1]}}
+        return {'data': data, 'errors': errors} if errors else {'data': data}
+
+    def _lookup_refs(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        repo = self.repos.get(variables.get('name')) if variables.get('owner') == self.spec.name else None
+        if repo is None:
+            return {'data': {'repository': None},
+                    'errors': [{'type': 'NOT_FOUND', 'path': ['repository'], 'message': 'Could not resolve to a Repository'}]}
+        found = {}
+        for alias, var in re.findall(r'(\w+): ref\(qualifiedName: \$(\w+)\)', query):
+            ref = variables.get(var, '')
+            sha = repo.get_ref(ref)
+            found[alias] = None if sha is None else {'id': self._ref_id(repo, ref), 'target': {'oid': sha}}
+        return {'data': {'repository': found}}
+
+    def _delete_refs(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        errors = []
+        for alias, var in re.findall(r'(\w+): deleteRef\(input: \{refId: \$(\w+)\}\)', query):
+            ref_id = variables.get(var, '')
+            try:
+                repo_name, ref = base64.urlsafe_b64decode(ref_id[len('REF_'):]).decode().split(':', 1)
+            except ValueError:
+                repo_name, ref = '', ''
+            repo = self.repos.get(repo_name)
+            if repo is None or repo.get_ref(ref) is None:
+                data[alias] = None
+                errors.append({'path': [alias], 'type': 'NOT_FOUND', 'message': f"Could not resolve to a node with the global id of '{ref_id}'"})
+                continue
+            repo.delete_ref(ref)
+            data[alias] = {'clientMutationId': None}
+        return {'data': data, 'errors': errors} if errors else {'data': data}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self, status: int, payload: Any, headers: Dict[str, str]) -> None:
+        body = b'' if payload is None or status in (204, 304) else json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if body:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Any:
+        raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not raw:
+            return {}
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(raw)
+        return dict(parse_qsl(raw.decode()))
+
+    def _slack(self, method: str, body: Any) -> None:
+        github: FakeGitHub = self.server.github
+        github.count_slack(method)
+        github.delay('read')
+        if method == 'files.getUploadURLExternal':
+            return self._reply(200, {'ok': True, 'file_id': 'F1', 'upload_url': f"{github.url}/slack/upload/F1"}, {})
+        if method == 'files.completeUploadExternal':
+            return self._reply(200, {'ok': True, 'files': [{'id': 'F1'}]}, {})
+        return self._reply(200, {'ok': True, 'channel': 'C0BENCH', 'ts': f"{time.time():.6f}"}, {})
+
+    def _handle(self, method: str) -> None:
+        github: FakeGitHub = self.server.github
+        parsed = urlparse(self.path)
+        body = self._body()
+        if parsed.path.startswith('/slack/'):
+            return self._slack(parsed.path.rsplit('/', 1)[-1], body)
+
+        endpoint, handler, args = github.route(method, parsed.path)
+        resource = 'graphql' if parsed.path == '/graphql' else 'core'
+        mutation = resource == 'graphql' and body.get('query', '').lstrip().startswith('mutation')
+        write = method != 'GET' and resource == 'core' or mutation
+        rejected = github.admit(resource, write)
+        if rejected is not None:
+            kind, retry_after = rejected
+            headers = github.rate_headers(resource)
+            if retry_after is not None:
+                headers['Retry-After'] = str(max(int(math.ceil(retry_after)), 1))
+            message = PRIMARY_LIMIT_MESSAGE if kind == 'primary' else SECONDARY_LIMIT_MESSAGE
+            return self._reply(403, {'message': message, 'documentation_url': 'https://docs.github.com/rest'}, headers)
+        try:
+            github.delay('graphql' if resource == 'graphql' else 'write' if write else 'read')
+            if handler is None:
+                status, payload, headers = 404, {'message': 'Not Found'}, {}
+            else:
+                params = dict(parse_qsl(parsed.query))
+                status, payload, headers = github.dispatch(handler, args, params, body)
+        finally:
+            github.release()
+
+        not_modified = False
+        if method == 'GET' and status == 200:
+            etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest() + '"'
+            headers['ETag'] = etag
+            not_modified = self.headers.get('If-None-Match') == etag
+        github.charge(resource, endpoint, not_modified)
+        headers.update(github.rate_headers(resource))
+        if not_modified:
+            return self._reply(304, None, headers)
+        self._reply(status, payload, headers)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def log_message(self, *args):
+        pass
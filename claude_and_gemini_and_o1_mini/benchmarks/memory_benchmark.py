@@ -0,0 +1,109 @@
+"""
+Peak RSS of holding a repository's evaluated branches.
+
+Builds PyGithub `Branch` objects from synthetic REST payloads (the branch
+listing entry, with its commit completed as it is once the commit date has
+been read) and measures, in a fresh process per mode, the peak RSS of:
+
+- `pygithub`: keeping the PyGithub objects, as branch listings used to be kept;
+- `records`: converting each branch to a `BranchRecord` as it is listed.
+
+    PYTHONPATH=src python benchmarks/memory_benchmark.py --branches 100000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+from typing import Any, Dict
+
+
+def user(login: str) -> Dict[str, Any]:
+    base = f"https://api.github.com/users/{login}"
+    return {
+        'login': login, 'id': 1, 'node_id': 'MDQ6VXNlcjE=', 'avatar_url': 'https://avatars.githubusercontent.com/u/1',
+        'gravatar_id': '', 'url': base, 'html_url': f"https://github.com/{login}",
+        'followers_url': f"{base}/followers", 'following_url': f"{base}/following{{/other_user}}",
+        'gists_url': f"{base}/gists{{/gist_id}}", 'starred_url': f"{base}/starred{{/owner}}{{/repo}}",
+        'subscriptions_url': f"{base}/subscriptions", 'organizations_url': f"{base}/orgs",
+        'repos_url': f"{base}/repos", 'events_url': f"{base}/events{{/privacy}}",
+        'received_events_url': f"{base}/received_events", 'type': 'User', 'site_admin': False,
+    }
+
+
+def branch_payload(i: int) -> Dict[str, Any]:
+    sha = f"{i:040x}"
+    url = f"https://api.github.com/repos/org/repo/commits/{sha}"
+    person = {'name': 'Developer', 'email': 'dev@example.com', 'date': '2024-01-01T00:00:00Z'}
+    return {
+        'name': f"feature/branch-{i}",
+        'protected': False,
+        'commit': {
+            'sha': sha, 'node_id': f"C_{sha}", 'url': url,
+            'html_url': f"https://github.com/org/repo/commit/{sha}",
+            'comments_url': f"{url}/comments",
+            'commit': {
+                'author': person, 'committer': person,
+                'message': f"Implement feature {i}\n\nSome longer description of the change.",
+                'tree': {'sha': sha, 'url': f"https://api.github.com/repos/org/repo/git/trees/{sha}"},
+                'url': f"https://api.github.com/repos/org/repo/git/commits/{sha}",
+                'comment_count': 0,
+                'verification': {'verified': False, 'reason': 'unsigned', 'signature': None, 'payload': None},
+            },
+            'author': user('developer'), 'committer': user('web-flow'),
+            'parents': [{'sha': sha, 'url': url, 'html_url': f"https://github.com/org/repo/commit/{sha}"}],
+            'stats': {'total': 12, 'additions': 10, 'deletions': 2},
+            'files': [
+                {'sha': sha, 'filename': f"src/module_{n}.py", 'status': 'modified', 'additions': 5,
+                 'deletions': 1, 'changes': 6, 'blob_url': f"https://github.com/org/repo/blob/{sha}/src/module_{n}.py",
+                 'raw_url': f"https://github.com/org/repo/raw/{sha}/src/module_{n}.py",
+                 'contents_url': f"https://api.github.com/repos/org/repo/contents/src/module_{n}.py?ref={sha}",
+                 'patch': '@@ -1,3 +1,7 @@\n' + '+    changed line\n' * 10}
+                for n in range(2)
+            ],
+        },
+        '_links': {'self': f"https://api.github.com/repos/org/repo/branches/feature/branch-{i}",
+                   'html': f"https://github.com/org/repo/tree/feature/branch-{i}"},
+    }
+
+
+def run(mode: str, count: int) -> None:
+    from github.Branch import Branch
+    from github_branch_manager.records import BranchRecord
+
+    headers = {'x-ratelimit-remaining': '4999', 'etag': 'W/"0"', 'content-type': 'application/json'}
+    kept = []
+    for i in range(count):
+        branch = Branch(None, dict(headers), branch_payload(i), completed=True)
+        if mode == 'records':
+            record = BranchRecord.from_rest(branch)
+            record.authored_date  # read the date, as the inactivity check does
+            kept.append(record)
+        else:
+            branch.commit.commit.author.date
+            kept.append(branch)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{peak_kb / 1024:.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--branches', type=int, default=100_000)
+    parser.add_argument('--mode', choices=('pygithub', 'records'))
+    args = parser.parse_args()
+    if args.mode:
+        run(args.mode, args.branches)
+        return
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, ['src', os.environ.get('PYTHONPATH')])))
+    results = {}
+    for mode in ('pygithub', 'records'):
+        output = subprocess.run([sys.executable, __file__, '--mode', mode, '--branches', str(args.branches)],
+                                env=env, check=True, capture_output=True, text=True).stdout
+        results[mode] = float(output.strip())
+        print(f"{mode:>9}: peak RSS {results[mode]:.1f} MB for {args.branches} branches")
+    print(f"Records use {results['records'] / results['pygithub']:.0%} of the PyGithub peak")
+
+
+if __name__ == '__main__':
+    main()
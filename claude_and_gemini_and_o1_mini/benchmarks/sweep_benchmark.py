@@ -0,0 +1,261 @@
+"""
+Cost of a full sweep for each strategy, against a local stand-in for GitHub.
+
+Serves a synthetic organization with `fake_github.FakeGitHub` and, for each
+strategy (inventory mode, write mode and concurrency), runs
+`BranchManager.process_branches` over every repository and a complete `main()`
+run. Each run gets a fresh process, a fresh state directory and a freshly
+generated organization. For each run it reports the wall time, the API calls
+by endpoint, the quota consumed and the peak RSS. The `events` strategy
+measures the seeding run. `mirror` mode is left out because it clones over
+git's HTTP protocol, which the stand-in does not serve.
+
+    PYTHONPATH=src python benchmarks/sweep_benchmark.py --repos 5 --branches 100
+
+The defaults enforce GitHub's limits and typical latencies, including
+PyGithub's own pause between requests, so large organizations take as long as
+they would against GitHub. `--fast` removes the latency, the pacing and the
+write limit, leaving the request counts unchanged. `--save-baseline` records
+the API calls of every run. `--baseline` compares against such a record and
+fails if any endpoint is called more often than before:
+
+    PYTHONPATH=src python benchmarks/sweep_benchmark.py --fast --baseline benchmarks/request_baseline.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, NamedTuple, Optional
+from fake_github import AGE_DISTRIBUTIONS, FakeGitHub, Latency, OrgSpec, RateLimits
+
+ENTRY_POINTS = ('process_branches', 'main')
+
+
+class Strategy(NamedTuple):
+    name: str
+    env: Dict[str, str]
+    max_branch_workers: int = 1
+    max_repos_in_flight: int = 1
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (
+    Strategy('rest', {'INVENTORY_MODE': 'rest', 'WRITE_MODE': 'rest'}),
+    Strategy('rest-concurrent', {'INVENTORY_MODE': 'rest', 'WRITE_MODE': 'rest'}, 8, 2),
+    Strategy('graphql', {'INVENTORY_MODE': 'graphql', 'WRITE_MODE': 'rest'}),
+    Strategy('graphql-bulk-writes', {'INVENTORY_MODE': 'graphql', 'WRITE_MODE': 'graphql'}),
+    Strategy('events', {'INVENTORY_MODE': 'events', 'WRITE_MODE': 'rest'}),
+)}
+
+
+def disable_client_pacing() -> None:
+    """Drops PyGithub's own pause between requests (0.25 s, and 1 s between writes)."""
+    from github import Github
+    init = Github.__init__
+
+    def unpaced(self, *args, **kwargs):
+        kwargs.setdefault('seconds_between_requests', 0)
+        kwargs.setdefault('seconds_between_writes', 0)
+        init(self, *args, **kwargs)
+
+    Github.__init__ = unpaced
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    """Runs one entry point against the stand-in and writes its wall time and peak RSS to `args.result`."""
+    strategy = STRATEGIES[args.strategy]
+    os.environ.update(strategy.env)
+    os.environ.update({
+        'GITHUB_TOKEN': 'bench-token',
+        'GITHUB_ORG': args.org,
+        'GITHUB_API_URL': args.api_url,
+        'SLACK_TOKEN': 'bench-token',
+        'SLACK_API_URL': f"{args.api_url}/slack/api/",
+        'STATE_DIR': args.state_dir,
+        'CLOUD_LOGGING': 'false',
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+    })
+    if not args.client_pacing:
+        disable_client_pacing()
+    from github_branch_manager.main import main
+    from github_branch_manager.branch_manager import BranchManager
+    from github_branch_manager.config import Config
+    from github_branch_manager.scheduler import BranchScheduler
+
+    actions: Optional[int] = None
+    exit_code = 0
+    start = time.perf_counter()
+    if args.worker == 'main':
+        sys.argv = ['github-tidy', '--mode', 'all',
+                    '--max-branch-workers', str(strategy.max_branch_workers),
+                    '--max-repos-in-flight', str(strategy.max_repos_in_flight)]
+        try:
+            main()
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+    else:
+        scheduler = None
+        if strategy.max_branch_workers > 1:
+            scheduler = BranchScheduler(strategy.max_branch_workers, strategy.max_repos_in_flight)
+        manager = BranchManager(Config.from_env(), scheduler=scheduler)
+        try:
+            actions = sum(len(manager.process_branches(repo.name)) for repo in manager.org.get_repos())
+        finally:
+            manager.close()
+            if scheduler is not None:
+                scheduler.shutdown()
+    wall = time.perf_counter() - start
+    with open(args.result, 'w') as f:
+        json.dump({'wall_seconds': wall, 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                   'actions': actions, 'exit_code': exit_code}, f)
+
+
+def run_case(server: FakeGitHub, strategy: Strategy, entry: str, args: argparse.Namespace) -> Dict[str, Any]:
+    server.reset()
+    with tempfile.TemporaryDirectory() as state_dir:
+        result_path = os.path.join(state_dir, 'result.json')
+        command = [sys.executable, os.path.abspath(__file__), '--worker', entry, '--strategy', strategy.name,
+                   '--org', server.spec.name, '--api-url', server.url, '--state-dir', state_dir,
+                   '--result', result_path]
+        if not args.client_pacing:
+            command.append('--no-client-pacing')
+        src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [src, os.environ.get('PYTHONPATH')])))
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run(command, env=env, check=True, stdout=output, stderr=output)
+        with open(result_path) as f:
+            result = json.load(f)
+    return {'strategy': strategy.name, 'entry': entry, **result, **server.stats()}
+
+
+def report(result: Dict[str, Any]) -> None:
+    quota = result['quota_used']
+    calls = result['calls']
+    not_modified = sum(result['not_modified'].values())
+    slack = sum(result['slack'].values())
+    limited = ', '.join(f"{count} {kind}" for kind, count in result['rate_limited'].items()) or 'none'
+    print(f"\n{result['strategy']} / {result['entry']}: {result['wall_seconds']:.2f}s wall, "
+          f"peak RSS {result['peak_rss_mb']:.1f} MB")
+    print(f"  {sum(calls.values())} API calls, quota used: {quota['core']} core, {quota['graphql']} GraphQL "
+          f"({not_modified} not modified, rate limited: {limited}); {slack} Slack calls")
+    for endpoint, count in sorted(calls.items(), key=lambda item: -item[1]):
+        print(f"  {count:>8}  {endpoint}")
+
+
+def summary(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'strategy':<22}{'entry':<18}{'wall (s)':>10}{'calls':>9}{'core':>8}{'graphql':>9}{'RSS (MB)':>10}")
+    for result in results:
+        print(f"{result['strategy']:<22}{result['entry']:<18}{result['wall_seconds']:>10.2f}"
+              f"{sum(result['calls'].values()):>9}{result['quota_used']['core']:>8}"
+              f"{result['quota_used']['graphql']:>9}{result['peak_rss_mb']:>10.1f}")
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    return f"{result['strategy']}/{result['entry']}"
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], spec: OrgSpec) -> bool:
+    """Prints the endpoints called more or less often than in the baseline; returns True if none was called more."""
+    if baseline.get('org') != asdict(spec):
+        print(f"\nThe baseline was recorded for another organization: {baseline.get('org')}")
+        return False
+    ok = True
+    print()
+    for result in results:
+        expected = baseline['cases'].get(case_key(result))
+        if expected is None:
+            print(f"{case_key(result)}: not in the baseline")
+            continue
+        for endpoint in sorted(set(expected) | set(result['calls'])):
+            before, after = expected.get(endpoint, 0), result['calls'].get(endpoint, 0)
+            if after > before:
+                ok = False
+                print(f"REGRESSION {case_key(result)}: {endpoint} called {after} times, {before} in the baseline")
+            elif after < before:
+                print(f"improved   {case_key(result)}: {endpoint} called {after} times, {before} in the baseline")
+    print("Request counts within the baseline" if ok else "Request counts exceed the baseline")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    org = parser.add_argument_group('organization')
+    org.add_argument('--repos', type=int, default=3)
+    org.add_argument('--branches', type=int, default=30, help='Feature branches per repository')
+    org.add_argument('--tags', type=int, default=10, help='Tags per repository')
+    org.add_argument('--prs', type=int, default=20, help='Pull requests per repository')
+    org.add_argument('--age-distribution', choices=AGE_DISTRIBUTIONS, default='uniform')
+    org.add_argument('--age-days', type=float, default=180.0,
+                     help='Upper bound (uniform) or mean (exponential) of head commit ages')
+    org.add_argument('--archived-fraction', type=float, default=0.1)
+    org.add_argument('--seed', type=int, default=0)
+    limits = parser.add_argument_group('limits')
+    limits.add_argument('--rate-limit', type=int, default=5000, help='REST requests per window')
+    limits.add_argument('--graphql-limit', type=int, default=5000, help='GraphQL points per window')
+    limits.add_argument('--rate-window', type=float, default=3600.0, help='Quota window in seconds')
+    limits.add_argument('--writes-per-minute', type=int, default=80, help='Content creation limit; 0 disables it')
+    limits.add_argument('--latency-scale', type=float, default=1.0, help='Multiplier of the simulated latency')
+    limits.add_argument('--no-client-pacing', dest='client_pacing', action='store_false',
+                        help="Drop PyGithub's own pause between requests")
+    limits.add_argument('--fast', action='store_true',
+                        help='No latency, pacing or write limit, and quotas that are never reached')
+    parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument('--entry-points', nargs='+', choices=ENTRY_POINTS, default=list(ENTRY_POINTS))
+    parser.add_argument('--json', metavar='FILE', help='Write all results to FILE')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Record the API calls of every run in FILE')
+    parser.add_argument('--baseline', metavar='FILE', help='Fail if any endpoint is called more often than in FILE')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the runs')
+    # Used by the runs themselves
+    parser.add_argument('--worker', choices=ENTRY_POINTS, help=argparse.SUPPRESS)
+    parser.add_argument('--strategy', choices=list(STRATEGIES), help=argparse.SUPPRESS)
+    parser.add_argument('--org', help=argparse.SUPPRESS)
+    parser.add_argument('--api-url', help=argparse.SUPPRESS)
+    parser.add_argument('--state-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(args)
+        return
+
+    if args.fast:
+        args.latency_scale, args.client_pacing, args.writes_per_minute = 0.0, False, 0
+        args.rate_limit = args.graphql_limit = 10_000_000
+    spec = OrgSpec(repos=args.repos, branches_per_repo=args.branches, tags_per_repo=args.tags, prs_per_repo=args.prs,
+                   age_distribution=args.age_distribution, age_days=args.age_days,
+                   archived_fraction=args.archived_fraction, seed=args.seed)
+    server = FakeGitHub(
+        spec,
+        RateLimits(core=args.rate_limit, graphql=args.graphql_limit, window_seconds=args.rate_window,
+                   writes_per_minute=args.writes_per_minute),
+        Latency(scale=args.latency_scale),
+    )
+    results = []
+    with server:
+        for name in args.strategies:
+            for entry in args.entry_points:
+                result = run_case(server, STRATEGIES[name], entry, args)
+                report(result)
+                results.append(result)
+    summary(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'org': asdict(spec), 'results': results}, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'org': asdict(spec), 'cases': {case_key(result): result['calls'] for result in results}},
+                      f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, spec):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
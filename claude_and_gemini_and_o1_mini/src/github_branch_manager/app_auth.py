@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+from github import Auth, GithubIntegration
+from github.InstallationAuthorization import InstallationAuthorization
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Installation tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 300
+
+
+class InstallationTokenPool:
+    """
+    Mints, caches and refreshes GitHub App installation tokens, one per organization.
+
+    Each organization the app is installed in gets its own token and therefore
+    its own rate limit budget, which is what lets one process sweep many orgs.
+    """
+
+    def __init__(self, app_id: str, private_key: str, base_url: str = 'https://api.github.com',
+                 refresh_margin: int = TOKEN_REFRESH_MARGIN, clock: Callable[[], float] = time.time):
+        self.integration = GithubIntegration(auth=Auth.AppAuth(app_id, private_key), base_url=base_url)
+        self.refresh_margin = refresh_margin
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._installation_ids: Dict[str, int] = {}
+        self._tokens: Dict[str, InstallationAuthorization] = {}
+
+    def installation_id(self, org_name: str) -> int:
+        with self._lock:
+            if org_name not in self._installation_ids:
+                self._installation_ids[org_name] = self.integration.get_org_installation(org_name).id
+            return self._installation_ids[org_name]
+
+    def _is_fresh(self, token: Optional[InstallationAuthorization]) -> bool:
+        if token is None:
+            return False
+        return token.expires_at.timestamp() - self.refresh_margin > self._clock()
+
+    def token(self, org_name: str) -> str:
+        """
+        Returns a valid installation token for the organization, minting a new
+        one when there is none yet or the cached one is about to expire.
+        """
+        installation_id = self.installation_id(org_name)
+        with self._lock:
+            cached = self._tokens.get(org_name)
+            if not self._is_fresh(cached):
+                logger.info(f"Minting installation token for {org_name}")
+                cached = self.integration.get_access_token(installation_id)
+                self._tokens[org_name] = cached
+            return cached.token
+
+    def auth(self, org_name: str) -> 'InstallationTokenAuth':
+        return InstallationTokenAuth(self, org_name)
+
+
+class InstallationTokenAuth(Auth.Auth):
+    """PyGithub authentication that always uses the pool's current token for an organization."""
+
+    def __init__(self, pool: InstallationTokenPool, org_name: str):
+        self.pool = pool
+        self.org_name = org_name
+
+    @property
+    def token_type(self) -> str:
+        return 'token'
+
+    @property
+    def token(self) -> str:
+        return self.pool.token(self.org_name)
+
+    @property
+    def _masked_token(self) -> str:
+        return 'token (installation token removed)'
@@ -0,0 +1,310 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+from .config import Config
+from .records import BranchRecord
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class ArchiveRecord:
+    """
+    A branch archived by the tool.
+
+    Attributes:
+        repo (str): Repository full name.
+        branch (str): The branch's name before it was archived.
+        archived_name (str): The branch's name after archiving (with the archive prefix).
+        sha (str): The head commit when it was archived.
+        archived_at (datetime): When it was archived.
+        tag (Optional[str]): The archive tag, if one was created.
+    """
+    repo: str
+    branch: str
+    archived_name: str
+    sha: str
+    archived_at: datetime
+    tag: Optional[str] = None
+
+    def as_branch(self) -> BranchRecord:
+        """The archived branch as last seen, dated by its archive time."""
+        return BranchRecord(self.archived_name, self.sha, self.archived_at, self.archived_at)
+
+    def to_dict(self) -> dict:
+        return {
+            'repo': self.repo,
+            'branch': self.branch,
+            'archived_name': self.archived_name,
+            'sha': self.sha,
+            'archived_at': self.archived_at.isoformat(),
+            'tag': self.tag,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ArchiveRecord':
+        archived_at = data['archived_at']
+        if isinstance(archived_at, str):
+            archived_at = datetime.fromisoformat(archived_at)
+        return cls(
+            repo=data['repo'],
+            branch=data['branch'],
+            archived_name=data['archived_name'],
+            sha=data['sha'],
+            archived_at=_as_utc(archived_at),
+            tag=data.get('tag'),
+        )
+
+
+class ArchiveLedger(ABC):
+    """
+    Records when each branch was archived, so retention is measured from the
+    archive time and purging needs no per-branch GitHub reads.
+
+    Archived branches that predate the ledger are adopted once per repository
+    (`track`), dated by the time they were first seen.
+    """
+
+    @abstractmethod
+    def record(self, record: ArchiveRecord) -> None:
+        """Stores the record, replacing any earlier one for the same archived branch."""
+
+    @abstractmethod
+    def remove(self, repo: str, archived_name: str) -> None:
+        """Forgets the archived branch, once it has been purged."""
+
+    @abstractmethod
+    def archived_before(self, repo: str, cutoff: datetime) -> List[ArchiveRecord]:
+        """Returns the records of a repository archived before `cutoff`, oldest first."""
+
+    @abstractmethod
+    def next_archived_after(self, repo: str, cutoff: datetime) -> Optional[datetime]:
+        """Returns the earliest archive time at or after `cutoff`, if any."""
+
+    @abstractmethod
+    def is_tracked(self, repo: str) -> bool:
+        """Returns True once the repository's existing archived branches have been adopted."""
+
+    @abstractmethod
+    def track(self, repo: str, records: Iterable[ArchiveRecord]) -> None:
+        """Adds records not in the ledger yet and marks the repository as fully tracked."""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteArchiveLedger(ArchiveLedger):
+    """Archive ledger in a local SQLite file, indexed by repository and archive time."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS archives ("
+            " repo TEXT, archived_name TEXT, branch TEXT, sha TEXT, archived_at TEXT, tag TEXT,"
+            " PRIMARY KEY (repo, archived_name));"
+            "CREATE INDEX IF NOT EXISTS archives_by_time ON archives (repo, archived_at);"
+            "CREATE TABLE IF NOT EXISTS tracked_repos (repo TEXT PRIMARY KEY);"
+        )
+
+    @staticmethod
+    def _row(record: ArchiveRecord) -> tuple:
+        # UTC ISO timestamps sort chronologically as text
+        archived_at = _as_utc(record.archived_at).astimezone(timezone.utc).isoformat()
+        return record.repo, record.archived_name, record.branch, record.sha, archived_at, record.tag
+
+    @staticmethod
+    def _record(row: tuple) -> ArchiveRecord:
+        repo, archived_name, branch, sha, archived_at, tag = row
+        return ArchiveRecord(repo, branch, archived_name, sha, datetime.fromisoformat(archived_at), tag)
+
+    @staticmethod
+    def _key(value: datetime) -> str:
+        return _as_utc(value).astimezone(timezone.utc).isoformat()
+
+    def record(self, record: ArchiveRecord) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO archives VALUES (?, ?, ?, ?, ?, ?)", self._row(record))
+
+    def remove(self, repo: str, archived_name: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM archives WHERE repo = ? AND archived_name = ?", (repo, archived_name))
+
+    def archived_before(self, repo: str, cutoff: datetime) -> List[ArchiveRecord]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT repo, archived_name, branch, sha, archived_at, tag FROM archives"
+                " WHERE repo = ? AND archived_at < ? ORDER BY archived_at",
+                (repo, self._key(cutoff)),
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def next_archived_after(self, repo: str, cutoff: datetime) -> Optional[datetime]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(archived_at) FROM archives WHERE repo = ? AND archived_at >= ?",
+                (repo, self._key(cutoff)),
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] else None
+
+    def is_tracked(self, repo: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM tracked_repos WHERE repo = ?", (repo,)).fetchone() is not None
+
+    def track(self, repo: str, records: Iterable[ArchiveRecord]) -> None:
+        rows = [self._row(record) for record in records]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR IGNORE INTO archives VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("INSERT OR IGNORE INTO tracked_repos VALUES (?)", (repo,))
+            self._db.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class JSONArchiveLedger(ArchiveLedger):
+    """Archive ledger in a JSON file, rewritten atomically on every change; for small organizations."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: Dict[tuple, ArchiveRecord] = {}
+        self._tracked = set()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            for item in data.get('records', []):
+                record = ArchiveRecord.from_dict(item)
+                self._records[(record.repo, record.archived_name)] = record
+            self._tracked = set(data.get('tracked', []))
+        except FileNotFoundError:
+            pass
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'records': [record.to_dict() for record in self._records.values()],
+                'tracked': sorted(self._tracked),
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def record(self, record: ArchiveRecord) -> None:
+        with self._lock:
+            self._records[(record.repo, record.archived_name)] = record
+            self._save()
+
+    def remove(self, repo: str, archived_name: str) -> None:
+        with self._lock:
+            if self._records.pop((repo, archived_name), None) is not None:
+                self._save()
+
+    def archived_before(self, repo: str, cutoff: datetime) -> List[ArchiveRecord]:
+        with self._lock:
+            records = [r for r in self._records.values() if r.repo == repo and r.archived_at < cutoff]
+        return sorted(records, key=lambda r: r.archived_at)
+
+    def next_archived_after(self, repo: str, cutoff: datetime) -> Optional[datetime]:
+        with self._lock:
+            times = [r.archived_at for r in self._records.values() if r.repo == repo and r.archived_at >= cutoff]
+        return min(times, default=None)
+
+    def is_tracked(self, repo: str) -> bool:
+        with self._lock:
+            return repo in self._tracked
+
+    def track(self, repo: str, records: Iterable[ArchiveRecord]) -> None:
+        with self._lock:
+            for record in records:
+                self._records.setdefault((record.repo, record.archived_name), record)
+            self._tracked.add(repo)
+            self._save()
+
+
+class FirestoreArchiveLedger(ArchiveLedger):
+    """
+    Archive ledger in a Firestore collection, for runs without a persistent disk.
+
+    `archived_before` needs a composite index on (`repo`, `archived_at`).
+    Requires the `google-cloud-firestore` package (the `firestore` extra).
+    """
+
+    def __init__(self, collection: str = 'archived_branches', client=None):
+        if client is None:
+            from google.cloud import firestore
+            client = firestore.Client()
+        self._collection = client.collection(collection)
+        self._tracked = client.collection(f"{collection}_tracked_repos")
+
+    @staticmethod
+    def _document_id(repo: str, name: str) -> str:
+        # Percent-encoding drops the slashes Firestore reads as path separators;
+        # ':' is always encoded within a part, so no two (repo, name) pairs share an id
+        return f"{quote(repo, safe='')}:{quote(name, safe='')}"
+
+    def record(self, record: ArchiveRecord) -> None:
+        data = record.to_dict()
+        data['archived_at'] = record.archived_at
+        self._collection.document(self._document_id(record.repo, record.archived_name)).set(data)
+
+    def remove(self, repo: str, archived_name: str) -> None:
+        self._collection.document(self._document_id(repo, archived_name)).delete()
+
+    def _query(self, repo: str, op: str, cutoff: datetime):
+        return (self._collection.where('repo', '==', repo)
+                .where('archived_at', op, cutoff)
+                .order_by('archived_at'))
+
+    def archived_before(self, repo: str, cutoff: datetime) -> List[ArchiveRecord]:
+        return [ArchiveRecord.from_dict(doc.to_dict()) for doc in self._query(repo, '<', cutoff).stream()]
+
+    def next_archived_after(self, repo: str, cutoff: datetime) -> Optional[datetime]:
+        for doc in self._query(repo, '>=', cutoff).limit(1).stream():
+            return ArchiveRecord.from_dict(doc.to_dict()).archived_at
+        return None
+
+    def is_tracked(self, repo: str) -> bool:
+        return self._tracked.document(quote(repo, safe='')).get().exists
+
+    def track(self, repo: str, records: Iterable[ArchiveRecord]) -> None:
+        for record in records:
+            ref = self._collection.document(self._document_id(record.repo, record.archived_name))
+            if not ref.get().exists:
+                self.record(record)
+        self._tracked.document(quote(repo, safe='')).set({'repo': repo})
+
+
+def open_archive_ledger(config: Config) -> Optional[ArchiveLedger]:
+    """
+    Opens the archive ledger selected by `config.archive_ledger`.
+
+    Returns:
+        Optional[ArchiveLedger]: The ledger, or None if it is disabled or cannot be
+        opened (retention is then measured from each branch's last commit).
+    """
+    try:
+        if config.archive_ledger == 'firestore':
+            return FirestoreArchiveLedger(config.archive_ledger_collection)
+        if config.archive_ledger == 'sqlite' and config.state_dir:
+            return SQLiteArchiveLedger(os.path.join(config.state_dir, 'archive-ledger.sqlite3'))
+        if config.archive_ledger == 'json' and config.state_dir:
+            return JSONArchiveLedger(os.path.join(config.state_dir, 'archive-ledger.json'))
+    except Exception as e:
+        logger.warning(f"Archive ledger unavailable, measuring retention from last commits: {e}")
+    return None
@@ -1,130 +1,392 @@
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
-from github import Github
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, TypeVar, Union
+from github import Auth, Github
 from github.Repository import Repository
 from github.Branch import Branch
 from .config import Config
+from .inventory import fetch_branch_inventory
+from .records import BranchRecord
+from .tag_index import TagIndex
+from .pr_index import PullRequestEntry, PullRequestIndex, is_own_head
+from .branch_state import BranchStateStore
+from .scheduler import BranchScheduler
+from .rate_limit import GovernedAuth, RateBudgetExceeded, RateGovernor
+from .run_state import RepoRunState, RunStateStore
+from .policy import Policy, RepoPolicy, compile_policy
+from .bulk_refs import BulkRefWriter
+from .plan import APPLIED, CHANGED, FAILED, PlanEntry
+from .git_mirror import GitError, GitMirror, MirrorSnapshot
+from .archive_ledger import ArchiveLedger, ArchiveRecord
+from .classify import BranchColumns, classify_branches
+from .metrics import Metrics
+import os
+import threading
 from .logger import setup_logger
 from .notifier import SlackNotifier
-import time
-from github.GithubException import RateLimitExceededException, GithubException
+from .notification_queue import NotificationQueue, NotificationSpool
+from github.GithubException import RateLimitExceededException, GithubException, UnknownObjectException
 
 logger = setup_logger()
 
+# Attempts made for a write that keeps hitting rate limits
+MAX_RATE_LIMIT_ATTEMPTS = 3
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Branches classified together when prefiltering an inventory
+CLASSIFY_CHUNK_SIZE = 10000
+
+
+class BranchAction(NamedTuple):
+    """An action taken on a branch during a run."""
+    repo: str
+    branch: str
+    action: str
+
+
 class BranchManager:
     """
     Manages GitHub branches by archiving inactive ones and purging them after a retention period.
     """
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, scheduler: Optional[BranchScheduler] = None,
+                 auth: Optional[Auth.Auth] = None, run_state: Optional[RunStateStore] = None,
+                 branch_state: Optional[BranchStateStore] = None,
+                 archive_ledger: Optional[ArchiveLedger] = None, policy: Optional[Policy] = None,
+                 metrics: Optional[Metrics] = None):
         """
         Initializes the BranchManager with the given configuration.
         
         Args:
             config (Config): Configuration settings.
+            scheduler (Optional[BranchScheduler]): Evaluates branches concurrently when given;
+                branches are processed one at a time otherwise.
+            auth (Optional[Auth.Auth]): Authentication to use instead of `config.github_token`,
+                e.g. a GitHub App installation token.
+            run_state (Optional[RunStateStore]): Records each completed phase, so later
+                runs can skip repositories where nothing changed.
+            branch_state (Optional[BranchStateStore]): The webhook-maintained branch state
+                read in `events` inventory mode; opened from `state_dir` when not given.
+            archive_ledger (Optional[ArchiveLedger]): Records when branches are archived;
+                when given, retention is measured from the archive time and the purge
+                phase reads its candidates from the ledger instead of listing branches.
+            policy (Optional[Policy]): The compiled branch policy; compiled from
+                `config` (and its policy file) when not given.
+            metrics (Optional[Metrics]): Where predicate evaluations, phase durations
+                and Slack calls are recorded; kept by the manager alone when not given.
         """
         self.config = config
-        self.github = Github(config.github_token)
+        self.scheduler = scheduler
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.governor = RateGovernor(budget_percent=config.rate_budget_percent)
+        auth = GovernedAuth(auth or Auth.Token(config.github_token), self.governor)
+        self._auth = auth
+        # PyGithub binds authentication to a client, so each organization, with its
+        # own token and rate budget, gets its own; `main` shares the connection pool
+        # below the clients with `install_connection_pool`.
+        if scheduler is not None:
+            # One pooled connection per worker that may be talking to GitHub
+            pool_size = scheduler.max_branch_workers + scheduler.max_repos_in_flight
+            self.github = Github(auth=auth, base_url=config.github_api_url, pool_size=pool_size)
+        else:
+            self.github = Github(auth=auth, base_url=config.github_api_url)
         self.org = self.github.get_organization(config.org_name)
-        self.notifier = SlackNotifier(config.slack_token, config.slack_channel)
-
-    def handle_rate_limit(self):
-        """Handles GitHub API rate limits by sleeping until reset."""
-        core_rate_limit = self.github.get_rate_limit().core
-        remaining = core_rate_limit.remaining
-        reset_timestamp = core_rate_limit.reset.timestamp()
-        current_timestamp = time.time()
-        sleep_time = reset_timestamp - current_timestamp + 5  # Adding buffer
-
-        if remaining == 0:
-            logger.warning(f"Rate limit exceeded. Sleeping for {sleep_time} seconds.")
-            time.sleep(max(sleep_time, 0))
-
-    def is_branch_inactive(self, branch: Branch) -> bool:
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=self.config.inactivity_days)
-        last_commit = branch.commit.commit.author.date
+        self.notifier = SlackNotifier(config.slack_token, config.slack_channel, digest=config.slack_digest,
+                                      base_url=config.slack_api_url or None, metrics=self.metrics)
+        if config.notification_queue_size > 0:
+            # Deliver notifications in the background; spool them per organization when the queue is full
+            spool = None
+            if config.state_dir:
+                spool_path = os.path.join(config.state_dir, 'notification-spool', f"{config.org_name}.jsonl")
+                spool = NotificationSpool(spool_path)
+            self.notifier = NotificationQueue(self.notifier, config.notification_queue_size, spool)
+        # GraphQL inventories keyed by repository full name, then branch name
+        self._inventories: Dict[str, Dict[str, BranchRecord]] = {}
+        # Critical tag indexes keyed by repository full name
+        self._tag_indexes: Dict[str, TagIndex] = {}
+        # Pull request indexes keyed by repository full name
+        self._pr_indexes: Dict[str, PullRequestIndex] = {}
+        # Local mirror snapshots keyed by repository full name, and those outdated by our own writes
+        self._mirrors: Dict[str, MirrorSnapshot] = {}
+        self._stale_mirrors: Set[str] = set()
+        self.run_state = run_state
+        if branch_state is None and config.inventory_mode == 'events':
+            branch_state = BranchStateStore(os.path.join(config.state_dir, 'branch-state.sqlite3'))
+        self.branch_state = branch_state
+        self.archive_ledger = archive_ledger
+        self.policy = policy if policy is not None else compile_policy(config)
+        self._fingerprints: Dict[int, str] = {}
+        # Earliest upcoming threshold and incomplete phases, keyed by (repository full name, phase)
+        self._next_due: Dict[Tuple[str, str], datetime] = {}
+        self._incomplete: Set[Tuple[str, str]] = set()
+        self._run_state_lock = threading.Lock()
+        # Per worker thread: whether a check of the branch being evaluated fell back to its safe answer
+        self._checks = threading.local()
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Sends any collected digest and waits for queued notifications to be delivered.
+
+        Args:
+            timeout (Optional[float]): How long to wait for queued notifications;
+                undelivered ones are spooled for the next run.
+        """
+        self.notifier.flush()
+        if isinstance(self.notifier, NotificationQueue):
+            self.notifier.close(timeout)
+
+    def policy_for(self, repo: Repository) -> RepoPolicy:
+        """Returns the policy of a repository, with its overrides applied."""
+        return self.policy.for_repo(repo.full_name)
+
+    def _fingerprint(self, repo_full_name: str) -> str:
+        policy = self.policy.for_repo(repo_full_name)
+        fingerprint = self._fingerprints.get(id(policy))
+        if fingerprint is None:
+            fingerprint = self._fingerprints[id(policy)] = policy.fingerprint(self.config.archive_prefix)
+        return fingerprint
+
+    def _inventory_entry(self, repo: Repository, branch_name: str) -> Optional[BranchRecord]:
+        """Returns the GraphQL inventory entry for a branch, if one was loaded."""
+        inventory = self._inventories.get(repo.full_name)
+        if inventory is None:
+            return None
+        return inventory.get(branch_name)
+
+    @staticmethod
+    def _head_sha(branch: Union[Branch, BranchRecord]) -> str:
+        if isinstance(branch, BranchRecord):
+            return branch.sha
+        return branch.commit.sha
+
+    @staticmethod
+    def _last_commit_date(branch: Union[Branch, BranchRecord]) -> datetime:
+        if isinstance(branch, BranchRecord):
+            return branch.authored_date
+        return branch.commit.commit.author.date
+
+    def is_branch_inactive(self, branch: Union[Branch, BranchRecord], repo: Optional[Repository] = None) -> bool:
+        policy = self.policy_for(repo) if repo is not None else self.policy.default
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=policy.inactivity_days)
+        last_commit = self._last_commit_date(branch)
         return last_commit < cutoff_date
 
-    def is_branch_merged(self, repo: Repository, branch: Branch) -> bool:
+    def is_branch_merged(self, repo: Repository, branch: Union[Branch, BranchRecord]) -> bool:
+        protected = self.policy_for(repo).protected
+        entry = self._inventory_entry(repo, branch.name)
+        if entry is not None:
+            return entry.is_merged_into(protected)
+        mirror = self._mirrors.get(repo.full_name)
+        if mirror is not None and mirror.is_merged_into(branch.name, protected):
+            return True
+        pr_index = self._pr_indexes.get(repo.full_name)
+        if pr_index is not None:
+            # Squash and rebase merges leave no ancestry behind; the pull requests still tell
+            return pr_index.is_merged_into(branch.name, protected)
         try:
-            for base in self.config.protected_branches:
+            for base in sorted(protected.names):
                 pulls = repo.get_pulls(state='closed',
                                      base=base,
                                      head=branch.name)
                 if any(pr.merged for pr in pulls):
                     return True
+            if protected.globs:
+                # Bases given as patterns cannot be queried by name
+                pulls = repo.get_pulls(state='closed', head=branch.name)
+                return any(pr.merged and pr.base.ref in protected for pr in pulls)
             return False
+        except RateBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Failed to check merge status for {branch.name}: {e}")
+            self._check_failed()
             return False
 
     def has_open_prs(self, repo: Repository, branch_name: str) -> bool:
+        entry = self._inventory_entry(repo, branch_name)
+        if entry is not None:
+            return entry.has_open_pr
+        pr_index = self._pr_indexes.get(repo.full_name)
+        if pr_index is not None:
+            return pr_index.has_open_pr(branch_name)
         try:
             pulls = repo.get_pulls(state='open', head=branch_name)
             return pulls.totalCount > 0
+        except RateBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Failed to check PRs for {branch_name}: {e}")
+            self._check_failed()
             return True
 
-    def has_critical_tags(self, repo: Repository, branch: Branch) -> bool:
+    def _pr_index_path(self, repo: Repository) -> Optional[str]:
+        if not self.config.state_dir:
+            return None
+        return os.path.join(self.config.state_dir, 'pr-index', f"{repo.full_name.replace('/', '__')}.json")
+
+    def build_pr_index(self, repo: Repository) -> Optional[PullRequestIndex]:
+        """
+        Builds the pull request index for a repository run.
+
+        When `state_dir` is configured, the index saved by the previous run is
+        loaded and only pull requests updated since then are read. If reading
+        fails, no index is kept and the merge and open-PR checks fall back to
+        per-branch queries.
+
+        Args:
+            repo (Repository): The GitHub repository.
+
+        Returns:
+            Optional[PullRequestIndex]: The index, or None if it could not be built.
+        """
+        path = self._pr_index_path(repo)
         try:
-            import fnmatch
-            commit_sha = branch.commit.sha
+            index = PullRequestIndex.load(path) if path else PullRequestIndex()
+            read = index.refresh(repo)
+        except RateBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to build pull request index for {repo.name}: {e}")
+            self._pr_indexes.pop(repo.full_name, None)
+            return None
+        self._pr_indexes[repo.full_name] = index
+        logger.info(f"Indexed {len(index)} pull requests in {repo.name} ({read} read)")
+        if path:
+            try:
+                index.save(path)
+            except OSError as e:
+                logger.error(f"Failed to save pull request index for {repo.name}: {e}")
+        return index
+
+    def build_tag_index(self, repo: Repository) -> Optional[TagIndex]:
+        """
+        Builds the critical tag index for a repository run.
+
+        If the listing fails, no index is kept and `has_critical_tags` falls back
+        to scanning the repository's tags.
+
+        Args:
+            repo (Repository): The GitHub repository.
+
+        Returns:
+            Optional[TagIndex]: The index, or None if it could not be built.
+        """
+        if self.config.inventory_mode == 'mirror':
+            try:
+                index = self.refresh_mirror(repo).tag_index(self.policy_for(repo).critical_tags)
+                self._tag_indexes[repo.full_name] = index
+                logger.info(f"Indexed {len(index)} critical tags in {repo.name} from the local mirror")
+                return index
+            except GitError as e:
+                logger.error(f"Failed to update the mirror of {repo.name}, listing tags through the API: {e}")
+        try:
+            index = TagIndex.from_matching_refs(repo, self.policy_for(repo).critical_tags)
+        except RateBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to build tag index for {repo.name}: {e}")
+            self._tag_indexes.pop(repo.full_name, None)
+            return None
+        self._tag_indexes[repo.full_name] = index
+        logger.info(f"Indexed {len(index)} critical tags in {repo.name}")
+        return index
+
+    def has_critical_tags(self, repo: Repository, branch: Union[Branch, BranchRecord]) -> bool:
+        index = self._tag_indexes.get(repo.full_name)
+        if index is not None:
+            return index.has_critical_tag(self._head_sha(branch))
+        try:
+            commit_sha = self._head_sha(branch)
             for tag in repo.get_tags():
                 if tag.commit.sha != commit_sha:
                     continue
-                if any(fnmatch.fnmatch(tag.name, p) for p in self.config.critical_tag_patterns):
+                if self.policy_for(repo).critical_tags.match(tag.name):
                     return True
             return False
+        except RateBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Failed to check tags for {branch.name}: {e}")
+            self._check_failed()
             return True
 
     def should_archive_branch(self, repo: Repository, branch: Branch) -> bool:
-        if branch.name in self.config.protected_branches:
-            return False
-        if branch.name.startswith(self.config.archive_prefix):
-            return False
-        if not self.is_branch_inactive(branch):
-            return False
-        if not self.is_branch_merged(repo, branch):
-            return False
-        if self.has_open_prs(repo, branch.name):
-            return False
-        if self.has_critical_tags(repo, branch):
-            return False
-        
-        return True
+        with self.metrics.phase('classify'):
+            evaluated = self.metrics.evaluated
+            if evaluated('protected', self.policy_for(repo).is_protected(branch.name)):
+                return False
+            if evaluated('archived', branch.name.startswith(self.config.archive_prefix)):
+                return False
+            if not evaluated('inactive', self.is_branch_inactive(branch, repo)):
+                return False
+            if not evaluated('merged', self.is_branch_merged(repo, branch)):
+                return False
+            if evaluated('open_prs', self.has_open_prs(repo, branch.name)):
+                return False
+            if evaluated('critical_tags', self.has_critical_tags(repo, branch)):
+                return False
 
-    def should_purge_branch(self, repo: Repository, branch: Branch) -> bool:
+            return True
+
+    def should_purge_branch(self, repo: Repository, branch: Branch, archived_at: Optional[datetime] = None) -> bool:
         """
         Determines if a branch should be purged based on retention period and critical tags.
 
         Args:
             repo (Repository): The GitHub repository.
             branch (Branch): The GitHub branch to evaluate.
+            archived_at (Optional[datetime]): When the branch was archived, from the
+                archive ledger; retention is measured from the last commit without it.
 
         Returns:
             bool: True if the branch should be purged, False otherwise.
         """
-        if self.has_critical_tags(repo, branch) and not self.config.allow_auto_purge_critical:
-            logger.info(f"Branch {branch.name} has critical tags and requires manual approval.")
-            return False
+        with self.metrics.phase('classify'):
+            policy = self.policy_for(repo)
+            if self.metrics.evaluated('critical_tags', self.has_critical_tags(repo, branch)) \
+                    and not policy.allow_auto_purge_critical:
+                logger.info(f"Branch {branch.name} has critical tags and requires manual approval.")
+                return False
 
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=self.config.retention_days)
-        return branch.commit.commit.author.date < cutoff_date
+            cutoff_date = datetime.now(timezone.utc) - timedelta(days=policy.retention_days)
+            return self.metrics.evaluated('retention', self._retention_start(branch, archived_at) < cutoff_date)
 
-    def archive_branch(self, repo: Repository, branch: Branch) -> None:
+    def _retention_start(self, branch: Union[Branch, BranchRecord], archived_at: Optional[datetime]) -> datetime:
+        return archived_at if archived_at is not None else self._last_commit_date(branch)
+
+    def archive_branch(self, repo: Repository, branch: Branch) -> bool:
         """
         Archives a branch by creating a tag and renaming it with a prefix.
 
         Args:
             repo (Repository): The GitHub repository.
             branch (Branch): The GitHub branch to archive.
+
+        Returns:
+            bool: True if the branch was archived.
         """
-        try:
-            self.handle_rate_limit()
+        for attempt in range(1, MAX_RATE_LIMIT_ATTEMPTS + 1):
+            try:
+                self._archive(repo, branch)
+                return True
+            except RateLimitExceededException as e:
+                logger.error(f"GitHub rate limit exceeded while archiving {branch.name} "
+                             f"(attempt {attempt}/{MAX_RATE_LIMIT_ATTEMPTS}).")
+                self.governor.on_rate_limit_error(e)
+            except GithubException as e:
+                logger.error(f"GitHub exception occurred while archiving {branch.name}: {e}")
+                return False
+            except RateBudgetExceeded:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to archive {branch.name}: {str(e)}")
+                return False
+        return False
 
+    def _archive(self, repo: Repository, branch: Union[Branch, BranchRecord]) -> None:
+        with self.metrics.phase('archive'):
             # Create tag before archiving
             tag_name = f"archived-{branch.name}-{datetime.now().strftime('%Y%m%d')}"
             repo.create_git_tag_and_release(
@@ -132,7 +394,7 @@ class BranchManager:
                 tag_message=f"Archived branch {branch.name} on {datetime.now().strftime('%Y-%m-%d')}",
                 release_name=f"Archive {branch.name}",
                 release_message=f"Branch `{branch.name}` has been archived.",
-                object=branch.commit.sha,
+                object=self._head_sha(branch),
                 type="commit",
                 draft=False,
                 prerelease=False
@@ -143,40 +405,764 @@ class BranchManager:
             new_name = f"{self.config.archive_prefix}{branch.name}"
             repo.create_git_ref(
                 ref=f"refs/heads/{new_name}",
-                sha=branch.commit.sha
+                sha=self._head_sha(branch)
             )
             repo.get_git_ref(f"heads/{branch.name}").delete()
-            self.notifier.notify_archive(repo.name, branch.name, tag_name)
-            logger.info(f"Archived branch {branch.name} in {repo.name}")
-
-        except RateLimitExceededException:
-            logger.error("GitHub rate limit exceeded. Attempting to sleep and retry.")
-            self.handle_rate_limit()
-            self.archive_branch(repo, branch)  # Retry once after sleeping
-        except GithubException as e:
-            logger.error(f"GitHub exception occurred while archiving {branch.name}: {e}")
-        except Exception as e:
-            logger.error(f"Failed to archive {branch.name}: {str(e)}")
+        self._record_archive(repo, branch, tag_name)
+        self.notifier.notify_archive(repo.name, branch.name, tag_name)
+        logger.info(f"Archived branch {branch.name} in {repo.name}")
     
-    def purge_branch(self, repo: Repository, branch: Branch) -> None:
+    def purge_branch(self, repo: Repository, branch: Branch) -> bool:
         try:
-            repo.get_git_ref(f"heads/{branch.name}").delete()
+            with self.metrics.phase('purge'):
+                repo.get_git_ref(f"heads/{branch.name}").delete()
             self.notifier.notify_deletion(repo.name, branch.name)
             logger.info(f"Purged branch {branch.name} in {repo.name}")
+            return True
+        except UnknownObjectException:
+            logger.info(f"Branch {branch.name} no longer exists in {repo.name}")
+            self._forget_archive(repo, branch.name)
+            return False
+        except RateBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Failed to purge {branch.name}: {str(e)}")
+            return False
             
-    def process_branches(self, repo_name: str) -> None:
-        repo = self.org.get_repo(repo_name)
-        for branch in repo.get_branches():
-            if self.should_archive_branch(repo, branch):
-                self.archive_branch(repo, branch)
+    def list_branches(self, repo: Repository) -> List[Union[Branch, BranchRecord]]:
+        """
+        Lists the branches of a repository using the configured inventory mode.
+
+        In GraphQL mode the whole inventory (head commit dates and associated pull
+        requests included) is fetched in pages of 100 and kept for the predicates,
+        so evaluating a branch costs no further requests.
+
+        Args:
+            repo (Repository): The GitHub repository.
+
+        Returns:
+            List[Union[Branch, BranchRecord]]: The branches of the repository.
+        """
+        return list(self.metrics.timed('list', self.iter_branches(repo)))
+
+    def iter_branches(self, repo: Repository) -> Iterator[Union[Branch, BranchRecord]]:
+        """
+        Yields the branches of a repository using the configured inventory mode.
+
+        GraphQL pages (whose cursors are not affected by writes) are fetched as
+        the branches are consumed; REST listings are read in full first. GraphQL
+        and events inventory entries are kept for the predicates as they are yielded.
+
+        Args:
+            repo (Repository): The GitHub repository.
+
+        Yields:
+            Union[Branch, BranchRecord]: The branches of the repository.
+        """
+        if self.config.inventory_mode == 'rest':
+            self._inventories.pop(repo.full_name, None)
+            # Converted as they are listed; the PyGithub objects are not kept. The listing is
+            # paginated by offset, so it is read in full before any branch is renamed or deleted
+            yield from list(map(BranchRecord.from_rest, repo.get_branches()))
+            return
+
+        if self.config.inventory_mode == 'mirror':
+            mirror = self._mirrors.get(repo.full_name)
+            if mirror is None or repo.full_name in self._stale_mirrors:
+                mirror = self.refresh_mirror(repo)
+            yield from list(mirror.branches.values())
+            return
+
+        if self.config.inventory_mode == 'events':
+            branches = self._branches_from_events(repo)
+        else:
+            branches = fetch_branch_inventory(self.github.requester, self.config.org_name, repo.name)
+        inventory: Dict[str, BranchRecord] = {}
+        self._inventories[repo.full_name] = inventory
+        for branch in branches:
+            inventory[branch.name] = branch
+            yield branch
+
+    def refresh_mirror(self, repo: Repository) -> MirrorSnapshot:
+        """
+        Brings the local mirror of a repository up to date and reads its branches, tags and merges.
+
+        Mirrors are kept under `state_dir/mirrors`; they are cloned on first use
+        and fetched incrementally afterwards.
+        """
+        path = os.path.join(self.config.state_dir, 'mirrors', f"{repo.full_name}.git")
+        mirror = GitMirror(path, repo.clone_url, self._auth.token)
+        mirror.sync()
+        snapshot = mirror.snapshot(self.policy_for(repo).protected)
+        self._mirrors[repo.full_name] = snapshot
+        self._stale_mirrors.discard(repo.full_name)
+        logger.info(f"Read {len(snapshot.branches)} branches and {len(snapshot.tags)} tags of {repo.name} "
+                    f"from the local mirror")
+        return snapshot
+
+    def seed_branch_state(self, repo: Repository) -> None:
+        """Fills the branch state of a repository from a full listing of its branches and pull requests."""
+        branches = fetch_branch_inventory(self.github.requester, self.config.org_name, repo.name)
+        pulls = (PullRequestEntry.from_pull(pull) for pull in repo.get_pulls(state='all')
+                 if is_own_head(pull, repo.full_name))
+        self.branch_state.seed(repo.full_name, branches, pulls)
+        logger.info(f"Seeded branch state for {repo.name}")
+
+    def _branches_from_events(self, repo: Repository) -> List[BranchRecord]:
+        """
+        Lists branches from the webhook-maintained state.
+
+        Only a repository that was never seeded is listed in full; branches whose
+        head commit date is not known yet are looked up individually.
+        """
+        if not self.branch_state.is_seeded(repo.full_name):
+            self.seed_branch_state(repo)
+        branches = []
+        for branch in self.branch_state.branches(repo.full_name):
+            if branch.authored_date is None:
+                branch = self._refresh_branch(repo, branch)
+                if branch is None:
+                    continue
+            branches.append(branch)
+        return branches
+
+    def _refresh_branch(self, repo: Repository, branch: BranchRecord) -> Optional[BranchRecord]:
+        """Reads a branch's current head and updates the branch state; None if it no longer exists."""
+        try:
+            live = repo.get_branch(branch.name)
+        except GithubException as e:
+            if e.status != 404:
+                raise
+            self.branch_state.delete_branch(repo.full_name, branch.name)
+            return None
+        date = live.commit.commit.author.date
+        self.branch_state.put_branch(repo.full_name, branch.name, live.commit.sha, date)
+        return BranchRecord(branch.name, live.commit.sha, date, date, branch.pull_requests)
+
+    def _confirm_head(self, repo: Repository, branch: Union[Branch, BranchRecord]) -> bool:
+        """
+        In events mode, checks that a branch still points at the evaluated commit
+        before acting on it, in case a webhook delivery was missed or is still pending.
+        """
+        if self.config.inventory_mode != 'events':
+            return True
+        try:
+            live = self._refresh_branch(repo, branch)
+        except RateBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to verify {branch.name}: {e}")
+            return False
+        if live is None or live.sha != branch.sha:
+            logger.info(f"Branch {branch.name} changed since its last event, skipping it until the next run")
+            return False
+        return True
+
+    def is_up_to_date(self, repo_full_name: str, pushed_at: Optional[datetime], phases: Sequence[str]) -> bool:
+        """
+        Checks whether a repository can be skipped because nothing changed since its last evaluation.
+
+        Args:
+            repo_full_name (str): The repository full name.
+            pushed_at (Optional[datetime]): The repository's current `pushed_at`.
+            phases (Sequence[str]): The phases about to run (`archive`, `purge`).
+
+        Returns:
+            bool: True if every phase was completed since the last push, with the
+            current policy, and no branch has crossed a time threshold since.
+        """
+        if self.run_state is None:
+            return False
+        try:
+            states = [self.run_state.get(repo_full_name, phase) for phase in phases]
+        except Exception as e:
+            logger.error(f"Failed to read run state for {repo_full_name}: {e}")
+            return False
+        fingerprint = self._fingerprint(repo_full_name)
+        return all(state is not None and state.is_current(pushed_at, fingerprint) for state in states)
+
+    def _note_due(self, repo: Repository, phase: str, due: datetime) -> None:
+        if self.run_state is None or due <= datetime.now(timezone.utc):
+            return
+        key = (repo.full_name, phase)
+        with self._run_state_lock:
+            if key not in self._next_due or due < self._next_due[key]:
+                self._next_due[key] = due
+
+    def _mark_incomplete(self, repo: Repository, phase: str) -> None:
+        if self.run_state is None:
+            return
+        with self._run_state_lock:
+            self._incomplete.add((repo.full_name, phase))
 
-        for branch in repo.get_branches():
-            if branch.name.startswith(self.config.archive_prefix):
+    def _begin_phase(self, repo: Repository, phase: str) -> None:
+        key = (repo.full_name, phase)
+        with self._run_state_lock:
+            self._next_due.pop(key, None)
+            self._incomplete.discard(key)
+
+    def _record_phase(self, repo: Repository, phase: str) -> None:
+        """Stores the outcome of a phase; a phase with failed actions is due again right away."""
+        if self.run_state is None:
+            return
+        key = (repo.full_name, phase)
+        now = datetime.now(timezone.utc)
+        with self._run_state_lock:
+            next_due = now if key in self._incomplete else self._next_due.get(key)
+        state = RepoRunState(repo.full_name, phase, repo.pushed_at, now, next_due, self._fingerprint(repo.full_name))
+        try:
+            self.run_state.put(state)
+        except Exception as e:
+            logger.error(f"Failed to record run state for {repo.name}: {e}")
+
+    def _map(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        if self.scheduler is None:
+            return [fn(item) for item in items]
+        return self.scheduler.map(fn, items)
+
+    def _imap(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        if self.scheduler is None:
+            return (fn(item) for item in items)
+        return self.scheduler.imap(fn, items)
+
+    def _check_failed(self) -> None:
+        self._checks.failed = True
+
+    def _evaluate(self, check: Callable[[], bool]) -> Tuple[bool, bool]:
+        """Runs a decision and returns its result, and whether one of its checks failed."""
+        self._checks.failed = False
+        try:
+            return check(), self._checks.failed
+        finally:
+            self._checks.failed = False
+
+    def _archive_candidate(self, repo: Repository, branch: Union[Branch, BranchRecord]) -> bool:
+        """Whether a branch is to be archived now; records when it will be due otherwise."""
+        archive, failed = self._evaluate(lambda: self.should_archive_branch(repo, branch))
+        if failed:
+            # The safe answer only holds until the check can be made again
+            self._mark_incomplete(repo, 'archive')
+        elif archive:
+            if self._confirm_head(repo, branch):
+                return True
+            self._mark_incomplete(repo, 'archive')
+        elif not self.policy_for(repo).is_protected(branch.name) and not branch.name.startswith(self.config.archive_prefix):
+            self._note_due(repo, 'archive',
+                           self._last_commit_date(branch) + timedelta(days=self.policy_for(repo).inactivity_days))
+        return False
+
+    def _purge_candidate(self, repo: Repository, branch: Union[Branch, BranchRecord],
+                         archived_at: Optional[datetime] = None) -> bool:
+        """Whether an archived branch is to be purged now; records when it will be due otherwise."""
+        if not branch.name.startswith(self.config.archive_prefix):
+            return False
+        try:
+            purge, failed = self._evaluate(lambda: self.should_purge_branch(repo, branch, archived_at))
+            if failed:
+                self._mark_incomplete(repo, 'purge')
+            elif purge:
+                if self._confirm_head(repo, branch):
+                    return True
+                self._mark_incomplete(repo, 'purge')
+            else:
+                self._note_due(repo, 'purge', self._retention_start(branch, archived_at)
+                               + timedelta(days=self.policy_for(repo).retention_days))
+        except RateBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to process branch {branch.name} for purging: {str(e)}")
+            self._mark_incomplete(repo, 'purge')
+        return False
+
+    def _record_archive(self, repo: Repository, branch: Union[Branch, BranchRecord], tag: Optional[str]) -> None:
+        if self.archive_ledger is None:
+            return
+        record = ArchiveRecord(repo.full_name, branch.name, f"{self.config.archive_prefix}{branch.name}",
+                               self._head_sha(branch), datetime.now(timezone.utc), tag)
+        try:
+            self.archive_ledger.record(record)
+        except Exception as e:
+            # Without a record the branch is adopted, and its retention restarted, when next seen
+            logger.error(f"Failed to record the archive of {branch.name} in the ledger: {e}")
+
+    def _forget_archive(self, repo: Repository, archived_name: str) -> None:
+        if self.archive_ledger is None:
+            return
+        try:
+            self.archive_ledger.remove(repo.full_name, archived_name)
+        except Exception as e:
+            logger.error(f"Failed to remove {archived_name} from the archive ledger: {e}")
+
+    def _track_archives(self, repo: Repository) -> None:
+        """Adds the repository's archived branches missing from the ledger, dated now."""
+        now = datetime.now(timezone.utc)
+        prefix = self.config.archive_prefix
+        records = [
+            ArchiveRecord(repo.full_name, branch.name[len(prefix):], branch.name, self._head_sha(branch), now)
+            for branch in self.list_branches(repo) if branch.name.startswith(prefix)
+        ]
+        self.archive_ledger.track(repo.full_name, records)
+        logger.info(f"Archive ledger now tracks {repo.name}; {len(records)} archived branches found, "
+                    f"retention for those not recorded before starts today")
+
+    def purge_candidates(self, repo: Repository) -> Tuple[List[Union[Branch, BranchRecord]], Dict[str, datetime]]:
+        """
+        Returns the branches to consider for purging, with their archive times when known.
+
+        With an archive ledger this is a single range query for the branches
+        archived before the retention cutoff; the repository's branches are only
+        listed the first time, to adopt branches archived before the ledger
+        existed. Without a ledger, all branches are listed.
+        """
+        if self.archive_ledger is None:
+            return self.list_branches(repo), {}
+        retention = timedelta(days=self.policy_for(repo).retention_days)
+        cutoff = datetime.now(timezone.utc) - retention
+        try:
+            if not self.archive_ledger.is_tracked(repo.full_name):
+                self._track_archives(repo)
+            records = self.archive_ledger.archived_before(repo.full_name, cutoff)
+            upcoming = self.archive_ledger.next_archived_after(repo.full_name, cutoff)
+        except RateBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to read the archive ledger for {repo.name}, not purging it this run: {e}")
+            self._mark_incomplete(repo, 'purge')
+            return [], {}
+        if upcoming is not None:
+            self._note_due(repo, 'purge', upcoming + retention)
+        return [record.as_branch() for record in records], {record.archived_name: record.archived_at for record in records}
+
+    def _archived(self, repo: Repository, branch: Union[Branch, BranchRecord]) -> BranchAction:
+        self._stale_mirrors.add(repo.full_name)
+        if self.branch_state is not None:
+            self.branch_state.move_branch(repo.full_name, branch.name,
+                                          f"{self.config.archive_prefix}{branch.name}")
+        return BranchAction(repo.name, branch.name, 'archived')
+
+    def _purged(self, repo: Repository, branch: Union[Branch, BranchRecord]) -> BranchAction:
+        self._stale_mirrors.add(repo.full_name)
+        self._forget_archive(repo, branch.name)
+        if self.branch_state is not None:
+            self.branch_state.delete_branch(repo.full_name, branch.name)
+        return BranchAction(repo.name, branch.name, 'purged')
+
+    def _archive_if_eligible(self, repo: Repository, branch: Union[Branch, BranchRecord]) -> Optional[BranchAction]:
+        if not self._archive_candidate(repo, branch):
+            return None
+        if self.archive_branch(repo, branch):
+            return self._archived(repo, branch)
+        self._mark_incomplete(repo, 'archive')
+        return None
+
+    def _purge_if_eligible(self, repo: Repository, branch: Union[Branch, BranchRecord],
+                           archived_at: Optional[datetime] = None) -> Optional[BranchAction]:
+        if not self._purge_candidate(repo, branch, archived_at):
+            return None
+        if self.purge_branch(repo, branch):
+            return self._purged(repo, branch)
+        self._mark_incomplete(repo, 'purge')
+        return None
+
+    def archive_in_bulk(self, repo: Repository, branches: List[Union[Branch, BranchRecord]]) -> List[BranchAction]:
+        """
+        Archives branches with batched GraphQL ref writes.
+
+        The archive tags (lightweight; GraphQL cannot create releases) and the
+        prefixed refs of all branches are created first; only branches for which
+        both exist are then deleted under their old name, in a second pass.
+
+        Args:
+            repo (Repository): The GitHub repository.
+            branches (List[Union[Branch, BranchRecord]]): The branches to archive.
+
+        Returns:
+            List[BranchAction]: The branches archived.
+        """
+        writer = BulkRefWriter(self.github.requester, repo, self.config.write_batch_size)
+        today = datetime.now().strftime('%Y%m%d')
+        planned = [
+            (branch, f"refs/tags/archived-{branch.name}-{today}",
+             f"refs/heads/{self.config.archive_prefix}{branch.name}")
+            for branch in branches
+        ]
+        with self.metrics.phase('archive'):
+            created = writer.create_refs([
+                (ref, self._head_sha(branch)) for branch, tag_ref, archive_ref in planned for ref in (tag_ref, archive_ref)
+            ])
+        to_delete = []
+        for branch, tag_ref, archive_ref in planned:
+            if created[tag_ref].ok and created[archive_ref].ok:
+                to_delete.append((branch, tag_ref))
+            else:
+                logger.error(f"Failed to archive {branch.name}: "
+                             f"{created[tag_ref].error or created[archive_ref].error}")
+                self._mark_incomplete(repo, 'archive')
+        with self.metrics.phase('archive'):
+            deleted = writer.delete_refs([(f"refs/heads/{branch.name}", self._head_sha(branch))
+                                          for branch, _ in to_delete])
+
+        actions = []
+        for branch, tag_ref in to_delete:
+            result = deleted[f"refs/heads/{branch.name}"]
+            if not result.ok:
+                logger.error(f"Failed to remove {branch.name} after archiving it: {result.error}")
+                self._mark_incomplete(repo, 'archive')
+                continue
+            self._record_archive(repo, branch, tag_ref[len('refs/tags/'):])
+            self.notifier.notify_archive(repo.name, branch.name, tag_ref[len('refs/tags/'):])
+            logger.info(f"Archived branch {branch.name} in {repo.name}")
+            actions.append(self._archived(repo, branch))
+        self._log_bulk_writes(repo, writer, len(branches) * 3)
+        return actions
+
+    def purge_in_bulk(self, repo: Repository, branches: List[Union[Branch, BranchRecord]]) -> List[BranchAction]:
+        """
+        Purges branches with batched GraphQL ref deletions.
+
+        Args:
+            repo (Repository): The GitHub repository.
+            branches (List[Union[Branch, BranchRecord]]): The branches to purge.
+
+        Returns:
+            List[BranchAction]: The branches purged.
+        """
+        writer = BulkRefWriter(self.github.requester, repo, self.config.write_batch_size)
+        with self.metrics.phase('purge'):
+            deleted = writer.delete_refs([(f"refs/heads/{branch.name}", self._head_sha(branch)) for branch in branches])
+        actions = []
+        for branch in branches:
+            result = deleted[f"refs/heads/{branch.name}"]
+            if not result.ok:
+                logger.error(f"Failed to purge {branch.name}: {result.error}")
+                self._mark_incomplete(repo, 'purge')
+                continue
+            self.notifier.notify_deletion(repo.name, branch.name)
+            logger.info(f"Purged branch {branch.name} in {repo.name}")
+            actions.append(self._purged(repo, branch))
+        self._log_bulk_writes(repo, writer, len(branches))
+        return actions
+
+    @staticmethod
+    def _log_bulk_writes(repo: Repository, writer: BulkRefWriter, ref_writes: int) -> None:
+        if ref_writes:
+            logger.info(f"Wrote {ref_writes} refs in {repo.name} with {writer.graphql_requests} GraphQL requests "
+                        f"and {writer.rest_fallbacks} REST fallbacks")
+
+    def run_archive_phase(self, repo: Repository) -> List[BranchAction]:
+        self._begin_phase(repo, 'archive')
+        branches = self.list_branches(repo)
+        if self.config.write_mode == 'graphql':
+            eligible = self._map(lambda branch: self._archive_candidate(repo, branch), branches)
+            actions = self.archive_in_bulk(repo, [branch for branch, ok in zip(branches, eligible) if ok])
+        else:
+            results = self._map(lambda branch: self._archive_if_eligible(repo, branch), branches)
+            actions = [action for action in results if action is not None]
+        self._record_phase(repo, 'archive')
+        return actions
+
+    def run_purge_phase(self, repo: Repository) -> List[BranchAction]:
+        self._begin_phase(repo, 'purge')
+        actions = self._purge(repo, *self.purge_candidates(repo))
+        self._record_phase(repo, 'purge')
+        return actions
+
+    def _purge(self, repo: Repository, branches: List[Union[Branch, BranchRecord]],
+               archived_at: Dict[str, datetime]) -> List[BranchAction]:
+        if self.config.write_mode == 'graphql':
+            eligible = self._map(lambda branch: self._purge_candidate(repo, branch, archived_at.get(branch.name)), branches)
+            return self.purge_in_bulk(repo, [branch for branch, ok in zip(branches, eligible) if ok])
+        results = self._map(lambda branch: self._purge_if_eligible(repo, branch, archived_at.get(branch.name)),
+                            branches)
+        return [action for action in results if action is not None]
+
+    def _renamed(self, branch: Union[Branch, BranchRecord]) -> BranchRecord:
+        """The view of a just-archived branch under its archived name."""
+        date = self._last_commit_date(branch)
+        return BranchRecord(f"{self.config.archive_prefix}{branch.name}", self._head_sha(branch), date, date)
+
+    def _release_inventory_entry(self, repo: Repository, branch_name: str) -> None:
+        inventory = self._inventories.get(repo.full_name)
+        if inventory is not None:
+            inventory.pop(branch_name, None)
+
+    def _prefilter(self, repo: Repository, branches: Iterable[BranchRecord]) -> Iterator[BranchRecord]:
+        """
+        Drops the inventory branches that the name and time checks alone rule out.
+
+        The branches are classified in columnar chunks against a single current
+        time; only those left may need the merge, pull request and tag checks.
+        """
+        policy = self.policy_for(repo)
+        purge_from_listing = self.archive_ledger is None
+        now = datetime.now(timezone.utc)
+        iterator = iter(branches)
+        while True:
+            chunk = list(islice(iterator, CLASSIFY_CHUNK_SIZE))
+            if not chunk:
+                return
+            with self.metrics.phase('classify'):
+                result = classify_branches(BranchColumns.from_branches(chunk), policy, self.config.archive_prefix, now)
+            if result.next_archive_due is not None:
+                self._note_due(repo, 'archive', result.next_archive_due)
+            selected = set(result.archive_indices())
+            if purge_from_listing:
+                selected.update(result.purge_indices())
+                if result.next_purge_due is not None:
+                    self._note_due(repo, 'purge', result.next_purge_due)
+            self.metrics.branches_evaluated.inc(len(selected), predicate='prefilter', result='true')
+            self.metrics.branches_evaluated.inc(len(chunk) - len(selected), predicate='prefilter', result='false')
+            for i, branch in enumerate(chunk):
+                if i in selected:
+                    yield branch
+                else:
+                    self._release_inventory_entry(repo, branch.name)
+
+    def run_pipeline(self, repo: Repository) -> List[BranchAction]:
+        """
+        Runs the archive and purge phases over a single listing of the branches.
+
+        The listing is streamed: each branch goes to the purge classifier if it
+        carries the archive prefix and to the archive classifier otherwise, and a
+        branch archived on the way is handed to the purge classifier under its
+        new name instead of being listed again. With an archive ledger, purge
+        candidates come from the ledger and archived branches in the listing are
+        skipped. Inventories that carry commit dates (every mode but `rest`) are
+        first narrowed down with `classify_branches`. Apart from REST listings,
+        which are read in full as compact records before any write, only the
+        branches in flight (and in GraphQL write mode, one write batch or
+        classification chunk) are held at a time.
+
+        Args:
+            repo (Repository): The GitHub repository.
+
+        Returns:
+            List[BranchAction]: The actions taken, archive actions first.
+        """
+        self._begin_phase(repo, 'archive')
+        self._begin_phase(repo, 'purge')
+        prefix = self.config.archive_prefix
+        from_listing = self.archive_ledger is None
+        archive_actions: List[BranchAction] = []
+        purge_actions: List[BranchAction] = []
+        branches = self.metrics.timed('list', self.iter_branches(repo))
+        if self.config.inventory_mode != 'rest':
+            branches = self._prefilter(repo, branches)
+
+        if self.config.write_mode == 'graphql':
+            to_archive: List[Union[Branch, BranchRecord]] = []
+            to_purge: List[Union[Branch, BranchRecord]] = []
+
+            def classify(branch: Union[Branch, BranchRecord]) -> Tuple[Union[Branch, BranchRecord], Optional[str]]:
                 try:
-                    commit_date = branch.commit.commit.author.date
-                    if self.should_purge_branch(repo, branch):
-                        self.purge_branch(repo, branch)
-                except Exception as e:
-                    logger.error(f"Failed to process branch {branch.name} for purging: {str(e)}") 
\ No newline at end of file
+                    if branch.name.startswith(prefix):
+                        return branch, 'purge' if from_listing and self._purge_candidate(repo, branch) else None
+                    return branch, 'archive' if self._archive_candidate(repo, branch) else None
+                finally:
+                    self._release_inventory_entry(repo, branch.name)
+
+            def flush_archives() -> None:
+                if not to_archive:
+                    return
+                done = self.archive_in_bulk(repo, to_archive)
+                archive_actions.extend(done)
+                archived = {action.branch for action in done}
+                for branch in to_archive:
+                    if branch.name not in archived:
+                        continue
+                    renamed = self._renamed(branch)
+                    if from_listing and self._purge_candidate(repo, renamed):
+                        to_purge.append(renamed)
+                to_archive.clear()
+
+            def flush_purges() -> None:
+                if not to_purge:
+                    return
+                purge_actions.extend(self.purge_in_bulk(repo, to_purge))
+                to_purge.clear()
+
+            for branch, decision in self._imap(classify, branches):
+                if decision == 'archive':
+                    to_archive.append(branch)
+                elif decision == 'purge':
+                    to_purge.append(branch)
+                if len(to_archive) >= self.config.write_batch_size:
+                    flush_archives()
+                if len(to_purge) >= self.config.write_batch_size:
+                    flush_purges()
+            flush_archives()
+            flush_purges()
+        else:
+            def handle(branch: Union[Branch, BranchRecord]) -> List[BranchAction]:
+                try:
+                    if branch.name.startswith(prefix):
+                        action = self._purge_if_eligible(repo, branch) if from_listing else None
+                        return [action] if action is not None else []
+                    action = self._archive_if_eligible(repo, branch)
+                    if action is None:
+                        return []
+                    purged = self._purge_if_eligible(repo, self._renamed(branch)) if from_listing else None
+                    return [action] if purged is None else [action, purged]
+                finally:
+                    self._release_inventory_entry(repo, branch.name)
+
+            for actions in self._imap(handle, branches):
+                for action in actions:
+                    (archive_actions if action.action == 'archived' else purge_actions).append(action)
+        self._record_phase(repo, 'archive')
+
+        if not from_listing:
+            purge_actions.extend(self._purge(repo, *self.purge_candidates(repo)))
+        self._record_phase(repo, 'purge')
+        return archive_actions + purge_actions
+
+    def archive_branches(self, repo_name: str) -> List[BranchAction]:
+        """Archives the eligible branches of a repository."""
+        repo = self.org.get_repo(repo_name)
+        with self.metrics.phase('list'):
+            self.build_tag_index(repo)
+            if self.config.inventory_mode in ('rest', 'mirror'):
+                self.build_pr_index(repo)
+        actions = self.run_archive_phase(repo)
+        self.notifier.repo_done(repo.name)
+        return actions
+
+    def _plans_purge(self, repo: Repository, branch: Union[Branch, BranchRecord],
+                     archived_at: Optional[datetime] = None) -> bool:
+        if not branch.name.startswith(self.config.archive_prefix):
+            return False
+        try:
+            return self.should_purge_branch(repo, branch, archived_at)
+        except RateBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to process branch {branch.name} for purging: {str(e)}")
+            return False
+
+    def _plan_entry(self, repo: Repository, branch: Union[Branch, BranchRecord], action: str,
+                    archived_at: Optional[datetime] = None) -> PlanEntry:
+        policy = self.policy_for(repo)
+        last_commit = self._last_commit_date(branch).strftime('%Y-%m-%d')
+        if action == 'archive':
+            reason = (f"no commits since {last_commit} ({policy.inactivity_days}+ days), "
+                      f"merged, no open pull requests, no critical tags")
+        elif archived_at is not None:
+            reason = f"archived on {archived_at.strftime('%Y-%m-%d')}, past the {policy.retention_days}-day retention"
+        else:
+            reason = f"archived, last commit {last_commit} is past the {policy.retention_days}-day retention"
+        return PlanEntry(repo.full_name, branch.name, self._head_sha(branch), action, reason)
+
+    def plan_branches(self, repo_name: str, phases: Sequence[str]) -> List[PlanEntry]:
+        """
+        Decides what to do with the branches of a repository without changing anything.
+
+        Args:
+            repo_name (str): The repository name.
+            phases (Sequence[str]): The phases to plan (`archive`, `purge`).
+
+        Returns:
+            List[PlanEntry]: The planned actions, archive actions first.
+        """
+        repo = self.org.get_repo(repo_name)
+        with self.metrics.phase('list'):
+            self.build_tag_index(repo)
+            if 'archive' in phases and self.config.inventory_mode in ('rest', 'mirror'):
+                self.build_pr_index(repo)
+        branches = self.list_branches(repo)
+        entries = []
+        if 'archive' in phases:
+            decisions = self._map(lambda branch: self.should_archive_branch(repo, branch), branches)
+            entries.extend(self._plan_entry(repo, branch, 'archive')
+                           for branch, planned in zip(branches, decisions) if planned)
+        if 'purge' in phases:
+            candidates, archived_at = self.purge_candidates(repo)
+            decisions = self._map(lambda branch: self._plans_purge(repo, branch, archived_at.get(branch.name)),
+                                  candidates)
+            entries.extend(self._plan_entry(repo, branch, 'purge', archived_at.get(branch.name))
+                           for branch, planned in zip(candidates, decisions) if planned)
+        return entries
+
+    def apply_plan(self, repo_name: str, entries: List[PlanEntry],
+                   on_result: Callable[[PlanEntry, str], None]) -> List[BranchAction]:
+        """
+        Carries out the planned actions of a repository.
+
+        The branches are listed once; an entry whose branch is gone or points at
+        another commit than when it was planned is skipped.
+
+        Args:
+            repo_name (str): The repository name.
+            entries (List[PlanEntry]): The entries of the repository still to apply.
+            on_result (Callable[[PlanEntry, str], None]): Called with the outcome of each entry
+                (`applied`, `changed` or `failed`) as soon as it is known.
+
+        Returns:
+            List[BranchAction]: The actions taken.
+        """
+        repo = self.org.get_repo(repo_name)
+        current = {branch.name: branch for branch in self.list_branches(repo)}
+        planned = []
+        for entry in entries:
+            branch = current.get(entry.branch)
+            if branch is None or self._head_sha(branch) != entry.head_sha:
+                logger.info(f"Skipping {entry.action} of {entry.branch} in {repo.name}: branch changed since planning")
+                on_result(entry, CHANGED)
+                continue
+            planned.append((entry, branch))
+
+        if self.config.write_mode == 'graphql':
+            actions = []
+            for action_name, apply_bulk in (('archive', self.archive_in_bulk), ('purge', self.purge_in_bulk)):
+                batch_entries = [(entry, branch) for entry, branch in planned if entry.action == action_name]
+                # Checkpoint after every batch, so a resumed apply repeats at most one batch
+                for start in range(0, len(batch_entries), self.config.write_batch_size):
+                    batch = batch_entries[start:start + self.config.write_batch_size]
+                    done = apply_bulk(repo, [branch for _, branch in batch])
+                    succeeded = {action.branch for action in done}
+                    for entry, _ in batch:
+                        on_result(entry, APPLIED if entry.branch in succeeded else FAILED)
+                    actions.extend(done)
+            self.notifier.repo_done(repo.name)
+            return actions
+
+        def apply_entry(item: Tuple[PlanEntry, Union[Branch, BranchRecord]]) -> Optional[BranchAction]:
+            entry, branch = item
+            if entry.action == 'archive':
+                action = self._archived(repo, branch) if self.archive_branch(repo, branch) else None
+            else:
+                action = self._purged(repo, branch) if self.purge_branch(repo, branch) else None
+            on_result(entry, APPLIED if action is not None else FAILED)
+            return action
+
+        results = self._map(apply_entry, planned)
+        self.notifier.repo_done(repo.name)
+        return [action for action in results if action is not None]
+
+    def purge_branches(self, repo_name: str) -> List[BranchAction]:
+        """Purges the archived branches of a repository that are past retention."""
+        repo = self.org.get_repo(repo_name)
+        with self.metrics.phase('list'):
+            self.build_tag_index(repo)
+        actions = self.run_purge_phase(repo)
+        self.notifier.repo_done(repo.name)
+        return actions
+
+    def process_branches(self, repo_name: str) -> List[BranchAction]:
+        """
+        Runs the archive and purge phases for a repository in one pass over its branches.
+
+        Args:
+            repo_name (str): The repository name.
+
+        Returns:
+            List[BranchAction]: The actions taken, archive actions first, each
+            phase in branch listing order.
+        """
+        repo = self.org.get_repo(repo_name)
+        with self.metrics.phase('list'):
+            self.build_tag_index(repo)
+            if self.config.inventory_mode in ('rest', 'mirror'):
+                self.build_pr_index(repo)
+        actions = self.run_pipeline(repo)
+        self.notifier.repo_done(repo.name)
+        return actions
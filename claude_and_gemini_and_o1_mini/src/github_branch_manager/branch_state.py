@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from .inventory import parse_github_datetime
+from .records import BranchRecord, PullRequestSummary
+from .pr_index import PullRequestEntry
+from .logger import setup_logger
+
+logger = setup_logger()
+
+BRANCH_REF_PREFIX = 'refs/heads/'
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    return value.astimezone(timezone.utc).isoformat() if value else None
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class BranchStateStore:
+    """
+    Branches and pull requests of repositories, kept current from webhook events.
+
+    A repository is seeded once from a full listing; afterwards `push`, `create`,
+    `delete` and `pull_request` events keep it up to date, so the archive and
+    purge passes read the store instead of sweeping the repository.
+
+    Branches whose head commit date is not known (e.g. created without a push
+    event carrying the commit) are stored with no date and have to be verified
+    against the API before use.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS repositories (repo TEXT PRIMARY KEY, seeded_at TEXT);"
+            "CREATE TABLE IF NOT EXISTS branches ("
+            " repo TEXT, name TEXT, sha TEXT, committed_at TEXT, PRIMARY KEY (repo, name));"
+            "CREATE TABLE IF NOT EXISTS pull_requests ("
+            " repo TEXT, number INTEGER, head_ref TEXT, base_ref TEXT, state TEXT, merged INTEGER,"
+            " updated_at TEXT, PRIMARY KEY (repo, number));"
+            "CREATE INDEX IF NOT EXISTS pull_requests_head ON pull_requests (repo, head_ref);"
+            "CREATE TABLE IF NOT EXISTS deliveries (id TEXT PRIMARY KEY);"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def is_seeded(self, repo: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM repositories WHERE repo = ?", (repo,)).fetchone()
+        return row is not None
+
+    def seed(self, repo: str, branches: Iterable[BranchRecord], pulls: Iterable[PullRequestEntry]) -> None:
+        """Replaces everything known about a repository with a full listing."""
+        branch_rows = [(repo, b.name, b.sha, _timestamp(b.authored_date)) for b in branches]
+        pull_rows = [
+            (repo, p.number, p.head_ref, p.base_ref, p.state, int(p.merged), _timestamp(p.updated_at))
+            for p in pulls
+        ]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM branches WHERE repo = ?", (repo,))
+            self._db.execute("DELETE FROM pull_requests WHERE repo = ?", (repo,))
+            self._db.executemany("INSERT INTO branches VALUES (?, ?, ?, ?)", branch_rows)
+            self._db.executemany("INSERT INTO pull_requests VALUES (?, ?, ?, ?, ?, ?, ?)", pull_rows)
+            self._db.execute("INSERT OR REPLACE INTO repositories VALUES (?, ?)",
+                             (repo, _timestamp(datetime.now(timezone.utc))))
+            self._db.execute("COMMIT")
+
+    def put_branch(self, repo: str, name: str, sha: Optional[str], committed_at: Optional[datetime]) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO branches VALUES (?, ?, ?, ?)",
+                             (repo, name, sha, _timestamp(committed_at)))
+
+    def add_branch(self, repo: str, name: str) -> None:
+        """Records a branch with an unknown head, unless it is already known."""
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO branches VALUES (?, ?, NULL, NULL)", (repo, name))
+
+    def delete_branch(self, repo: str, name: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM branches WHERE repo = ? AND name = ?", (repo, name))
+
+    def move_branch(self, repo: str, name: str, new_name: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE OR REPLACE branches SET name = ? WHERE repo = ? AND name = ?",
+                             (new_name, repo, name))
+
+    def put_pull_request(self, repo: str, entry: PullRequestEntry) -> None:
+        """Records a pull request unless a more recent update of it is already stored."""
+        with self._lock:
+            row = self._db.execute("SELECT updated_at FROM pull_requests WHERE repo = ? AND number = ?",
+                                   (repo, entry.number)).fetchone()
+            if row is not None and _parse(row[0]) > entry.updated_at:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO pull_requests VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (repo, entry.number, entry.head_ref, entry.base_ref, entry.state, int(entry.merged),
+                 _timestamp(entry.updated_at)),
+            )
+
+    def branches(self, repo: str) -> List[BranchRecord]:
+        """
+        Returns the stored branches of a repository with their pull requests.
+
+        Branches without a known head commit date are returned with
+        `committed_date` and `authored_date` set to None.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, sha, committed_at FROM branches WHERE repo = ? ORDER BY name", (repo,)
+            ).fetchall()
+            pulls = self._db.execute(
+                "SELECT head_ref, base_ref, state, merged FROM pull_requests WHERE repo = ?", (repo,)
+            ).fetchall()
+        by_head: Dict[str, List[PullRequestSummary]] = {}
+        for head_ref, base_ref, state, merged in pulls:
+            # Same representation as the GraphQL inventory
+            by_head.setdefault(head_ref, []).append(PullRequestSummary(base_ref, state.upper(), bool(merged)))
+        return [
+            BranchRecord(name, sha, _parse(committed_at), _parse(committed_at), by_head.get(name, []))
+            for name, sha, committed_at in rows
+        ]
+
+    def has_delivery(self, delivery_id: str) -> bool:
+        """Returns True if the webhook delivery was already applied (GitHub redelivers on failure)."""
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM deliveries WHERE id = ?", (delivery_id,)).fetchone()
+        return row is not None
+
+    def record_delivery(self, delivery_id: str) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO deliveries VALUES (?)", (delivery_id,))
+
+    def apply_event(self, event: str, payload: Dict[str, Any]) -> bool:
+        """
+        Updates the store from a webhook payload.
+
+        Args:
+            event (str): The `X-GitHub-Event` name.
+            payload (Dict[str, Any]): The decoded payload.
+
+        Returns:
+            bool: True if the event changed the state of a branch or pull request.
+        """
+        repo = (payload.get('repository') or {}).get('full_name')
+        if repo is None:
+            return False
+
+        if event == 'push':
+            ref = payload.get('ref', '')
+            if not ref.startswith(BRANCH_REF_PREFIX):
+                return False
+            name = ref[len(BRANCH_REF_PREFIX):]
+            if payload.get('deleted'):
+                self.delete_branch(repo, name)
+                return True
+            head_commit = payload.get('head_commit') or {}
+            # Without a head commit (e.g. a force push to an older commit) the date is unknown
+            committed_at = parse_github_datetime(head_commit['timestamp']) \
+                if head_commit.get('id') == payload.get('after') else None
+            self.put_branch(repo, name, payload.get('after'), committed_at)
+            return True
+
+        if event in ('create', 'delete'):
+            if payload.get('ref_type') != 'branch':
+                return False
+            if event == 'delete':
+                self.delete_branch(repo, payload['ref'])
+            else:
+                # The accompanying push event carries the commit
+                self.add_branch(repo, payload['ref'])
+            return True
+
+        if event == 'pull_request':
+            pull = payload.get('pull_request') or {}
+            # A fork's head ref names a branch of the fork, not of this repository
+            head_repo = pull['head'].get('repo') or {}
+            if head_repo.get('full_name') != repo:
+                return False
+            self.put_pull_request(repo, PullRequestEntry(
+                number=pull['number'],
+                head_ref=pull['head']['ref'],
+                base_ref=pull['base']['ref'],
+                state=pull['state'],
+                merged=pull.get('merged_at') is not None,
+                updated_at=parse_github_datetime(pull['updated_at']),
+            ))
+            return True
+
+        return False
@@ -0,0 +1,179 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from github.GithubException import GithubException
+from github.Repository import Repository
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Ref writes sent in one GraphQL request
+DEFAULT_BATCH_SIZE = 50
+
+
+class RefResult(NamedTuple):
+    """The outcome of one ref write."""
+    ref: str
+    ok: bool
+    via: str
+    error: Optional[str] = None
+
+
+def _node_id(repo: Repository) -> str:
+    # `Repository.node_id` only exists in recent PyGithub releases; the payload always has it
+    node_id = getattr(repo, 'node_id', None)
+    return node_id if node_id is not None else repo.raw_data['node_id']
+
+
+def _batches(items: Sequence, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BulkRefWriter:
+    """
+    Creates and deletes many refs of a repository per GitHub API call.
+
+    Writes are sent as GraphQL documents holding one aliased `createRef` or
+    `deleteRef` mutation per ref, `batch_size` refs at a time, and reported per
+    ref: GitHub runs every aliased mutation and names the failed ones in the
+    response errors. Refs whose GraphQL write fails are retried one at a time
+    through the REST API.
+
+    Args:
+        requester: The PyGithub requester used to issue the requests.
+        repo (Repository): The repository the refs belong to.
+        batch_size (int): Refs written per GraphQL request.
+    """
+
+    def __init__(self, requester, repo: Repository, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.requester = requester
+        self.repo = repo
+        self.batch_size = max(1, batch_size)
+        self.graphql_requests = 0
+        self.rest_fallbacks = 0
+
+    def _graphql(self, query: str, variables: Dict[str, Any], aliases: Sequence[str]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Sends a GraphQL document; returns its data and the error message of each failed alias.
+
+        Errors that cannot be tied to an alias, and failed requests, fail every alias.
+        """
+        self.graphql_requests += 1
+        try:
+            _, response = self.requester.requestJsonAndCheck(
+                'POST', self.requester.graphql_url, input={'query': query, 'variables': variables})
+        except GithubException as e:
+            return {}, {alias: str(e) for alias in aliases}
+        errors: Dict[str, str] = {}
+        for error in response.get('errors') or []:
+            failed = [part for part in error.get('path') or [] if part in aliases]
+            for alias in failed or aliases:
+                errors.setdefault(alias, error.get('message', 'unknown error'))
+        return response.get('data') or {}, errors
+
+    def create_refs(self, refs: Sequence[Tuple[str, str]]) -> Dict[str, RefResult]:
+        """
+        Creates refs.
+
+        Args:
+            refs (Sequence[Tuple[str, str]]): Fully qualified ref names (`refs/heads/...`,
+                `refs/tags/...`) and the commit SHA each should point at.
+
+        Returns:
+            Dict[str, RefResult]: The result of each ref, keyed by ref name.
+        """
+        results: Dict[str, RefResult] = {}
+        for batch in _batches(list(refs), self.batch_size):
+            aliases = [f"c{i}" for i in range(len(batch))]
+            params = ', '.join(f"${a}_name: String!, ${a}_oid: GitObjectID!" for a in aliases)
+            fields = ' '.join(
+                f"{a}: createRef(input: {{repositoryId: $repositoryId, name: ${a}_name, oid: ${a}_oid}}) {{ ref {{ name }} }}"
+                for a in aliases
+            )
+            variables: Dict[str, Any] = {'repositoryId': _node_id(self.repo)}
+            for alias, (ref, sha) in zip(aliases, batch):
+                variables[f"{alias}_name"] = ref
+                variables[f"{alias}_oid"] = sha
+            _, errors = self._graphql(f"mutation($repositoryId: ID!, {params}) {{ {fields} }}", variables, aliases)
+            for alias, (ref, sha) in zip(aliases, batch):
+                if alias in errors:
+                    results[ref] = self._create_rest(ref, sha, errors[alias])
+                else:
+                    results[ref] = RefResult(ref, True, 'graphql')
+        return results
+
+    def delete_refs(self, refs: Sequence[Tuple[str, Optional[str]]]) -> Dict[str, RefResult]:
+        """
+        Deletes refs that still point at the expected commit.
+
+        The refs of a batch are looked up in one query first: `deleteRef` takes
+        ref IDs, and a ref that moved since it was evaluated is left alone.
+
+        Args:
+            refs (Sequence[Tuple[str, Optional[str]]]): Fully qualified ref names and the
+                SHA each is expected to point at (None skips the check).
+
+        Returns:
+            Dict[str, RefResult]: The result of each ref, keyed by ref name.
+        """
+        results: Dict[str, RefResult] = {}
+        owner, name = self.repo.full_name.split('/', 1)
+        for batch in _batches(list(refs), self.batch_size):
+            aliases = [f"r{i}" for i in range(len(batch))]
+            params = ', '.join(f"${a}: String!" for a in aliases)
+            fields = ' '.join(f"{a}: ref(qualifiedName: ${a}) {{ id target {{ oid }} }}" for a in aliases)
+            variables: Dict[str, Any] = {'owner': owner, 'name': name}
+            variables.update({alias: ref for alias, (ref, _) in zip(aliases, batch)})
+            data, lookup_errors = self._graphql(
+                f"query($owner: String!, $name: String!, {params}) "
+                f"{{ repository(owner: $owner, name: $name) {{ {fields} }} }}",
+                variables, aliases)
+            found = data.get('repository') or {}
+
+            to_delete: List[Tuple[str, str]] = []
+            for alias, (ref, sha) in zip(aliases, batch):
+                node = found.get(alias)
+                if alias in lookup_errors or node is None:
+                    results[ref] = self._delete_rest(ref, sha, lookup_errors.get(alias, 'ref not found'))
+                elif sha is not None and (node.get('target') or {}).get('oid') != sha:
+                    logger.info(f"Ref {ref} moved since it was evaluated, leaving it in place")
+                    results[ref] = RefResult(ref, False, 'graphql', 'ref moved')
+                else:
+                    to_delete.append((ref, node['id']))
+            if not to_delete:
+                continue
+
+            delete_aliases = [f"d{i}" for i in range(len(to_delete))]
+            params = ', '.join(f"${a}: ID!" for a in delete_aliases)
+            fields = ' '.join(f"{a}: deleteRef(input: {{refId: ${a}}}) {{ clientMutationId }}" for a in delete_aliases)
+            variables = {alias: ref_id for alias, (_, ref_id) in zip(delete_aliases, to_delete)}
+            _, errors = self._graphql(f"mutation({params}) {{ {fields} }}", variables, delete_aliases)
+            for alias, (ref, _) in zip(delete_aliases, to_delete):
+                if alias in errors:
+                    results[ref] = self._delete_rest(ref, None, errors[alias])
+                else:
+                    results[ref] = RefResult(ref, True, 'graphql')
+        return results
+
+    def _create_rest(self, ref: str, sha: str, reason: str) -> RefResult:
+        logger.warning(f"GraphQL could not create {ref} ({reason}), retrying through REST")
+        self.rest_fallbacks += 1
+        try:
+            self.repo.create_git_ref(ref=ref, sha=sha)
+            return RefResult(ref, True, 'rest')
+        except Exception as e:
+            logger.error(f"Failed to create {ref} in {self.repo.name}: {e}")
+            return RefResult(ref, False, 'rest', str(e))
+
+    def _delete_rest(self, ref: str, sha: Optional[str], reason: str) -> RefResult:
+        logger.warning(f"GraphQL could not delete {ref} ({reason}), retrying through REST")
+        self.rest_fallbacks += 1
+        try:
+            git_ref = self.repo.get_git_ref(ref[len('refs/'):])
+            if sha is not None and git_ref.object.sha != sha:
+                logger.info(f"Ref {ref} moved since it was evaluated, leaving it in place")
+                return RefResult(ref, False, 'rest', 'ref moved')
+            git_ref.delete()
+            return RefResult(ref, True, 'rest')
+        except Exception as e:
+            logger.error(f"Failed to delete {ref} in {self.repo.name}: {e}")
+            return RefResult(ref, False, 'rest', str(e))
@@ -0,0 +1,157 @@
+import math
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Sequence
+from .records import BranchRecord, from_timestamp, to_timestamp
+from .policy import RepoPolicy
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the same pass runs over Python arrays without it
+    np = None
+
+DAY = 86400.0
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    timestamp = to_timestamp(value)
+    return math.nan if timestamp is None else timestamp
+
+
+class BranchColumns:
+    """
+    Branch metadata held column by column.
+
+    Args:
+        names (List[str]): Branch names.
+        shas (List[str]): Head commit SHAs.
+        committed (Sequence[float]): Last commit times, in epoch seconds.
+        archived (Optional[Sequence[float]]): Archive times from the archive
+            ledger, in epoch seconds, NaN where unknown.
+    """
+
+    def __init__(self, names: List[str], shas: List[str], committed: Sequence[float],
+                 archived: Optional[Sequence[float]] = None):
+        if archived is None:
+            archived = array('d', [math.nan]) * len(names)
+        if not len(names) == len(shas) == len(committed) == len(archived):
+            raise ValueError("All columns must have the same length")
+        self.names = names
+        self.shas = shas
+        self.committed = committed
+        self.archived = archived
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_branches(cls, branches: Iterable[BranchRecord],
+                      archived_at: Optional[Dict[str, datetime]] = None) -> 'BranchColumns':
+        """Builds the columns from branch records, dated by their last authored commit."""
+        archived_at = archived_at or {}
+        names, shas, committed, archived = [], [], array('d'), array('d')
+        for branch in branches:
+            names.append(branch.name)
+            shas.append(branch.sha)
+            authored = branch.authored_timestamp
+            committed.append(math.nan if authored is None else authored)
+            archived.append(_epoch(archived_at.get(branch.name)))
+        return cls(names, shas, committed, archived)
+
+
+@dataclass
+class Classification:
+    """
+    The outcome of the time and name checks over a set of branch columns.
+
+    Attributes:
+        archive (Sequence[bool]): Branches that are neither protected nor
+            archived and have been inactive long enough to archive.
+        purge (Sequence[bool]): Archived branches past their retention period.
+        next_archive_due (Optional[datetime]): When the next branch becomes old
+            enough to archive, if any.
+        next_purge_due (Optional[datetime]): When the next archived branch
+            reaches the end of its retention period, if any.
+    """
+    archive: Sequence[bool]
+    purge: Sequence[bool]
+    next_archive_due: Optional[datetime] = None
+    next_purge_due: Optional[datetime] = None
+
+    def archive_indices(self) -> List[int]:
+        return _indices(self.archive)
+
+    def purge_indices(self) -> List[int]:
+        return _indices(self.purge)
+
+
+def _indices(mask: Sequence[bool]) -> List[int]:
+    if np is not None and isinstance(mask, np.ndarray):
+        return np.flatnonzero(mask).tolist()
+    return list(compress(range(len(mask)), mask))
+
+
+def classify_branches(columns: BranchColumns, policy: RepoPolicy, archive_prefix: str,
+                      now: Optional[datetime] = None, vectorized: Optional[bool] = None) -> Classification:
+    """
+    Runs the protected, prefix, inactivity and retention checks over all branches at once.
+
+    Every branch is measured against the same `now`. Name checks run once per
+    branch; the time checks are whole-column comparisons, done with NumPy when it
+    is installed. The merge, pull request and tag checks are not part of this
+    pass; they are left for the branches it selects.
+
+    Args:
+        columns (BranchColumns): The branches.
+        policy (RepoPolicy): The repository's policy.
+        archive_prefix (str): Prefix of archived branches.
+        now (Optional[datetime]): The evaluation time; the current time if not given.
+        vectorized (Optional[bool]): Use NumPy (True) or plain Python arrays (False);
+            NumPy when it is installed by default.
+
+    Returns:
+        Classification: The masks of branches to consider for archiving and purging.
+    """
+    if vectorized is None:
+        vectorized = np is not None
+    elif vectorized and np is None:
+        raise RuntimeError("Vectorized classification requires NumPy")
+    now_ts = _epoch(now or datetime.now(timezone.utc))
+    inactivity = policy.inactivity_days * DAY
+    retention = policy.retention_days * DAY
+    protected_names = policy.protected
+    live = [not (name.startswith(archive_prefix) or name in protected_names) for name in columns.names]
+    archived = [name.startswith(archive_prefix) for name in columns.names]
+
+    if vectorized:
+        live_mask = np.array(live, dtype=bool)
+        archived_mask = np.array(archived, dtype=bool)
+        committed = np.asarray(columns.committed, dtype=np.float64)
+        archived_at = np.asarray(columns.archived, dtype=np.float64)
+        inactive = committed < now_ts - inactivity
+        retention_start = np.where(np.isnan(archived_at), committed, archived_at)
+        expired = retention_start < now_ts - retention
+        pending_archive = committed[live_mask & ~inactive]
+        pending_purge = retention_start[archived_mask & ~expired]
+        return Classification(
+            archive=live_mask & inactive,
+            purge=archived_mask & expired,
+            next_archive_due=from_timestamp(float(pending_archive.min()) + inactivity if pending_archive.size else None),
+            next_purge_due=from_timestamp(float(pending_purge.min()) + retention if pending_purge.size else None),
+        )
+
+    archive_cutoff = now_ts - inactivity
+    purge_cutoff = now_ts - retention
+    retention_start = [a if a == a else c for c, a in zip(columns.committed, columns.archived)]
+    archive = [l and c < archive_cutoff for l, c in zip(live, columns.committed)]
+    purge = [a and s < purge_cutoff for a, s in zip(archived, retention_start)]
+    pending_archive = [c for l, c in zip(live, columns.committed) if l and not c < archive_cutoff]
+    pending_purge = [s for a, s in zip(archived, retention_start) if a and not s < purge_cutoff]
+    return Classification(
+        archive=archive,
+        purge=purge,
+        next_archive_due=from_timestamp(min(pending_archive) + inactivity if pending_archive else None),
+        next_purge_due=from_timestamp(min(pending_purge) + retention if pending_purge else None),
+    )
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from typing import List
 import os
 from dotenv import load_dotenv
@@ -16,6 +16,40 @@ class Config:
     archive_prefix: str
     critical_tag_patterns: List[str]
     allow_auto_purge_critical: bool
+    inventory_mode: str = 'rest'
+    state_dir: str = ''
+    rate_budget_percent: float = 100.0
+    github_api_url: str = 'https://api.github.com'
+    github_app_id: str = ''
+    github_app_private_key: str = ''
+    org_names: List[str] = field(default_factory=list)
+    http_cache_dir: str = ''
+    http_cache_max_mb: int = 256
+    run_state_store: str = 'sqlite'
+    run_state_collection: str = 'repo_run_state'
+    slack_digest: str = 'off'
+    notification_queue_size: int = 1000
+    write_mode: str = 'rest'
+    write_batch_size: int = 50
+    archive_ledger: str = 'sqlite'
+    archive_ledger_collection: str = 'archived_branches'
+    policy_file: str = ''
+    slack_api_url: str = ''
+    metrics_file: str = ''
+    metrics_port: int = 0
+
+    @property
+    def uses_github_app(self) -> bool:
+        return bool(self.github_app_id)
+
+    @property
+    def orgs(self) -> List[str]:
+        """All organizations to process; `org_name` alone unless several were configured."""
+        return self.org_names or [self.org_name]
+
+    def for_org(self, org_name: str) -> 'Config':
+        """Returns a copy of this configuration scoped to a single organization."""
+        return replace(self, org_name=org_name)
 
     @classmethod
     def from_env(cls) -> 'Config':
@@ -28,9 +62,24 @@ class Config:
         """
         load_dotenv()
         
+        # A GitHub App can be used instead of a personal access token
+        app_id = os.getenv('GITHUB_APP_ID', '')
+        private_key = os.getenv('GITHUB_APP_PRIVATE_KEY', '')
+        private_key_path = os.getenv('GITHUB_APP_PRIVATE_KEY_PATH')
+        if app_id and not private_key and private_key_path:
+            with open(private_key_path) as f:
+                private_key = f.read()
+        org_names = [o.strip() for o in os.getenv('GITHUB_ORGS', '').split(',') if o.strip()]
+
         # Check required variables
         required_vars = ['GITHUB_TOKEN', 'GITHUB_ORG', 'SLACK_TOKEN']
+        if app_id:
+            required_vars.remove('GITHUB_TOKEN')
+        if org_names:
+            required_vars.remove('GITHUB_ORG')
         missing = [var for var in required_vars if not os.getenv(var)]
+        if app_id and not private_key:
+            missing.append('GITHUB_APP_PRIVATE_KEY')
         if missing:
             raise EnvironmentError(f"Missing required environment variables: {', '.join(missing)}")
 
@@ -43,9 +92,71 @@ class Config:
         except ValueError as e:
             raise ValueError(f"Invalid numeric configuration: {str(e)}")
 
+        try:
+            http_cache_max_mb = int(os.getenv('HTTP_CACHE_MAX_MB', '256'))
+            if http_cache_max_mb < 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError("HTTP_CACHE_MAX_MB must be a positive integer")
+        try:
+            notification_queue_size = int(os.getenv('NOTIFICATION_QUEUE_SIZE', '1000'))
+            if notification_queue_size < 0:
+                raise ValueError
+        except ValueError:
+            raise ValueError("NOTIFICATION_QUEUE_SIZE must be a non-negative integer")
+        try:
+            write_batch_size = int(os.getenv('WRITE_BATCH_SIZE', '50'))
+            if write_batch_size < 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError("WRITE_BATCH_SIZE must be a positive integer")
+        try:
+            metrics_port = int(os.getenv('METRICS_PORT', '0'))
+            if not 0 <= metrics_port <= 65535:
+                raise ValueError
+        except ValueError:
+            raise ValueError("METRICS_PORT must be a port number, or 0 to not serve metrics")
+        state_dir = os.getenv('STATE_DIR', '')
+        http_cache_dir = os.getenv('HTTP_CACHE_DIR') or (os.path.join(state_dir, 'http-cache') if state_dir else '')
+
+        try:
+            rate_budget_percent = float(os.getenv('RATE_BUDGET_PERCENT', '100'))
+        except ValueError:
+            raise ValueError("RATE_BUDGET_PERCENT must be a number")
+        if not 0 < rate_budget_percent <= 100:
+            raise ValueError("RATE_BUDGET_PERCENT must be greater than 0 and at most 100")
+
+        inventory_mode = os.getenv('INVENTORY_MODE', 'rest').lower()
+        if inventory_mode not in ('rest', 'graphql', 'events', 'mirror'):
+            raise ValueError("INVENTORY_MODE must be one of 'rest', 'graphql', 'events' or 'mirror'")
+        if inventory_mode == 'events' and not state_dir:
+            raise ValueError("INVENTORY_MODE 'events' requires STATE_DIR for the branch state")
+        if inventory_mode == 'mirror' and not state_dir:
+            raise ValueError("INVENTORY_MODE 'mirror' requires STATE_DIR for the repository mirrors")
+
+        run_state_store = os.getenv('RUN_STATE_STORE', 'sqlite').lower()
+        if run_state_store not in ('sqlite', 'firestore', 'none'):
+            raise ValueError("RUN_STATE_STORE must be one of 'sqlite', 'firestore' or 'none'")
+
+        archive_ledger = os.getenv('ARCHIVE_LEDGER', 'sqlite').lower()
+        if archive_ledger not in ('sqlite', 'json', 'firestore', 'none'):
+            raise ValueError("ARCHIVE_LEDGER must be one of 'sqlite', 'json', 'firestore' or 'none'")
+
+        write_mode = os.getenv('WRITE_MODE', 'rest').lower()
+        if write_mode not in ('rest', 'graphql'):
+            raise ValueError("WRITE_MODE must be one of 'rest' or 'graphql'")
+
+        policy_file = os.getenv('POLICY_FILE', '')
+        if policy_file and not os.path.isfile(policy_file):
+            raise ValueError(f"POLICY_FILE {policy_file} does not exist")
+
+        slack_digest = os.getenv('SLACK_DIGEST', 'off').lower()
+        if slack_digest not in ('off', 'repo', 'run'):
+            raise ValueError("SLACK_DIGEST must be one of 'off', 'repo' or 'run'")
+
         return cls(
-            github_token=os.getenv('GITHUB_TOKEN'),
-            org_name=os.getenv('GITHUB_ORG'),
+            github_token=os.getenv('GITHUB_TOKEN', ''),
+            org_name=os.getenv('GITHUB_ORG') or org_names[0],
             slack_token=os.getenv('SLACK_TOKEN'),
             slack_channel=os.getenv('SLACK_CHANNEL', '#github-notifications'),
             protected_branches=[b.strip() for b in os.getenv('PROTECTED_BRANCHES', 'main,develop').split(',')],
@@ -53,5 +164,26 @@ class Config:
             retention_days=retention_days,
             archive_prefix=os.getenv('ARCHIVE_PREFIX', 'archived/'),
             critical_tag_patterns=[p.strip() for p in os.getenv('CRITICAL_TAG_PATTERNS', 'v*,release-*').split(',')],
-            allow_auto_purge_critical=os.getenv('ALLOW_AUTO_PURGE_CRITICAL', 'false').lower() in ('true', '1', 'yes')
+            allow_auto_purge_critical=os.getenv('ALLOW_AUTO_PURGE_CRITICAL', 'false').lower() in ('true', '1', 'yes'),
+            inventory_mode=inventory_mode,
+            state_dir=state_dir,
+            rate_budget_percent=rate_budget_percent,
+            github_api_url=os.getenv('GITHUB_API_URL', 'https://api.github.com'),
+            github_app_id=app_id,
+            github_app_private_key=private_key,
+            org_names=org_names,
+            http_cache_dir=http_cache_dir,
+            http_cache_max_mb=http_cache_max_mb,
+            run_state_store=run_state_store,
+            run_state_collection=os.getenv('RUN_STATE_COLLECTION', 'repo_run_state'),
+            slack_digest=slack_digest,
+            notification_queue_size=notification_queue_size,
+            write_mode=write_mode,
+            write_batch_size=write_batch_size,
+            archive_ledger=archive_ledger,
+            archive_ledger_collection=os.getenv('ARCHIVE_LEDGER_COLLECTION', 'archived_branches'),
+            policy_file=policy_file,
+            slack_api_url=os.getenv('SLACK_API_URL', ''),
+            metrics_file=os.getenv('METRICS_FILE', ''),
+            metrics_port=metrics_port
         ) 
\ No newline at end of file
@@ -0,0 +1,135 @@
+import base64
+import os
+import subprocess
+from dataclasses import dataclass, field
+from typing import Container, Dict, Iterable, List, Optional, Pattern, Set, Tuple, Union
+from .inventory import parse_github_datetime
+from .records import BranchRecord
+from .tag_index import TagIndex
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# One line per ref: name, object type, object, peeled object (annotated tags), dates of the commit
+REF_FORMAT = '%00'.join([
+    '%(refname)', '%(objecttype)', '%(objectname)', '%(*objectname)',
+    '%(committerdate:iso-strict)', '%(authordate:iso-strict)',
+])
+
+
+class GitError(Exception):
+    """A git command failed."""
+
+
+@dataclass
+class MirrorSnapshot:
+    """
+    The branches and tags of a mirror at one point in time.
+
+    Attributes:
+        branches (Dict[str, BranchRecord]): Branches by name; pull requests are
+            not known locally and are left empty.
+        tags (List[Tuple[str, str]]): Tag names and the commit each points at.
+        merged (Dict[str, Set[str]]): For each protected branch, the branches whose
+            head is reachable from it.
+    """
+    branches: Dict[str, BranchRecord] = field(default_factory=dict)
+    tags: List[Tuple[str, str]] = field(default_factory=list)
+    merged: Dict[str, Set[str]] = field(default_factory=dict)
+
+    def is_merged_into(self, branch_name: str, bases: Container[str]) -> bool:
+        return any(branch_name in merged for base, merged in self.merged.items() if base in bases)
+
+    def tag_index(self, patterns: Union[Iterable[str], Pattern]) -> TagIndex:
+        index = TagIndex(patterns)
+        for name, sha in self.tags:
+            index.add(name, sha)
+        return index
+
+
+class GitMirror:
+    """
+    A bare, blob-less local copy of a repository's branches and tags.
+
+    The first `sync` clones with `--filter=blob:none`, so only commits and
+    trees are downloaded; later syncs are incremental fetches that also prune
+    deleted refs. Everything `snapshot` reports is then computed locally: one
+    `for-each-ref` pass for heads, dates and tags, and one `--merged` query per
+    protected branch for ancestry.
+
+    Args:
+        path (str): Directory of the mirror.
+        url (str): Clone URL of the repository.
+        token (Optional[str]): GitHub token for HTTPS access; passed to git
+            through the environment, never on the command line.
+    """
+
+    def __init__(self, path: str, url: str, token: Optional[str] = None):
+        self.path = path
+        self.url = url
+        self.token = token
+
+    def _env(self) -> Dict[str, str]:
+        env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+        if self.token:
+            credentials = base64.b64encode(f"x-access-token:{self.token}".encode()).decode()
+            env.update({
+                'GIT_CONFIG_COUNT': '1',
+                'GIT_CONFIG_KEY_0': 'http.extraHeader',
+                'GIT_CONFIG_VALUE_0': f"Authorization: Basic {credentials}",
+            })
+        return env
+
+    def _git(self, *args: str, cwd: Optional[str] = None) -> str:
+        result = subprocess.run(['git', *args], cwd=cwd if cwd is not None else self.path,
+                                env=self._env(), capture_output=True, text=True)
+        if result.returncode != 0:
+            raise GitError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result.stdout
+
+    @property
+    def exists(self) -> bool:
+        return os.path.isdir(os.path.join(self.path, 'objects'))
+
+    def sync(self) -> None:
+        """Clones the mirror, or brings an existing one up to date."""
+        if not self.exists:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._git('clone', '--bare', '--filter=blob:none', '--quiet', self.url, self.path, cwd='.')
+            # Bare clones have no fetch refspec; track heads and tags only (not pull request refs)
+            self._git('config', 'remote.origin.fetch', '+refs/heads/*:refs/heads/*')
+            self._git('config', '--add', 'remote.origin.fetch', '+refs/tags/*:refs/tags/*')
+            logger.info(f"Cloned mirror of {self.url}")
+            return
+        self._git('fetch', '--prune', '--quiet', 'origin')
+
+    def snapshot(self, protected_branches: Container[str]) -> MirrorSnapshot:
+        """
+        Reads branches, tags and merged status from the mirror.
+
+        Args:
+            protected_branches (Container[str]): Names (or a `BranchMatcher`) of
+                the branches to compute merged status against.
+        """
+        snapshot = MirrorSnapshot()
+        for line in self._git('for-each-ref', f"--format={REF_FORMAT}", 'refs/heads', 'refs/tags').splitlines():
+            ref, object_type, sha, peeled, committed, authored = line.split('\x00')
+            if ref.startswith('refs/heads/'):
+                if object_type != 'commit':
+                    continue
+                name = ref[len('refs/heads/'):]
+                snapshot.branches[name] = BranchRecord(
+                    name, sha, parse_github_datetime(committed), parse_github_datetime(authored))
+            elif object_type == 'tag':
+                snapshot.tags.append((ref[len('refs/tags/'):], peeled))
+            else:
+                snapshot.tags.append((ref[len('refs/tags/'):], sha))
+
+        for base in sorted(snapshot.branches):
+            if base not in protected_branches:
+                continue
+            merged = self._git('for-each-ref', '--format=%(refname)', f"--merged=refs/heads/{base}", 'refs/heads')
+            snapshot.merged[base] = {
+                ref[len('refs/heads/'):] for ref in merged.splitlines() if ref != f"refs/heads/{base}"
+            }
+        return snapshot
@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+from .records import BranchRecord, PullRequestSummary
+
+BRANCH_INVENTORY_QUERY = """
+query($owner: String!, $name: String!, $pageSize: Int!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    refs(refPrefix: "refs/heads/", first: $pageSize, after: $cursor) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        name
+        target {
+          ... on Commit {
+            oid
+            committedDate
+            authoredDate
+          }
+        }
+        associatedPullRequests(first: 20) {
+          pageInfo {
+            hasNextPage
+            endCursor
+          }
+          nodes {
+            state
+            merged
+            baseRefName
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# The pull requests of a branch beyond those listed with the inventory
+BRANCH_PULL_REQUESTS_QUERY = """
+query($owner: String!, $name: String!, $ref: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    branch: ref(qualifiedName: $ref) {
+      associatedPullRequests(first: 100, after: $cursor) {
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+        nodes {
+          state
+          merged
+          baseRefName
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def parse_github_datetime(value: str) -> datetime:
+    """Parses an ISO-8601 timestamp as returned by the GitHub GraphQL API."""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def branch_from_node(node: Dict[str, Any]) -> Optional[BranchRecord]:
+    """
+    Builds a branch record from a `refs` node, or returns None when the ref does
+    not point at a commit.
+    """
+    target = node.get('target') or {}
+    if 'oid' not in target:
+        return None
+    pulls = (node.get('associatedPullRequests') or {}).get('nodes') or []
+    return BranchRecord(
+        name=node['name'],
+        sha=target['oid'],
+        committed_date=parse_github_datetime(target['committedDate']),
+        authored_date=parse_github_datetime(target['authoredDate']),
+        pull_requests=[
+            PullRequestSummary(base=pr['baseRefName'], state=pr['state'], merged=pr['merged'])
+            for pr in pulls
+        ],
+    )
+
+
+def _remaining_pull_requests(requester, owner: str, name: str, node: Dict[str, Any]) -> None:
+    """Appends the pull requests of a `refs` node that did not fit in the inventory page."""
+    pulls = node['associatedPullRequests']
+    page_info = pulls.get('pageInfo') or {}
+    while page_info.get('hasNextPage'):
+        _, data = requester.graphql_query(
+            BRANCH_PULL_REQUESTS_QUERY,
+            {'owner': owner, 'name': name, 'ref': f"refs/heads/{node['name']}", 'cursor': page_info['endCursor']},
+        )
+        branch = data['data']['repository']['branch']
+        if branch is None:
+            # Deleted since it was listed; the pull requests read so far are kept
+            return
+        page = branch['associatedPullRequests']
+        pulls['nodes'].extend(page['nodes'])
+        page_info = page['pageInfo']
+
+
+def fetch_branch_inventory(requester, owner: str, name: str, page_size: int = 100) -> Iterator[BranchRecord]:
+    """
+    Lists all branches of a repository through the GraphQL API.
+
+    Args:
+        requester: The PyGithub requester used to issue the queries.
+        owner (str): The repository owner.
+        name (str): The repository name.
+        page_size (int): Number of refs requested per page (GitHub caps this at 100).
+
+    Yields:
+        BranchRecord: One entry per branch, in the order GitHub returns them.
+        Branches with more pull requests than a page lists have the rest read
+        with one further query per 100 pull requests.
+    """
+    cursor = None
+    while True:
+        _, data = requester.graphql_query(
+            BRANCH_INVENTORY_QUERY,
+            {'owner': owner, 'name': name, 'pageSize': page_size, 'cursor': cursor},
+        )
+        refs = data['data']['repository']['refs']
+        for node in refs['nodes']:
+            if node.get('associatedPullRequests'):
+                _remaining_pull_requests(requester, owner, name, node)
+            branch = branch_from_node(node)
+            if branch is not None:
+                yield branch
+        if not refs['pageInfo']['hasNextPage']:
+            return
+        cursor = refs['pageInfo']['endCursor']
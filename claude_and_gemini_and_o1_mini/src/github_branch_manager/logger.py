@@ -1,25 +1,213 @@
+import atexit
 import logging
-from google.cloud import logging as cloud_logging
-
-def setup_logger():
-    logger = logging.getLogger('github-branch-manager')
-    
-    if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
-        # Cloud Logging handler
-        client = cloud_logging.Client()
-        cloud_handler = cloud_logging.handlers.CloudLoggingHandler(client)
-        cloud_handler.setFormatter(logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ))
-        logger.addHandler(cloud_handler)
-        
-        # Console handler
+import os
+import queue
+import threading
+import time
+from logging.handlers import BufferingHandler, QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+LOGGER_NAME = 'github-branch-manager'
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Records shipped to Cloud Logging per write request, and the longest a record waits for a full batch
+CLOUD_BATCH_SIZE = 100
+CLOUD_BATCH_SECONDS = 5.0
+# How often the listener checks for a due batch while no records arrive
+CLOUD_BATCH_POLL_SECONDS = 1.0
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def cloud_logging_enabled() -> bool:
+    """
+    Whether records are shipped to Google Cloud Logging.
+
+    `CLOUD_LOGGING=true|false` decides explicitly; otherwise shipping is enabled
+    when running on Cloud Run (services or jobs).
+    """
+    setting = os.getenv('CLOUD_LOGGING', 'auto').lower()
+    if setting in ('true', '1', 'yes'):
+        return True
+    if setting in ('false', '0', 'no'):
+        return False
+    return bool(os.getenv('K_SERVICE') or os.getenv('CLOUD_RUN_JOB'))
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """
+    Passes at most `per_second` DEBUG records per second (bursts up to the same
+    number); the count of dropped records is reported on the next one let through.
+    Records above DEBUG always pass.
+    """
+
+    def __init__(self, per_second: float, clock=time.monotonic):
+        super().__init__()
+        self.per_second = per_second
+        self.clock = clock
+        self._tokens = per_second
+        self._last = clock()
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.per_second, self._tokens + (now - self._last) * self.per_second)
+            self._last = now
+            if self._tokens < 1:
+                self._dropped += 1
+                return False
+            self._tokens -= 1
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} debug messages suppressed)"
+        return True
+
+
+class CloudBatchHandler(BufferingHandler):
+    """
+    Ships records to Cloud Logging as structured entries, in batches.
+
+    The client is created on the first flush, on the listener thread, so
+    importing and configuring the package needs neither credentials nor network.
+    A batch is due once it is full, an ERROR is logged, or its oldest record has
+    waited `max_delay`; the last is checked on each record and, while logging is
+    idle, by `BatchingQueueListener` through `flush_if_due`.
+    """
+
+    def __init__(self, log_name: str = LOGGER_NAME, capacity: int = CLOUD_BATCH_SIZE,
+                 max_delay: float = CLOUD_BATCH_SECONDS, clock=time.monotonic):
+        super().__init__(capacity)
+        self.log_name = log_name
+        self.max_delay = max_delay
+        self.clock = clock
+        self._cloud_logger = None
+        self._first_buffered = 0.0
+
+    def _client_logger(self):
+        if self._cloud_logger is None:
+            from google.cloud import logging as cloud_logging
+            self._cloud_logger = cloud_logging.Client().logger(self.log_name)
+        return self._cloud_logger
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not self.buffer:
+            self._first_buffered = self.clock()
+        super().emit(record)
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return (len(self.buffer) >= self.capacity
+                or self.clock() - self._first_buffered >= self.max_delay
+                or record.levelno >= logging.ERROR)
+
+    def flush_if_due(self) -> None:
+        """Ships the buffered records once the oldest has waited `max_delay`."""
+        self.acquire()
+        try:
+            if self.buffer and self.clock() - self._first_buffered >= self.max_delay:
+                self.flush()
+        finally:
+            self.release()
+
+    @staticmethod
+    def to_struct(record: logging.LogRecord) -> Dict:
+        entry = {
+            'message': record.getMessage(),
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return entry
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            records: List[logging.LogRecord] = self.buffer
+            if not records:
+                return
+            self.buffer = []
+            try:
+                batch = self._client_logger().batch()
+                for record in records:
+                    batch.log_struct(self.to_struct(record), severity=record.levelname)
+                batch.commit()
+            except Exception as e:
+                # Never let log shipping break the run; the console still has the records
+                logging.getLogger(__name__).warning(f"Failed to ship {len(records)} log records: {e}")
+        finally:
+            self.release()
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    A QueueListener that, while waiting for records, flushes the batches of its
+    `CloudBatchHandler`s that are due, so a quiet spell cannot hold records back.
+    """
+
+    def __init__(self, records, *handlers: logging.Handler, respect_handler_level: bool = False,
+                 poll_interval: float = CLOUD_BATCH_POLL_SECONDS):
+        super().__init__(records, *handlers, respect_handler_level=respect_handler_level)
+        self.poll_interval = poll_interval
+        self._batching = [handler for handler in handlers if isinstance(handler, CloudBatchHandler)]
+
+    def dequeue(self, block: bool):
+        if not block or not self._batching:
+            return super().dequeue(block)
+        while True:
+            try:
+                return self.queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                for handler in self._batching:
+                    handler.flush_if_due()
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def setup_logger() -> logging.Logger:
+    """
+    Returns the package logger, configuring it on first use.
+
+    Records are put on an in-memory queue and written by a background listener:
+    to the console, and to Cloud Logging in batches when `cloud_logging_enabled()`.
+    The level comes from `LOG_LEVEL` (default INFO); DEBUG records are limited to
+    `LOG_DEBUG_PER_SECOND` (default 50) so per-branch detail cannot flood the output.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.handlers:
+        return logger
+
+    with _setup_lock:
+        if logger.handlers:
+            return logger
+        logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
         console_handler = logging.StreamHandler()
-        console_handler.setFormatter(logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ))
-        logger.addHandler(console_handler)
-    
-    return logger 
\ No newline at end of file
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers: List[logging.Handler] = [console_handler]
+        if cloud_logging_enabled():
+            handlers.append(CloudBatchHandler())
+
+        records: 'queue.SimpleQueue[logging.LogRecord]' = queue.SimpleQueue()
+        queue_handler = QueueHandler(records)
+        queue_handler.addFilter(DebugRateLimitFilter(float(os.getenv('LOG_DEBUG_PER_SECOND', '50'))))
+        _listener = BatchingQueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+        logger.addHandler(queue_handler)
+
+    return logger
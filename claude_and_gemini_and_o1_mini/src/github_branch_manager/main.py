@@ -1,11 +1,41 @@
 import argparse
 import os
+import signal
+from typing import List, NamedTuple
 from .config import Config
 from .branch_manager import BranchManager
+from .scheduler import BranchScheduler, interleave, run_repositories
+from .app_auth import InstallationTokenPool
+from .http_cache import HttpCache, install_connection_pool, install_http_cache
+from .metrics import Metrics, MetricsServer, install_github_metrics
+from .rate_limit import RateBudgetExceeded
+from .run_state import PHASES, open_run_state_store
+from .branch_state import BranchStateStore
+from .archive_ledger import open_archive_ledger
+from .plan import PlanCheckpoint, PlanEntry, PlanWriter, checkpoint_path, group_by_repo, read_plan
 from .logger import setup_logger
 
 logger = setup_logger()
 
+class PlannedRepo(NamedTuple):
+    """A repository of a plan being applied, with its entries still to apply."""
+    full_name: str
+    name: str
+    entries: List[PlanEntry]
+
+
+MODE_PHASES = {'archive': ('archive',), 'purge': ('purge',), 'all': PHASES}
+
+# How long queued notifications may take to deliver at shutdown, normally and when terminated
+NOTIFICATION_DRAIN_SECONDS = 30.0
+TERMINATED_DRAIN_SECONDS = 5.0
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
 def main():
     """Main entry point for the GitHub branch manager."""
     parser = argparse.ArgumentParser(description="GitHub Branch Manager")
@@ -15,6 +45,36 @@ def main():
         default='all',
         help='Mode to run: archive, purge, or all (default: all)'
     )
+    parser.add_argument(
+        '--max-repos-in-flight',
+        type=positive_int,
+        default=1,
+        help='Number of repositories processed concurrently (default: 1)'
+    )
+    parser.add_argument(
+        '--max-branch-workers',
+        type=positive_int,
+        default=1,
+        help='Number of workers evaluating branches, shared by all repositories (default: 1)'
+    )
+    parser.add_argument(
+        '--force-full',
+        action='store_true',
+        help='Evaluate every repository, including those unchanged since the last run'
+    )
+    plan_group = parser.add_mutually_exclusive_group()
+    plan_group.add_argument(
+        '--plan',
+        metavar='FILE',
+        help='Only decide what to do: write the planned actions to FILE (JSON lines) without changing anything; '
+             'replaces FILE and the checkpoint of any earlier apply of it'
+    )
+    plan_group.add_argument(
+        '--apply',
+        metavar='FILE',
+        help='Carry out a plan written by --plan; progress is checkpointed to FILE.checkpoint, '
+             'so an interrupted apply can be resumed by running it again'
+    )
     args = parser.parse_args()
 
     try:
@@ -26,24 +86,185 @@ def main():
         logger.error(f"Unexpected error during configuration: {str(e)}")
         exit(1)
 
+    # Installed first, so the requests the HTTP cache sends are counted as they go out
+    metrics = Metrics()
+    install_github_metrics(metrics)
+    metrics_server = None
+    if config.metrics_port:
+        try:
+            metrics_server = MetricsServer(metrics, port=config.metrics_port)
+            metrics_server.start()
+            logger.info(f"Serving metrics on port {config.metrics_port}")
+        except OSError as e:
+            logger.error(f"Metrics endpoint disabled, cannot listen on port {config.metrics_port}: {e}")
+
+    # One connection pool for the clients of all organizations, sized for every worker that may talk to GitHub
+    install_connection_pool(args.max_branch_workers + args.max_repos_in_flight)
+
+    http_cache = None
+    if config.http_cache_dir:
+        http_cache = HttpCache.open(config.http_cache_dir, config.http_cache_max_mb * 1024 * 1024)
+        if http_cache is not None:
+            install_http_cache(http_cache)
+
+    scheduler = None
+    if args.max_branch_workers > 1:
+        scheduler = BranchScheduler(args.max_branch_workers, args.max_repos_in_flight)
+
+    # Remembers which repositories were evaluated, so unchanged ones can be skipped
+    run_state = open_run_state_store(config)
+
+    # When each branch was archived, so retention counts from the archive and not the last commit
+    archive_ledger = open_archive_ledger(config)
+
+    # Webhook-maintained branch state, shared by all organizations
+    branch_state = None
+    if config.inventory_mode == 'events':
+        branch_state = BranchStateStore(os.path.join(config.state_dir, 'branch-state.sqlite3'))
+
+    token_pool = None
+    if config.uses_github_app:
+        token_pool = InstallationTokenPool(config.github_app_id, config.github_app_private_key,
+                                           base_url=config.github_api_url)
+
+    terminated = False
+
+    def handle_sigterm(signum, frame):
+        nonlocal terminated
+        terminated = True
+        # Unwind so pending notifications are delivered or spooled before exiting
+        raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    plan_writer = None
+    checkpoint = None
+    plan_groups = {}
+    orgs = config.orgs
+    if args.apply:
+        checkpoint = PlanCheckpoint(checkpoint_path(args.apply))
+        plan_groups = group_by_repo(checkpoint.pending(read_plan(args.apply)))
+        if len(checkpoint):
+            logger.info(f"Resuming plan {args.apply}: {len(checkpoint)} entries already done")
+        # The plan decides which organizations are touched
+        orgs = list(dict.fromkeys(repo.split('/', 1)[0] for repo in plan_groups))
+    elif args.plan:
+        plan_writer = PlanWriter(args.plan)
+
+    managers = []
+
+    def export_metrics():
+        for manager in managers:
+            metrics.observe_budget(manager.config.org_name, manager.governor.budget, manager.governor.used)
+        if config.metrics_file:
+            try:
+                metrics.write_textfile(config.metrics_file)
+            except OSError as e:
+                logger.error(f"Failed to write metrics to {config.metrics_file}: {e}")
+
     try:
-        manager = BranchManager(config)
-        
-        # Process all repositories in the organization
-        for repo in manager.org.get_repos():
-            logger.info(f"Processing repository: {repo.name}")
-            
-            if args.mode in ['archive', 'all']:
-                logger.info(f"Running archive mode for {repo.name}")
-                manager.archive_branches(repo.name)
-            
-            if args.mode in ['purge', 'all']:
-                logger.info(f"Running purge mode for {repo.name}")
-                manager.purge_branches(repo.name)
+        # One manager, and therefore one rate budget, per organization
+        for org_name in orgs:
+            auth = token_pool.auth(org_name) if token_pool else None
+            managers.append(BranchManager(config.for_org(org_name), scheduler=scheduler, auth=auth,
+                                          run_state=run_state, branch_state=branch_state,
+                                          archive_ledger=archive_ledger, metrics=metrics))
+
+        def apply_repo(item):
+            manager, repo = item
+            if manager.governor.exhausted:
+                raise RateBudgetExceeded("Run budget used up before the repository was processed")
+            logger.info(f"Applying plan to repository: {repo.full_name} ({len(repo.entries)} entries)")
+            return manager.apply_plan(repo.name, repo.entries, checkpoint.record)
+
+        def process_repo(item):
+            manager, repo = item
+            if not args.force_full and manager.is_up_to_date(repo.full_name, repo.pushed_at, MODE_PHASES[args.mode]):
+                logger.info(f"Skipping repository: {repo.full_name} (unchanged since last run)")
+                return None
+            if manager.governor.exhausted:
+                raise RateBudgetExceeded("Run budget used up before the repository was processed")
+            if plan_writer is not None:
+                logger.info(f"Planning repository: {repo.full_name} (mode: {args.mode})")
+                plan_writer.write(manager.plan_branches(repo.name, MODE_PHASES[args.mode]))
+                return []
+            logger.info(f"Processing repository: {repo.full_name} (mode: {args.mode})")
+            if args.mode == 'archive':
+                return manager.archive_branches(repo.name)
+            if args.mode == 'purge':
+                return manager.purge_branches(repo.name)
+            return manager.process_branches(repo.name)
+
+        def exporting_metrics(fn):
+            # Exported after every repository, so a run about to use up its budget shows before it ends
+            def run(item):
+                try:
+                    return fn(item)
+                finally:
+                    export_metrics()
+            return run
+
+        if checkpoint is not None:
+            repos = interleave(*(
+                [(manager, PlannedRepo(full_name, full_name.split('/', 1)[1], entries))
+                 for full_name, entries in plan_groups.items() if full_name.split('/', 1)[0] == manager.config.org_name]
+                for manager in managers
+            ))
+            results = run_repositories(repos, exporting_metrics(apply_repo), args.max_repos_in_flight)
+        else:
+            # Process all repositories of every organization, alternating between organizations
+            repos = interleave(*(
+                [(manager, repo) for repo in manager.org.get_repos()] for manager in managers
+            ))
+            results = run_repositories(repos, exporting_metrics(process_repo), args.max_repos_in_flight)
 
     except Exception as e:
         logger.error(f"Failed to process repositories: {str(e)}")
         raise
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown()
+        for manager in managers:
+            manager.close(TERMINATED_DRAIN_SECONDS if terminated else NOTIFICATION_DRAIN_SECONDS)
+        if run_state is not None:
+            run_state.close()
+        if branch_state is not None:
+            branch_state.close()
+        if archive_ledger is not None:
+            archive_ledger.close()
+        if plan_writer is not None:
+            plan_writer.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        export_metrics()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+    failed = 0
+    skipped = 0
+    for (manager, repo), actions, error in results:
+        if error is not None:
+            failed += 1
+            logger.error(f"Failed to process repository {repo.full_name}: {error}")
+            continue
+        if actions is None:
+            skipped += 1
+            continue
+        for action in actions:
+            logger.info(f"{action.action.title()}: {action.repo}/{action.branch}")
+    logger.info(f"Processed {len(results)} repositories ({skipped} unchanged, {failed} failed)")
+    if plan_writer is not None:
+        logger.info(f"Planned {plan_writer.count} actions in {args.plan}")
+    failed_deliveries = []
+    for manager in managers:
+        failed_deliveries.extend(manager.notifier.failed_deliveries)
+    if failed_deliveries:
+        logger.warning(f"{len(failed_deliveries)} Slack notifications could not be delivered: "
+                       f"{'; '.join(failed_deliveries)}")
+    if http_cache is not None:
+        logger.info(f"HTTP cache: {http_cache.hits} not-modified responses served, {http_cache.misses} fetched")
+    if failed:
+        exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,382 @@
+import bisect
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Type, TypeVar
+from urllib.parse import urlsplit
+from github.Requester import Requester
+from .http_cache import injected_connection_classes
+from .logger import setup_logger
+
+logger = setup_logger()
+
+T = TypeVar('T')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latencies in seconds; GitHub answers most reads well under a second
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Path segments naming an object, by the collection they follow; those marked
+# as taking the rest of the path are branch and ref names, which contain slashes
+_PLACEHOLDERS = {
+    'repos': '{owner}', 'orgs': '{org}', 'users': '{user}', 'installations': '{installation}',
+    'branches': '{branch}', 'git/refs': '{ref}', 'git/ref': '{ref}', 'git/matching-refs': '{ref}',
+    'commits': '{sha}', 'git/commits': '{sha}', 'git/tags': '{sha}', 'git/trees': '{sha}',
+    'pulls': '{number}', 'issues': '{number}', 'releases': '{id}', 'hooks': '{id}',
+}
+_REST_OF_PATH = {'branches', 'git/refs', 'git/ref', 'git/matching-refs'}
+
+
+def endpoint(url: str) -> str:
+    """
+    Reduces a GitHub API URL to its endpoint, e.g. `/repos/{owner}/{repo}/branches/{branch}`.
+
+    The query string and a GitHub Enterprise `/api/v3` prefix are dropped, so
+    that requests are counted per endpoint rather than per object.
+    """
+    path = urlsplit(url).path
+    if path.startswith('/api/v3/'):
+        path = path[len('/api/v3'):]
+    elif path == '/api/graphql':
+        path = '/graphql'
+    segments = [segment for segment in path.split('/') if segment]
+    template: List[str] = []
+    i = 0
+    while i < len(segments):
+        collection = segments[i]
+        if collection == 'git' and i + 1 < len(segments):
+            i += 1
+            collection = f"git/{segments[i]}"
+        template.append(collection)
+        i += 1
+        if i >= len(segments):
+            break
+        if collection == 'repos':
+            template.extend(('{owner}', '{repo}'))
+            i += 2
+        elif collection in _REST_OF_PATH:
+            template.append(_PLACEHOLDERS[collection])
+            break
+        elif collection in _PLACEHOLDERS:
+            template.append(_PLACEHOLDERS[collection])
+            i += 1
+    return '/' + '/'.join(template)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class MetricFamily:
+    """
+    A metric and its samples, one per combination of label values.
+
+    Args:
+        name (str): The metric name.
+        help (str): The `# HELP` text.
+        labels (Sequence[str]): The label names; every sample sets all of them.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labels) or 'none'}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _label_text(self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def value(self, **labels: object) -> float:
+        """The current value of a sample; 0 if it was never set."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._label_text(key)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(MetricFamily):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(MetricFamily):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(MetricFamily):
+    """A histogram with cumulative `_bucket`, `_sum` and `_count` samples."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._observations: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._observations.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._observations[key] = (counts, total + value)
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            observed = self._observations.get(self._key(labels))
+        return sum(observed[0]) if observed else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            observations = sorted((key, (list(counts), total)) for key, (counts, total) in self._observations.items())
+        for key, (counts, total) in observations:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{self._label_text(key, [('le', _format_value(bound))])} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self._label_text(key)} {cumulative}"
+
+
+class Metrics:
+    """
+    The API cost and timing metrics of a run, in the Prometheus text format.
+
+    GitHub requests are recorded by the connection classes installed with
+    `install_github_metrics`, Slack calls by `SlackNotifier`, and predicate
+    evaluations and phase durations by `BranchManager`. Phase durations add up
+    the time spent in each phase by every worker, so with concurrent workers
+    they can exceed the wall time of the run. The metrics are exported with
+    `write_textfile` (for the node exporter's textfile collector) or served on
+    `/metrics` by a `MetricsServer`.
+    """
+
+    def __init__(self, namespace: str = 'github_tidy'):
+        self.namespace = namespace
+        self.github_requests = Counter(
+            f"{namespace}_github_requests_total", "GitHub API requests sent, by endpoint and response status.",
+            ('method', 'endpoint', 'status'))
+        self.github_request_duration = Histogram(
+            f"{namespace}_github_request_duration_seconds", "GitHub API request latency.", ('method', 'endpoint'))
+        self.rate_limit_remaining = Gauge(
+            f"{namespace}_github_rate_limit_remaining", "Requests left in the current GitHub rate limit window.",
+            ('resource',))
+        self.rate_limit_limit = Gauge(
+            f"{namespace}_github_rate_limit_limit", "Requests allowed per GitHub rate limit window.", ('resource',))
+        self.rate_limit_reset = Gauge(
+            f"{namespace}_github_rate_limit_reset_timestamp_seconds",
+            "When the current GitHub rate limit window resets, in epoch seconds.", ('resource',))
+        self.rate_budget = Gauge(
+            f"{namespace}_rate_budget_requests", "Requests the run may use per window (RATE_BUDGET_PERCENT).",
+            ('org',))
+        self.rate_budget_used = Gauge(
+            f"{namespace}_rate_budget_used_requests", "Requests the run has used of its budget.", ('org',))
+        self.slack_requests = Counter(
+            f"{namespace}_slack_requests_total", "Slack API calls made, by method and response status.",
+            ('method', 'status'))
+        self.slack_request_duration = Histogram(
+            f"{namespace}_slack_request_duration_seconds", "Slack API call latency.", ('method',))
+        self.branches_evaluated = Counter(
+            f"{namespace}_branches_evaluated_total", "Branches evaluated by each predicate, by outcome.",
+            ('predicate', 'result'))
+        self.phase_duration = Counter(
+            f"{namespace}_phase_duration_seconds_total", "Time spent in each phase, summed over workers.",
+            ('phase',))
+        self._families: List[MetricFamily] = [
+            self.github_requests, self.github_request_duration, self.rate_limit_remaining, self.rate_limit_limit,
+            self.rate_limit_reset, self.rate_budget, self.rate_budget_used, self.slack_requests,
+            self.slack_request_duration, self.branches_evaluated, self.phase_duration,
+        ]
+        self._write_lock = threading.Lock()
+
+    def observe_github_response(self, method: str, url: str, status: int, headers: Mapping[str, str],
+                                seconds: float) -> None:
+        """Records a GitHub response and the rate limit state it reports."""
+        path = endpoint(url)
+        self.github_requests.inc(method=method, endpoint=path, status=status)
+        self.github_request_duration.observe(seconds, method=method, endpoint=path)
+        headers = {k.lower(): v for k, v in headers.items()}
+        resource = headers.get('x-ratelimit-resource') or ('graphql' if path == '/graphql' else 'core')
+        try:
+            if 'x-ratelimit-remaining' in headers:
+                self.rate_limit_remaining.set(float(headers['x-ratelimit-remaining']), resource=resource)
+            if 'x-ratelimit-limit' in headers:
+                self.rate_limit_limit.set(float(headers['x-ratelimit-limit']), resource=resource)
+            if 'x-ratelimit-reset' in headers:
+                self.rate_limit_reset.set(float(headers['x-ratelimit-reset']), resource=resource)
+        except ValueError:
+            logger.debug(f"Ignoring malformed rate limit headers from {path}")
+
+    def observe_slack_call(self, method: str, status: object, seconds: float) -> None:
+        self.slack_requests.inc(method=method, status=status)
+        self.slack_request_duration.observe(seconds, method=method)
+
+    def observe_budget(self, org: str, budget: Optional[int], used: int) -> None:
+        """Records how much of an organization's rate budget the run has used."""
+        if budget is not None:
+            self.rate_budget.set(budget, org=org)
+        self.rate_budget_used.set(used, org=org)
+
+    def evaluated(self, predicate: str, result: bool) -> bool:
+        """Counts a predicate evaluation and returns its result."""
+        self.branches_evaluated.inc(predicate=predicate, result='true' if result else 'false')
+        return result
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Adds the time spent in the block to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_duration.inc(time.perf_counter() - start, phase=name)
+
+    def timed(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Yields `items`, adding the time spent producing each one to a phase."""
+        iterator = iter(items)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def render(self) -> str:
+        return '\n'.join(family.render() for family in self._families) + '\n'
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Writes the metrics to `path` for the node exporter's textfile collector.
+
+        The file is replaced atomically, so the collector never reads a partial file.
+        """
+        directory = os.path.dirname(path) or '.'
+        with self._write_lock:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(self.render())
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+class MetricsServer:
+    """Serves the metrics on `/metrics` for Prometheus to scrape while a run is in progress."""
+
+    def __init__(self, metrics: Metrics, host: str = '0.0.0.0', port: int = 9464):
+        self.metrics = metrics
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _handler_class(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                payload = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics {self.address_string()}: {format % args}")
+
+        return Handler
+
+    def start(self) -> None:
+        """Serves the metrics on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _metered_connection_class(base: Type, metrics: Metrics) -> Type:
+    class MeteredConnection(base):
+        def getresponse(self):
+            start = time.perf_counter()
+            response = super().getresponse()
+            metrics.observe_github_response(self.verb, self.url, response.status, response.headers,
+                                            time.perf_counter() - start)
+            return response
+
+    MeteredConnection.__name__ = f"Metered{base.__name__}"
+    return MeteredConnection
+
+
+def install_github_metrics(metrics: Metrics) -> None:
+    """
+    Records every PyGithub request in this process, as sent over the wire.
+
+    Install it before the HTTP cache, so that the cache's conditional requests
+    are counted with their actual `304` status. Only `Github` clients created
+    afterwards are instrumented.
+    """
+    http_class, https_class = injected_connection_classes()
+    Requester.injectConnectionClasses(
+        _metered_connection_class(http_class, metrics),
+        _metered_connection_class(https_class, metrics),
+    )
@@ -0,0 +1,192 @@
+import json
+import os
+import queue
+import threading
+from typing import Any, List, Optional, Set, Tuple
+from .notifier import SlackNotifier
+from .logger import setup_logger
+
+logger = setup_logger()
+
+DEFAULT_QUEUE_SIZE = 1000
+
+# A queued notifier call: method name and arguments; the first argument is the repository
+Notification = Tuple[str, List[Any]]
+
+_STOP = ('stop', [])
+
+
+class NotificationSpool:
+    """Notifications kept on disk, as JSON lines, until they can be delivered."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+
+    def append(self, notifications: List[Notification]) -> None:
+        with open(self.path, 'a') as f:
+            self._write(f, notifications)
+
+    @staticmethod
+    def _write(f, notifications: List[Notification]) -> None:
+        for method, args in notifications:
+            f.write(json.dumps([method, args]) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    def read(self) -> List[Notification]:
+        try:
+            with open(self.path) as f:
+                return [tuple(json.loads(line)) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def drop(self, count: int) -> None:
+        """Removes the first `count` notifications, keeping those appended after them."""
+        if count <= 0:
+            return
+        remaining = self.read()[count:]
+        if not remaining:
+            self.clear()
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            self._write(f, remaining)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class NotificationQueue:
+    """
+    Delivers notifications on a background thread, so branch processing never waits for Slack.
+
+    Exposes the `SlackNotifier` interface. Calls are queued and delivered one at
+    a time in the order they were made, which keeps each repository's
+    notifications in order. When the queue is full, notifications go to the
+    on-disk spool instead (and so do all later notifications of the same
+    repository, to keep them in order); the worker delivers the spool once it
+    has caught up, and a spool left over by an earlier run is delivered first.
+    Without a spool, a full queue makes callers wait.
+
+    `close` waits for the queue to drain; whatever cannot be delivered in time
+    is spooled for the next run. Notifications still in memory when the process
+    is killed without a chance to close are lost.
+    """
+
+    def __init__(self, notifier: SlackNotifier, maxsize: int = DEFAULT_QUEUE_SIZE,
+                 spool: Optional[NotificationSpool] = None):
+        self.notifier = notifier
+        self.spool = spool
+        self._queue: 'queue.Queue[Notification]' = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._spooled_repos: Set[str] = set()
+        self._abandon = False
+        self._closed = False
+        if spool is not None:
+            self._spooled_repos = {args[0] for _, args in spool.read() if args}
+        self._worker = threading.Thread(target=self._run, name='notifications', daemon=True)
+        self._worker.start()
+
+    @property
+    def failed_deliveries(self) -> List[str]:
+        return self.notifier.failed_deliveries
+
+    def notify_archive(self, repo: str, branch: str, tag: Optional[str] = None) -> None:
+        self._enqueue(('notify_archive', [repo, branch, tag]))
+
+    def notify_deletion(self, repo: str, branch: str) -> None:
+        self._enqueue(('notify_deletion', [repo, branch]))
+
+    def repo_done(self, repo: str) -> None:
+        self._enqueue(('repo_done', [repo]))
+
+    def flush(self, repo: Optional[str] = None) -> None:
+        self._enqueue(('flush', [repo]))
+
+    def _enqueue(self, notification: Notification) -> None:
+        if self._closed:
+            # Late calls after shutdown are delivered directly
+            self._deliver(notification)
+            return
+        if self.spool is None:
+            self._queue.put(notification)
+            return
+        _, args = notification
+        with self._lock:
+            repo = args[0] if args else None
+            if repo not in self._spooled_repos:
+                try:
+                    self._queue.put_nowait(notification)
+                    return
+                except queue.Full:
+                    logger.warning("Notification queue is full, spooling notifications to disk")
+            self.spool.append([notification])
+            self._spooled_repos.add(repo)
+
+    def _deliver(self, notification: Notification) -> None:
+        method, args = notification
+        try:
+            getattr(self.notifier, method)(*args)
+        except Exception as e:
+            logger.error(f"Failed to deliver notification {method}{tuple(args)}: {e}")
+
+    def _deliver_spool(self) -> None:
+        with self._lock:
+            notifications = self.spool.read()
+            if self._abandon or not notifications:
+                return
+            self._spooled_repos.clear()
+        delivered = 0
+        try:
+            for notification in notifications:
+                if self._abandon:
+                    break
+                self._deliver(notification)
+                delivered += 1
+        finally:
+            # Notifications leave the spool only once delivered; if the process dies
+            # first, the next run delivers them (the ones already sent, again).
+            with self._lock:
+                self.spool.drop(delivered)
+
+    def _run(self) -> None:
+        if self.spool is not None:
+            self._deliver_spool()
+        while True:
+            notification = self._queue.get()
+            if notification is _STOP:
+                break
+            if self._abandon:
+                if self.spool is not None:
+                    self.spool.append([notification])
+                else:
+                    logger.error(f"Dropped undelivered notification {notification[0]}{tuple(notification[1])}")
+                continue
+            self._deliver(notification)
+            if self.spool is not None and self._spooled_repos and self._queue.empty():
+                self._deliver_spool()
+        if self.spool is not None and not self._abandon:
+            self._deliver_spool()
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Delivers the queued notifications and stops the worker.
+
+        Args:
+            timeout (Optional[float]): How long to wait for delivery; what is left
+                afterwards is spooled to disk (or dropped, without a spool).
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            logger.warning("Notification delivery timed out, spooling the remaining notifications")
+            self._abandon = True
+            self._worker.join()
@@ -1,24 +1,190 @@
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from .logger import setup_logger
+from .metrics import Metrics
 
 logger = setup_logger()
 
+# Attempts made for a Slack call that keeps getting rate limited
+MAX_SLACK_ATTEMPTS = 3
+# Slack truncates messages well above this; smaller messages stay readable
+MAX_MESSAGE_CHARS = 3500
+# Digests with more entries are posted as a summary with the full list attached as a file
+FILE_UPLOAD_THRESHOLD = 200
+
+DIGEST_MODES = ('off', 'repo', 'run')
+
+
+class DigestEntry(NamedTuple):
+    repo: str
+    branch: str
+    action: str
+    tag: Optional[str] = None
+
+    def line(self) -> str:
+        if self.action == 'archived' and self.tag:
+            return f"• `{self.branch}` archived (tag `{self.tag}`)"
+        return f"• `{self.branch}` {self.action}"
+
+
+def chunk_lines(lines: List[str], limit: int = MAX_MESSAGE_CHARS) -> List[str]:
+    """Packs lines into as few messages of at most `limit` characters as possible."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
 class SlackNotifier:
-    def __init__(self, token: str, channel: str):
-        self.client = WebClient(token=token)
+    """
+    Posts branch actions to a Slack channel.
+
+    By default every action is posted as it happens. In digest mode (`repo` or
+    `run`) actions are collected and posted by `flush` as a few chunked
+    messages, or as a summary with the full list attached for large runs.
+    Rate limited calls are retried after the `Retry-After` Slack asks for;
+    deliveries that still fail are kept in `failed_deliveries`. When `metrics`
+    is given, every call is counted by method and status, and its time added
+    to the `notify` phase.
+    """
+
+    def __init__(self, token: str, channel: str, digest: str = 'off', base_url: Optional[str] = None,
+                 metrics: Optional[Metrics] = None):
+        if digest not in DIGEST_MODES:
+            raise ValueError(f"Unknown digest mode: {digest}")
+        if base_url:
+            self.client = WebClient(token=token, base_url=base_url)
+        else:
+            self.client = WebClient(token=token)
         self.channel = channel
+        self.digest = digest
+        self.metrics = metrics
+        self.failed_deliveries: List[str] = []
+        self._entries: Dict[str, List[DigestEntry]] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, description: str, method: Callable, **kwargs):
+        """Calls a Slack API method, waiting out rate limits; returns None if delivery failed."""
+        for attempt in range(1, MAX_SLACK_ATTEMPTS + 1):
+            start = time.perf_counter()
+            try:
+                response = method(**kwargs)
+                self._observe(method, getattr(response, 'status_code', 200), start)
+                return response
+            except SlackApiError as e:
+                response = e.response
+                self._observe(method, getattr(response, 'status_code', None) or 'error', start)
+                rate_limited = getattr(response, 'status_code', None) == 429 or response.get('error') == 'ratelimited'
+                if rate_limited and attempt < MAX_SLACK_ATTEMPTS:
+                    retry_after = int((getattr(response, 'headers', None) or {}).get('Retry-After', 1))
+                    logger.warning(f"Slack rate limit hit, retrying in {retry_after} seconds "
+                                   f"(attempt {attempt}/{MAX_SLACK_ATTEMPTS})")
+                    time.sleep(retry_after)
+                    continue
+                logger.error(f"Failed to send Slack notification: {str(e)}")
+            except Exception as e:
+                self._observe(method, 'error', start)
+                logger.error(f"Failed to send Slack notification: {str(e)}")
+            with self._lock:
+                self.failed_deliveries.append(description)
+            return None
 
-    def notify_archive(self, repo: str, branch: str) -> None:
-        try:
-            text = f":file_folder: Branch `{branch}` in repository `{repo}` has been archived"
-            self.client.chat_postMessage(channel=self.channel, text=text)
-        except SlackApiError as e:
-            logger.error(f"Failed to send Slack notification: {str(e)}")
+    def _observe(self, method: Callable, status: object, start: float) -> None:
+        if self.metrics is None:
+            return
+        seconds = time.perf_counter() - start
+        # chat_postMessage -> chat.postMessage, as Slack names its methods
+        name = getattr(method, '__name__', 'unknown').replace('_', '.', 1)
+        self.metrics.observe_slack_call(name, status, seconds)
+        self.metrics.phase_duration.inc(seconds, phase='notify')
+
+    def _post(self, description: str, text: str, **kwargs):
+        return self._call(description, self.client.chat_postMessage, channel=self.channel, text=text, **kwargs)
+
+    def _record(self, entry: DigestEntry) -> None:
+        with self._lock:
+            self._entries.setdefault(entry.repo, []).append(entry)
+
+    def notify_archive(self, repo: str, branch: str, tag: Optional[str] = None) -> None:
+        if self.digest != 'off':
+            self._record(DigestEntry(repo, branch, 'archived', tag))
+            return
+        text = f":file_folder: Branch `{branch}` in repository `{repo}` has been archived"
+        if tag:
+            text += f" (tag `{tag}`)"
+        self._post(f"archive notification for {repo}/{branch}", text)
 
     def notify_deletion(self, repo: str, branch: str) -> None:
-        try:
-            text = f":wastebasket: Branch `{branch}` in repository `{repo}` has been deleted"
-            self.client.chat_postMessage(channel=self.channel, text=text)
-        except SlackApiError as e:
-            logger.error(f"Failed to send Slack notification: {str(e)}") 
\ No newline at end of file
+        if self.digest != 'off':
+            self._record(DigestEntry(repo, branch, 'deleted'))
+            return
+        text = f":wastebasket: Branch `{branch}` in repository `{repo}` has been deleted"
+        self._post(f"deletion notification for {repo}/{branch}", text)
+
+    def repo_done(self, repo: str) -> None:
+        """Sends the digest of a repository when digesting per repository."""
+        if self.digest == 'repo':
+            self.flush(repo)
+
+    def flush(self, repo: Optional[str] = None) -> None:
+        """
+        Sends the collected digest.
+
+        Args:
+            repo (Optional[str]): Only send the actions of this repository; all
+                collected actions are sent when omitted.
+        """
+        with self._lock:
+            if repo is None:
+                entries = [entry for repo_entries in self._entries.values() for entry in repo_entries]
+                self._entries.clear()
+            else:
+                entries = self._entries.pop(repo, [])
+        if not entries:
+            return
+
+        by_repo: Dict[str, List[DigestEntry]] = {}
+        for entry in entries:
+            by_repo.setdefault(entry.repo, []).append(entry)
+        lines = []
+        for repo_name, repo_entries in by_repo.items():
+            lines.append(f"*{repo_name}*")
+            lines.extend(entry.line() for entry in repo_entries)
+
+        archived = sum(1 for entry in entries if entry.action == 'archived')
+        summary = (f":broom: Branch cleanup: {archived} archived, {len(entries) - archived} deleted "
+                   f"in {len(by_repo)} {'repository' if len(by_repo) == 1 else 'repositories'}")
+        if len(entries) > FILE_UPLOAD_THRESHOLD:
+            self._send_as_file(summary, "\n".join(lines))
+            return
+
+        chunks = chunk_lines(lines)
+        for number, chunk in enumerate(chunks, 1):
+            header = summary if len(chunks) == 1 else f"{summary} ({number}/{len(chunks)})"
+            self._post(f"digest message {number}/{len(chunks)} ({', '.join(by_repo)})", f"{header}\n{chunk}")
+
+    def _send_as_file(self, summary: str, content: str) -> None:
+        response = self._post("digest summary", f"{summary}. The full list is attached.")
+        if response is None:
+            return
+        # Uploads need the channel ID, which the posted message reports
+        self._call(
+            "digest file",
+            self.client.files_upload_v2,
+            channel=response['channel'],
+            thread_ts=response['ts'],
+            content=content,
+            filename='branch-cleanup.txt',
+            title='Branch cleanup',
+        )
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+from .logger import setup_logger
+
+logger = setup_logger()
+
+ACTIONS = ('archive', 'purge')
+
+# Final outcomes of applying an entry; failed entries are retried when the apply is resumed
+APPLIED = 'applied'
+CHANGED = 'changed'
+FAILED = 'failed'
+FINAL_STATUSES = (APPLIED, CHANGED)
+
+
+class PlanEntry(NamedTuple):
+    """A planned action on a branch, and why it was planned."""
+    repo: str
+    branch: str
+    head_sha: str
+    action: str
+    reason: str
+
+    @property
+    def key(self) -> Tuple[str, str, str, str]:
+        return self.repo, self.branch, self.head_sha, self.action
+
+    @property
+    def org(self) -> str:
+        return self.repo.split('/', 1)[0]
+
+    @property
+    def repo_name(self) -> str:
+        return self.repo.split('/', 1)[1]
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict())
+
+    @classmethod
+    def from_json(cls, line: str) -> 'PlanEntry':
+        entry = cls(**json.loads(line))
+        if entry.action not in ACTIONS:
+            raise ValueError(f"Unknown plan action: {entry.action}")
+        return entry
+
+
+def checkpoint_path(plan_path: str) -> str:
+    """Returns where the progress of applying a plan is checkpointed."""
+    return f"{plan_path}.checkpoint"
+
+
+class PlanWriter:
+    """
+    Writes plan entries to a JSON lines file as they are decided.
+
+    Entries are flushed per repository, so a plan interrupted half way holds
+    every repository planned until then. The checkpoint of applying an earlier
+    plan at the same path is removed, so the new plan is applied in full.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'w')
+        try:
+            os.remove(checkpoint_path(path))
+            logger.info(f"Removed the checkpoint of the previous plan at {path}")
+        except FileNotFoundError:
+            pass
+        self._lock = threading.Lock()
+
+    def write(self, entries: Iterable[PlanEntry]) -> None:
+        with self._lock:
+            for entry in entries:
+                self._file.write(entry.to_json() + "\n")
+                self.count += 1
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_plan(path: str) -> Iterator[PlanEntry]:
+    """Reads the entries of a plan file, in the order they were planned."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield PlanEntry.from_json(line)
+
+
+def group_by_repo(entries: Iterable[PlanEntry]) -> Dict[str, List[PlanEntry]]:
+    """Groups entries by repository full name, keeping the plan order within each."""
+    groups: Dict[str, List[PlanEntry]] = {}
+    for entry in entries:
+        groups.setdefault(entry.repo, []).append(entry)
+    return groups
+
+
+class PlanCheckpoint:
+    """
+    Records the outcome of each applied plan entry, so an interrupted apply resumes where it stopped.
+
+    Outcomes are appended to a JSON lines file next to the plan and synced to
+    disk as they happen. Entries applied, or skipped because their branch
+    changed, are not looked at again; failed entries are retried. Outcomes are
+    keyed by the planned head SHA, so a re-planned action on a branch that
+    moved since is applied again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._final: Set[Tuple[str, str, str, str]] = set()
+        try:
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record['status'] in FINAL_STATUSES:
+                        self._final.add((record['repo'], record['branch'], record['head_sha'], record['action']))
+        except FileNotFoundError:
+            pass
+        self._file = open(path, 'a')
+
+    def __len__(self) -> int:
+        return len(self._final)
+
+    def pending(self, entries: Iterable[PlanEntry]) -> List[PlanEntry]:
+        """Returns the entries without a final outcome."""
+        return [entry for entry in entries if entry.key not in self._final]
+
+    def record(self, entry: PlanEntry, status: str) -> None:
+        record = {'repo': entry.repo, 'branch': entry.branch, 'head_sha': entry.head_sha,
+                  'action': entry.action, 'status': status}
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if status in FINAL_STATUSES:
+                self._final.add(entry.key)
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+from .config import Config
+from .tag_index import compile_patterns
+
+GLOB_CHARS = frozenset('*?[')
+
+# Settings a policy file may give, by default or per repository
+POLICY_KEYS = ('protected_branches', 'inactivity_days', 'retention_days',
+               'critical_tag_patterns', 'allow_auto_purge_critical')
+
+
+def _is_glob(pattern: str) -> bool:
+    return any(c in GLOB_CHARS for c in pattern)
+
+
+def translate_glob(pattern: str) -> str:
+    """
+    Translates a branch glob into a regular expression.
+
+    `*` and `?` do not match `/`; `**` matches across path segments, and
+    `a/**/b` also matches `a/b`. `[...]` and `[!...]` are character classes.
+
+    Args:
+        pattern (str): The glob pattern.
+
+    Returns:
+        str: A regex for `re.fullmatch`.
+    """
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            parts.append('[^/]*')
+        elif c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace('\\', '\\\\')
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append(f"[{body}]")
+                i = end + 1
+                continue
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return ''.join(parts)
+
+
+def _compile_globs(patterns: Iterable[str]) -> Pattern:
+    return re.compile('|'.join(f"(?:{translate_glob(p)})" for p in patterns))
+
+
+class BranchMatcher:
+    """
+    Matches branch names against exact names and glob patterns.
+
+    Exact names are kept in a set. Glob patterns are grouped by their literal
+    first path segment (`release/*` under `release`) and each group is compiled
+    into a single regex; patterns starting with a wildcard form one more group.
+    A name is therefore checked with a set lookup, a dict lookup on its first
+    segment and at most two small regexes, however many patterns there are.
+
+    Args:
+        patterns (Iterable[str]): Branch names and globs (see `translate_glob`).
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: Tuple[str, ...] = tuple(dict.fromkeys(patterns))
+        self.names = frozenset(p for p in self.patterns if not _is_glob(p))
+        self.globs: Tuple[str, ...] = tuple(p for p in self.patterns if _is_glob(p))
+        groups: Dict[str, List[str]] = {}
+        wildcard = []
+        for pattern in self.globs:
+            head, sep, _ = pattern.partition('/')
+            if sep and not _is_glob(head):
+                groups.setdefault(head, []).append(pattern)
+            else:
+                wildcard.append(pattern)
+        self._groups = {head: _compile_globs(group) for head, group in groups.items()}
+        self._wildcard = _compile_globs(wildcard) if wildcard else None
+
+    def __contains__(self, name: str) -> bool:
+        if name in self.names:
+            return True
+        group = self._groups.get(name.partition('/')[0])
+        if group is not None and group.fullmatch(name):
+            return True
+        return self._wildcard is not None and self._wildcard.fullmatch(name) is not None
+
+    def __repr__(self) -> str:
+        return f"BranchMatcher({list(self.patterns)!r})"
+
+
+@dataclass(frozen=True)
+class RepoPolicy:
+    """
+    The settings deciding what happens to a repository's branches, compiled.
+
+    Attributes:
+        protected (BranchMatcher): Branches never archived; also the bases a
+            branch must be merged into.
+        inactivity_days (int): Days without commits before a branch is archived.
+        retention_days (int): Days an archived branch is kept before it is purged.
+        critical_tag_patterns (Tuple[str, ...]): fnmatch patterns of critical tags.
+        critical_tags (Pattern): `critical_tag_patterns` compiled into one regex.
+        allow_auto_purge_critical (bool): Whether branches with critical tags may be purged.
+    """
+    protected: BranchMatcher
+    inactivity_days: int
+    retention_days: int
+    critical_tag_patterns: Tuple[str, ...]
+    critical_tags: Pattern
+    allow_auto_purge_critical: bool
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> 'RepoPolicy':
+        patterns = tuple(settings['critical_tag_patterns'])
+        return cls(
+            protected=BranchMatcher(settings['protected_branches']),
+            inactivity_days=settings['inactivity_days'],
+            retention_days=settings['retention_days'],
+            critical_tag_patterns=patterns,
+            critical_tags=compile_patterns(patterns),
+            allow_auto_purge_critical=settings['allow_auto_purge_critical'],
+        )
+
+    @classmethod
+    def from_config(cls, config: Config) -> 'RepoPolicy':
+        return cls.from_settings({key: getattr(config, key) for key in POLICY_KEYS})
+
+    def is_protected(self, branch_name: str) -> bool:
+        return branch_name in self.protected
+
+    def fingerprint(self, archive_prefix: str) -> str:
+        """Hashes the policy, so a policy change forces re-evaluation of the repositories it applies to."""
+        policy = {
+            'protected_branches': sorted(self.protected.patterns),
+            'inactivity_days': self.inactivity_days,
+            'retention_days': self.retention_days,
+            'archive_prefix': archive_prefix,
+            'critical_tag_patterns': sorted(self.critical_tag_patterns),
+            'allow_auto_purge_critical': self.allow_auto_purge_critical,
+        }
+        return hashlib.sha256(json.dumps(policy, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class Policy:
+    """
+    The default policy of an organization and its per-repository overrides.
+
+    Overrides are compiled up front and keyed by repository full name, so
+    resolving a repository's policy is a single dict lookup.
+    """
+
+    def __init__(self, default: RepoPolicy, overrides: Optional[Dict[str, RepoPolicy]] = None):
+        self.default = default
+        self.overrides = overrides or {}
+
+    def for_repo(self, repo_full_name: str) -> RepoPolicy:
+        return self.overrides.get(repo_full_name, self.default)
+
+
+def _validate(settings: Dict[str, Any], where: str) -> Dict[str, Any]:
+    if not isinstance(settings, dict):
+        raise ValueError(f"{where} must be a table of settings")
+    unknown = set(settings) - set(POLICY_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown policy settings in {where}: {', '.join(sorted(unknown))}")
+    for key in ('inactivity_days', 'retention_days'):
+        if key in settings and (not isinstance(settings[key], int) or settings[key] < 1):
+            raise ValueError(f"{where}: {key} must be a positive integer")
+    for key in ('protected_branches', 'critical_tag_patterns'):
+        if key in settings and (not isinstance(settings[key], list)
+                                or not all(isinstance(p, str) for p in settings[key])):
+            raise ValueError(f"{where}: {key} must be a list of strings")
+    if 'allow_auto_purge_critical' in settings and not isinstance(settings['allow_auto_purge_critical'], bool):
+        raise ValueError(f"{where}: allow_auto_purge_critical must be true or false")
+    return settings
+
+
+def load_policy_file(path: str) -> Dict[str, Any]:
+    """
+    Reads a policy file: TOML (`.toml`), YAML (`.yaml`, `.yml`) or JSON.
+
+    YAML needs the `PyYAML` package, and TOML on Python before 3.11 the `tomli`
+    package (the `policy` extra).
+
+    Raises:
+        ValueError: If the file cannot be parsed.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == '.toml':
+            try:
+                import tomllib
+            except ImportError:
+                import tomli as tomllib
+            with open(path, 'rb') as f:
+                data = tomllib.load(f)
+        elif extension in ('.yaml', '.yml'):
+            import yaml
+            with open(path) as f:
+                data = yaml.safe_load(f)
+        else:
+            with open(path) as f:
+                data = json.load(f)
+    except ImportError as e:
+        raise ValueError(f"Reading {path} requires an optional package ({e.name}); install the 'policy' extra")
+    except Exception as e:
+        raise ValueError(f"Invalid policy file {path}: {e}")
+    return data or {}
+
+
+def compile_policy(config: Config) -> Policy:
+    """
+    Compiles the policy of the configured organization.
+
+    The defaults come from `config`, overridden by the `defaults` table of
+    `config.policy_file` when one is set; each entry of its `repos` table
+    overrides them for one repository. Repository keys are names within the
+    organization or full names (`org/repo`).
+
+    Example (TOML):
+
+        [defaults]
+        protected_branches = ["main", "develop", "release/*", "hotfix/**"]
+
+        [repos.payments]
+        retention_days = 180
+
+    Args:
+        config (Config): Configuration settings.
+
+    Returns:
+        Policy: The compiled policy.
+
+    Raises:
+        ValueError: If the policy file is invalid.
+    """
+    defaults = {key: getattr(config, key) for key in POLICY_KEYS}
+    if not config.policy_file:
+        return Policy(RepoPolicy.from_settings(defaults))
+
+    data = load_policy_file(config.policy_file)
+    unknown = set(data) - {'defaults', 'repos'}
+    if unknown:
+        raise ValueError(f"Unknown sections in {config.policy_file}: {', '.join(sorted(unknown))}")
+    defaults.update(_validate(data.get('defaults', {}), 'defaults'))
+    repos = data.get('repos', {})
+    if not isinstance(repos, dict):
+        raise ValueError("repos must be a table of repositories")
+
+    overrides = {}
+    for name, settings in repos.items():
+        full_name = name if '/' in name else f"{config.org_name}/{name}"
+        overrides[full_name] = RepoPolicy.from_settings(dict(defaults, **_validate(settings, f"repos.{name}")))
+    return Policy(RepoPolicy.from_settings(defaults), overrides)
@@ -0,0 +1,135 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Container, Dict, Iterable, List, Optional
+from github.Repository import Repository
+
+
+def is_own_head(pull, repo_full_name: str) -> bool:
+    """
+    Whether a pull request's head branch lives in the repository itself.
+
+    Pull requests from forks carry the fork's branch name as their head ref,
+    which says nothing about a local branch that happens to share it.
+    """
+    head_repo = pull.head.repo
+    return head_repo is not None and head_repo.full_name == repo_full_name
+
+
+@dataclass
+class PullRequestEntry:
+    """The fields of a pull request that the merge and open-PR checks rely on."""
+    __slots__ = ('number', 'head_ref', 'base_ref', 'state', 'merged', 'updated_at')
+
+    number: int
+    head_ref: str
+    base_ref: str
+    state: str
+    merged: bool
+    updated_at: datetime
+
+    @classmethod
+    def from_pull(cls, pull) -> 'PullRequestEntry':
+        # `merged_at` is part of the list payload; `merged` would trigger a
+        # completion request per pull request.
+        return cls(
+            number=pull.number,
+            head_ref=pull.head.ref,
+            base_ref=pull.base.ref,
+            state=pull.state,
+            merged=pull.merged_at is not None,
+            updated_at=pull.updated_at,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['updated_at'] = self.updated_at.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PullRequestEntry':
+        return cls(**{**data, 'updated_at': datetime.fromisoformat(data['updated_at'])})
+
+
+class PullRequestIndex:
+    """
+    All pull requests of a repository from its own branches, keyed by head ref.
+
+    The index is filled by paging through the repository's pulls sorted by
+    most recently updated, so an index loaded from a previous run can be
+    brought up to date by reading only the pulls updated since then.
+    """
+
+    def __init__(self, entries: Iterable[PullRequestEntry] = ()):
+        self._by_number: Dict[int, PullRequestEntry] = {}
+        self._by_head: Dict[str, List[PullRequestEntry]] = {}
+        self.updated_through: Optional[datetime] = None
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: PullRequestEntry) -> None:
+        """Adds a pull request, replacing any previously recorded state for it."""
+        previous = self._by_number.get(entry.number)
+        if previous is not None:
+            self._by_head[previous.head_ref].remove(previous)
+        self._by_number[entry.number] = entry
+        self._by_head.setdefault(entry.head_ref, []).append(entry)
+        if self.updated_through is None or entry.updated_at > self.updated_through:
+            self.updated_through = entry.updated_at
+
+    def pulls_for(self, head_ref: str) -> List[PullRequestEntry]:
+        return list(self._by_head.get(head_ref, ()))
+
+    def is_merged_into(self, head_ref: str, bases: Container[str]) -> bool:
+        return any(pr.merged and pr.base_ref in bases for pr in self._by_head.get(head_ref, ()))
+
+    def has_open_pr(self, head_ref: str) -> bool:
+        return any(pr.state == 'open' for pr in self._by_head.get(head_ref, ()))
+
+    def __len__(self) -> int:
+        return len(self._by_number)
+
+    def refresh(self, repo: Repository) -> int:
+        """
+        Reads pull requests updated since the newest one already in the index.
+
+        Args:
+            repo (Repository): The GitHub repository.
+
+        Returns:
+            int: The number of pull requests read.
+        """
+        since = self.updated_through
+        count = 0
+        for pull in repo.get_pulls(state='all', sort='updated', direction='desc'):
+            if since is not None and pull.updated_at <= since:
+                break
+            count += 1
+            if not is_own_head(pull, repo.full_name):
+                continue
+            self.add(PullRequestEntry.from_pull(pull))
+        return count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'pulls': [entry.to_dict() for entry in self._by_number.values()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PullRequestIndex':
+        return cls(PullRequestEntry.from_dict(item) for item in data.get('pulls', []))
+
+    def save(self, path: str) -> None:
+        """Writes the index to a JSON file, replacing it atomically."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PullRequestIndex':
+        """Loads an index saved by `save`, or returns an empty one if there is none."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
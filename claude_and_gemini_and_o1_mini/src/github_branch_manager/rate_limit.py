@@ -0,0 +1,187 @@
+import threading
+import time
+from typing import Callable, Mapping, Optional
+from github.Auth import Auth, WithRequester
+from github.GithubException import GithubException
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Cool-down applied to a secondary rate limit that does not say how long to wait
+DEFAULT_SECONDARY_BACKOFF = 60.0
+
+
+class RateBudgetExceeded(Exception):
+    """Raised when a run has used up its share of the hourly quota."""
+
+
+class RateGovernor:
+    """
+    Paces GitHub requests from the rate limit state of responses already received.
+
+    The governor never asks GitHub for its rate limit. It reads the
+    `X-RateLimit-*` values of the last response and spreads the remaining quota
+    evenly over the time left until the reset, using a token bucket. Secondary
+    (abuse) limits put every worker into a shared cool-down honoring
+    `Retry-After`. A run may also be capped to a percentage of the quota, after
+    which every request raises `RateBudgetExceeded`.
+    """
+
+    def __init__(self, budget_percent: float = 100.0, burst: int = 20,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        if not 0 < budget_percent <= 100:
+            raise ValueError("budget_percent must be in (0, 100]")
+        self.budget_percent = budget_percent
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._last_refill = clock()
+        self._limit: Optional[int] = None
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
+        self._first_remaining: Optional[int] = None
+        self._cooldown_until = 0.0
+
+    @property
+    def used(self) -> int:
+        """Requests counted against the quota since the first observed response."""
+        if self._first_remaining is None or self._remaining is None:
+            return 0
+        return max(self._first_remaining - self._remaining, 0)
+
+    @property
+    def budget(self) -> Optional[int]:
+        if self._limit is None:
+            return None
+        return int(self._limit * self.budget_percent / 100)
+
+    @property
+    def exhausted(self) -> bool:
+        budget = self.budget
+        return budget is not None and self.used >= budget
+
+    def observe(self, remaining: int, limit: int, reset_at: float) -> None:
+        """Records the rate limit state reported by the latest response."""
+        with self._lock:
+            if remaining < 0 or limit <= 0:
+                return
+            if self._first_remaining is None or reset_at > self._reset_at + 1:
+                # First response, or a new rate limit window has started
+                self._first_remaining = remaining
+            self._remaining = remaining
+            self._limit = limit
+            self._reset_at = float(reset_at)
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Records the rate limit state from raw `X-RateLimit-*` response headers."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        if 'x-ratelimit-remaining' in headers and 'x-ratelimit-limit' in headers:
+            self.observe(
+                int(float(headers['x-ratelimit-remaining'])),
+                int(float(headers['x-ratelimit-limit'])),
+                float(headers.get('x-ratelimit-reset', self._reset_at)),
+            )
+
+    def on_rate_limit_error(self, error: GithubException) -> None:
+        """
+        Records a rate limit error so the next requests wait for it to clear.
+
+        A `Retry-After` header or a response with quota left means a secondary
+        limit; an exhausted quota means waiting for the primary reset.
+        """
+        headers = {k.lower(): v for k, v in (error.headers or {}).items()}
+        self.observe_headers(headers)
+        now = self._clock()
+        with self._lock:
+            if 'retry-after' in headers:
+                delay = float(headers['retry-after'])
+            elif self._remaining == 0:
+                return
+            else:
+                delay = DEFAULT_SECONDARY_BACKOFF
+            self._cooldown_until = max(self._cooldown_until, now + delay)
+        logger.warning(f"Secondary rate limit hit. Pausing requests for {delay:.0f} seconds.")
+
+    def _rate(self, now: float) -> Optional[float]:
+        """Tokens per second that spread the remaining allowance until the reset."""
+        if self._remaining is None:
+            return None
+        allowance = self._remaining
+        budget = self.budget
+        if budget is not None:
+            allowance = min(allowance, budget - self.used)
+        return max(allowance, 0) / max(self._reset_at - now, 1.0)
+
+    def _delay(self) -> float:
+        """Takes a token if one is available; otherwise returns how long to wait."""
+        now = self._clock()
+        if now < self._cooldown_until:
+            return self._cooldown_until - now
+        if self._remaining == 0 and now < self._reset_at:
+            return self._reset_at - now + 1
+        if self.exhausted:
+            raise RateBudgetExceeded(
+                f"Run budget of {self.budget} requests ({self.budget_percent}% of {self._limit}) used up"
+            )
+        rate = self._rate(now)
+        if rate is None:
+            return 0.0
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / rate if rate > 0 else max(self._reset_at - now, 1.0)
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                delay = self._delay()
+            if delay <= 0:
+                return
+            if delay > 5:
+                logger.warning(f"Rate limit pacing: sleeping for {delay:.0f} seconds.")
+            self._sleep(delay)
+
+
+class GovernedAuth(Auth, WithRequester['GovernedAuth']):
+    """
+    Wraps a PyGithub authentication so every request first passes the governor.
+
+    PyGithub calls `authentication` right before sending each request, and keeps
+    the rate limit headers of the last response on its requester; both are used
+    here so pacing costs no extra calls.
+    """
+
+    def __init__(self, auth: Auth, governor: RateGovernor):
+        super().__init__()
+        self.auth = auth
+        self.governor = governor
+
+    @property
+    def token_type(self) -> str:
+        return self.auth.token_type
+
+    @property
+    def token(self) -> str:
+        return self.auth.token
+
+    def withRequester(self, requester) -> 'GovernedAuth':
+        super().withRequester(requester)
+        if isinstance(self.auth, WithRequester):
+            self.auth.withRequester(requester)
+        return self
+
+    def authentication(self, headers: dict) -> None:
+        requester = self.requester
+        if requester is not None:
+            remaining, limit = requester.rate_limiting
+            self.governor.observe(remaining, limit, requester.rate_limiting_resettime)
+        self.governor.acquire()
+        self.auth.authentication(headers)
+
+    def mask_authentication(self, headers: dict) -> None:
+        self.auth.mask_authentication(headers)
@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+from typing import Any, Container, Iterable, NamedTuple, Optional, Tuple
+
+
+def to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    """Converts a datetime to epoch seconds; naive datetimes are taken as UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def from_timestamp(value: Optional[float]) -> Optional[datetime]:
+    return None if value is None else datetime.fromtimestamp(value, timezone.utc)
+
+
+class PullRequestSummary(NamedTuple):
+    """The subset of a pull request needed by the branch predicates."""
+    base: str
+    state: str
+    merged: bool
+
+
+class BranchRecord:
+    """
+    A branch as evaluated by the tool.
+
+    Branches from every source (REST listings, the GraphQL inventory, webhook
+    state, local mirrors, the archive ledger) are converted to records, which
+    hold plain values only: the name and head SHA, commit times as epoch
+    seconds and pull request summaries as a tuple. A record built from a REST
+    listing keeps the listing's commit until its date is first read, and drops
+    it afterwards, so no PyGithub object outlives the evaluation of its branch.
+
+    Args:
+        name (str): Branch name.
+        sha (str): Head commit SHA.
+        committed_date (Optional[datetime]): When the head commit was committed.
+        authored_date (Optional[datetime]): When the head commit was authored.
+        pull_requests (Iterable[PullRequestSummary]): Pull requests with this branch as head.
+    """
+    __slots__ = ('name', 'sha', '_committed', '_authored', 'pull_requests', '_commit')
+
+    def __init__(self, name: str, sha: str, committed_date: Optional[datetime], authored_date: Optional[datetime],
+                 pull_requests: Iterable[PullRequestSummary] = ()):
+        self.name = name
+        self.sha = sha
+        self._committed = to_timestamp(committed_date)
+        self._authored = to_timestamp(authored_date)
+        self.pull_requests: Tuple[PullRequestSummary, ...] = tuple(pull_requests)
+        self._commit: Any = None
+
+    @classmethod
+    def from_rest(cls, branch: Any) -> 'BranchRecord':
+        """
+        Converts a PyGithub `Branch` from a branch listing.
+
+        The listing does not include commit dates; the date is read from the
+        commit (one request, as before) the first time it is needed.
+        """
+        record = cls(branch.name, branch.commit.sha, None, None)
+        record._commit = branch.commit
+        return record
+
+    def _load_dates(self) -> None:
+        commit = self._commit
+        if commit is not None:
+            self._committed = self._authored = to_timestamp(commit.commit.author.date)
+            self._commit = None
+
+    @property
+    def committed_date(self) -> Optional[datetime]:
+        self._load_dates()
+        return from_timestamp(self._committed)
+
+    @property
+    def authored_date(self) -> Optional[datetime]:
+        self._load_dates()
+        return from_timestamp(self._authored)
+
+    @property
+    def authored_timestamp(self) -> Optional[float]:
+        """The authored date as epoch seconds, without building a datetime."""
+        self._load_dates()
+        return self._authored
+
+    @property
+    def has_open_pr(self) -> bool:
+        return any(pr.state == 'OPEN' for pr in self.pull_requests)
+
+    def is_merged_into(self, bases: Container[str]) -> bool:
+        return any(pr.merged and pr.base in bases for pr in self.pull_requests)
+
+    def _key(self) -> tuple:
+        self._load_dates()
+        return self.name, self.sha, self._committed, self._authored, self.pull_requests
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BranchRecord):
+            return NotImplemented
+        return self._key() == other._key()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"BranchRecord(name={self.name!r}, sha={self.sha!r}, committed_date={self.committed_date!r}, "
+                f"authored_date={self.authored_date!r}, pull_requests={list(self.pull_requests)!r})")
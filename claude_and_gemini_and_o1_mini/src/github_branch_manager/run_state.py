@@ -0,0 +1,179 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+from .config import Config
+from .policy import RepoPolicy
+from .logger import setup_logger
+
+logger = setup_logger()
+
+PHASES = ('archive', 'purge')
+
+
+def policy_fingerprint(config: Config) -> str:
+    """Hashes the settings that decide what happens to a branch, so a policy change forces re-evaluation."""
+    return RepoPolicy.from_config(config).fingerprint(config.archive_prefix)
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass
+class RepoRunState:
+    """
+    What was known about a repository after its last complete evaluation of one phase.
+
+    Attributes:
+        repo (str): The repository full name.
+        phase (str): `archive` or `purge`.
+        pushed_at (Optional[datetime]): The repository's `pushed_at` at evaluation time.
+        evaluated_at (datetime): When the evaluation finished.
+        next_due (Optional[datetime]): The earliest time an inactivity or retention
+            threshold passes for one of the branches, if any.
+        policy (str): The `policy_fingerprint` the evaluation ran with.
+    """
+    repo: str
+    phase: str
+    pushed_at: Optional[datetime]
+    evaluated_at: datetime
+    next_due: Optional[datetime]
+    policy: str
+
+    def is_current(self, pushed_at: Optional[datetime], policy: str, now: Optional[datetime] = None) -> bool:
+        """
+        Returns True if evaluating the repository again would not change anything.
+
+        That is the case when nothing was pushed since the evaluation, the policy
+        is unchanged and no branch has crossed a time threshold since.
+        """
+        now = now or datetime.now(timezone.utc)
+        if policy != self.policy:
+            return False
+        if pushed_at is None or self.pushed_at is None or _as_utc(pushed_at) > self.pushed_at:
+            return False
+        return self.next_due is None or now < self.next_due
+
+    def to_dict(self) -> dict:
+        return {
+            'repo': self.repo,
+            'phase': self.phase,
+            'pushed_at': self.pushed_at.isoformat() if self.pushed_at else None,
+            'evaluated_at': self.evaluated_at.isoformat(),
+            'next_due': self.next_due.isoformat() if self.next_due else None,
+            'policy': self.policy,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RepoRunState':
+        return cls(
+            repo=data['repo'],
+            phase=data['phase'],
+            pushed_at=_as_utc(_parse(data.get('pushed_at'))),
+            evaluated_at=_parse(data['evaluated_at']),
+            next_due=_parse(data.get('next_due')),
+            policy=data.get('policy', ''),
+        )
+
+
+class RunStateStore(ABC):
+    """Keeps one `RepoRunState` per repository and phase between runs."""
+
+    @abstractmethod
+    def get(self, repo: str, phase: str) -> Optional[RepoRunState]:
+        """Returns the stored state for the repository and phase, if any."""
+
+    @abstractmethod
+    def put(self, state: RepoRunState) -> None:
+        """Stores the state, replacing any earlier one for its repository and phase."""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteRunStateStore(RunStateStore):
+    """Run state in a local SQLite file."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS repo_run_state ("
+            " repo TEXT, phase TEXT, state TEXT, PRIMARY KEY (repo, phase))"
+        )
+
+    def get(self, repo: str, phase: str) -> Optional[RepoRunState]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state FROM repo_run_state WHERE repo = ? AND phase = ?", (repo, phase)
+            ).fetchone()
+        return RepoRunState.from_dict(json.loads(row[0])) if row else None
+
+    def put(self, state: RepoRunState) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO repo_run_state VALUES (?, ?, ?)",
+                (state.repo, state.phase, json.dumps(state.to_dict())),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class FirestoreRunStateStore(RunStateStore):
+    """
+    Run state in a Firestore collection, for runs without a persistent disk.
+
+    Requires the `google-cloud-firestore` package (the `firestore` extra).
+    """
+
+    def __init__(self, collection: str = 'repo_run_state', client=None):
+        if client is None:
+            from google.cloud import firestore
+            client = firestore.Client()
+        self._collection = client.collection(collection)
+
+    @staticmethod
+    def _document_id(repo: str, phase: str) -> str:
+        return f"{repo.replace('/', '__')}__{phase}"
+
+    def get(self, repo: str, phase: str) -> Optional[RepoRunState]:
+        doc = self._collection.document(self._document_id(repo, phase)).get()
+        if not doc.exists:
+            return None
+        return RepoRunState.from_dict(doc.to_dict())
+
+    def put(self, state: RepoRunState) -> None:
+        self._collection.document(self._document_id(state.repo, state.phase)).set(state.to_dict())
+
+
+def open_run_state_store(config: Config) -> Optional[RunStateStore]:
+    """
+    Opens the run state store selected by `config.run_state_store`.
+
+    Returns:
+        Optional[RunStateStore]: The store, or None if incremental runs are disabled
+        or the store cannot be opened (every repository is then evaluated).
+    """
+    try:
+        if config.run_state_store == 'firestore':
+            return FirestoreRunStateStore(config.run_state_collection)
+        if config.run_state_store == 'sqlite' and config.state_dir:
+            return SQLiteRunStateStore(os.path.join(config.state_dir, 'run-state.sqlite3'))
+    except Exception as e:
+        logger.warning(f"Run state store unavailable, evaluating all repositories: {e}")
+    return None
@@ -0,0 +1,95 @@
+from collections import deque
+from itertools import chain, zip_longest
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class BranchScheduler:
+    """
+    Runs per-branch work on a worker pool shared by all repositories.
+
+    Each repository may only have its fair share of the pool in flight at a
+    time (`max_branch_workers / max_repos_in_flight`, at least one), so a
+    repository with thousands of branches cannot keep the workers busy while
+    the other repositories being processed wait.
+    """
+
+    def __init__(self, max_branch_workers: int, max_repos_in_flight: int = 1):
+        if max_branch_workers < 1 or max_repos_in_flight < 1:
+            raise ValueError("max_branch_workers and max_repos_in_flight must be positive integers")
+        self.max_branch_workers = max_branch_workers
+        self.max_repos_in_flight = max_repos_in_flight
+        self.per_repo_limit = max(1, -(-max_branch_workers // max_repos_in_flight))
+        self._executor = ThreadPoolExecutor(max_workers=max_branch_workers, thread_name_prefix='branch')
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """
+        Applies `fn` to each item on the shared pool.
+
+        Args:
+            fn (Callable): The per-item work.
+            items (Iterable): The items of one repository.
+
+        Returns:
+            List: The results, in the order of `items`.
+
+        Raises:
+            Exception: The first exception raised by `fn`, once all submitted work has finished.
+        """
+        return list(self.imap(fn, items))
+
+    def imap(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        """
+        Like `map`, but yields the results as they complete, in order.
+
+        `items` is consumed lazily, at most the repository's share of the pool
+        ahead of the results, so a generator of branches is never materialized.
+        """
+        in_flight: Deque[Future] = deque()
+        for item in items:
+            if len(in_flight) >= self.per_repo_limit:
+                yield in_flight.popleft().result()
+            in_flight.append(self._executor.submit(fn, item))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def run_repositories(repos: Iterable[T], work: Callable[[T], R],
+                     max_repos_in_flight: int = 1) -> List[Tuple[T, Optional[R], Optional[Exception]]]:
+    """
+    Runs `work` for every repository, up to `max_repos_in_flight` at a time.
+
+    A failure in one repository does not stop the others.
+
+    Args:
+        repos (Iterable[T]): The repositories to process, e.g. names.
+        work (Callable[[T], R]): The per-repository work.
+        max_repos_in_flight (int): How many repositories are processed concurrently.
+
+    Returns:
+        List[Tuple[T, Optional[R], Optional[Exception]]]: One `(repo, result, error)`
+        entry per repository, in the order of `repos`.
+    """
+    def run(repo: T) -> Tuple[T, Optional[R], Optional[Exception]]:
+        try:
+            return repo, work(repo), None
+        except Exception as e:
+            return repo, None, e
+
+    if max_repos_in_flight <= 1:
+        return [run(repo) for repo in repos]
+
+    with ThreadPoolExecutor(max_workers=max_repos_in_flight, thread_name_prefix='repo') as executor:
+        return list(executor.map(run, repos))
+
+
+def interleave(*sequences: Iterable[T]) -> List[T]:
+    """Round-robins several sequences, e.g. the repositories of several organizations."""
+    missing = object()
+    return [item for item in chain.from_iterable(zip_longest(*sequences, fillvalue=missing)) if item is not missing]
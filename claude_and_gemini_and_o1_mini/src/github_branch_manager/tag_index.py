@@ -0,0 +1,80 @@
+import fnmatch
+import re
+from typing import Dict, Iterable, List, Pattern, Union
+from github.Repository import Repository
+
+
+def compile_patterns(patterns: Iterable[str]) -> Pattern:
+    """
+    Compiles glob patterns into a single regular expression.
+
+    Args:
+        patterns (Iterable[str]): fnmatch-style glob patterns.
+
+    Returns:
+        Pattern: A regex whose `match` succeeds if any of the patterns match.
+    """
+    translated = [f"(?:{fnmatch.translate(p)})" for p in patterns]
+    if not translated:
+        # Matches nothing
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(translated))
+
+
+class TagIndex:
+    """
+    Maps commit SHAs to the critical tags pointing at them.
+
+    Built once per repository run so that the archive and purge phases can
+    answer `has_critical_tags` with a dictionary lookup instead of walking the
+    repository's tags for every branch.
+    """
+
+    def __init__(self, patterns: Union[Iterable[str], Pattern]):
+        self.matcher = patterns if isinstance(patterns, Pattern) else compile_patterns(patterns)
+        self._tags_by_sha: Dict[str, List[str]] = {}
+
+    def is_critical(self, tag_name: str) -> bool:
+        return self.matcher.match(tag_name) is not None
+
+    def add(self, tag_name: str, sha: str) -> None:
+        """Records a tag if its name matches one of the critical patterns."""
+        if self.is_critical(tag_name):
+            self._tags_by_sha.setdefault(sha, []).append(tag_name)
+
+    def critical_tags(self, sha: str) -> List[str]:
+        return list(self._tags_by_sha.get(sha, ()))
+
+    def has_critical_tag(self, sha: str) -> bool:
+        return sha in self._tags_by_sha
+
+    def __len__(self) -> int:
+        return sum(len(tags) for tags in self._tags_by_sha.values())
+
+    @classmethod
+    def from_matching_refs(cls, repo: Repository, patterns: Union[Iterable[str], Pattern]) -> 'TagIndex':
+        """
+        Builds the index from the lightweight `git/matching-refs/tags` listing.
+
+        Only annotated tags whose names match a critical pattern are dereferenced
+        to their commit, so non-critical tags never cost more than their share of
+        a listing page.
+
+        Args:
+            repo (Repository): The GitHub repository.
+            patterns (Union[Iterable[str], Pattern]): Critical tag glob patterns, or
+                the regex they were compiled into.
+
+        Returns:
+            TagIndex: The populated index.
+        """
+        index = cls(patterns)
+        for ref in repo.get_git_matching_refs('tags/'):
+            name = ref.ref[len('refs/tags/'):]
+            if not index.is_critical(name):
+                continue
+            sha = ref.object.sha
+            if ref.object.type == 'tag':
+                sha = repo.get_git_tag(sha).object.sha
+            index.add(name, sha)
+        return index
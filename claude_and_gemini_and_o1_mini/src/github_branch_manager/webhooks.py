@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from .branch_state import BranchStateStore
+from .logger import setup_logger
+
+logger = setup_logger()
+
+SUBSCRIBED_EVENTS = ('push', 'create', 'delete', 'pull_request')
+
+
+def sign(secret: str, body: bytes) -> str:
+    """Computes the `X-Hub-Signature-256` header value GitHub sends for a payload."""
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    if not signature:
+        return False
+    return hmac.compare_digest(sign(secret, body), signature)
+
+
+class WebhookReceiver:
+    """
+    Receives GitHub webhook deliveries and applies them to a `BranchStateStore`.
+
+    Deliveries must be signed with the webhook secret. Events other than `push`,
+    `create`, `delete` and `pull_request` are acknowledged and ignored, and a
+    delivery that was already applied is not applied again.
+    """
+
+    def __init__(self, store: BranchStateStore, secret: str, host: str = '0.0.0.0', port: int = 8080):
+        if not secret:
+            raise ValueError("A webhook secret is required")
+        self.store = store
+        self.secret = secret
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def handle(self, event: Optional[str], delivery: Optional[str], body: bytes,
+               signature: Optional[str]) -> Tuple[int, str]:
+        """
+        Processes one delivery.
+
+        Returns:
+            Tuple[int, str]: The HTTP status and message to answer with.
+        """
+        if not verify_signature(self.secret, body, signature):
+            return 401, "invalid signature"
+        if not event:
+            return 400, "missing X-GitHub-Event"
+        if event not in SUBSCRIBED_EVENTS:
+            return 200, "ignored"
+        if delivery and self.store.has_delivery(delivery):
+            return 200, "duplicate"
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, "invalid payload"
+        try:
+            self.store.apply_event(event, payload)
+        except Exception as e:
+            logger.error(f"Failed to apply {event} delivery {delivery}: {e}")
+            return 500, "failed"
+        if delivery:
+            self.store.record_delivery(delivery)
+        return 200, "applied"
+
+    def _handler_class(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, message = receiver.handle(
+                    self.headers.get('X-GitHub-Event'),
+                    self.headers.get('X-GitHub-Delivery'),
+                    body,
+                    self.headers.get('X-Hub-Signature-256'),
+                )
+                payload = message.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Webhook {self.address_string()}: {format % args}")
+
+        return Handler
+
+    def start(self) -> None:
+        """Serves deliveries on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def replay(url: str, secret: str, paths: Iterable[str]) -> List[int]:
+    """
+    Posts recorded deliveries to a receiver, in the given order.
+
+    Each file holds one delivery as `{"event": ..., "delivery": ..., "payload": {...}}`.
+
+    Returns:
+        List[int]: The HTTP status of each delivery.
+    """
+    statuses = []
+    for path in paths:
+        with open(path) as f:
+            recorded = json.load(f)
+        body = json.dumps(recorded['payload']).encode()
+        request = urllib.request.Request(url, data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'X-GitHub-Event': recorded['event'],
+            'X-GitHub-Delivery': recorded.get('delivery', ''),
+            'X-Hub-Signature-256': sign(secret, body),
+        })
+        try:
+            with urllib.request.urlopen(request) as response:
+                statuses.append(response.status)
+        except urllib.error.HTTPError as e:
+            statuses.append(e.code)
+    return statuses
+
+
+def main():
+    """Runs the webhook receiver, or replays recorded deliveries into one."""
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="GitHub Branch Manager webhook receiver")
+    parser.add_argument('--port', type=int, default=int(os.getenv('WEBHOOK_PORT', '8080')),
+                        help='Port to listen on (default: WEBHOOK_PORT or 8080)')
+    parser.add_argument('--replay', nargs='+', metavar='FILE',
+                        help='Post recorded deliveries to a running receiver instead of serving')
+    parser.add_argument('--url', default='http://127.0.0.1:8080/', help='Receiver URL for --replay')
+    args = parser.parse_args()
+
+    secret = os.getenv('WEBHOOK_SECRET', '')
+    if not secret:
+        logger.error("Configuration error: Missing required environment variables: WEBHOOK_SECRET")
+        exit(1)
+
+    if args.replay:
+        for path, status in zip(args.replay, replay(args.url, secret, args.replay)):
+            logger.info(f"Replayed {path}: {status}")
+        return
+
+    state_dir = os.getenv('STATE_DIR', '')
+    if not state_dir:
+        logger.error("Configuration error: Missing required environment variables: STATE_DIR")
+        exit(1)
+    store = BranchStateStore(os.path.join(state_dir, 'branch-state.sqlite3'))
+    receiver = WebhookReceiver(store, secret, port=args.port)
+    logger.info(f"Receiving GitHub webhooks on port {args.port}")
+    try:
+        receiver.serve_forever()
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
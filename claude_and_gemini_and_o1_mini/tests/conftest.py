@@ -0,0 +1,60 @@
+import pytest
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from github.Branch import Branch
+from github_branch_manager.branch_manager import BranchManager
+from github_branch_manager.config import Config
+from github_branch_manager.records import BranchRecord
+
+
+def make_config(**overrides) -> Config:
+    """The configuration the tests share, with the fields a test changes overridden."""
+    config = Config(
+        github_token="test_token",
+        org_name="test_org",
+        slack_token="test_slack_token",
+        slack_channel="#test-channel",
+        protected_branches=["main", "develop"],
+        inactivity_days=30,
+        retention_days=60,
+        archive_prefix="archived/",
+        critical_tag_patterns=["v*", "release-*"],
+        allow_auto_purge_critical=False
+    )
+    return replace(config, **overrides)
+
+
+def make_manager(config: Config, **kwargs) -> BranchManager:
+    """A BranchManager on a mocked GitHub client, with a mocked notifier."""
+    with patch('github_branch_manager.branch_manager.Github'):
+        manager = BranchManager(config, **kwargs)
+    manager.notifier = MagicMock()
+    return manager
+
+
+def make_branch(name, sha=None, days_old=40, now=None) -> BranchRecord:
+    """A branch as listed by the inventory, last committed `days_old` days ago."""
+    date = (now or datetime.now(timezone.utc)) - timedelta(days=days_old)
+    return BranchRecord(name, sha or f"sha-{name}", date, date)
+
+
+def make_github_branch(name, days_old=40):
+    """A PyGithub branch, as returned by `Repository.get_branches`."""
+    branch = MagicMock(spec=Branch)
+    branch.name = name
+    branch.commit.sha = f"sha-{name}"
+    branch.commit.commit.author.date = datetime.now(timezone.utc) - timedelta(days=days_old)
+    return branch
+
+
+@pytest.fixture
+def config():
+    """Fixture providing test configuration"""
+    return make_config()
+
+
+@pytest.fixture
+def manager(config):
+    """Fixture providing a BranchManager instance"""
+    return make_manager(config)
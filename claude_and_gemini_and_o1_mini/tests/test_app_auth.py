@@ -0,0 +1,138 @@
+import json
+import threading
+import pytest
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from github_branch_manager.app_auth import InstallationTokenPool
+from github_branch_manager.config import Config
+
+INSTALLATIONS = {'org-a': 11, 'org-b': 22}
+
+
+class TokenEndpoint(BaseHTTPRequestHandler):
+    """Local stand-in for the GitHub App installation endpoints."""
+    expires_in = timedelta(hours=1)
+    minted = []
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        org = self.path.split('/')[2]
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._reply(401, {'message': 'JWT required'})
+        if org not in INSTALLATIONS:
+            return self._reply(404, {'message': 'Not Found'})
+        self._reply(200, {'id': INSTALLATIONS[org], 'account': {'login': org}})
+
+    def do_POST(self):
+        installation_id = int(self.path.split('/')[3])
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        TokenEndpoint.minted.append(installation_id)
+        expires_at = datetime.now(timezone.utc) + self.expires_in
+        self._reply(201, {
+            'token': f"ghs_{installation_id}_{len(TokenEndpoint.minted)}",
+            'expires_at': expires_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        })
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def token_server():
+    TokenEndpoint.minted = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TokenEndpoint)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='module')
+def private_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime.now(timezone.utc).timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+class TestInstallationTokenPool:
+    def test_tokens_are_minted_per_org_and_cached(self, token_server, private_key):
+        pool = InstallationTokenPool('123', private_key, base_url=token_server)
+
+        token_a = pool.token('org-a')
+        token_b = pool.token('org-b')
+
+        assert token_a.startswith('ghs_11_')
+        assert token_b.startswith('ghs_22_')
+        assert pool.token('org-a') == token_a
+        assert TokenEndpoint.minted == [11, 22]
+
+    def test_token_is_refreshed_before_expiry(self, token_server, private_key):
+        clock = FakeClock()
+        pool = InstallationTokenPool('123', private_key, base_url=token_server, refresh_margin=300, clock=clock)
+
+        first = pool.token('org-a')
+        clock.now += 3600 - 299
+        second = pool.token('org-a')
+
+        assert first != second
+        assert TokenEndpoint.minted == [11, 11]
+
+    def test_auth_header_uses_current_token(self, token_server, private_key):
+        pool = InstallationTokenPool('123', private_key, base_url=token_server)
+        headers = {}
+
+        pool.auth('org-b').authentication(headers)
+
+        assert headers['Authorization'] == f"token {pool.token('org-b')}"
+
+
+class TestConfigForApps:
+    def test_app_credentials_replace_token(self, monkeypatch, tmp_path, private_key):
+        key_path = tmp_path / 'app.pem'
+        key_path.write_text(private_key)
+        monkeypatch.delenv('GITHUB_TOKEN', raising=False)
+        monkeypatch.delenv('GITHUB_ORG', raising=False)
+        monkeypatch.setenv('SLACK_TOKEN', 'test_slack_token')
+        monkeypatch.setenv('GITHUB_APP_ID', '123')
+        monkeypatch.setenv('GITHUB_APP_PRIVATE_KEY_PATH', str(key_path))
+        monkeypatch.setenv('GITHUB_ORGS', 'org-a, org-b')
+
+        config = Config.from_env()
+
+        assert config.uses_github_app
+        assert config.github_app_private_key == private_key
+        assert config.orgs == ['org-a', 'org-b']
+        assert config.org_name == 'org-a'
+        assert config.for_org('org-b').org_name == 'org-b'
+
+    def test_app_without_key_is_rejected(self, monkeypatch):
+        monkeypatch.setenv('GITHUB_ORG', 'test_org')
+        monkeypatch.setenv('SLACK_TOKEN', 'test_slack_token')
+        monkeypatch.setenv('GITHUB_APP_ID', '123')
+        monkeypatch.delenv('GITHUB_APP_PRIVATE_KEY', raising=False)
+        monkeypatch.delenv('GITHUB_APP_PRIVATE_KEY_PATH', raising=False)
+
+        with pytest.raises(EnvironmentError) as exc_info:
+            Config.from_env()
+        assert 'GITHUB_APP_PRIVATE_KEY' in str(exc_info.value)
@@ -0,0 +1,146 @@
+import pytest
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.archive_ledger import (
+    ArchiveRecord, FirestoreArchiveLedger, JSONArchiveLedger, SQLiteArchiveLedger, open_archive_ledger
+)
+from github_branch_manager.branch_manager import BranchAction
+from .conftest import make_config, make_manager
+
+NOW = datetime.now(timezone.utc)
+REPO = 'test_org/test-repo'
+
+
+def make_record(branch, days_ago, repo=REPO):
+    return ArchiveRecord(repo, branch, f"archived/{branch}", f"sha-{branch}", NOW - timedelta(days=days_ago), 'tag')
+
+
+@pytest.fixture
+def config(tmp_path):
+    return make_config(state_dir=str(tmp_path))
+
+
+@pytest.fixture(params=['sqlite', 'json'])
+def ledger(request, tmp_path):
+    if request.param == 'sqlite':
+        ledger = SQLiteArchiveLedger(str(tmp_path / 'archive-ledger.sqlite3'))
+    else:
+        ledger = JSONArchiveLedger(str(tmp_path / 'archive-ledger.json'))
+    yield ledger
+    ledger.close()
+
+
+class TestArchiveLedger:
+    def test_archived_before_is_a_range_query(self, ledger):
+        for record in (make_record('old', 90), make_record('recent', 10), make_record('older', 120),
+                       make_record('other', 90, repo='test_org/other')):
+            ledger.record(record)
+        cutoff = NOW - timedelta(days=60)
+
+        records = ledger.archived_before(REPO, cutoff)
+
+        assert [r.archived_name for r in records] == ['archived/older', 'archived/old']
+        assert records[0] == make_record('older', 120)
+        assert ledger.next_archived_after(REPO, cutoff) == NOW - timedelta(days=10)
+
+        ledger.remove(REPO, 'archived/older')
+        assert [r.archived_name for r in ledger.archived_before(REPO, cutoff)] == ['archived/old']
+
+    def test_track_keeps_existing_records(self, ledger):
+        ledger.record(make_record('known', 90))
+        assert ledger.is_tracked(REPO) is False
+
+        ledger.track(REPO, [make_record('known', 0), make_record('legacy', 0)])
+
+        assert ledger.is_tracked(REPO) is True
+        assert [r.archived_name for r in ledger.archived_before(REPO, NOW - timedelta(days=60))] == ['archived/known']
+
+    def test_records_survive_reopening(self, tmp_path):
+        path = str(tmp_path / 'archive-ledger.json')
+        ledger = JSONArchiveLedger(path)
+        ledger.record(make_record('old', 90))
+
+        assert JSONArchiveLedger(path).archived_before(REPO, NOW) == [make_record('old', 90)]
+
+    def test_firestore_queries_by_repo_and_time(self):
+        client = MagicMock()
+        ledger = FirestoreArchiveLedger('archived_branches', client=client)
+        collection = client.collection.return_value
+        record = make_record('old', 90)
+        query = collection.where.return_value.where.return_value.order_by.return_value
+        query.stream.return_value = [MagicMock(to_dict=MagicMock(return_value=record.to_dict()))]
+
+        ledger.record(record)
+        records = ledger.archived_before(REPO, NOW)
+
+        collection.document.assert_called_with('test_org%2Ftest-repo:archived%2Fold')
+        collection.where.assert_called_once_with('repo', '==', REPO)
+        collection.where.return_value.where.assert_called_once_with('archived_at', '<', NOW)
+        assert records == [record]
+
+    def test_firestore_document_ids_are_distinct(self):
+        document_id = FirestoreArchiveLedger._document_id
+
+        assert document_id('org/a__b', 'c') != document_id('org/a', 'b__c')
+        assert document_id('org/a', 'b/c') != document_id('org/a', 'b__c')
+        assert '/' not in document_id('org/a', 'archived/feature/x')
+
+    def test_ledger_selection(self, config):
+        assert isinstance(open_archive_ledger(config), SQLiteArchiveLedger)
+        assert isinstance(open_archive_ledger(replace(config, archive_ledger='json')), JSONArchiveLedger)
+        assert open_archive_ledger(replace(config, archive_ledger='none')) is None
+        assert open_archive_ledger(replace(config, state_dir='')) is None
+
+
+class TestLedgerRetention:
+    @pytest.fixture
+    def manager(self, config, ledger):
+        return make_manager(config, archive_ledger=ledger)
+
+    @pytest.fixture
+    def repo(self, manager):
+        repo = MagicMock(spec=Repository)
+        repo.name = 'test-repo'
+        repo.full_name = REPO
+        repo.get_git_matching_refs.return_value = []
+        manager.org.get_repo.return_value = repo
+        return repo
+
+    def test_archive_is_recorded(self, manager, repo, ledger):
+        branch = MagicMock()
+        branch.name = 'feature/done'
+        branch.commit.sha = 'sha-done'
+
+        manager.archive_branch(repo, branch)
+
+        record, = ledger.archived_before(REPO, NOW + timedelta(minutes=1))
+        assert (record.branch, record.archived_name, record.sha) == ('feature/done', 'archived/feature/done', 'sha-done')
+        assert record.tag.startswith('archived-feature/done-')
+
+    def test_purge_reads_candidates_from_the_ledger(self, manager, repo, ledger):
+        ledger.track(REPO, [])
+        ledger.record(make_record('expired', 90))
+        ledger.record(make_record('retained', 10))
+
+        actions = manager.purge_branches('test-repo')
+
+        assert actions == [BranchAction('test-repo', 'archived/expired', 'purged')]
+        repo.get_branches.assert_not_called()
+        repo.get_branch.assert_not_called()
+        repo.get_git_ref.assert_called_once_with('heads/archived/expired')
+        assert [r.archived_name for r in ledger.archived_before(REPO, NOW)] == ['archived/retained']
+
+    def test_untracked_repository_is_adopted_with_retention_starting_now(self, manager, repo, ledger):
+        legacy = MagicMock()
+        legacy.name = 'archived/legacy'
+        legacy.commit.sha = 'sha-legacy'
+        repo.get_branches.return_value = [legacy]
+
+        assert manager.purge_branches('test-repo') == []
+        assert manager.purge_branches('test-repo') == []
+
+        # Listed once to adopt it; its last commit date is never read
+        repo.get_branches.assert_called_once()
+        assert ledger.next_archived_after(REPO, NOW - timedelta(days=1)) is not None
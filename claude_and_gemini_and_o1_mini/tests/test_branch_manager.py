@@ -1,8 +1,6 @@
 import pytest
 from datetime import datetime, timedelta, timezone
-from unittest.mock import Mock, patch, MagicMock
-from github_branch_manager.branch_manager import BranchManager
-from github_branch_manager.config import Config
+from unittest.mock import Mock, MagicMock
 from github.Branch import Branch
 from github.Commit import Commit
 from github.GitCommit import GitCommit
@@ -11,22 +9,9 @@ from github.Tag import Tag
 from github.Repository import Repository
 from github.GithubException import RateLimitExceededException
 from github.GitRef import GitRef
-
-@pytest.fixture
-def config():
-    """Fixture providing test configuration"""
-    return Config(
-        github_token="test_token",
-        org_name="test_org",
-        slack_token="test_slack_token",
-        slack_channel="#test-channel",
-        protected_branches=["main", "develop"],
-        inactivity_days=30,
-        retention_days=60,
-        archive_prefix="archived/",
-        critical_tag_patterns=["v*", "release-*"],
-        allow_auto_purge_critical=False
-    )
+from github import Auth
+from github_branch_manager.rate_limit import GovernedAuth, RateBudgetExceeded, RateGovernor
+from .conftest import make_github_branch
 
 @pytest.fixture
 def mock_branch():
@@ -71,14 +56,11 @@ def mock_github(mock_repo, mock_branch, mock_pull_request, mock_tag):
     return mock_github
 
 @pytest.fixture
-def branch_manager(config):
+def branch_manager(manager):
     """Fixture providing a BranchManager instance"""
-    with patch('github.Github'):
-        manager = BranchManager(config)
-        manager.github = MagicMock()
-        manager.org = MagicMock()
-        manager.notifier = MagicMock()
-        return manager
+    manager.github = MagicMock()
+    manager.org = MagicMock()
+    return manager
 
 class TestBranchManager:
     def test_is_branch_inactive(self, branch_manager, mock_branch):
@@ -142,6 +124,21 @@ class TestBranchManager:
         mock_branch.name = "main"
         assert branch_manager.should_archive_branch(mock_repo, mock_branch) == False
 
+    def test_should_archive_branch_counts_predicates(self, branch_manager, mock_repo, mock_branch):
+        """Test that each predicate evaluated is counted, up to the first that rules the branch out"""
+        branch_manager.is_branch_inactive = MagicMock(return_value=True)
+        branch_manager.is_branch_merged = MagicMock(return_value=False)
+        branch_manager.has_open_prs = MagicMock(return_value=False)
+
+        branch_manager.should_archive_branch(mock_repo, mock_branch)
+
+        evaluated = branch_manager.metrics.branches_evaluated
+        assert evaluated.value(predicate='protected', result='false') == 1
+        assert evaluated.value(predicate='inactive', result='true') == 1
+        assert evaluated.value(predicate='merged', result='false') == 1
+        assert evaluated.value(predicate='open_prs', result='false') == 0
+        assert branch_manager.metrics.phase_duration.value(phase='classify') > 0
+
     def test_should_purge_branch(self, branch_manager, mock_repo, mock_branch):
         """Test branch purge decision"""
         # Mock branch with critical tags
@@ -152,16 +149,11 @@ class TestBranchManager:
         branch_manager.has_critical_tags = MagicMock(return_value=False)
         assert branch_manager.should_purge_branch(mock_repo, mock_branch) == True
 
-    @patch('time.sleep')  # Prevent actual sleeping in tests
-    def test_handle_rate_limit(self, mock_sleep, branch_manager):
-        """Test rate limit handling"""
-        mock_rate_limit = MagicMock()
-        mock_rate_limit.remaining = 0
-        mock_rate_limit.reset = datetime.now(timezone.utc) + timedelta(minutes=5)
-        branch_manager.github.get_rate_limit.return_value.core = mock_rate_limit
+    def test_archive_branch_does_not_poll_rate_limit(self, branch_manager, mock_repo, mock_branch):
+        """Test that archiving relies on passive rate limit accounting"""
+        branch_manager.archive_branch(mock_repo, mock_branch)
 
-        branch_manager.handle_rate_limit()
-        mock_sleep.assert_called_once()
+        branch_manager.github.get_rate_limit.assert_not_called()
 
     def test_archive_branch(self, branch_manager, mock_repo, mock_branch):
         """Test branch archival process"""
@@ -189,7 +181,60 @@ class TestBranchManager:
         assert mock_repo.create_git_tag_and_release.call_count == 2
         branch_manager.notifier.notify_archive.assert_called_once()
 
+    def test_archive_branch_rate_limit_retries_are_bounded(self, branch_manager, mock_repo, mock_branch):
+        """Test that archiving gives up after repeated rate limit errors"""
+        mock_repo.create_git_tag_and_release.side_effect = RateLimitExceededException(403, "API rate limit exceeded")
+
+        assert branch_manager.archive_branch(mock_repo, mock_branch) is False
+        assert mock_repo.create_git_tag_and_release.call_count == 3
+        branch_manager.notifier.notify_archive.assert_not_called()
+
     def test_purge_branch(self, branch_manager, mock_repo, mock_branch):
         branch_manager.purge_branch(mock_repo, mock_branch)
         mock_repo.get_git_ref.assert_called_once()
-        branch_manager.notifier.notify_deletion.assert_called_once() 
\ No newline at end of file
+        branch_manager.notifier.notify_deletion.assert_called_once()
+
+    def test_process_branches_lists_branches_once(self, branch_manager, mock_repo):
+        """Test that archived branches are fed to the purge stage without a second listing"""
+        mock_repo.full_name = "test_org/test-repo"
+        mock_repo.get_branches.return_value = [
+            make_github_branch("feature/old", 100), make_github_branch("archived/old", 90),
+            make_github_branch("feature/fresh", 2),
+        ]
+        branch_manager.org.get_repo.return_value = mock_repo
+        branch_manager.build_tag_index = MagicMock()
+        branch_manager.build_pr_index = MagicMock()
+        branch_manager.is_branch_merged = MagicMock(return_value=True)
+        branch_manager.has_open_prs = MagicMock(return_value=False)
+        branch_manager.has_critical_tags = MagicMock(return_value=False)
+
+        actions = branch_manager.process_branches("test-repo")
+
+        assert [(a.branch, a.action) for a in actions] == [
+            ("feature/old", "archived"), ("archived/feature/old", "purged"), ("archived/old", "purged"),
+        ]
+        mock_repo.get_branches.assert_called_once()
+        mock_repo.get_git_ref.assert_any_call("heads/archived/feature/old")
+
+    def test_run_budget_stops_governed_checks_and_writes(self, branch_manager, mock_repo, mock_branch):
+        """Test that an exhausted run budget is not mistaken for a failed check"""
+        governor = RateGovernor(budget_percent=10)
+        governor.observe(remaining=5000, limit=5000, reset_at=9_999_999_999)
+        governor.observe(remaining=4000, limit=5000, reset_at=9_999_999_999)
+        auth = GovernedAuth(Auth.Token('test_token'), governor)
+
+        def send(*args, **kwargs):
+            # PyGithub authenticates each request right before sending it
+            auth.authentication({})
+        mock_repo.get_pulls.side_effect = send
+        mock_repo.get_tags.side_effect = send
+        mock_repo.get_git_ref.side_effect = send
+        mock_repo.create_git_tag_and_release.side_effect = send
+
+        for check in (lambda: branch_manager.is_branch_merged(mock_repo, mock_branch),
+                      lambda: branch_manager.has_open_prs(mock_repo, mock_branch.name),
+                      lambda: branch_manager.has_critical_tags(mock_repo, mock_branch),
+                      lambda: branch_manager.archive_branch(mock_repo, mock_branch),
+                      lambda: branch_manager.purge_branch(mock_repo, mock_branch)):
+            with pytest.raises(RateBudgetExceeded):
+                check()
@@ -0,0 +1,143 @@
+import pytest
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.bulk_refs import BulkRefWriter
+from .conftest import make_branch, make_config
+
+
+class FakeGraphQL:
+    """Answers the ref mutations and lookups of BulkRefWriter from an in-memory set of refs."""
+
+    graphql_url = 'https://api.github.com/graphql'
+
+    def __init__(self, refs=None, failing=()):
+        self.refs = dict(refs or {})
+        self.failing = set(failing)
+        self.requests = 0
+
+    def _ref_id(self, ref):
+        return f"id:{ref}"
+
+    def requestJsonAndCheck(self, verb, url, input):
+        self.requests += 1
+        query, variables = input['query'], input['variables']
+        data, errors = {}, []
+        if query.startswith('query'):
+            repository = {}
+            for alias, ref in variables.items():
+                if alias in ('owner', 'name'):
+                    continue
+                oid = self.refs.get(ref)
+                repository[alias] = {'id': self._ref_id(ref), 'target': {'oid': oid}} if oid else None
+            data['repository'] = repository
+        elif '$repositoryId' in query:
+            for alias in sorted({key.split('_')[0] for key in variables if key != 'repositoryId'}):
+                ref, oid = variables[f"{alias}_name"], variables[f"{alias}_oid"]
+                if ref in self.failing or ref in self.refs:
+                    data[alias] = None
+                    errors.append({'path': [alias], 'message': f"cannot create {ref}"})
+                else:
+                    self.refs[ref] = oid
+                    data[alias] = {'ref': {'name': ref}}
+        else:
+            for alias, ref_id in variables.items():
+                ref = ref_id[len('id:'):]
+                if ref in self.failing:
+                    data[alias] = None
+                    errors.append({'path': [alias], 'message': f"cannot delete {ref}"})
+                else:
+                    del self.refs[ref]
+                    data[alias] = {'clientMutationId': None}
+        response = {'data': data}
+        if errors:
+            response['errors'] = errors
+        return {}, response
+
+
+@pytest.fixture
+def mock_repo():
+    repo = MagicMock(spec=Repository)
+    repo.name = "test-repo"
+    repo.full_name = "test_org/test-repo"
+    repo.node_id = "R_test"
+    return repo
+
+
+class TestBulkRefWriter:
+    def test_writes_are_batched(self, mock_repo):
+        requester = FakeGraphQL()
+        writer = BulkRefWriter(requester, mock_repo, batch_size=50)
+
+        created = writer.create_refs([(f"refs/heads/archived/b{i}", f"sha{i}") for i in range(120)])
+        deleted = writer.delete_refs([(f"refs/heads/archived/b{i}", f"sha{i}") for i in range(120)])
+
+        assert all(result.ok and result.via == 'graphql' for result in created.values())
+        assert all(result.ok for result in deleted.values())
+        assert requester.refs == {}
+        # 3 create mutations, then 3 lookups and 3 delete mutations
+        assert requester.requests == 9
+        mock_repo.create_git_ref.assert_not_called()
+
+    def test_failed_refs_fall_back_to_rest(self, mock_repo):
+        requester = FakeGraphQL(refs={'refs/heads/gone': 'sha2'}, failing={'refs/heads/a', 'refs/heads/gone'})
+        writer = BulkRefWriter(requester, mock_repo)
+        mock_repo.get_git_ref.return_value.object.sha = 'sha2'
+
+        created = writer.create_refs([('refs/heads/a', 'sha1'), ('refs/heads/b', 'sha1')])
+        deleted = writer.delete_refs([('refs/heads/gone', 'sha2')])
+
+        assert created['refs/heads/a'].via == 'rest' and created['refs/heads/a'].ok
+        assert created['refs/heads/b'].via == 'graphql'
+        mock_repo.create_git_ref.assert_called_once_with(ref='refs/heads/a', sha='sha1')
+        assert deleted['refs/heads/gone'] == ('refs/heads/gone', True, 'rest', None)
+        mock_repo.get_git_ref.assert_called_once_with('heads/gone')
+        mock_repo.get_git_ref.return_value.delete.assert_called_once()
+        assert writer.rest_fallbacks == 2
+
+    def test_moved_refs_are_not_deleted(self, mock_repo):
+        requester = FakeGraphQL(refs={'refs/heads/a': 'new_sha'})
+        writer = BulkRefWriter(requester, mock_repo)
+
+        deleted = writer.delete_refs([('refs/heads/a', 'old_sha')])
+
+        assert deleted['refs/heads/a'].ok is False
+        assert requester.refs == {'refs/heads/a': 'new_sha'}
+
+
+class TestBulkWriteMode:
+    @pytest.fixture
+    def config(self):
+        return make_config(write_mode='graphql')
+
+    def test_archive_in_bulk(self, manager, mock_repo):
+        branches = [make_branch(f"feature/{i}", f"sha{i}") for i in range(3)]
+        requester = FakeGraphQL(refs={f"refs/heads/{b.name}": b.sha for b in branches},
+                                failing={'refs/heads/archived/feature/1'})
+        manager.github.requester = requester
+        mock_repo.create_git_ref.side_effect = Exception("Reference already exists")
+
+        actions = manager.archive_in_bulk(mock_repo, branches)
+
+        assert [action.branch for action in actions] == ['feature/0', 'feature/2']
+        # The branch whose archive ref could not be created keeps its original name
+        assert 'refs/heads/feature/1' in requester.refs
+        assert requester.refs['refs/heads/archived/feature/0'] == 'sha0'
+        tags = [ref for ref in requester.refs if ref.startswith('refs/tags/archived-feature/0-')]
+        assert len(tags) == 1
+        assert requester.requests == 3
+        mock_repo.create_git_tag_and_release.assert_not_called()
+        assert manager.notifier.notify_archive.call_count == 2
+
+    def test_purge_phase_in_bulk(self, manager, mock_repo):
+        branches = [make_branch(f"archived/old-{i}", f"sha{i}", days_old=90) for i in range(2)]
+        branches.append(make_branch("archived/recent", "sha9", days_old=10))
+        requester = FakeGraphQL(refs={f"refs/heads/{b.name}": b.sha for b in branches})
+        manager.github.requester = requester
+        manager.list_branches = MagicMock(return_value=branches)
+        manager._tag_indexes[mock_repo.full_name] = MagicMock(has_critical_tag=MagicMock(return_value=False))
+
+        actions = manager.run_purge_phase(mock_repo)
+
+        assert [action.branch for action in actions] == ['archived/old-0', 'archived/old-1']
+        assert list(requester.refs) == ['refs/heads/archived/recent']
+        assert requester.requests == 2
@@ -0,0 +1,77 @@
+import importlib.util
+import pytest
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from github.Repository import Repository
+from github_branch_manager.branch_manager import BranchAction
+from github_branch_manager.classify import BranchColumns, classify_branches
+from github_branch_manager.policy import RepoPolicy
+from .conftest import make_branch, make_config, make_manager
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+
+@pytest.fixture
+def config():
+    return make_config(protected_branches=["main", "release/*"], critical_tag_patterns=["v*"])
+
+
+BRANCHES = [
+    make_branch("main", days_old=100, now=NOW),
+    make_branch("release/1.0", days_old=100, now=NOW),
+    make_branch("feature/old", days_old=40, now=NOW),
+    make_branch("feature/fresh", days_old=10, now=NOW),
+    make_branch("archived/expired", days_old=90, now=NOW),
+    make_branch("archived/kept", days_old=45, now=NOW),
+]
+
+
+class TestClassifyBranches:
+    @pytest.mark.parametrize('vectorized', [
+        False, pytest.param(True, marks=pytest.mark.skipif(not HAS_NUMPY, reason="NumPy is not installed"))])
+    def test_masks_and_due_dates(self, config, vectorized):
+        columns = BranchColumns.from_branches(BRANCHES)
+
+        result = classify_branches(columns, RepoPolicy.from_config(config), 'archived/', NOW, vectorized=vectorized)
+
+        assert [columns.names[i] for i in result.archive_indices()] == ['feature/old']
+        assert [columns.names[i] for i in result.purge_indices()] == ['archived/expired']
+        assert result.next_archive_due == NOW + timedelta(days=20)
+        assert result.next_purge_due == NOW + timedelta(days=15)
+
+    def test_archive_times_take_precedence(self, config):
+        columns = BranchColumns.from_branches(BRANCHES, {'archived/expired': NOW - timedelta(days=5)})
+
+        result = classify_branches(columns, RepoPolicy.from_config(config), 'archived/', NOW, vectorized=False)
+
+        assert result.purge_indices() == []
+        assert result.next_purge_due == NOW + timedelta(days=15)
+
+    def test_columns_must_line_up(self):
+        with pytest.raises(ValueError):
+            BranchColumns(['a', 'b'], ['sha'], [0.0, 0.0])
+
+
+class TestPrefilter:
+    def test_only_candidates_reach_the_predicates(self, config):
+        manager = make_manager(replace(config, inventory_mode='graphql'))
+        repo = MagicMock(spec=Repository)
+        repo.name = "test-repo"
+        repo.full_name = "test_org/test-repo"
+        manager.org.get_repo.return_value = repo
+        now = datetime.now(timezone.utc)
+        branches = [make_branch(b.name, days_old=(NOW - b.authored_date).days, now=now) for b in BRANCHES]
+        manager.build_tag_index = MagicMock()
+        manager.is_branch_merged = MagicMock(return_value=True)
+        manager.has_open_prs = MagicMock(return_value=False)
+        manager.has_critical_tags = MagicMock(return_value=False)
+
+        with patch('github_branch_manager.branch_manager.fetch_branch_inventory', return_value=iter(branches)):
+            actions = manager.process_branches("test-repo")
+
+        assert actions == [BranchAction('test-repo', 'feature/old', 'archived'),
+                           BranchAction('test-repo', 'archived/expired', 'purged')]
+        manager.is_branch_merged.assert_called_once()
+        assert manager._inventories["test_org/test-repo"] == {}
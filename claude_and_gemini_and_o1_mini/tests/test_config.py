@@ -47,6 +47,17 @@ def test_config_from_env_custom():
     del os.environ['ARCHIVE_PREFIX']
     del os.environ['CRITICAL_TAG_PATTERNS']
 
+@pytest.fixture
+def required_env(monkeypatch):
+    """Sets the environment variables Config.from_env requires"""
+    env_vars = {
+        'GITHUB_TOKEN': 'test_token',
+        'GITHUB_ORG': 'test_org',
+        'SLACK_TOKEN': 'test_slack_token'
+    }
+    for key, value in env_vars.items():
+        monkeypatch.setenv(key, value)
+
 class TestConfig:
     """Tests for the Config class"""
 
@@ -113,17 +124,8 @@ class TestConfig:
         assert config.critical_tag_patterns == ['v*', 'release-*', 'hotfix-*']
         assert config.allow_auto_purge_critical is True
 
-    def test_from_env_default_values(self, monkeypatch):
+    def test_from_env_default_values(self, required_env):
         """Test config creation with default values"""
-        # Set only required variables
-        env_vars = {
-            'GITHUB_TOKEN': 'test_token',
-            'GITHUB_ORG': 'test_org',
-            'SLACK_TOKEN': 'test_slack_token'
-        }
-        for key, value in env_vars.items():
-            monkeypatch.setenv(key, value)
-
         config = Config.from_env()
         assert config.slack_channel == '#github-notifications'
         assert config.protected_branches == ['main', 'develop']
@@ -133,16 +135,8 @@ class TestConfig:
         assert config.critical_tag_patterns == ['v*', 'release-*']
         assert config.allow_auto_purge_critical is False
 
-    def test_auto_purge_critical_values(self, monkeypatch):
+    def test_auto_purge_critical_values(self, monkeypatch, required_env):
         """Test different values for ALLOW_AUTO_PURGE_CRITICAL"""
-        env_vars = {
-            'GITHUB_TOKEN': 'test_token',
-            'GITHUB_ORG': 'test_org',
-            'SLACK_TOKEN': 'test_slack_token'
-        }
-        for key, value in env_vars.items():
-            monkeypatch.setenv(key, value)
-
         # Test truthy values
         for value in ['true', '1', 'yes', 'True', 'TRUE']:
             monkeypatch.setenv('ALLOW_AUTO_PURGE_CRITICAL', value)
@@ -153,4 +147,72 @@ class TestConfig:
         for value in ['false', '0', 'no', 'False', 'FALSE', '', 'invalid']:
             monkeypatch.setenv('ALLOW_AUTO_PURGE_CRITICAL', value)
             config = Config.from_env()
-            assert config.allow_auto_purge_critical is False 
\ No newline at end of file
+            assert config.allow_auto_purge_critical is False
+
+    def test_inventory_mode(self, monkeypatch, required_env):
+        """Test INVENTORY_MODE selection and validation"""
+        assert Config.from_env().inventory_mode == 'rest'
+
+        monkeypatch.setenv('INVENTORY_MODE', 'GraphQL')
+        assert Config.from_env().inventory_mode == 'graphql'
+
+        monkeypatch.setenv('INVENTORY_MODE', 'soap')
+        with pytest.raises(ValueError) as exc_info:
+            Config.from_env()
+        assert "INVENTORY_MODE" in str(exc_info.value)
+
+    def test_run_state_store(self, monkeypatch, required_env):
+        """Test RUN_STATE_STORE selection and validation"""
+        assert Config.from_env().run_state_store == 'sqlite'
+
+        monkeypatch.setenv('RUN_STATE_STORE', 'Firestore')
+        monkeypatch.setenv('RUN_STATE_COLLECTION', 'tidy_state')
+        config = Config.from_env()
+        assert config.run_state_store == 'firestore'
+        assert config.run_state_collection == 'tidy_state'
+
+        monkeypatch.setenv('RUN_STATE_STORE', 'redis')
+        with pytest.raises(ValueError) as exc_info:
+            Config.from_env()
+        assert "RUN_STATE_STORE" in str(exc_info.value)
+
+    def test_write_mode(self, monkeypatch, required_env):
+        """Test WRITE_MODE and WRITE_BATCH_SIZE parsing and validation"""
+        config = Config.from_env()
+        assert (config.write_mode, config.write_batch_size) == ('rest', 50)
+
+        monkeypatch.setenv('WRITE_MODE', 'GraphQL')
+        monkeypatch.setenv('WRITE_BATCH_SIZE', '25')
+        config = Config.from_env()
+        assert (config.write_mode, config.write_batch_size) == ('graphql', 25)
+
+        monkeypatch.setenv('WRITE_BATCH_SIZE', '0')
+        with pytest.raises(ValueError) as exc_info:
+            Config.from_env()
+        assert "WRITE_BATCH_SIZE" in str(exc_info.value)
+
+    def test_archive_ledger(self, monkeypatch, required_env):
+        """Test ARCHIVE_LEDGER selection and validation"""
+        assert Config.from_env().archive_ledger == 'sqlite'
+
+        monkeypatch.setenv('ARCHIVE_LEDGER', 'JSON')
+        assert Config.from_env().archive_ledger == 'json'
+
+        monkeypatch.setenv('ARCHIVE_LEDGER', 'csv')
+        with pytest.raises(ValueError) as exc_info:
+            Config.from_env()
+        assert "ARCHIVE_LEDGER" in str(exc_info.value)
+
+    def test_policy_file(self, monkeypatch, required_env, tmp_path):
+        """Test POLICY_FILE must point at an existing file"""
+        assert Config.from_env().policy_file == ''
+
+        path = tmp_path / 'policy.toml'
+        path.write_text('')
+        monkeypatch.setenv('POLICY_FILE', str(path))
+        assert Config.from_env().policy_file == str(path)
+
+        monkeypatch.setenv('POLICY_FILE', str(tmp_path / 'missing.toml'))
+        with pytest.raises(ValueError) as exc_info:
+            Config.from_env()
+        assert "POLICY_FILE" in str(exc_info.value)
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.branch_manager import BranchAction
+from github_branch_manager.git_mirror import GitMirror
+from .conftest import make_config, make_manager
+
+OLD_DATE = '2020-01-01T00:00:00+00:00'
+
+
+def git(path, *args, date=OLD_DATE):
+    env = dict(os.environ, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date,
+               GIT_AUTHOR_NAME='test', GIT_AUTHOR_EMAIL='test@example.com',
+               GIT_COMMITTER_NAME='test', GIT_COMMITTER_EMAIL='test@example.com')
+    return subprocess.run(['git', *args], cwd=path, env=env, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def commit(path, message, date=OLD_DATE):
+    git(path, 'commit', '--allow-empty', '-q', '-m', message, date=date)
+    return git(path, 'rev-parse', 'HEAD')
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    """
+    A repository with:
+    main (recent), feature/merged (merged into main), feature/open (not merged),
+    feature/tagged (merged, head tagged v1.0 with an annotated tag).
+    """
+    path = str(tmp_path / 'upstream')
+    os.makedirs(path)
+    git(path, 'init', '-q', '-b', 'main')
+    commit(path, 'initial')
+    git(path, 'checkout', '-q', '-b', 'feature/merged')
+    commit(path, 'merged work')
+    git(path, 'checkout', '-q', '-b', 'feature/tagged')
+    commit(path, 'tagged work')
+    git(path, 'tag', '-a', 'v1.0', '-m', 'release')
+    git(path, 'checkout', '-q', 'main')
+    git(path, 'merge', '-q', '--no-ff', '-m', 'merge', 'feature/tagged')
+    git(path, 'checkout', '-q', '-b', 'feature/open')
+    commit(path, 'open work')
+    git(path, 'checkout', '-q', 'main')
+    commit(path, 'recent work', date=datetime.now(timezone.utc).isoformat())
+    return path
+
+
+@pytest.fixture
+def mirror(upstream, tmp_path):
+    mirror = GitMirror(str(tmp_path / 'mirrors' / 'test_org' / 'test-repo.git'), upstream)
+    mirror.sync()
+    return mirror
+
+
+class TestGitMirror:
+    def test_snapshot(self, mirror, upstream):
+        snapshot = mirror.snapshot(['main', 'develop'])
+
+        assert sorted(snapshot.branches) == ['feature/merged', 'feature/open', 'feature/tagged', 'main']
+        merged = snapshot.branches['feature/merged']
+        assert merged.sha == git(upstream, 'rev-parse', 'feature/merged')
+        assert merged.authored_date == datetime(2020, 1, 1, tzinfo=timezone.utc)
+        assert snapshot.merged == {'main': {'feature/merged', 'feature/tagged'}}
+        # Annotated tags are peeled to their commit
+        assert snapshot.tags == [('v1.0', git(upstream, 'rev-parse', 'feature/tagged'))]
+        assert snapshot.tag_index(['v*']).has_critical_tag(snapshot.branches['feature/tagged'].sha)
+
+    def test_sync_fetches_changes_incrementally(self, mirror, upstream):
+        git(upstream, 'checkout', '-q', 'feature/open')
+        new_head = commit(upstream, 'more work')
+        git(upstream, 'branch', '-q', '-D', 'feature/merged')
+
+        mirror.sync()
+        snapshot = mirror.snapshot(['main'])
+
+        assert snapshot.branches['feature/open'].sha == new_head
+        assert 'feature/merged' not in snapshot.branches
+
+    def test_mirror_is_blobless(self, mirror):
+        assert git(mirror.path, 'config', 'remote.origin.partialclonefilter') == 'blob:none'
+
+
+class TestMirrorMode:
+    @pytest.fixture
+    def manager(self, tmp_path):
+        return make_manager(make_config(inventory_mode='mirror', state_dir=str(tmp_path / 'state')))
+
+    @pytest.fixture
+    def repo(self, manager, upstream):
+        repo = MagicMock(spec=Repository)
+        repo.name = 'test-repo'
+        repo.full_name = 'test_org/test-repo'
+        repo.clone_url = upstream
+        repo.get_pulls.return_value = []
+        manager.org.get_repo.return_value = repo
+        return repo
+
+    def test_branches_are_evaluated_from_the_mirror(self, manager, repo, upstream):
+        actions = manager.archive_branches('test-repo')
+
+        assert actions == [BranchAction('test-repo', 'feature/merged', 'archived')]
+        repo.create_git_ref.assert_called_once_with(
+            ref='refs/heads/archived/feature/merged', sha=git(upstream, 'rev-parse', 'feature/merged'))
+        # The API is only asked for pull requests and for the writes
+        repo.get_branches.assert_not_called()
+        repo.get_git_matching_refs.assert_not_called()
+        repo.get_tags.assert_not_called()
+        assert repo.get_pulls.call_count == 1
+        assert os.path.isdir(os.path.join(manager.config.state_dir, 'mirrors', 'test_org', 'test-repo.git'))
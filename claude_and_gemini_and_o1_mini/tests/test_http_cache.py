@@ -0,0 +1,163 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from github import Auth, Github
+from github_branch_manager.http_cache import HttpCache, install_connection_pool, install_http_cache, uninstall_http_cache
+
+BRANCHES = [{'name': 'main', 'commit': {'sha': 'a' * 40, 'url': ''}, 'protected': False}]
+
+
+class ConditionalHandler(BaseHTTPRequestHandler):
+    """Local stand-in for GitHub that honors If-None-Match."""
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        conditional = self.headers.get('If-None-Match')
+        ConditionalHandler.requests.append((self.path, conditional))
+        if conditional == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('X-RateLimit-Remaining', '4999')
+            self.send_header('X-RateLimit-Limit', '5000')
+            self.end_headers()
+            return
+        if 'branches' in self.path:
+            body = BRANCHES
+        else:
+            body = {'name': 'test-repo', 'full_name': 'test_org/test-repo', 'url': ''}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', self.etag)
+        self.send_header('X-RateLimit-Remaining', '4998')
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def github_server():
+    ConditionalHandler.requests = []
+    ConditionalHandler.etag = '"v1"'
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ConditionalHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class KeepAliveHandler(ConditionalHandler):
+    """Keeps connections open and records which one, and which token, each request came in on."""
+    protocol_version = 'HTTP/1.1'
+    connections = []
+
+    def do_GET(self):
+        KeepAliveHandler.connections.append((self.client_address, self.headers.get('Authorization')))
+        super().do_GET()
+
+
+@pytest.fixture
+def keep_alive_server():
+    KeepAliveHandler.connections = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    uninstall_http_cache()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    install_http_cache(cache)
+    yield cache
+    uninstall_http_cache()
+    cache.close()
+
+
+class TestHttpCache:
+    def test_put_and_get(self, tmp_path):
+        cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+        key = HttpCache.key('https://api.github.com/repos/o/r')
+        cache.put(key, 'https://api.github.com/repos/o/r',
+                  {'ETag': '"abc"', 'X-RateLimit-Remaining': '10', 'Link': '<next>'}, '{"a": 1}')
+
+        entry = cache.get(key)
+
+        assert entry.etag == '"abc"'
+        assert entry.body == '{"a": 1}'
+        assert 'X-RateLimit-Remaining' not in entry.headers
+        assert entry.headers['Link'] == '<next>'
+        assert cache.get(HttpCache.key('https://api.github.com/other')) is None
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        cache = HttpCache(str(tmp_path / 'cache.sqlite3'), max_bytes=400)
+        for name in ('a', 'b', 'c'):
+            cache.put(name, name, {'ETag': name}, 'x' * 100)
+        cache.get('a')
+        cache.put('d', 'd', {'ETag': 'd'}, 'x' * 100)
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.size <= 400
+
+    def test_size_survives_reopen(self, tmp_path):
+        path = str(tmp_path / 'cache.sqlite3')
+        cache = HttpCache(path)
+        cache.put('a', 'a', {'ETag': 'a'}, 'x' * 100)
+        cache.close()
+
+        assert HttpCache(path).size == cache.size
+
+    def test_open_unwritable_directory(self, tmp_path):
+        blocker = tmp_path / 'file'
+        blocker.write_text('')
+        assert HttpCache.open(str(blocker / 'cache')) is None
+
+
+class TestConditionalRequests:
+    def test_rerun_is_served_from_cache(self, github_server, cache):
+        """Test that an unchanged resource is revalidated and served from the cache"""
+        github = Github(auth=Auth.Token('test_token'), base_url=github_server, seconds_between_requests=0)
+        first = [b.name for b in github.get_repo('test_org/test-repo').get_branches()]
+        second = [b.name for b in github.get_repo('test_org/test-repo').get_branches()]
+
+        assert first == second == ['main']
+        assert [conditional for _, conditional in ConditionalHandler.requests] == [None, None, '"v1"', '"v1"']
+        assert cache.hits == 2
+        assert github.requester.rate_limiting == (4999, 5000)
+
+    def test_changed_resource_is_refetched(self, github_server, cache):
+        github = Github(auth=Auth.Token('test_token'), base_url=github_server, seconds_between_requests=0)
+        github.get_repo('test_org/test-repo')
+        ConditionalHandler.etag = '"v2"'
+        github.get_repo('test_org/test-repo')
+
+        assert cache.hits == 0
+        assert len(cache) == 1
+
+
+class TestConnectionPool:
+    def test_clients_share_connections(self, keep_alive_server):
+        """Test that clients with different tokens reuse the same TCP connection"""
+        install_connection_pool(4)
+        clients = [Github(auth=Auth.Token(token), base_url=keep_alive_server, seconds_between_requests=0)
+                   for token in ('token_a', 'token_b')]
+
+        for github in clients + clients:
+            github.get_repo('test_org/test-repo')
+
+        addresses = {address for address, _ in KeepAliveHandler.connections}
+        tokens = [auth for _, auth in KeepAliveHandler.connections]
+        assert len(KeepAliveHandler.connections) == 4
+        assert len(addresses) == 1
+        assert tokens == ['token token_a', 'token token_b'] * 2
@@ -0,0 +1,132 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.inventory import branch_from_node, fetch_branch_inventory
+from .conftest import make_config
+
+
+def make_node(name, sha, days_old=40, pulls=()):
+    date = (datetime.now(timezone.utc) - timedelta(days=days_old)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return {
+        'name': name,
+        'target': {'oid': sha, 'committedDate': date, 'authoredDate': date},
+        'associatedPullRequests': {
+            'nodes': [{'baseRefName': base, 'state': state, 'merged': state == 'MERGED'} for base, state in pulls]
+        },
+    }
+
+
+def make_page(nodes, end_cursor=None):
+    return {}, {
+        'data': {
+            'repository': {
+                'refs': {
+                    'pageInfo': {'hasNextPage': end_cursor is not None, 'endCursor': end_cursor},
+                    'nodes': nodes,
+                }
+            }
+        }
+    }
+
+
+@pytest.fixture
+def config():
+    return make_config(inventory_mode="graphql")
+
+
+@pytest.fixture
+def mock_repo():
+    repo = MagicMock(spec=Repository)
+    repo.name = "test-repo"
+    repo.full_name = "test_org/test-repo"
+    return repo
+
+
+@pytest.fixture
+def graphql_manager(manager):
+    manager.github = MagicMock()
+    manager.org = MagicMock()
+    manager.github.requester.graphql_query.return_value = make_page([
+        make_node('feature/merged', 'sha1', pulls=[('develop', 'MERGED')]),
+        make_node('feature/open', 'sha2', pulls=[('develop', 'OPEN')]),
+        make_node('feature/fresh', 'sha3', days_old=1, pulls=[('develop', 'MERGED')]),
+    ])
+    return manager
+
+
+class TestBranchFromNode:
+    def test_from_node(self):
+        """Test parsing of a GraphQL ref node"""
+        node = make_node('feature/a', 'abc', pulls=[('develop', 'MERGED'), ('main', 'OPEN')])
+        branch = branch_from_node(node)
+
+        assert branch.name == 'feature/a'
+        assert branch.sha == 'abc'
+        assert branch.authored_date.tzinfo is not None
+        assert branch.has_open_pr is True
+        assert branch.is_merged_into(['develop']) is True
+        assert branch.is_merged_into(['stage', 'master']) is False
+
+    def test_from_node_without_commit_target(self):
+        """Refs that do not point at a commit are skipped"""
+        assert branch_from_node({'name': 'odd', 'target': {}}) is None
+
+
+class TestFetchBranchInventory:
+    def test_paginates_until_last_page(self):
+        """Test that every page is requested with the previous end cursor"""
+        requester = MagicMock()
+        requester.graphql_query.side_effect = [
+            make_page([make_node('a', '1'), make_node('b', '2')], end_cursor='c1'),
+            make_page([make_node('c', '3')]),
+        ]
+
+        branches = list(fetch_branch_inventory(requester, 'test_org', 'test-repo'))
+
+        assert [b.name for b in branches] == ['a', 'b', 'c']
+        assert requester.graphql_query.call_count == 2
+        first_vars = requester.graphql_query.call_args_list[0][0][1]
+        second_vars = requester.graphql_query.call_args_list[1][0][1]
+        assert first_vars == {'owner': 'test_org', 'name': 'test-repo', 'pageSize': 100, 'cursor': None}
+        assert second_vars['cursor'] == 'c1'
+
+    def test_reads_pull_requests_beyond_first_page(self):
+        """Test that a branch with more pull requests than the inventory lists gets the rest read"""
+        node = make_node('busy', 'sha1', pulls=[('feature/x', 'CLOSED')] * 20)
+        node['associatedPullRequests']['pageInfo'] = {'hasNextPage': True, 'endCursor': 'p1'}
+        rest = {'pageInfo': {'hasNextPage': False, 'endCursor': 'p2'},
+                'nodes': [{'baseRefName': 'develop', 'state': 'MERGED', 'merged': True}]}
+        requester = MagicMock()
+        requester.graphql_query.side_effect = [
+            make_page([node]),
+            ({}, {'data': {'repository': {'branch': {'associatedPullRequests': rest}}}}),
+        ]
+
+        [branch] = fetch_branch_inventory(requester, 'test_org', 'test-repo')
+
+        assert len(branch.pull_requests) == 21
+        assert branch.is_merged_into({'develop'})
+        follow_up = requester.graphql_query.call_args_list[1][0][1]
+        assert follow_up == {'owner': 'test_org', 'name': 'test-repo', 'ref': 'refs/heads/busy', 'cursor': 'p1'}
+
+
+class TestGraphQLMode:
+    def test_predicates_use_inventory(self, graphql_manager, mock_repo):
+        """Test that predicates answer from the inventory without REST calls"""
+        branches = {b.name: b for b in graphql_manager.list_branches(mock_repo)}
+
+        assert graphql_manager.is_branch_merged(mock_repo, branches['feature/merged']) is True
+        assert graphql_manager.has_open_prs(mock_repo, 'feature/merged') is False
+        assert graphql_manager.has_open_prs(mock_repo, 'feature/open') is True
+        assert graphql_manager.is_branch_inactive(branches['feature/merged']) is True
+        assert graphql_manager.is_branch_inactive(branches['feature/fresh']) is False
+        mock_repo.get_branches.assert_not_called()
+        mock_repo.get_pulls.assert_not_called()
+
+    def test_archive_uses_inventory_sha(self, graphql_manager, mock_repo):
+        """Test that archiving an inventory branch uses its head SHA"""
+        branch = graphql_manager.list_branches(mock_repo)[0]
+        graphql_manager.archive_branch(mock_repo, branch)
+
+        mock_repo.create_git_ref.assert_called_once_with(ref='refs/heads/archived/feature/merged', sha='sha1')
@@ -0,0 +1,137 @@
+import logging
+import queue
+import subprocess
+import sys
+import time
+import pytest
+from unittest.mock import MagicMock
+from github_branch_manager.logger import (
+    BatchingQueueListener, CloudBatchHandler, DebugRateLimitFilter, cloud_logging_enabled
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(level=logging.INFO, msg='message'):
+    return logging.LogRecord('github-branch-manager', level, __file__, 1, msg, None, None)
+
+
+class TestCloudLoggingEnabled:
+    def test_explicit_setting(self, monkeypatch):
+        monkeypatch.setenv('CLOUD_LOGGING', 'false')
+        monkeypatch.setenv('CLOUD_RUN_JOB', 'github-branch-manager')
+        assert cloud_logging_enabled() is False
+
+        monkeypatch.setenv('CLOUD_LOGGING', 'true')
+        monkeypatch.delenv('CLOUD_RUN_JOB')
+        assert cloud_logging_enabled() is True
+
+    def test_detected_on_cloud_run(self, monkeypatch):
+        monkeypatch.delenv('CLOUD_LOGGING', raising=False)
+        monkeypatch.delenv('K_SERVICE', raising=False)
+        monkeypatch.delenv('CLOUD_RUN_JOB', raising=False)
+        assert cloud_logging_enabled() is False
+
+        monkeypatch.setenv('CLOUD_RUN_JOB', 'github-branch-manager')
+        assert cloud_logging_enabled() is True
+
+
+def test_import_does_not_create_cloud_client():
+    """Test that importing the package needs no Cloud Logging client or credentials"""
+    code = ("import sys, github_branch_manager.main; "
+            "assert 'google.cloud.logging' not in sys.modules, 'cloud logging imported'")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            env={'PATH': '', 'PYTHONPATH': ':'.join(sys.path), 'CLOUD_LOGGING': 'false'})
+    assert result.returncode == 0, result.stderr
+
+
+class TestDebugRateLimitFilter:
+    def test_debug_records_are_limited(self):
+        clock = FakeClock()
+        rate_filter = DebugRateLimitFilter(per_second=5, clock=clock)
+
+        passed = [rate_filter.filter(make_record(logging.DEBUG)) for _ in range(20)]
+        assert passed.count(True) == 5
+        assert all(rate_filter.filter(make_record(logging.INFO)) for _ in range(20))
+
+        clock.now += 1
+        record = make_record(logging.DEBUG)
+        assert rate_filter.filter(record) is True
+        assert '15 debug messages suppressed' in record.getMessage()
+
+
+class TestCloudBatchHandler:
+    @pytest.fixture
+    def handler(self):
+        handler = CloudBatchHandler(capacity=3, max_delay=5.0, clock=FakeClock())
+        handler._cloud_logger = MagicMock()
+        return handler
+
+    def batch(self, handler):
+        return handler._cloud_logger.batch.return_value
+
+    def test_records_are_shipped_in_batches(self, handler):
+        for i in range(2):
+            handler.handle(make_record(msg=f"branch {i}"))
+        self.batch(handler).commit.assert_not_called()
+
+        handler.handle(make_record(msg='branch 2'))
+
+        self.batch(handler).commit.assert_called_once()
+        entries = [call.args[0] for call in self.batch(handler).log_struct.call_args_list]
+        assert [entry['message'] for entry in entries] == ['branch 0', 'branch 1', 'branch 2']
+        assert self.batch(handler).log_struct.call_args.kwargs['severity'] == 'INFO'
+
+    def test_batch_is_sent_after_max_delay(self, handler):
+        handler.handle(make_record())
+        handler.clock.now += 6
+        handler.handle(make_record())
+
+        self.batch(handler).commit.assert_called_once()
+
+    def test_flush_if_due_without_further_records(self, handler):
+        handler.handle(make_record())
+        handler.flush_if_due()
+        self.batch(handler).commit.assert_not_called()
+
+        handler.clock.now += 6
+        handler.flush_if_due()
+
+        self.batch(handler).commit.assert_called_once()
+
+    def test_listener_flushes_while_idle(self):
+        handler = CloudBatchHandler(capacity=100, max_delay=0.05)
+        handler._cloud_logger = MagicMock()
+        records = queue.SimpleQueue()
+        listener = BatchingQueueListener(records, handler, poll_interval=0.01)
+        listener.start()
+        try:
+            records.put(make_record())
+            deadline = time.monotonic() + 2
+            while not self.batch(handler).commit.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            listener.stop()
+
+        self.batch(handler).commit.assert_called_once()
+
+    def test_errors_are_sent_right_away_and_close_flushes(self, handler):
+        handler.handle(make_record(logging.ERROR))
+        assert self.batch(handler).commit.call_count == 1
+
+        handler.handle(make_record())
+        handler.close()
+        assert self.batch(handler).commit.call_count == 2
+
+    def test_shipping_failures_do_not_raise(self, handler):
+        handler._cloud_logger.batch.side_effect = Exception("no credentials")
+
+        handler.handle(make_record(logging.ERROR))
+
+        assert handler.buffer == []
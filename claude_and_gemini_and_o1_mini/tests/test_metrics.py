@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+import pytest
+from github import Auth, Github
+from github.Requester import Requester
+from slack_sdk.errors import SlackApiError
+from github_branch_manager.http_cache import HttpCache, install_http_cache
+from github_branch_manager.metrics import Counter, Histogram, Metrics, MetricsServer, endpoint, install_github_metrics
+from github_branch_manager.notifier import SlackNotifier
+
+
+class TestEndpoint:
+    @pytest.mark.parametrize('url, expected', [
+        ('/orgs/acme/repos?per_page=100', '/orgs/{org}/repos'),
+        ('/repos/acme/app', '/repos/{owner}/{repo}'),
+        ('/repos/acme/app/branches?per_page=100&page=2', '/repos/{owner}/{repo}/branches'),
+        ('/repos/acme/app/branches/feature/login', '/repos/{owner}/{repo}/branches/{branch}'),
+        ('/repos/acme/app/git/refs', '/repos/{owner}/{repo}/git/refs'),
+        ('/repos/acme/app/git/refs/heads/feature/login', '/repos/{owner}/{repo}/git/refs/{ref}'),
+        ('/repos/acme/app/git/matching-refs/tags/v', '/repos/{owner}/{repo}/git/matching-refs/{ref}'),
+        ('/repos/acme/app/commits/abc123', '/repos/{owner}/{repo}/commits/{sha}'),
+        ('/repos/acme/app/pulls/7/commits', '/repos/{owner}/{repo}/pulls/{number}/commits'),
+        ('https://github.example.com/api/v3/repos/acme/app/tags', '/repos/{owner}/{repo}/tags'),
+        ('https://github.example.com/api/graphql', '/graphql'),
+        ('/app/installations/42/access_tokens', '/app/installations/{installation}/access_tokens'),
+    ])
+    def test_collapses_object_names(self, url, expected):
+        assert endpoint(url) == expected
+
+
+class TestExposition:
+    def test_counter_samples(self):
+        counter = Counter('requests_total', 'Requests.', ('endpoint', 'status'))
+        counter.inc(endpoint='/graphql', status=200)
+        counter.inc(2, endpoint='/graphql', status=200)
+        counter.inc(endpoint='/say "hi"\n', status=502)
+
+        assert counter.render().splitlines() == [
+            '# HELP requests_total Requests.',
+            '# TYPE requests_total counter',
+            'requests_total{endpoint="/graphql",status="200"} 3',
+            'requests_total{endpoint="/say \\"hi\\"\\n",status="502"} 1',
+        ]
+
+    def test_labels_must_match(self):
+        counter = Counter('requests_total', 'Requests.', ('endpoint',))
+        with pytest.raises(ValueError):
+            counter.inc(status=200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ('method',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, method='GET')
+
+        samples = histogram.render().splitlines()[2:]
+        assert samples == [
+            'latency_seconds_bucket{method="GET",le="0.1"} 2',
+            'latency_seconds_bucket{method="GET",le="1"} 3',
+            'latency_seconds_bucket{method="GET",le="+Inf"} 4',
+            'latency_seconds_sum{method="GET"} 3.65',
+            'latency_seconds_count{method="GET"} 4',
+        ]
+
+    def test_write_textfile_replaces_file(self, tmp_path):
+        metrics = Metrics()
+        metrics.evaluated('merged', True)
+        path = tmp_path / 'textfile' / 'github_tidy.prom'
+        metrics.write_textfile(str(path))
+        metrics.evaluated('merged', True)
+        metrics.write_textfile(str(path))
+
+        assert 'github_tidy_branches_evaluated_total{predicate="merged",result="true"} 2' in path.read_text()
+        assert os.listdir(path.parent) == ['github_tidy.prom']
+
+    def test_phase_timing(self):
+        metrics = Metrics()
+        items = list(metrics.timed('list', iter([1, 2, 3])))
+        with metrics.phase('archive'):
+            pass
+
+        assert items == [1, 2, 3]
+        assert metrics.phase_duration.value(phase='list') > 0
+        assert metrics.phase_duration.value(phase='archive') > 0
+        assert metrics.phase_duration.value(phase='purge') == 0
+
+
+class TestMetricsServer:
+    def test_serves_metrics(self):
+        metrics = Metrics()
+        metrics.observe_budget('acme', 5000, 120)
+        server = MetricsServer(metrics, host='127.0.0.1', port=0)
+        server.start()
+        try:
+            with urllib.request.urlopen(server.url) as response:
+                body = response.read().decode()
+                content_type = response.headers['Content-Type']
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(server.url.replace('/metrics', '/'))
+        finally:
+            server.shutdown()
+
+        assert content_type.startswith('text/plain; version=0.0.4')
+        assert 'github_tidy_rate_budget_used_requests{org="acme"} 120' in body
+        assert error.value.code == 404
+
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    """Local stand-in for GitHub that reports its rate limit and honors If-None-Match."""
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('X-RateLimit-Remaining', '4998')
+            self.send_header('X-RateLimit-Limit', '5000')
+            self.send_header('X-RateLimit-Reset', '1700000000')
+            self.send_header('X-RateLimit-Resource', 'core')
+            self.end_headers()
+            return
+        payload = json.dumps({'name': 'app', 'full_name': 'acme/app', 'url': ''}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', '"v1"')
+        self.send_header('X-RateLimit-Remaining', '4999')
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.send_header('X-RateLimit-Reset', '1700000000')
+        self.send_header('X-RateLimit-Resource', 'core')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def github_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RateLimitedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    Requester.resetConnectionClasses()
+
+
+class TestGithubMetrics:
+    def test_counts_requests_and_rate_limit(self, github_server):
+        metrics = Metrics()
+        install_github_metrics(metrics)
+        github = Github(auth=Auth.Token('token'), base_url=github_server)
+
+        github.get_repo('acme/app')
+
+        assert metrics.github_requests.value(method='GET', endpoint='/repos/{owner}/{repo}', status=200) == 1
+        assert metrics.github_request_duration.count(method='GET', endpoint='/repos/{owner}/{repo}') == 1
+        assert metrics.rate_limit_remaining.value(resource='core') == 4999
+        assert metrics.rate_limit_limit.value(resource='core') == 5000
+        assert metrics.rate_limit_reset.value(resource='core') == 1700000000
+
+    def test_counts_not_modified_responses_behind_cache(self, github_server, tmp_path):
+        metrics = Metrics()
+        install_github_metrics(metrics)
+        cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+        install_http_cache(cache)
+        github = Github(auth=Auth.Token('token'), base_url=github_server)
+
+        github.get_repo('acme/app')
+        github.get_repo('acme/app')
+        cache.close()
+
+        assert cache.hits == 1
+        assert metrics.github_requests.value(method='GET', endpoint='/repos/{owner}/{repo}', status=200) == 1
+        assert metrics.github_requests.value(method='GET', endpoint='/repos/{owner}/{repo}', status=304) == 1
+        assert metrics.rate_limit_remaining.value(resource='core') == 4998
+
+
+class TestSlackMetrics:
+    def test_counts_calls_by_status(self):
+        metrics = Metrics()
+        notifier = SlackNotifier('token', '#channel', metrics=metrics)
+        notifier.client = MagicMock()
+        notifier.client.chat_postMessage.__name__ = 'chat_postMessage'
+        notifier.client.chat_postMessage.side_effect = [
+            MagicMock(status_code=200),
+            SlackApiError('failed', MagicMock(status_code=500, get=lambda key: 'internal_error')),
+        ]
+
+        notifier.notify_deletion('app', 'archived/one')
+        notifier.notify_deletion('app', 'archived/two')
+
+        assert metrics.slack_requests.value(method='chat.postMessage', status=200) == 1
+        assert metrics.slack_requests.value(method='chat.postMessage', status=500) == 1
+        assert metrics.slack_request_duration.count(method='chat.postMessage') == 2
+        assert metrics.phase_duration.value(phase='notify') > 0
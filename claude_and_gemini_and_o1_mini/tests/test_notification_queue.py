@@ -0,0 +1,123 @@
+import threading
+import time
+import pytest
+from github_branch_manager.notification_queue import NotificationQueue, NotificationSpool
+
+
+class RecordingNotifier:
+    """Stands in for SlackNotifier; deliveries block while `gate` is closed."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.failed_deliveries = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def _record(self, *call):
+        self.gate.wait()
+        time.sleep(self.delay)
+        self.calls.append(call)
+
+    def notify_archive(self, repo, branch, tag=None):
+        self._record('archive', repo, branch)
+
+    def notify_deletion(self, repo, branch):
+        self._record('deletion', repo, branch)
+
+    def repo_done(self, repo):
+        self._record('repo_done', repo)
+
+    def flush(self, repo=None):
+        self._record('flush', repo)
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return NotificationSpool(str(tmp_path / 'spool' / 'test_org.jsonl'))
+
+
+def branches_of(calls, repo):
+    return [call[2] for call in calls if call[0] in ('archive', 'deletion') and call[1] == repo]
+
+
+class TestNotificationQueue:
+    def test_callers_do_not_wait_for_delivery(self):
+        notifier = RecordingNotifier(delay=0.05)
+        notifications = NotificationQueue(notifier)
+
+        started = time.monotonic()
+        for i in range(10):
+            notifications.notify_archive('test-repo', f"feature/{i}", 'tag')
+        enqueue_time = time.monotonic() - started
+        notifications.close()
+
+        assert enqueue_time < 0.05
+        assert branches_of(notifier.calls, 'test-repo') == [f"feature/{i}" for i in range(10)]
+
+    def test_full_queue_spools_and_keeps_repo_order(self, spool):
+        notifier = RecordingNotifier()
+        notifier.gate.clear()
+        notifications = NotificationQueue(notifier, maxsize=2, spool=spool)
+
+        for i in range(6):
+            notifications.notify_archive('repo-a', f"feature/{i}")
+            notifications.notify_deletion('repo-b', f"archived/{i}")
+        assert len(spool.read()) > 0
+        notifier.gate.set()
+        notifications.close()
+
+        assert branches_of(notifier.calls, 'repo-a') == [f"feature/{i}" for i in range(6)]
+        assert branches_of(notifier.calls, 'repo-b') == [f"archived/{i}" for i in range(6)]
+        assert spool.read() == []
+
+    def test_undelivered_notifications_survive_shutdown(self, spool):
+        notifier = RecordingNotifier()
+        notifier.gate.clear()
+        notifications = NotificationQueue(notifier, spool=spool)
+        for i in range(3):
+            notifications.notify_archive('test-repo', f"feature/{i}")
+        notifications.repo_done('test-repo')
+
+        threading.Timer(0.2, notifier.gate.set).start()
+        notifications.close(timeout=0.05)
+
+        # The delivery in progress completes; the rest waits in the spool
+        assert notifier.calls == [('archive', 'test-repo', 'feature/0')]
+        assert [method for method, _ in spool.read()] == ['notify_archive', 'notify_archive', 'repo_done']
+
+        next_run = RecordingNotifier()
+        notifications = NotificationQueue(next_run, spool=spool)
+        notifications.notify_archive('test-repo', 'feature/3')
+        notifications.close()
+
+        assert branches_of(next_run.calls, 'test-repo') == ['feature/1', 'feature/2', 'feature/3']
+        assert next_run.calls[2] == ('repo_done', 'test-repo')
+
+    def test_spool_keeps_what_was_not_delivered(self, spool):
+        spool.append([('notify_archive', ['test-repo', f"feature/{i}", None]) for i in range(3)])
+        notifier = RecordingNotifier()
+        notifier.gate.clear()
+        notifications = NotificationQueue(notifier, spool=spool)
+
+        threading.Timer(0.2, notifier.gate.set).start()
+        notifications.close(timeout=0.05)
+
+        assert notifier.calls == [('archive', 'test-repo', 'feature/0')]
+        assert [args[1] for _, args in spool.read()] == ['feature/1', 'feature/2']
+
+    def test_drop_keeps_later_appends(self, spool):
+        spool.append([('repo_done', ['repo-a']), ('repo_done', ['repo-b'])])
+        spool.append([('repo_done', ['repo-c'])])
+
+        spool.drop(2)
+
+        assert spool.read() == [('repo_done', ['repo-c'])]
+
+    def test_failed_deliveries_come_from_notifier(self):
+        notifier = RecordingNotifier()
+        notifier.failed_deliveries.append('digest summary')
+        notifications = NotificationQueue(notifier)
+        notifications.close()
+
+        assert notifications.failed_deliveries == ['digest summary']
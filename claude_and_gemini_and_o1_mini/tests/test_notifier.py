@@ -1,7 +1,12 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qsl, urlparse
 import pytest
-from github_branch_manager.notifier import SlackNotifier
+from github_branch_manager.notifier import FILE_UPLOAD_THRESHOLD, MAX_MESSAGE_CHARS, SlackNotifier, chunk_lines
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web import SlackResponse
 
 @pytest.fixture
 def mock_slack_client():
@@ -56,9 +61,11 @@ class TestSlackNotifier:
     def test_rate_limit_handling(self, notifier):
         """Test handling of Slack rate limits"""
         # Mock rate limit error
-        rate_limit_response = {'error': 'ratelimited'}
-        rate_limit_headers = {'Retry-After': '30'}
-        error = SlackApiError('Rate limited', rate_limit_response, rate_limit_headers)
+        rate_limit_response = SlackResponse(
+            client=None, http_verb='POST', api_url='https://slack.com/api/chat.postMessage', req_args={},
+            data={'ok': False, 'error': 'ratelimited'}, headers={'Retry-After': '30'}, status_code=429
+        )
+        error = SlackApiError('Rate limited', rate_limit_response)
         
         # Set up the mock to fail once then succeed
         notifier.client.chat_postMessage.side_effect = [
@@ -84,4 +91,148 @@ class TestSlackNotifier:
         notifier.notify_deletion('test-repo', 'feature/test')
 
         # Verify attempts were made
-        assert notifier.client.chat_postMessage.call_count == 2 
\ No newline at end of file
+        assert notifier.client.chat_postMessage.call_count == 2 
+
+class SlackStandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the Slack Web API."""
+    messages = []
+    uploads = []
+    completions = []
+    rate_limited = 0
+    error = None
+
+    def _reply(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _params(self):
+        params = dict(parse_qsl(urlparse(self.path).query))
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            params.update(json.loads(body))
+        elif body:
+            params.update(parse_qsl(body.decode()))
+        return params, body
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        method = urlparse(self.path).path.rsplit('/', 1)[-1]
+        params, body = self._params()
+        if method == 'F1':
+            SlackStandIn.uploads.append(body.decode())
+            return self._reply(200, {})
+        if SlackStandIn.error:
+            return self._reply(200, {'ok': False, 'error': SlackStandIn.error})
+        if method == 'chat.postMessage':
+            if SlackStandIn.rate_limited:
+                SlackStandIn.rate_limited -= 1
+                return self._reply(429, {'ok': False, 'error': 'ratelimited'}, {'Retry-After': '2'})
+            SlackStandIn.messages.append(params)
+            return self._reply(200, {'ok': True, 'channel': 'C0123', 'ts': f"1700000000.{len(self.messages):06d}"})
+        if method == 'files.getUploadURLExternal':
+            host, port = self.server.server_address[:2]
+            return self._reply(200, {'ok': True, 'file_id': 'F1', 'upload_url': f"http://{host}:{port}/upload/F1"})
+        if method == 'files.completeUploadExternal':
+            SlackStandIn.completions.append(params)
+            return self._reply(200, {'ok': True, 'files': [{'id': 'F1'}]})
+        self._reply(404, {'ok': False, 'error': 'unknown_method'})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slack_api():
+    SlackStandIn.messages, SlackStandIn.uploads, SlackStandIn.completions = [], [], []
+    SlackStandIn.rate_limited, SlackStandIn.error = 0, None
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlackStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/"
+    server.shutdown()
+    server.server_close()
+
+
+def archive_all(notifier, count, repo='test-repo'):
+    for i in range(count):
+        notifier.notify_archive(repo, f"feature/a-rather-long-branch-name-{i:04d}",
+                                f"archived-feature/a-rather-long-branch-name-{i:04d}-20240101")
+
+
+class TestDigest:
+    """Tests for digest notifications against a local Slack stand-in"""
+
+    def test_digest_is_sent_in_chunks(self, slack_api):
+        notifier = SlackNotifier('test_token', '#test-channel', digest='run', base_url=slack_api)
+        archive_all(notifier, 150)
+        notifier.notify_deletion('other-repo', 'archived/old')
+
+        assert SlackStandIn.messages == []
+        notifier.flush()
+
+        texts = [message['text'] for message in SlackStandIn.messages]
+        assert 1 < len(texts) < 10
+        assert all(len(text) <= MAX_MESSAGE_CHARS + 200 for text in texts)
+        assert texts[0].startswith(':broom: Branch cleanup: 150 archived, 1 deleted in 2 repositories (1/')
+        combined = "\n".join(texts)
+        assert all(f"a-rather-long-branch-name-{i:04d}" in combined for i in range(150))
+        assert '`archived/old` deleted' in combined
+        assert notifier.failed_deliveries == []
+
+    def test_repo_digest_is_sent_when_repo_is_done(self, slack_api):
+        notifier = SlackNotifier('test_token', '#test-channel', digest='repo', base_url=slack_api)
+        archive_all(notifier, 2, repo='repo-a')
+        archive_all(notifier, 3, repo='repo-b')
+
+        notifier.repo_done('repo-a')
+
+        assert len(SlackStandIn.messages) == 1
+        assert 'repo-a' in SlackStandIn.messages[0]['text']
+        assert 'repo-b' not in SlackStandIn.messages[0]['text']
+
+    def test_large_digest_is_uploaded_as_file(self, slack_api):
+        notifier = SlackNotifier('test_token', '#test-channel', digest='run', base_url=slack_api)
+        archive_all(notifier, FILE_UPLOAD_THRESHOLD + 1)
+
+        notifier.flush()
+
+        assert len(SlackStandIn.messages) == 1
+        assert 'attached' in SlackStandIn.messages[0]['text']
+        assert len(SlackStandIn.uploads) == 1
+        assert f"a-rather-long-branch-name-{FILE_UPLOAD_THRESHOLD:04d}" in SlackStandIn.uploads[0]
+        assert SlackStandIn.completions[0]['channel_id'] == 'C0123'
+        # Attached to the summary message's thread
+        assert SlackStandIn.completions[0]['thread_ts'] == '1700000000.000001'
+
+    def test_retry_after_is_respected(self, slack_api):
+        SlackStandIn.rate_limited = 1
+        notifier = SlackNotifier('test_token', '#test-channel', base_url=slack_api)
+
+        with patch('time.sleep') as mock_sleep:
+            notifier.notify_archive('test-repo', 'feature/test', 'archived-tag')
+
+        mock_sleep.assert_called_once_with(2)
+        assert len(SlackStandIn.messages) == 1
+        assert notifier.failed_deliveries == []
+
+    def test_failed_deliveries_are_reported(self, slack_api):
+        SlackStandIn.error = 'channel_not_found'
+        notifier = SlackNotifier('test_token', '#missing', digest='run', base_url=slack_api)
+        archive_all(notifier, 1)
+
+        notifier.flush()
+
+        assert notifier.failed_deliveries == ['digest message 1/1 (test-repo)']
+
+
+def test_chunk_lines():
+    assert chunk_lines(['aaaa', 'bbbb', 'cccc'], limit=10) == ['aaaa\nbbbb', 'cccc']
+    assert chunk_lines([]) == []
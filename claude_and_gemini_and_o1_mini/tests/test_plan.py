@@ -0,0 +1,118 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.branch_manager import BranchAction
+from github_branch_manager.plan import PlanCheckpoint, PlanEntry, PlanWriter, checkpoint_path, group_by_repo, read_plan
+from .conftest import make_branch
+
+
+@pytest.fixture
+def repo(manager):
+    repo = MagicMock(spec=Repository)
+    repo.name = "test-repo"
+    repo.full_name = "test_org/test-repo"
+    manager.org.get_repo.return_value = repo
+    return repo
+
+
+@pytest.fixture
+def branches(manager):
+    branches = [
+        make_branch("main", "a" * 40),
+        make_branch("feature/done", "b" * 40),
+        make_branch("feature/fresh", "c" * 40, days_old=2),
+        make_branch("archived/old", "d" * 40, days_old=90),
+    ]
+    manager.list_branches = MagicMock(return_value=branches)
+    manager.is_branch_merged = MagicMock(return_value=True)
+    manager.has_open_prs = MagicMock(return_value=False)
+    manager.has_critical_tags = MagicMock(return_value=False)
+    return branches
+
+
+def entry(branch, sha, action='archive'):
+    return PlanEntry('test_org/test-repo', branch, sha, action, 'test')
+
+
+class TestPlanFiles:
+    def test_plan_round_trip(self, tmp_path):
+        path = str(tmp_path / 'plan.jsonl')
+        writer = PlanWriter(path)
+        writer.write([entry('feature/a', 'a' * 40), PlanEntry('test_org/other', 'archived/b', 'b' * 40, 'purge', 'old')])
+        writer.close()
+
+        entries = list(read_plan(path))
+
+        assert entries[0] == entry('feature/a', 'a' * 40)
+        assert list(group_by_repo(entries)) == ['test_org/test-repo', 'test_org/other']
+        assert entries[1].org == 'test_org' and entries[1].repo_name == 'other'
+
+    def test_checkpoint_resume_retries_only_failures(self, tmp_path):
+        path = str(tmp_path / 'plan.jsonl.checkpoint')
+        entries = [entry('feature/a', 'a' * 40), entry('feature/b', 'b' * 40), entry('feature/c', 'c' * 40)]
+        checkpoint = PlanCheckpoint(path)
+        checkpoint.record(entries[0], 'applied')
+        checkpoint.record(entries[1], 'failed')
+        checkpoint.close()
+
+        resumed = PlanCheckpoint(path)
+
+        assert resumed.pending(entries) == entries[1:]
+
+    def test_checkpoint_is_keyed_by_head_sha(self, tmp_path):
+        path = str(tmp_path / 'plan.jsonl.checkpoint')
+        checkpoint = PlanCheckpoint(path)
+        checkpoint.record(entry('feature/a', 'a' * 40), 'applied')
+        checkpoint.close()
+
+        moved = entry('feature/a', 'f' * 40)
+
+        assert PlanCheckpoint(path).pending([moved]) == [moved]
+
+    def test_new_plan_removes_old_checkpoint(self, tmp_path):
+        path = str(tmp_path / 'plan.jsonl')
+        checkpoint = PlanCheckpoint(checkpoint_path(path))
+        checkpoint.record(entry('feature/a', 'a' * 40), 'applied')
+        checkpoint.close()
+
+        PlanWriter(path).close()
+
+        assert not os.path.exists(checkpoint_path(path))
+
+
+class TestPlanAndApply:
+    def test_plan_does_not_write(self, manager, repo, branches):
+        entries = manager.plan_branches('test-repo', ('archive', 'purge'))
+
+        assert [(e.branch, e.action) for e in entries] == [('feature/done', 'archive'), ('archived/old', 'purge')]
+        assert entries[0].head_sha == 'b' * 40
+        assert 'merged' in entries[0].reason
+        repo.create_git_ref.assert_not_called()
+        repo.get_git_ref.assert_not_called()
+
+    def test_apply_skips_changed_branches(self, manager, repo, branches):
+        plan = [entry('feature/done', 'b' * 40), entry('feature/moved', 'e' * 40),
+                entry('archived/old', 'f' * 40, 'purge')]
+        outcomes = []
+
+        actions = manager.apply_plan('test-repo', plan, lambda e, status: outcomes.append((e.branch, status)))
+
+        assert actions == [BranchAction('test-repo', 'feature/done', 'archived')]
+        assert sorted(outcomes) == [('archived/old', 'changed'), ('feature/done', 'applied'),
+                                    ('feature/moved', 'changed')]
+        repo.create_git_ref.assert_called_once_with(ref='refs/heads/archived/feature/done', sha='b' * 40)
+        repo.get_git_ref.assert_called_once_with('heads/feature/done')
+
+    def test_interrupted_apply_resumes(self, manager, repo, branches, tmp_path):
+        plan = [entry('feature/done', 'b' * 40), entry('archived/old', 'd' * 40, 'purge')]
+        checkpoint = PlanCheckpoint(str(tmp_path / 'plan.jsonl.checkpoint'))
+        checkpoint.record(plan[0], 'applied')
+
+        pending = checkpoint.pending(plan)
+        actions = manager.apply_plan('test-repo', pending, checkpoint.record)
+        checkpoint.close()
+
+        assert actions == [BranchAction('test-repo', 'archived/old', 'purged')]
+        repo.create_git_ref.assert_not_called()
+        assert PlanCheckpoint(str(tmp_path / 'plan.jsonl.checkpoint')).pending(plan) == []
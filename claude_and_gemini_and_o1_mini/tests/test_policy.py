@@ -0,0 +1,133 @@
+import pytest
+from dataclasses import replace
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.policy import BranchMatcher, compile_policy
+from .conftest import make_branch, make_manager
+
+POLICY_TOML = '''
+[defaults]
+protected_branches = ["main", "develop", "release/*", "hotfix/**"]
+retention_days = 90
+
+[repos.payments]
+retention_days = 365
+critical_tag_patterns = ["prod-*"]
+
+[repos."other_org/shared"]
+inactivity_days = 7
+'''
+
+POLICY_YAML = '''
+defaults:
+  protected_branches: [main, "release/*", "hotfix/**"]
+  retention_days: 90
+repos:
+  payments:
+    retention_days: 365
+'''
+
+
+class TestBranchMatcher:
+    def test_globs(self):
+        matcher = BranchMatcher(['main', 'release/*', 'hotfix/**', 'feature/*/wip', '*-stable', 'v[0-9]*'])
+
+        for name in ('main', 'release/1.2', 'hotfix/a', 'hotfix/a/b', 'feature/x/wip', '2.x-stable', 'v2'):
+            assert name in matcher, name
+        for name in ('mainline', 'release/1.2/fix', 'release', 'hotfixes/a', 'feature/x/y/wip',
+                     'team/2.x-stable', 'vx'):
+            assert name not in matcher, name
+
+    def test_double_star_matches_zero_segments(self):
+        matcher = BranchMatcher(['team/**/done'])
+
+        assert 'team/done' in matcher
+        assert 'team/a/b/done' in matcher
+        assert 'team/undone' not in matcher
+
+    def test_many_patterns(self):
+        matcher = BranchMatcher([f"team-{i}/*" for i in range(500)] + [f"exact-{i}" for i in range(500)])
+
+        assert 'team-499/feature' in matcher
+        assert 'exact-250' in matcher
+        assert 'team-500/feature' not in matcher
+        assert 'team-1/a/b' not in matcher
+
+
+class TestCompilePolicy:
+    @pytest.mark.parametrize('filename, content', [('policy.toml', POLICY_TOML), ('policy.yaml', POLICY_YAML)])
+    def test_overrides(self, config, tmp_path, filename, content):
+        path = tmp_path / filename
+        path.write_text(content)
+
+        policy = compile_policy(replace(config, policy_file=str(path)))
+
+        default = policy.for_repo('test_org/web')
+        assert default.is_protected('release/2.0') and default.is_protected('hotfix/a/b')
+        assert (default.inactivity_days, default.retention_days) == (30, 90)
+        payments = policy.for_repo('test_org/payments')
+        assert payments.retention_days == 365
+        # Unset settings are inherited from the defaults
+        assert payments.is_protected('release/2.0')
+        assert payments.fingerprint('archived/') != default.fingerprint('archived/')
+
+    def test_full_name_keys(self, config, tmp_path):
+        path = tmp_path / 'policy.toml'
+        path.write_text(POLICY_TOML)
+
+        policy = compile_policy(replace(config, policy_file=str(path)))
+
+        assert policy.for_repo('other_org/shared').inactivity_days == 7
+        assert policy.for_repo('test_org/payments').critical_tags.match('prod-1')
+        assert not policy.for_repo('test_org/payments').critical_tags.match('v1.0')
+
+    def test_without_policy_file(self, config):
+        policy = compile_policy(config)
+
+        assert policy.for_repo('test_org/web') is policy.default
+        assert policy.default.is_protected('develop')
+        assert not policy.default.is_protected('release/1.0')
+
+    @pytest.mark.parametrize('content, message', [
+        ('[defaults]\nretention = 5\n', 'retention'),
+        ('[defaults]\nretention_days = 0\n', 'retention_days'),
+        ('[repos.web]\nprotected_branches = "main"\n', 'protected_branches'),
+        ('[repo.web]\nretention_days = 5\n', 'repo'),
+    ])
+    def test_invalid_files(self, config, tmp_path, content, message):
+        path = tmp_path / 'policy.toml'
+        path.write_text(content)
+
+        with pytest.raises(ValueError) as exc_info:
+            compile_policy(replace(config, policy_file=str(path)))
+        assert message in str(exc_info.value)
+
+
+class TestPolicyInBranchManager:
+    @pytest.fixture
+    def manager(self, config, tmp_path):
+        path = tmp_path / 'policy.toml'
+        path.write_text(POLICY_TOML)
+        manager = make_manager(replace(config, policy_file=str(path)))
+        manager.is_branch_merged = MagicMock(return_value=True)
+        manager.has_open_prs = MagicMock(return_value=False)
+        manager.has_critical_tags = MagicMock(return_value=False)
+        return manager
+
+    def make_repo(self, name):
+        repo = MagicMock(spec=Repository)
+        repo.name = name
+        repo.full_name = f"test_org/{name}"
+        return repo
+
+    def test_glob_protected_branches_are_not_archived(self, manager):
+        repo = self.make_repo('web')
+
+        assert manager.should_archive_branch(repo, make_branch('release/1.0', days_old=100)) is False
+        assert manager.should_archive_branch(repo, make_branch('feature/done', days_old=100)) is True
+
+    def test_retention_per_repository(self, manager):
+        branch = make_branch('archived/feature/done', days_old=200)
+
+        assert manager.should_purge_branch(self.make_repo('web'), branch) is True
+        assert manager.should_purge_branch(self.make_repo('payments'), branch) is False
@@ -0,0 +1,124 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.pr_index import PullRequestEntry, PullRequestIndex
+from .conftest import make_config, make_manager
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def make_pull(number, head, base='develop', state='closed', merged=True, hours_ago=0,
+              head_repo='test_org/test-repo'):
+    pull = MagicMock()
+    pull.number = number
+    pull.head.ref = head
+    pull.head.repo = MagicMock(full_name=head_repo) if head_repo else None
+    pull.base.ref = base
+    pull.state = state
+    pull.merged_at = NOW if merged else None
+    pull.updated_at = NOW - timedelta(hours=hours_ago)
+    return pull
+
+
+@pytest.fixture
+def mock_repo():
+    repo = MagicMock(spec=Repository)
+    repo.name = "test-repo"
+    repo.full_name = "test_org/test-repo"
+    return repo
+
+
+class TestPullRequestIndex:
+    def test_lookups_by_head_ref(self, mock_repo):
+        mock_repo.get_pulls.return_value = [
+            make_pull(3, 'feature/open', state='open', merged=False),
+            make_pull(2, 'feature/merged', base='develop', hours_ago=1),
+            make_pull(1, 'feature/elsewhere', base='experimental', hours_ago=2),
+        ]
+        index = PullRequestIndex()
+
+        assert index.refresh(mock_repo) == 3
+        mock_repo.get_pulls.assert_called_once_with(state='all', sort='updated', direction='desc')
+        assert index.is_merged_into('feature/merged', ['develop', 'master']) is True
+        assert index.is_merged_into('feature/elsewhere', ['develop', 'master']) is False
+        assert index.has_open_pr('feature/open') is True
+        assert index.has_open_pr('feature/merged') is False
+        assert index.has_open_pr('unknown') is False
+
+    def test_incremental_refresh_stops_at_known_updates(self, mock_repo):
+        """Test that a refresh only reads pulls updated since the last one"""
+        index = PullRequestIndex([
+            PullRequestEntry(1, 'feature/a', 'develop', 'open', False, NOW - timedelta(hours=5)),
+        ])
+        newer = make_pull(1, 'feature/a', state='closed', merged=True, hours_ago=1)
+        already_seen = make_pull(9, 'feature/b', hours_ago=5)
+        never_read = make_pull(8, 'feature/c', hours_ago=6)
+        mock_repo.get_pulls.return_value = iter([newer, already_seen, never_read])
+
+        assert index.refresh(mock_repo) == 1
+        assert index.has_open_pr('feature/a') is False
+        assert index.is_merged_into('feature/a', ['develop']) is True
+        assert index.pulls_for('feature/c') == []
+        assert len(index) == 1
+        assert index.updated_through == newer.updated_at
+
+    def test_pulls_from_forks_are_skipped(self, mock_repo):
+        """Test that a fork's branch does not stand in for a local branch of the same name"""
+        mock_repo.get_pulls.return_value = [
+            make_pull(3, 'feature/x', head_repo='someone/test-repo'),
+            make_pull(2, 'feature/x', state='open', merged=False, head_repo=None, hours_ago=1),
+            make_pull(1, 'feature/y', hours_ago=2),
+        ]
+        index = PullRequestIndex()
+
+        assert index.refresh(mock_repo) == 3
+        assert index.is_merged_into('feature/x', ['develop']) is False
+        assert index.has_open_pr('feature/x') is False
+        assert index.is_merged_into('feature/y', ['develop']) is True
+        assert len(index) == 1
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        path = str(tmp_path / 'nested' / 'index.json')
+        index = PullRequestIndex([
+            PullRequestEntry(1, 'feature/a', 'develop', 'closed', True, NOW),
+        ])
+        index.save(path)
+
+        loaded = PullRequestIndex.load(path)
+        assert loaded.is_merged_into('feature/a', ['develop']) is True
+        assert loaded.updated_through == NOW
+
+    def test_load_missing_file(self, tmp_path):
+        assert len(PullRequestIndex.load(str(tmp_path / 'missing.json'))) == 0
+
+
+class TestBranchManagerPullRequestIndex:
+    @pytest.fixture
+    def manager(self, tmp_path):
+        return make_manager(make_config(protected_branches=["develop", "stage", "master"], state_dir=str(tmp_path)))
+
+    def test_predicates_use_index(self, manager, mock_repo):
+        mock_repo.get_pulls.return_value = [
+            make_pull(2, 'feature/open', state='open', merged=False),
+            make_pull(1, 'feature/done', base='stage', hours_ago=1),
+        ]
+        branch = MagicMock()
+        branch.name = 'feature/done'
+
+        manager.build_pr_index(mock_repo)
+
+        assert manager.is_branch_merged(mock_repo, branch) is True
+        assert manager.has_open_prs(mock_repo, 'feature/open') is True
+        assert manager.has_open_prs(mock_repo, 'feature/done') is False
+        assert mock_repo.get_pulls.call_count == 1
+
+    def test_index_persists_between_runs(self, manager, mock_repo, tmp_path):
+        mock_repo.get_pulls.return_value = [make_pull(1, 'feature/done')]
+        manager.build_pr_index(mock_repo)
+
+        mock_repo.get_pulls.return_value = iter([make_pull(1, 'feature/done')])
+        index = manager.build_pr_index(mock_repo)
+
+        assert (tmp_path / 'pr-index' / 'test_org__test-repo.json').exists()
+        assert index.is_merged_into('feature/done', ['develop'])
@@ -0,0 +1,112 @@
+import pytest
+from unittest.mock import MagicMock
+from github import Auth
+from github.Requester import Requester
+from github.GithubException import RateLimitExceededException
+from github_branch_manager.rate_limit import GovernedAuth, RateBudgetExceeded, RateGovernor
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestRateGovernor:
+    def test_no_pacing_before_first_response(self, clock):
+        governor = RateGovernor(clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            governor.acquire()
+        assert clock.sleeps == []
+
+    def test_spreads_remaining_quota_until_reset(self, clock):
+        """Test that requests beyond the burst are paced evenly over the window"""
+        governor = RateGovernor(burst=1, clock=clock, sleep=clock.sleep)
+        # 100 requests left for the next 1000 seconds: one every 10 seconds
+        governor.observe(remaining=100, limit=5000, reset_at=clock.now + 1000)
+
+        governor.acquire()
+        governor.acquire()
+        governor.acquire()
+
+        assert clock.sleeps == [pytest.approx(10.0, rel=0.05), pytest.approx(10.0, rel=0.05)]
+
+    def test_waits_for_reset_when_quota_is_gone(self, clock):
+        governor = RateGovernor(clock=clock, sleep=clock.sleep)
+        governor.observe(remaining=0, limit=5000, reset_at=clock.now + 300)
+        governor.observe(remaining=0, limit=5000, reset_at=clock.now + 300)
+
+        governor.acquire()
+
+        assert clock.sleeps == [pytest.approx(301.0)]
+
+    def test_secondary_limit_honors_retry_after(self, clock):
+        governor = RateGovernor(clock=clock, sleep=clock.sleep)
+        governor.observe(remaining=4000, limit=5000, reset_at=clock.now + 3000)
+        error = RateLimitExceededException(403, {'message': 'secondary rate limit'}, {'Retry-After': '45'})
+
+        governor.on_rate_limit_error(error)
+        governor.acquire()
+
+        assert clock.sleeps[0] == pytest.approx(45.0)
+
+    def test_secondary_limit_without_retry_after(self, clock):
+        governor = RateGovernor(clock=clock, sleep=clock.sleep)
+        governor.on_rate_limit_error(RateLimitExceededException(403, "API rate limit exceeded"))
+        governor.acquire()
+
+        assert clock.sleeps[0] == pytest.approx(60.0)
+
+    def test_run_budget_cap(self, clock):
+        """Test that a run stops once it has used its percentage of the quota"""
+        governor = RateGovernor(budget_percent=10, clock=clock, sleep=clock.sleep)
+        governor.observe(remaining=5000, limit=5000, reset_at=clock.now + 3600)
+        governor.observe(remaining=4600, limit=5000, reset_at=clock.now + 3600)
+        assert governor.used == 400
+        assert not governor.exhausted
+
+        governor.observe(remaining=4500, limit=5000, reset_at=clock.now + 3600)
+
+        assert governor.exhausted
+        with pytest.raises(RateBudgetExceeded):
+            governor.acquire()
+
+    def test_new_window_resets_usage(self, clock):
+        governor = RateGovernor(budget_percent=10, clock=clock, sleep=clock.sleep)
+        governor.observe(remaining=5000, limit=5000, reset_at=clock.now + 10)
+        governor.observe(remaining=4500, limit=5000, reset_at=clock.now + 10)
+        governor.observe(remaining=4999, limit=5000, reset_at=clock.now + 3610)
+
+        assert governor.used == 0
+
+    def test_invalid_budget(self):
+        with pytest.raises(ValueError):
+            RateGovernor(budget_percent=0)
+
+
+class TestGovernedAuth:
+    def test_reads_requester_state_and_sets_header(self, clock):
+        governor = RateGovernor(clock=clock, sleep=clock.sleep)
+        auth = GovernedAuth(Auth.Token('secret'), governor)
+        requester = MagicMock(spec=Requester)
+        requester.rate_limiting = (4321, 5000)
+        requester.rate_limiting_resettime = clock.now + 600
+        auth.withRequester(requester)
+
+        headers = {}
+        auth.authentication(headers)
+
+        assert headers == {'Authorization': 'token secret'}
+        assert governor._remaining == 4321
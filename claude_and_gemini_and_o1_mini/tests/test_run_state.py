@@ -0,0 +1,138 @@
+import pytest
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.run_state import (
+    FirestoreRunStateStore, RepoRunState, SQLiteRunStateStore, open_run_state_store, policy_fingerprint
+)
+from .conftest import make_config, make_github_branch, make_manager
+
+NOW = datetime.now(timezone.utc)
+PUSHED_AT = NOW - timedelta(days=3)
+
+
+@pytest.fixture
+def config(tmp_path):
+    return make_config(state_dir=str(tmp_path))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteRunStateStore(str(tmp_path / 'run-state.sqlite3'))
+    yield store
+    store.close()
+
+
+class TestRepoRunState:
+    def make_state(self, **overrides):
+        state = RepoRunState('test_org/test-repo', 'archive', PUSHED_AT, NOW, NOW + timedelta(days=5), 'policy')
+        return replace(state, **overrides)
+
+    def test_unchanged_repository_is_current(self):
+        assert self.make_state().is_current(PUSHED_AT, 'policy') is True
+
+    def test_push_since_evaluation(self):
+        assert self.make_state().is_current(PUSHED_AT + timedelta(minutes=1), 'policy') is False
+
+    def test_threshold_passed(self):
+        assert self.make_state().is_current(PUSHED_AT, 'policy', now=NOW + timedelta(days=6)) is False
+
+    def test_policy_changed(self):
+        assert self.make_state().is_current(PUSHED_AT, 'other') is False
+
+    def test_fingerprint_follows_policy(self, config):
+        assert policy_fingerprint(config) == policy_fingerprint(replace(config, slack_channel='#other'))
+        assert policy_fingerprint(config) != policy_fingerprint(replace(config, inactivity_days=10))
+
+
+class TestStores:
+    def test_sqlite_round_trip(self, tmp_path):
+        path = str(tmp_path / 'run-state.sqlite3')
+        state = RepoRunState('test_org/test-repo', 'purge', PUSHED_AT, NOW, None, 'policy')
+        store = SQLiteRunStateStore(path)
+        store.put(state)
+        store.close()
+
+        reopened = SQLiteRunStateStore(path)
+        assert reopened.get('test_org/test-repo', 'purge') == state
+        assert reopened.get('test_org/test-repo', 'archive') is None
+        reopened.close()
+
+    def test_firestore_documents(self):
+        client = MagicMock()
+        store = FirestoreRunStateStore('repo_run_state', client=client)
+        state = RepoRunState('test_org/test-repo', 'archive', PUSHED_AT, NOW, None, 'policy')
+        collection = client.collection.return_value
+
+        store.put(state)
+        collection.document.return_value.get.return_value.to_dict.return_value = state.to_dict()
+
+        client.collection.assert_called_once_with('repo_run_state')
+        collection.document.assert_called_with('test_org__test-repo__archive')
+        collection.document.return_value.set.assert_called_once_with(state.to_dict())
+        assert store.get('test_org/test-repo', 'archive') == state
+
+    def test_store_selection(self, config):
+        assert isinstance(open_run_state_store(config), SQLiteRunStateStore)
+        assert open_run_state_store(replace(config, run_state_store='none')) is None
+        assert open_run_state_store(replace(config, state_dir='')) is None
+
+
+class TestIncrementalRuns:
+    @pytest.fixture
+    def manager(self, config, store):
+        return make_manager(config, run_state=store)
+
+    @pytest.fixture
+    def repo(self, manager):
+        repo = MagicMock(spec=Repository)
+        repo.name = 'test-repo'
+        repo.full_name = 'test_org/test-repo'
+        repo.pushed_at = PUSHED_AT
+        repo.get_branches.return_value = [
+            make_github_branch('main', 1),
+            make_github_branch('feature/recent', 10),
+            make_github_branch('archived/old', 40),
+        ]
+        repo.get_git_matching_refs.return_value = []
+        repo.get_pulls.return_value = []
+        manager.org.get_repo.return_value = repo
+        return repo
+
+    def test_unchanged_repository_is_skipped(self, manager, repo, store):
+        assert manager.is_up_to_date(repo.full_name, repo.pushed_at, ('archive', 'purge')) is False
+
+        manager.process_branches('test-repo')
+
+        assert manager.is_up_to_date(repo.full_name, repo.pushed_at, ('archive', 'purge')) is True
+        assert manager.is_up_to_date(repo.full_name, NOW, ('archive', 'purge')) is False
+        # The earliest upcoming thresholds: feature/recent turns inactive, archived/old passes retention
+        archive = store.get(repo.full_name, 'archive')
+        purge = store.get(repo.full_name, 'purge')
+        assert archive.next_due == repo.get_branches.return_value[1].commit.commit.author.date + timedelta(days=30)
+        assert purge.next_due == repo.get_branches.return_value[2].commit.commit.author.date + timedelta(days=60)
+
+    def test_phases_are_tracked_separately(self, manager, repo):
+        manager.archive_branches('test-repo')
+
+        assert manager.is_up_to_date(repo.full_name, repo.pushed_at, ('archive',)) is True
+        assert manager.is_up_to_date(repo.full_name, repo.pushed_at, ('purge',)) is False
+
+    def test_failed_action_is_retried_next_run(self, manager, repo, store):
+        repo.get_branches.return_value = [make_github_branch('archived/expired', 90)]
+        repo.get_git_ref.side_effect = Exception("boom")
+
+        manager.purge_branches('test-repo')
+
+        assert store.get(repo.full_name, 'purge') is not None
+        assert manager.is_up_to_date(repo.full_name, repo.pushed_at, ('purge',)) is False
+
+    def test_failed_check_is_retried_next_run(self, manager, repo):
+        repo.get_branches.return_value = [make_github_branch('feature/stale', 40)]
+        repo.get_pulls.side_effect = Exception("boom")
+
+        actions = manager.archive_branches('test-repo')
+
+        assert actions == []
+        assert manager.is_up_to_date(repo.full_name, repo.pushed_at, ('archive',)) is False
@@ -0,0 +1,130 @@
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.branch_manager import BranchAction
+from github_branch_manager.scheduler import BranchScheduler, interleave, run_repositories
+from .conftest import make_manager
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = BranchScheduler(max_branch_workers=4, max_repos_in_flight=2)
+    yield scheduler
+    scheduler.shutdown()
+
+
+class TestBranchScheduler:
+    def test_map_preserves_order(self, scheduler):
+        def work(n):
+            time.sleep(0.001 * (10 - n))
+            return n * n
+
+        assert scheduler.map(work, range(10)) == [n * n for n in range(10)]
+
+    def test_per_repo_share_of_pool(self, scheduler):
+        """Test that one repository never holds more than its share of workers"""
+        lock = threading.Lock()
+        current = {'in_flight': 0, 'peak': 0}
+
+        def work(n):
+            with lock:
+                current['in_flight'] += 1
+                current['peak'] = max(current['peak'], current['in_flight'])
+            time.sleep(0.005)
+            with lock:
+                current['in_flight'] -= 1
+            return n
+
+        scheduler.map(work, range(20))
+
+        assert scheduler.per_repo_limit == 2
+        assert current['peak'] <= 2
+
+    def test_map_raises_worker_errors(self, scheduler):
+        def work(n):
+            if n == 3:
+                raise RuntimeError("boom")
+            return n
+
+        with pytest.raises(RuntimeError):
+            scheduler.map(work, range(5))
+
+    def test_imap_consumes_items_lazily(self, scheduler):
+        """Test that only the repository's share of items is read ahead of the results"""
+        pulled = []
+
+        def items():
+            for n in range(100):
+                pulled.append(n)
+                yield n
+
+        results = scheduler.imap(lambda n: n, items())
+
+        assert next(results) == 0
+        assert len(pulled) <= scheduler.per_repo_limit + 1
+        assert list(results) == list(range(1, 100))
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            BranchScheduler(0, 1)
+
+
+class TestRunRepositories:
+    @pytest.mark.parametrize('max_repos_in_flight', [1, 3])
+    def test_results_in_input_order(self, max_repos_in_flight):
+        def work(name):
+            if name == 'broken':
+                raise RuntimeError("boom")
+            return name.upper()
+
+        results = run_repositories(['a', 'broken', 'c'], work, max_repos_in_flight)
+
+        assert [(name, result) for name, result, _ in results] == [('a', 'A'), ('broken', None), ('c', 'C')]
+        assert isinstance(results[1][2], RuntimeError)
+
+
+def test_interleave():
+    assert interleave(['a1', 'a2', 'a3'], ['b1'], [], ['c1', 'c2']) == ['a1', 'b1', 'c1', 'a2', 'c2', 'a3']
+
+
+class TestConcurrentBranchManager:
+    def make_repo(self):
+        repo = MagicMock(spec=Repository)
+        repo.name = 'test-repo'
+        repo.full_name = 'test_org/test-repo'
+        branches = []
+        for i in range(30):
+            branch = MagicMock()
+            branch.name = f"archived/old-{i}" if i % 3 == 0 else f"feature/{i}"
+            branch.commit.sha = f"sha{i}"
+            branch.commit.commit.author.date = datetime.now(timezone.utc) - timedelta(days=20 + 5 * i)
+            branches.append(branch)
+        repo.get_branches.return_value = branches
+        repo.get_git_matching_refs.return_value = []
+        merged = MagicMock()
+        merged.number = 1
+        merged.head.ref = 'feature/10'
+        merged.head.repo.full_name = 'test_org/test-repo'
+        merged.base.ref = 'develop'
+        merged.state = 'closed'
+        merged.merged_at = datetime.now(timezone.utc)
+        merged.updated_at = datetime.now(timezone.utc)
+        repo.get_pulls.return_value = [merged]
+        return repo
+
+    def test_concurrent_matches_serial(self, config, manager, scheduler):
+        repo = self.make_repo()
+        serial = manager
+        serial.org.get_repo.return_value = repo
+        concurrent = make_manager(config, scheduler=scheduler)
+        concurrent.org.get_repo.return_value = repo
+
+        expected = serial.process_branches('test-repo')
+        actual = concurrent.process_branches('test-repo')
+
+        assert actual == expected
+        assert BranchAction('test-repo', 'feature/10', 'archived') in actual
+        assert BranchAction('test-repo', 'archived/old-27', 'purged') in actual
@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock
+from github.Repository import Repository
+from github_branch_manager.tag_index import TagIndex, compile_patterns
+
+
+def make_ref(name, sha, obj_type='commit'):
+    ref = MagicMock()
+    ref.ref = f"refs/tags/{name}"
+    ref.object.sha = sha
+    ref.object.type = obj_type
+    return ref
+
+
+class TestCompilePatterns:
+    def test_matches_any_pattern(self):
+        matcher = compile_patterns(['v*', 'release-*'])
+        assert matcher.match('v1.2.3')
+        assert matcher.match('release-2024')
+        assert not matcher.match('nightly-v1')
+
+    def test_empty_patterns_match_nothing(self):
+        matcher = compile_patterns([])
+        assert not matcher.match('')
+        assert not matcher.match('v1')
+
+
+class TestTagIndex:
+    def test_only_critical_tags_are_indexed(self):
+        index = TagIndex(['v*'])
+        index.add('v1.0.0', 'sha1')
+        index.add('nightly', 'sha2')
+
+        assert index.has_critical_tag('sha1') is True
+        assert index.has_critical_tag('sha2') is False
+        assert index.critical_tags('sha1') == ['v1.0.0']
+        assert len(index) == 1
+
+    def test_from_matching_refs(self):
+        """Test building from refs, dereferencing only critical annotated tags"""
+        repo = MagicMock(spec=Repository)
+        repo.get_git_matching_refs.return_value = [
+            make_ref('v1.0.0', 'commit1'),
+            make_ref('release-1', 'tagobj', obj_type='tag'),
+            make_ref('scratch', 'tagobj2', obj_type='tag'),
+        ]
+        repo.get_git_tag.return_value.object.sha = 'commit2'
+
+        index = TagIndex.from_matching_refs(repo, ['v*', 'release-*'])
+
+        repo.get_git_matching_refs.assert_called_once_with('tags/')
+        repo.get_git_tag.assert_called_once_with('tagobj')
+        assert index.has_critical_tag('commit1')
+        assert index.has_critical_tag('commit2')
+        assert not index.has_critical_tag('tagobj2')
+
+
+class TestBranchManagerTagIndex:
+    def test_has_critical_tags_uses_index(self, manager):
+        """Test that once built, the index answers without listing tags"""
+        repo = MagicMock(spec=Repository)
+        repo.name = 'test-repo'
+        repo.full_name = 'test_org/test-repo'
+        repo.get_git_matching_refs.return_value = [make_ref('v2.0.0', 'head_sha')]
+        branch = MagicMock()
+        branch.commit.sha = 'head_sha'
+        other = MagicMock()
+        other.commit.sha = 'other_sha'
+
+        manager.build_tag_index(repo)
+
+        assert manager.has_critical_tags(repo, branch) is True
+        assert manager.has_critical_tags(repo, other) is False
+        repo.get_tags.assert_not_called()
+        assert repo.get_git_matching_refs.call_count == 1
+
+    def test_failed_index_falls_back_to_scan(self, manager):
+        repo = MagicMock(spec=Repository)
+        repo.name = 'test-repo'
+        repo.full_name = 'test_org/test-repo'
+        repo.get_git_matching_refs.side_effect = Exception("boom")
+        tag = MagicMock()
+        tag.name = 'release-7'
+        tag.commit.sha = 'head_sha'
+        repo.get_tags.return_value = [tag]
+        branch = MagicMock()
+        branch.commit.sha = 'head_sha'
+
+        assert manager.build_tag_index(repo) is None
+        assert manager.has_critical_tags(repo, branch) is True
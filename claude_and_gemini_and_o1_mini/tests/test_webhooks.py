@@ -0,0 +1,171 @@
+import glob
+import json
+import os
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from github.GithubException import GithubException
+from github.Repository import Repository
+from github_branch_manager.branch_manager import BranchAction
+from github_branch_manager.branch_state import BranchStateStore
+from github_branch_manager.records import BranchRecord
+from github_branch_manager.webhooks import WebhookReceiver, replay, sign
+from .conftest import make_config, make_manager
+
+SECRET = 'webhook-secret'
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'webhooks', '*.json')))
+LOGIN_SHA = '6dcb09b5b57875f334f61aebed695e2e4193db5e'
+REPO = 'test_org/test-repo'
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BranchStateStore(str(tmp_path / 'branch-state.sqlite3'))
+    old = datetime.now(timezone.utc) - timedelta(days=400)
+    store.seed(REPO, [
+        BranchRecord('main', 'a' * 40, old, old),
+        BranchRecord('feature/gone', 'b' * 40, old, old),
+    ], [])
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def receiver(store):
+    receiver = WebhookReceiver(store, SECRET, host='127.0.0.1', port=0)
+    receiver.start()
+    yield receiver
+    receiver.shutdown()
+
+
+def live_branch(sha, date):
+    branch = MagicMock()
+    branch.commit.sha = sha
+    branch.commit.commit.author.date = date
+    return branch
+
+
+class TestWebhookReceiver:
+    def test_replayed_deliveries_update_branch_state(self, receiver, store):
+        assert replay(receiver.url, SECRET, FIXTURES) == [200] * len(FIXTURES)
+
+        branches = {b.name: b for b in store.branches(REPO)}
+        assert sorted(branches) == ['feature/empty', 'feature/login', 'main']
+        login = branches['feature/login']
+        assert login.sha == LOGIN_SHA
+        assert login.authored_date == datetime(2024, 1, 2, 15, 0, tzinfo=timezone.utc)
+        assert login.is_merged_into(['develop']) is True
+        assert login.has_open_pr is False
+        assert branches['feature/empty'].authored_date is None
+
+    def test_redelivery_is_not_applied_again(self, receiver, store):
+        replay(receiver.url, SECRET, FIXTURES)
+        store.put_branch(REPO, 'feature/login', 'c' * 40, datetime.now(timezone.utc))
+
+        replay(receiver.url, SECRET, FIXTURES[:1])
+
+        assert {b.name: b.sha for b in store.branches(REPO)}['feature/login'] == 'c' * 40
+
+    def test_unsigned_delivery_is_rejected(self, receiver, store):
+        body = json.dumps({'ref': 'feature/x', 'ref_type': 'branch', 'repository': {'full_name': REPO}}).encode()
+
+        assert receiver.handle('create', 'id-1', body, None)[0] == 401
+        assert receiver.handle('create', 'id-1', body, sign('wrong', body))[0] == 401
+        assert receiver.handle('create', 'id-1', body, sign(SECRET, body)) == (200, 'applied')
+
+    def test_older_pull_request_update_is_ignored(self, receiver, store):
+        replay(receiver.url, SECRET, [FIXTURES[0], FIXTURES[2], FIXTURES[1]])
+
+        assert {b.name: b for b in store.branches(REPO)}['feature/login'].is_merged_into(['develop'])
+
+    def test_fork_pull_request_is_ignored(self, receiver, store):
+        body = json.dumps({'action': 'closed', 'repository': {'full_name': REPO}, 'pull_request': {
+            'number': 9, 'state': 'closed', 'merged_at': '2024-01-03T00:00:00Z',
+            'updated_at': '2024-01-03T00:00:00Z',
+            'head': {'ref': 'feature/gone', 'repo': {'full_name': 'someone/test-repo'}},
+            'base': {'ref': 'main'},
+        }}).encode()
+
+        assert receiver.handle('pull_request', 'id-fork', body, sign(SECRET, body)) == (200, 'applied')
+        assert {b.name: b for b in store.branches(REPO)}['feature/gone'].is_merged_into(['main']) is False
+
+
+class TestEventsMode:
+    @pytest.fixture
+    def manager(self, tmp_path, store):
+        return make_manager(make_config(inventory_mode='events', state_dir=str(tmp_path)), branch_state=store)
+
+    @pytest.fixture
+    def repo(self, manager, receiver):
+        replay(receiver.url, SECRET, FIXTURES)
+        repo = MagicMock(spec=Repository)
+        repo.name = 'test-repo'
+        repo.full_name = REPO
+        repo.get_git_matching_refs.return_value = []
+        recent = datetime.now(timezone.utc) - timedelta(days=1)
+        heads = {
+            'feature/login': live_branch(LOGIN_SHA, datetime(2024, 1, 2, 15, 0, tzinfo=timezone.utc)),
+            'feature/empty': live_branch('d' * 40, recent),
+        }
+
+        def get_branch(name):
+            if name not in heads:
+                raise GithubException(404, {'message': 'Branch not found'}, None)
+            return heads[name]
+
+        repo.get_branch.side_effect = get_branch
+        repo.heads = heads
+        manager.org.get_repo.return_value = repo
+        return repo
+
+    def test_archive_reads_branch_state(self, manager, repo, store):
+        actions = manager.archive_branches('test-repo')
+
+        assert actions == [BranchAction('test-repo', 'feature/login', 'archived')]
+        repo.get_branches.assert_not_called()
+        repo.get_pulls.assert_not_called()
+        # Only the branch without a known date and the branch acted on were looked up
+        assert sorted(call.args[0] for call in repo.get_branch.call_args_list) == ['feature/empty', 'feature/login']
+        assert sorted(b.name for b in store.branches(REPO)) == ['archived/feature/login', 'feature/empty', 'main']
+
+    def test_branch_moved_since_last_event_is_skipped(self, manager, repo):
+        repo.heads['feature/login'] = live_branch('e' * 40, datetime.now(timezone.utc))
+
+        assert manager.archive_branches('test-repo') == []
+        repo.create_git_ref.assert_not_called()
+
+    def test_unseeded_repository_is_listed_once(self, manager, store):
+        repo = MagicMock(spec=Repository)
+        repo.name = 'other-repo'
+        repo.full_name = 'test_org/other-repo'
+        repo.get_pulls.return_value = []
+        manager.github.requester.graphql_query.return_value = ({}, {'data': {'repository': {'refs': {
+            'nodes': [{'name': 'main', 'target': {'oid': 'f' * 40, 'committedDate': '2024-01-01T00:00:00Z',
+                                                   'authoredDate': '2024-01-01T00:00:00Z'}}],
+            'pageInfo': {'hasNextPage': False, 'endCursor': None},
+        }}}})
+
+        manager.list_branches(repo)
+        manager.list_branches(repo)
+
+        assert manager.github.requester.graphql_query.call_count == 1
+        assert store.is_seeded('test_org/other-repo')
+
+    def test_seeding_skips_fork_pull_requests(self, manager, store):
+        repo = MagicMock(spec=Repository)
+        repo.name = 'other-repo'
+        repo.full_name = 'test_org/other-repo'
+        fork = MagicMock(number=3, state='open', merged_at=None, updated_at=datetime.now(timezone.utc))
+        fork.head.ref = 'feature/x'
+        fork.head.repo.full_name = 'someone/other-repo'
+        fork.base.ref = 'main'
+        repo.get_pulls.return_value = [fork]
+        manager.github.requester.graphql_query.return_value = ({}, {'data': {'repository': {'refs': {
+            'nodes': [{'name': 'feature/x', 'target': {'oid': 'f' * 40, 'committedDate': '2024-01-01T00:00:00Z',
+                                                        'authoredDate': '2024-01-01T00:00:00Z'}}],
+            'pageInfo': {'hasNextPage': False, 'endCursor': None},
+        }}}})
+
+        manager.seed_branch_state(repo)
+
+        assert store.branches('test_org/other-repo')[0].has_open_pr is False
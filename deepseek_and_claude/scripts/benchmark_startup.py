@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Startup benchmark for the Cloud Function entry points.
+
+Each round starts a fresh interpreter (a cold start) that imports `src.main`
+and serves two requests against a local GitHub stand-in with an empty
+organization: the first request pays for the deferred imports and client
+setup, the second shows a warm invocation. Reports the p50 and max of each,
+and exits non-zero when the p50 import time is over `--budget-ms`.
+
+Run from the repository root:
+
+    python scripts/benchmark_startup.py --rounds 20 --budget-ms 300
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORG = "benchmark-org"
+
+# Runs in the child interpreter; prints the timings in milliseconds as JSON
+CHILD = """
+import json, sys, time
+from types import SimpleNamespace
+request = SimpleNamespace(method="POST", path="/")
+started = time.perf_counter()
+import src.main as main
+imported = time.perf_counter()
+main.archive_branches(request)
+first = time.perf_counter()
+main.archive_branches(request)
+second = time.perf_counter()
+print(json.dumps({
+    "import": (imported - started) * 1000,
+    "first_request": (first - imported) * 1000,
+    "warm_request": (second - first) * 1000,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+class GitHubStandIn(BaseHTTPRequestHandler):
+    """Answers the calls made for an organization without repositories"""
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == f"/orgs/{ORG}":
+            body = {"login": ORG, "url": f"http://{self.headers['Host']}/orgs/{ORG}"}
+        elif path == f"/orgs/{ORG}/repos":
+            body = []
+        else:
+            self.send_error(404)
+            return
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_round(env):
+    result = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Benchmark round failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10, help="cold starts to measure")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fail when the p50 import time is above this")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GitHubStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = dict(
+                os.environ,
+                GITHUB_TOKEN="benchmark",
+                GITHUB_ORG=ORG,
+                GITHUB_API_URL=f"http://127.0.0.1:{server.server_address[1]}",
+                HTTP_CACHE_DIR=cache_dir,
+                SLACK_WEBHOOK_URL="",
+                PYTHONDONTWRITEBYTECODE="",
+            )
+            # Warm the bytecode cache so rounds measure imports, not compilation
+            run_round(env)
+            rounds = [run_round(env) for _ in range(args.rounds)]
+    finally:
+        server.shutdown()
+
+    print(f"{'':<15}{'p50 ms':>10}{'max ms':>10}")
+    for key in ("import", "first_request", "warm_request"):
+        values = [r[key] for r in rounds]
+        print(f"{key:<15}{statistics.median(values):>10.1f}{max(values):>10.1f}")
+    print(f"modules loaded after import and two requests: {rounds[-1]['modules']}")
+
+    p50_import = statistics.median(r["import"] for r in rounds)
+    if args.budget_ms is not None and p50_import > args.budget_ms:
+        print(f"p50 import time {p50_import:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+import logging
+import threading
+
+if TYPE_CHECKING:
+    from google.cloud import firestore
+
+COLLECTION = "archived_branches"
+# Firestore accepts at most 500 writes in one batch
+MAX_BATCH_WRITES = 500
+# Documents requested per get_all call
+MAX_BATCH_READS = 300
+
+# A buffered write: ("set", document id, fields) or ("delete", document id, None)
+PendingWrite = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def document_id(repo_name: str, branch_name: str) -> str:
+    # A "/" would split the path into a subcollection; percent-encoding keeps
+    # the ids of branch names without one unchanged
+    return f"{repo_name}-{quote(branch_name, safe='')}"
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class _BufferedLedger:
+    """The write buffer shared by the sync and async ledgers.
+
+    New records and deletions are buffered and turned into batches of up to
+    500 writes by `_take_batches`; committing them is left to `flush`.
+    """
+
+    def __init__(self, client: Any, collection: str = COLLECTION):
+        self.client = client
+        self.collection = client.collection(collection)
+        self._pending: List[PendingWrite] = []
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def record_archived(self, repo_name: str, branch_name: str,
+                        archive_date: Optional[datetime] = None) -> None:
+        fields = {
+            "repo": repo_name,
+            "branch": branch_name,
+            "archive_date": archive_date or datetime.now(timezone.utc),
+        }
+        with self._lock:
+            self._pending.append(("set", document_id(repo_name, branch_name), fields))
+
+    def record_deleted(self, repo_name: str, branch_name: str) -> None:
+        with self._lock:
+            self._pending.append(("delete", document_id(repo_name, branch_name), None))
+
+    def _take_batches(self) -> List[Any]:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        batches = []
+        for chunk in _chunks(pending, MAX_BATCH_WRITES):
+            batch = self.client.batch()
+            for op, doc_id, fields in chunk:
+                ref = self.collection.document(doc_id)
+                if op == "set":
+                    batch.set(ref, fields)
+                else:
+                    batch.delete(ref)
+            batches.append(batch)
+        return batches
+
+
+class ArchiveLedger(_BufferedLedger):
+    """When each archived branch was archived, kept in the `archived_branches` collection.
+
+    Reads are made per repository: the records of all archived branches of a
+    repo are fetched with `get_all` instead of one round trip per branch.
+    New records and deletions are buffered and written by `flush` in batches
+    of up to 500 writes.
+    """
+
+    def __init__(self, client: firestore.Client, collection: str = COLLECTION):
+        super().__init__(client, collection)
+
+    def archive_dates(self, repo_name: str, branch_names: List[str]) -> Dict[str, datetime]:
+        """Returns branch name -> archive date for the given branches that have a record"""
+        names = {document_id(repo_name, name): name for name in branch_names}
+        refs = [self.collection.document(doc_id) for doc_id in names]
+        dates = {}
+        for chunk in _chunks(refs, MAX_BATCH_READS):
+            for doc in self.client.get_all(chunk):
+                if doc.exists:
+                    dates[names[doc.id]] = doc.get("archive_date")
+        return dates
+
+    def flush(self) -> int:
+        """Commits the buffered writes; returns the number of batches committed"""
+        batches = self._take_batches()
+        for batch in batches:
+            batch.commit()
+        return len(batches)
+
+
+class AsyncArchiveLedger(_BufferedLedger):
+    """The archive ledger on `firestore.AsyncClient`, for the asyncio code path"""
+
+    def __init__(self, client: firestore.AsyncClient, collection: str = COLLECTION):
+        super().__init__(client, collection)
+
+    async def archive_dates(self, repo_name: str, branch_names: List[str]) -> Dict[str, datetime]:
+        """Returns branch name -> archive date for the given branches that have a record"""
+        names = {document_id(repo_name, name): name for name in branch_names}
+        refs = [self.collection.document(doc_id) for doc_id in names]
+        dates = {}
+        for chunk in _chunks(refs, MAX_BATCH_READS):
+            async for doc in self.client.get_all(chunk):
+                if doc.exists:
+                    dates[names[doc.id]] = doc.get("archive_date")
+        return dates
+
+    async def flush(self) -> int:
+        """Commits the buffered writes; returns the number of batches committed"""
+        batches = self._take_batches()
+        for batch in batches:
+            await batch.commit()
+        return len(batches)
@@ -0,0 +1,182 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import fnmatch
+import logging
+import re
+import time
+import aiohttp
+from .metrics import Metrics
+from .records import BranchRecord
+
+class AsyncGitHubClient:
+    """asyncio counterpart of GitHubClient.
+
+    Repositories are the plain JSON objects returned by the REST API instead
+    of PyGithub objects; branches are converted to BranchRecords as they are
+    listed. All requests share one connection pool,
+    so thousands of checks can be in flight on a single event loop.
+    """
+
+    def __init__(self, token: str, base_url: str = "https://api.github.com",
+                 max_connections: int = 100, max_in_flight: int = 1000,
+                 metrics: Optional[Metrics] = None):
+        self.token = token
+        self.metrics = metrics
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        # Created on first use so they bind to the running event loop
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.logger = logging.getLogger(__name__)
+        # (repo full name, patterns) -> SHAs carrying a critical tag
+        self._tag_indexes: Dict[Tuple[str, Tuple[str, ...]], Set[str]] = {}
+        self._tag_index_locks: Dict[Tuple[str, Tuple[str, ...]], asyncio.Lock] = {}
+
+    async def __aenter__(self) -> "AsyncGitHubClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    "Accept": "application/vnd.github+json",
+                    "User-Agent": "github-branch-cleaner",
+                },
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> Tuple[Any, aiohttp.ClientResponse]:
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        async with self._in_flight:
+            start = time.perf_counter()
+            async with self.session.request(method, url, **kwargs) as response:
+                if self.metrics is not None:
+                    self.metrics.observe_github_response(method, url, response.status, response.headers,
+                                                         time.perf_counter() - start)
+                response.raise_for_status()
+                data = await response.json() if response.status != 204 else None
+                return data, response
+
+    async def _paginate(self, path: str, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        url: Optional[str] = path
+        params = {"per_page": 100, **(params or {})}
+        while url:
+            data, response = await self._request("GET", url, params=params)
+            for item in data:
+                yield item
+            next_link = response.links.get("next")
+            url = str(next_link["url"]) if next_link else None
+            # The next link already carries the query string
+            params = None
+
+    async def get_org_repos(self, org_name: str) -> List[Dict[str, Any]]:
+        try:
+            return [repo async for repo in self._paginate(f"/orgs/{org_name}/repos")]
+        except Exception as e:
+            self.logger.error(f"Failed to get repos for org {org_name}: {e}")
+            return []
+
+    async def get_branches(self, repo: Dict[str, Any]) -> List[BranchRecord]:
+        return [BranchRecord.from_json(branch) async for branch in self._paginate(f"/repos/{repo['full_name']}/branches")]
+
+    async def get_branch_last_activity(self, repo: Dict[str, Any], branch: BranchRecord) -> datetime:
+        try:
+            if branch.last_activity is None:
+                commit, _ = await self._request("GET", f"/repos/{repo['full_name']}/commits/{branch.sha}")
+                branch.last_activity = datetime.fromisoformat(commit["commit"]["author"]["date"].replace("Z", "+00:00"))
+            return branch.last_activity
+        except Exception as e:
+            self.logger.error(f"Failed to get last activity for branch {branch.name}: {e}")
+            return datetime.now(timezone.utc)
+
+    async def _pulls(self, repo: Dict[str, Any], **params) -> List[Dict[str, Any]]:
+        owner = repo["full_name"].split("/")[0]
+        params["head"] = f"{owner}:{params['head']}"
+        return [pull async for pull in self._paginate(f"/repos/{repo['full_name']}/pulls", params)]
+
+    async def is_branch_merged(self, repo: Dict[str, Any], branch: BranchRecord,
+                               protected_branches: List[str]) -> bool:
+        try:
+            results = await asyncio.gather(*(
+                self._pulls(repo, state="closed", base=base, head=branch.name)
+                for base in protected_branches
+            ))
+            return any(pull.get("merged_at") for pulls in results for pull in pulls)
+        except Exception as e:
+            self.logger.error(f"Failed to check merge status for {branch.name}: {e}")
+            return False
+
+    async def has_open_prs(self, repo: Dict[str, Any], branch_name: str) -> bool:
+        try:
+            return len(await self._pulls(repo, state="open", head=branch_name)) > 0
+        except Exception as e:
+            self.logger.error(f"Failed to check PRs for {branch_name}: {e}")
+            return True
+
+    async def _build_tag_index(self, repo: Dict[str, Any], patterns: List[str]) -> Set[str]:
+        """Returns the SHAs of all commits carrying a tag that matches one of the patterns"""
+        matcher = re.compile('|'.join(f"(?:{fnmatch.translate(p)})" for p in patterns) or r'(?!)')
+        critical = [
+            ref async for ref in self._paginate(f"/repos/{repo['full_name']}/git/matching-refs/tags/")
+            if matcher.match(ref["ref"][len("refs/tags/"):])
+        ]
+
+        async def commit_sha(ref: Dict[str, Any]) -> str:
+            if ref["object"]["type"] != "tag":
+                return ref["object"]["sha"]
+            # Annotated tag: resolve the tag object to its commit
+            tag, _ = await self._request("GET", f"/repos/{repo['full_name']}/git/tags/{ref['object']['sha']}")
+            return tag["object"]["sha"]
+
+        return set(await asyncio.gather(*(commit_sha(ref) for ref in critical)))
+
+    async def has_critical_tags(self, repo: Dict[str, Any], branch: BranchRecord,
+                                patterns: List[str]) -> bool:
+        try:
+            key = (repo["full_name"], tuple(patterns))
+            # Concurrent checks on the same repo wait for a single index build
+            lock = self._tag_index_locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                if key not in self._tag_indexes:
+                    self._tag_indexes[key] = await self._build_tag_index(repo, patterns)
+            return branch.sha in self._tag_indexes[key]
+        except Exception as e:
+            self.logger.error(f"Failed to check tags for {branch.name}: {e}")
+            return True
+
+    async def archive_branch(self, repo: Dict[str, Any], branch: BranchRecord,
+                             archive_prefix: str) -> bool:
+        try:
+            new_name = f"{archive_prefix}{branch.name}"
+            await self._request("POST", f"/repos/{repo['full_name']}/git/refs", json={
+                "ref": f"refs/heads/{new_name}",
+                "sha": branch.sha,
+            })
+            await self._request("DELETE", f"/repos/{repo['full_name']}/git/refs/heads/{branch.name}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to archive branch {branch.name}: {e}")
+            return False
+
+    async def delete_branch(self, repo: Dict[str, Any], branch: BranchRecord) -> bool:
+        try:
+            await self._request("DELETE", f"/repos/{repo['full_name']}/git/refs/heads/{branch.name}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to delete branch {branch.name}: {e}")
+            return False
@@ -1,34 +1,78 @@
+from __future__ import annotations
 from datetime import datetime, timezone, timedelta
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import asyncio
 import logging
-from google.cloud import firestore
+from .archive_ledger import ArchiveLedger, AsyncArchiveLedger
 from .github_client import GitHubClient
 from .config import Config
-from github.Repository import Repository
-from github.Branch import Branch
+from .metrics import Metrics
+
+if TYPE_CHECKING:
+    from google.cloud import firestore
+    from github.Repository import Repository
+    from .records import BranchRecord
+    from .async_github_client import AsyncGitHubClient
 
 class BranchManager:
-    def __init__(self, github_client: GitHubClient, config: Config):
+    def __init__(self, github_client: GitHubClient, config: Config, metrics: Optional[Metrics] = None):
         self.github = github_client
         self.config = config
-        self.db = firestore.Client()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._db: Optional[firestore.Client] = None
+        self._ledger: Optional[ArchiveLedger] = None
+        self._async_ledger: Optional[AsyncArchiveLedger] = None
         self.logger = logging.getLogger(__name__)
+
+    @property
+    def db(self) -> firestore.Client:
+        """Firestore client, created on first use: runs without archived branches never need it"""
+        if self._db is None:
+            from google.cloud import firestore
+            self._db = firestore.Client()
+        return self._db
+
+    @property
+    def ledger(self) -> ArchiveLedger:
+        if self._ledger is None:
+            self._ledger = ArchiveLedger(self.db)
+        return self._ledger
+
+    @property
+    def async_ledger(self) -> AsyncArchiveLedger:
+        if self._async_ledger is None:
+            from google.cloud import firestore
+            self._async_ledger = AsyncArchiveLedger(firestore.AsyncClient())
+        return self._async_ledger
+
+    def _archived_names(self, branch_names: List[str]) -> List[str]:
+        return [
+            name for name in branch_names
+            if name.startswith(self.config.ARCHIVE_PREFIX) and name not in self.config.PROTECTED_BRANCHES
+        ]
     
     def process_repos(self) -> List[Tuple[str, str, str]]:
         """Returns list of (repo_name, branch_name, action) tuples"""
         actions = []
-        for repo in self.github.get_org_repos(self.config.GITHUB_ORG):
+        with self.metrics.phase("list"):
+            repos = self.github.get_org_repos(self.config.GITHUB_ORG)
+        for repo in repos:
             actions.extend(self._process_repo(repo))
         return actions
     
     def _process_repo(self, repo: Repository) -> List[Tuple[str, str, str]]:
-        actions = []
-        for branch in repo.get_branches():
-            if branch.name in self.config.PROTECTED_BRANCHES:
+        decided = []
+        with self.metrics.phase("list"):
+            branches = self.github.get_branches(repo)
+            # One ledger read for all archived branches of the repo
+            archived = self._archived_names([branch.name for branch in branches])
+            archive_dates = self.ledger.archive_dates(repo.name, archived) if archived else {}
+        for branch in branches:
+            if self.metrics.evaluated("protected", branch.name in self.config.PROTECTED_BRANCHES):
                 continue
                 
             if branch.name.startswith(self.config.ARCHIVE_PREFIX):
-                if self._should_purge(repo, branch):
+                if self._should_purge(archive_dates.get(branch.name)):
                     action = "purge"
                 else:
                     continue
@@ -38,40 +82,158 @@ class BranchManager:
                 else:
                     continue
                     
-            actions.append((repo.name, branch.name, action))
-        return actions
+            decided.append((branch, action))
+        if self.config.APPLY_ACTIONS:
+            return self._apply_actions(repo, decided)
+        return [(repo.name, branch.name, action) for branch, action in decided]
+
+    def _apply_actions(self, repo: Repository,
+                       decided: List[Tuple[BranchRecord, str]]) -> List[Tuple[str, str, str]]:
+        """Archives and purges the branches, then writes their ledger records in one flush"""
+        applied = []
+        for branch, action in decided:
+            with self.metrics.phase(action):
+                if action == "archive":
+                    if not self.github.archive_branch(repo, branch, self.config.ARCHIVE_PREFIX):
+                        continue
+                    self.ledger.record_archived(repo.name, f"{self.config.ARCHIVE_PREFIX}{branch.name}")
+                else:
+                    if not self.github.delete_branch(repo, branch):
+                        continue
+                    self.ledger.record_deleted(repo.name, branch.name)
+            applied.append((repo.name, branch.name, action))
+        if applied:
+            try:
+                self.ledger.flush()
+            except Exception as e:
+                self.logger.error(f"Failed to update the archive ledger for {repo.name}: {e}")
+        return applied
     
-    def _should_archive(self, repo: Repository, branch: Branch) -> bool:
-        # Check inactivity
-        last_activity = self.github.get_branch_last_activity(repo, branch)
-        if (datetime.now(timezone.utc) - last_activity).days < self.config.INACTIVITY_DAYS:
-            return False
-            
-        # Check merge status
-        if not self.github.is_branch_merged(repo, branch, self.config.PROTECTED_BRANCHES):
-            return False
-            
-        # Check open PRs
-        if self.github.has_open_prs(repo, branch.name):
-            return False
-            
-        # Check critical tags
-        if self.github.has_critical_tags(repo, branch, self.config.CRITICAL_TAG_PATTERNS):
-            return False
-            
-        return True
-        
-    def _should_purge(self, repo: Repository, branch: Branch) -> bool:
-        doc_ref = self.db.collection('archived_branches').document(
-            f"{repo.name}-{branch.name}"
-        )
-        doc = doc_ref.get()
+    def _should_archive(self, repo: Repository, branch: BranchRecord) -> bool:
+        evaluated = self.metrics.evaluated
+        with self.metrics.phase("classify"):
+            # Check inactivity
+            last_activity = self.github.get_branch_last_activity(repo, branch)
+            if not evaluated("inactive", self._is_inactive(last_activity)):
+                return False
+
+            # Check merge status
+            if not evaluated("merged", self.github.is_branch_merged(repo, branch, self.config.PROTECTED_BRANCHES)):
+                return False
+
+            # Check open PRs
+            if evaluated("open_prs", self.github.has_open_prs(repo, branch.name)):
+                return False
+
+            # Check critical tags
+            if evaluated("critical_tags",
+                         self.github.has_critical_tags(repo, branch, self.config.CRITICAL_TAG_PATTERNS)):
+                return False
+
+            return True
+
+    def _is_inactive(self, last_activity: datetime) -> bool:
+        return (datetime.now(timezone.utc) - last_activity).days >= self.config.INACTIVITY_DAYS
         
-        if not doc.exists:
-            return False
-            
-        archive_date = doc.get('archive_date')
-        if (datetime.now(timezone.utc) - archive_date).days < self.config.RETENTION_DAYS:
+    def _should_purge(self, archive_date: Optional[datetime]) -> bool:
+        # Branches without a ledger record were not archived by us
+        if not self.metrics.evaluated("ledger_record", archive_date is not None):
             return False
             
-        return True 
\ No newline at end of file
+        return self.metrics.evaluated(
+            "retention", (datetime.now(timezone.utc) - archive_date).days >= self.config.RETENTION_DAYS
+        )
+
+    async def process_repos_async(self, client: "AsyncGitHubClient") -> List[Tuple[str, str, str]]:
+        """Same as process_repos, with all repos and branches checked concurrently"""
+        with self.metrics.phase("list"):
+            repos = await client.get_org_repos(self.config.GITHUB_ORG)
+        results = await asyncio.gather(*(self._process_repo_async(client, repo) for repo in repos))
+        return [action for actions in results for action in actions]
+
+    async def _process_repo_async(self, client: "AsyncGitHubClient",
+                                  repo: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+        with self.metrics.phase("list"):
+            try:
+                branches = await client.get_branches(repo)
+            except Exception as e:
+                self.logger.error(f"Failed to list branches for {repo['name']}: {e}")
+                return []
+            archive_dates = await self._archive_dates_async(
+                repo["name"], self._archived_names([branch.name for branch in branches])
+            )
+        # Timed once for all branches: their checks run concurrently and would otherwise overlap
+        with self.metrics.phase("classify"):
+            decisions = await asyncio.gather(*(
+                self._branch_action_async(client, repo, branch, archive_dates) for branch in branches
+            ))
+        decided = [(branch, action) for branch, action in zip(branches, decisions) if action is not None]
+        if self.config.APPLY_ACTIONS:
+            return await self._apply_actions_async(client, repo, decided)
+        return [(repo["name"], branch.name, action) for branch, action in decided]
+
+    async def _apply_actions_async(self, client: "AsyncGitHubClient", repo: Dict[str, Any],
+                                   decided: List[Tuple[BranchRecord, str]]) -> List[Tuple[str, str, str]]:
+        ledger = self.async_ledger if self.config.FIRESTORE_ASYNC else self.ledger
+
+        async def apply(branch: BranchRecord, action: str) -> bool:
+            if action == "archive":
+                if not await client.archive_branch(repo, branch, self.config.ARCHIVE_PREFIX):
+                    return False
+                ledger.record_archived(repo["name"], f"{self.config.ARCHIVE_PREFIX}{branch.name}")
+            else:
+                if not await client.delete_branch(repo, branch):
+                    return False
+                ledger.record_deleted(repo["name"], branch.name)
+            return True
+
+        applied = []
+        # Each action is timed once for the branches it is applied to concurrently
+        for phase in ("archive", "purge"):
+            branches = [branch for branch, action in decided if action == phase]
+            if not branches:
+                continue
+            with self.metrics.phase(phase):
+                results = await asyncio.gather(*(apply(branch, phase) for branch in branches))
+            applied.extend((repo["name"], branch.name, phase) for branch, ok in zip(branches, results) if ok)
+        if applied:
+            try:
+                if self.config.FIRESTORE_ASYNC:
+                    await self.async_ledger.flush()
+                else:
+                    await asyncio.get_running_loop().run_in_executor(None, self.ledger.flush)
+            except Exception as e:
+                self.logger.error(f"Failed to update the archive ledger for {repo['name']}: {e}")
+        return applied
+
+    async def _archive_dates_async(self, repo_name: str, archived: List[str]) -> Dict[str, datetime]:
+        if not archived:
+            return {}
+        if self.config.FIRESTORE_ASYNC:
+            return await self.async_ledger.archive_dates(repo_name, archived)
+        # The sync Firestore client blocks; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.ledger.archive_dates, repo_name, archived)
+
+    async def _branch_action_async(self, client: "AsyncGitHubClient", repo: Dict[str, Any],
+                                   branch: BranchRecord,
+                                   archive_dates: Dict[str, datetime]) -> Optional[str]:
+        name = branch.name
+        evaluated = self.metrics.evaluated
+        if evaluated("protected", name in self.config.PROTECTED_BRANCHES):
+            return None
+
+        if name.startswith(self.config.ARCHIVE_PREFIX):
+            return "purge" if self._should_purge(archive_dates.get(name)) else None
+
+        last_activity = await client.get_branch_last_activity(repo, branch)
+        if not evaluated("inactive", self._is_inactive(last_activity)):
+            return None
+        if not evaluated("merged", await client.is_branch_merged(repo, branch, self.config.PROTECTED_BRANCHES)):
+            return None
+        if evaluated("open_prs", await client.has_open_prs(repo, name)):
+            return None
+        if evaluated("critical_tags",
+                     await client.has_critical_tags(repo, branch, self.config.CRITICAL_TAG_PATTERNS)):
+            return None
+        return "archive"
@@ -6,6 +6,7 @@ import os
 class Config:
     GITHUB_TOKEN: str
     GITHUB_ORG: str
+    GITHUB_API_URL: str = "https://api.github.com"
     PROTECTED_BRANCHES: List[str] = ("develop", "stage", "master")
     ARCHIVE_PREFIX: str = "archived/"
     INACTIVITY_DAYS: int = 30
@@ -14,13 +15,30 @@ class Config:
     SLACK_WEBHOOK_URL: str = ""
     ENABLE_EMAIL: bool = False
     EMAIL_RECIPIENTS: List[str] = ()
+    # Only /tmp is writable on Cloud Functions
+    HTTP_CACHE_DIR: str = "/tmp/github-branch-cleaner/http-cache"
+    # Sweep with the asyncio client (AsyncGitHubClient) instead of PyGithub
+    ASYNC_CLIENT: bool = False
+    # Use firestore.AsyncClient for the archive ledger on the asyncio code path
+    FIRESTORE_ASYNC: bool = False
+    # Prometheus textfile written after every run; empty to only serve /metrics
+    METRICS_FILE: str = ""
+    # Archive and purge the branches found, recording them in the archive ledger;
+    # when off, the actions are only reported
+    APPLY_ACTIONS: bool = False
     
     @classmethod
     def from_env(cls):
         return cls(
             GITHUB_TOKEN=os.getenv("GITHUB_TOKEN"),
             GITHUB_ORG=os.getenv("GITHUB_ORG"),
+            GITHUB_API_URL=os.getenv("GITHUB_API_URL", "https://api.github.com"),
             PROTECTED_BRANCHES=os.getenv("PROTECTED_BRANCHES", "develop,stage,master").split(","),
             SLACK_WEBHOOK_URL=os.getenv("SLACK_WEBHOOK_URL", ""),
-            EMAIL_RECIPIENTS=os.getenv("EMAIL_RECIPIENTS", "").split(",")
+            EMAIL_RECIPIENTS=os.getenv("EMAIL_RECIPIENTS", "").split(","),
+            HTTP_CACHE_DIR=os.getenv("HTTP_CACHE_DIR", "/tmp/github-branch-cleaner/http-cache"),
+            ASYNC_CLIENT=os.getenv("ASYNC_CLIENT", "false").lower() == "true",
+            FIRESTORE_ASYNC=os.getenv("FIRESTORE_ASYNC", "false").lower() == "true",
+            METRICS_FILE=os.getenv("METRICS_FILE", ""),
+            APPLY_ACTIONS=os.getenv("APPLY_ACTIONS", "false").lower() == "true"
         ) 
\ No newline at end of file
@@ -1,14 +1,38 @@
+from __future__ import annotations
 from datetime import datetime, timezone
-from typing import List, Optional
-from github import Github
-from github.Repository import Repository
-from github.Branch import Branch
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+import fnmatch
+import re
 import logging
+from .records import BranchRecord
+
+if TYPE_CHECKING:
+    from github.Repository import Repository
+    from .metrics import Metrics
 
 class GitHubClient:
-    def __init__(self, token: str):
-        self.github = Github(token)
+    def __init__(self, token: str, cache_dir: Optional[str] = None,
+                 base_url: str = "https://api.github.com", metrics: Optional[Metrics] = None):
+        # PyGithub is imported here rather than at module level to keep cold starts short
+        from github import Github
         self.logger = logging.getLogger(__name__)
+        if metrics is not None:
+            # Ahead of the cache, so its revalidations are counted with their 304 status
+            from .metrics import install_github_metrics
+            install_github_metrics(metrics)
+        # Conditional requests answered with 304 do not count against the rate limit
+        self.http_cache = None
+        if cache_dir:
+            from .http_cache import HttpCache, install_http_cache
+            self.http_cache = HttpCache.open(cache_dir)
+            install_http_cache(self.http_cache)
+        self.github = Github(token, base_url=base_url)
+        # (repo full name, patterns) -> SHAs carrying a critical tag
+        self._tag_indexes: Dict[Tuple[str, Tuple[str, ...]], Set[str]] = {}
+
+    def reset_caches(self) -> None:
+        """Forgets per-run state, so a client reused across invocations sees new tags"""
+        self._tag_indexes.clear()
     
     def get_org_repos(self, org_name: str) -> List[Repository]:
         try:
@@ -18,14 +42,18 @@ class GitHubClient:
             self.logger.error(f"Failed to get repos for org {org_name}: {e}")
             return []
     
-    def get_branch_last_activity(self, repo: Repository, branch: Branch) -> datetime:
+    def get_branches(self, repo: Repository) -> List[BranchRecord]:
+        # Converted as they are listed; the PyGithub objects are not kept
+        return [BranchRecord.from_pygithub(branch) for branch in repo.get_branches()]
+
+    def get_branch_last_activity(self, repo: Repository, branch: BranchRecord) -> datetime:
         try:
-            return branch.commit.commit.author.date
+            return branch.last_activity
         except Exception as e:
             self.logger.error(f"Failed to get last activity for branch {branch.name}: {e}")
             return datetime.now(timezone.utc)
     
-    def is_branch_merged(self, repo: Repository, branch: Branch, 
+    def is_branch_merged(self, repo: Repository, branch: BranchRecord, 
                         protected_branches: List[str]) -> bool:
         try:
             for base in protected_branches:
@@ -47,31 +75,49 @@ class GitHubClient:
             self.logger.error(f"Failed to check PRs for {branch_name}: {e}")
             return True
     
-    def has_critical_tags(self, repo: Repository, branch: Branch, 
+    def _build_tag_index(self, repo: Repository, patterns: List[str]) -> Set[str]:
+        """Returns the SHAs of all commits carrying a tag that matches one of the patterns"""
+        matcher = re.compile('|'.join(f"(?:{fnmatch.translate(p)})" for p in patterns) or r'(?!)')
+        shas = set()
+        for ref in repo.get_git_matching_refs('tags/'):
+            if not matcher.match(ref.ref[len('refs/tags/'):]):
+                continue
+            sha = ref.object.sha
+            if ref.object.type == 'tag':
+                # Annotated tag: resolve the tag object to its commit
+                sha = repo.get_git_tag(sha).object.sha
+            shas.add(sha)
+        return shas
+
+    def has_critical_tags(self, repo: Repository, branch: BranchRecord, 
                          patterns: List[str]) -> bool:
         try:
-            import fnmatch
-            commit_sha = branch.commit.sha
-            for tag in repo.get_tags():
-                if tag.commit.sha != commit_sha:
-                    continue
-                if any(fnmatch.fnmatch(tag.name, p) for p in patterns):
-                    return True
-            return False
+            key = (repo.full_name, tuple(patterns))
+            if key not in self._tag_indexes:
+                self._tag_indexes[key] = self._build_tag_index(repo, patterns)
+            return branch.sha in self._tag_indexes[key]
         except Exception as e:
             self.logger.error(f"Failed to check tags for {branch.name}: {e}")
             return True
 
-    def archive_branch(self, repo: Repository, branch: Branch, 
+    def archive_branch(self, repo: Repository, branch: BranchRecord, 
                       archive_prefix: str) -> bool:
         try:
             new_name = f"{archive_prefix}{branch.name}"
             repo.create_git_ref(
                 ref=f"refs/heads/{new_name}",
-                sha=branch.commit.sha
+                sha=branch.sha
             )
             repo.get_git_ref(f"heads/{branch.name}").delete()
             return True
         except Exception as e:
             self.logger.error(f"Failed to archive branch {branch.name}: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+    def delete_branch(self, repo: Repository, branch: BranchRecord) -> bool:
+        try:
+            repo.get_git_ref(f"heads/{branch.name}").delete()
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to delete branch {branch.name}: {e}")
+            return False
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Type
+import requests
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+@dataclass
+class CacheEntry:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    headers: Dict[str, str]
+    body: str
+
+
+class HttpCache:
+    """
+    On-disk cache of GitHub GET responses, validated with conditional requests.
+
+    Responses carrying an `ETag` or `Last-Modified` header are stored in a
+    SQLite file. Later requests for the same URL send `If-None-Match` /
+    `If-Modified-Since`, and a `304 Not Modified` (which does not count against
+    the primary rate limit) is answered from the cache. The least recently used
+    entries are evicted once the cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT,"
+            " headers TEXT, body TEXT, size INTEGER, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @classmethod
+    def open(cls, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> Optional['HttpCache']:
+        """Opens the cache in `directory`, or returns None if it cannot be written to."""
+        try:
+            return cls(os.path.join(directory, 'github-responses.sqlite3'), max_bytes)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"HTTP cache disabled, cannot use {directory}: {e}")
+            return None
+
+    @staticmethod
+    def key(url: str, accept: str = '') -> str:
+        # Authorization is deliberately not part of the key: GitHub only answers
+        # 304 when the representation for the current credentials still matches.
+        return hashlib.sha256(f"{accept}\n{url}".encode()).hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        etag, last_modified, headers, body = row
+        return CacheEntry(etag, last_modified, json.loads(headers), body)
+
+    def put(self, key: str, url: str, headers: Dict[str, str], body: str) -> None:
+        headers = {k: v for k, v in headers.items() if not k.lower().startswith('x-ratelimit')}
+        encoded_headers = json.dumps(headers)
+        size = len(body) + len(encoded_headers)
+        if size > self.max_bytes:
+            return
+        lowered = {k.lower(): v for k, v in headers.items()}
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, lowered.get('etag'), lowered.get('last-modified'), encoded_headers, body, size, time.time()),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            self._evict()
+
+    def _evict(self) -> None:
+        if self._size <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if self._size <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class CachedResponse:
+    """Mimics the httplib-style response PyGithub expects, for a body served from the cache."""
+
+    def __init__(self, headers: Dict[str, str], body: str):
+        self.status = 200
+        self.headers = headers
+        self.text = body
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self.text
+
+
+def _caching_connection_class(base: Type, cache: HttpCache) -> Type:
+    sessions: Dict[Tuple[str, int], requests.Session] = {}
+    sessions_lock = threading.Lock()
+
+    class CachingConnection(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # PyGithub creates injected connection classes per request; share
+            # one session per host so TCP connections are still reused.
+            with sessions_lock:
+                shared = sessions.setdefault((self.host, self.port), self.session)
+            if shared is not self.session:
+                self.session.close()
+                self.session = shared
+
+        def getresponse(self):
+            if self.verb != 'GET':
+                return super().getresponse()
+            url = f"{self.protocol}://{self.host}:{self.port}{self.url}"
+            key = HttpCache.key(url, self.headers.get('Accept', ''))
+            entry = cache.get(key)
+            if entry is not None:
+                if entry.etag:
+                    self.headers['If-None-Match'] = entry.etag
+                elif entry.last_modified:
+                    self.headers['If-Modified-Since'] = entry.last_modified
+
+            response = super().getresponse()
+
+            if response.status == 304 and entry is not None:
+                cache.hits += 1
+                headers = dict(entry.headers)
+                # Keep the rate limit state of the actual response
+                headers.update({k: v for k, v in response.headers.items() if k.lower().startswith('x-ratelimit')})
+                return CachedResponse(headers, entry.body)
+            cache.misses += 1
+            if response.status == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+                cache.put(key, url, dict(response.headers), response.text)
+            return response
+
+        def close(self) -> None:
+            # The session is shared with later connections
+            pass
+
+    CachingConnection.__name__ = f"Caching{base.__name__}"
+    return CachingConnection
+
+
+def injected_connection_classes() -> Tuple[Type, Type]:
+    """The HTTP and HTTPS connection classes PyGithub currently creates connections with."""
+    return (getattr(Requester, '_Requester__httpConnectionClass', HTTPRequestsConnectionClass),
+            getattr(Requester, '_Requester__httpsConnectionClass', HTTPSRequestsConnectionClass))
+
+
+def install_http_cache(cache: HttpCache) -> None:
+    """
+    Routes every PyGithub request in this process through the cache.
+
+    Connection classes injected before (such as request metrics) keep sending
+    the requests the cache does not answer.
+    """
+    http_class, https_class = injected_connection_classes()
+    Requester.injectConnectionClasses(
+        _caching_connection_class(http_class, cache),
+        _caching_connection_class(https_class, cache),
+    )
+
+
+def uninstall_http_cache() -> None:
+    Requester.resetConnectionClasses()
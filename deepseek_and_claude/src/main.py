@@ -1,31 +1,84 @@
+import threading
+from typing import TYPE_CHECKING, List, Optional, Tuple
 import functions_framework
 from .config import Config
-from .github_client import GitHubClient
-from .branch_manager import BranchManager
-from .notifier import Notifier
+from .metrics import CONTENT_TYPE, Metrics
+
+if TYPE_CHECKING:
+    from .branch_manager import BranchManager
+    from .notifier import Notifier
+
+# Built on the first invocation of an instance and reused by the warm invocations
+# that follow, so PyGithub, Firestore and requests are imported, and their
+# connection pools opened, once per instance rather than once per request.
+_clients: Optional[Tuple["BranchManager", "Notifier"]] = None
+_clients_lock = threading.Lock()
+# Counts add up over the invocations served by this instance
+_metrics = Metrics()
+
+
+def _get_clients() -> Tuple["BranchManager", "Notifier"]:
+    global _clients
+    if _clients is None:
+        with _clients_lock:
+            if _clients is None:
+                from .github_client import GitHubClient
+                from .branch_manager import BranchManager
+                from .notifier import Notifier
+
+                config = Config.from_env()
+                github = GitHubClient(config.GITHUB_TOKEN, cache_dir=config.HTTP_CACHE_DIR,
+                                      base_url=config.GITHUB_API_URL, metrics=_metrics)
+                _clients = (BranchManager(github, config, metrics=_metrics),
+                            Notifier(config.SLACK_WEBHOOK_URL, config.EMAIL_RECIPIENTS, metrics=_metrics))
+    return _clients
+
+
+async def _process_repos_async(manager: "BranchManager") -> List[Tuple[str, str, str]]:
+    from .async_github_client import AsyncGitHubClient
+
+    # Per invocation: the client's connection pool is bound to the event loop asyncio.run creates
+    config = manager.config
+    async with AsyncGitHubClient(config.GITHUB_TOKEN, base_url=config.GITHUB_API_URL, metrics=_metrics) as client:
+        return await manager.process_repos_async(client)
+
+
+def _run_cleanup() -> Tuple[str, int]:
+    manager, notifier = _get_clients()
+    manager.github.reset_caches()
+
+    try:
+        if manager.config.ASYNC_CLIENT:
+            import asyncio
+            actions = asyncio.run(_process_repos_async(manager))
+        else:
+            actions = manager.process_repos()
+        notifier.notify_actions(actions)
+    finally:
+        if manager.config.METRICS_FILE:
+            try:
+                _metrics.write_textfile(manager.config.METRICS_FILE)
+            except OSError as e:
+                manager.logger.error(f"Failed to write metrics to {manager.config.METRICS_FILE}: {e}")
+
+    return 'OK', 200
+
+
+def _metrics_response():
+    """This instance's metrics, for a GET /metrics on either function"""
+    return _metrics.render(), 200, {"Content-Type": CONTENT_TYPE}
+
 
 @functions_framework.http
 def archive_branches(request):
     """Weekly branch archival function"""
-    config = Config.from_env()
-    github = GitHubClient(config.GITHUB_TOKEN)
-    manager = BranchManager(github, config)
-    notifier = Notifier(config.SLACK_WEBHOOK_URL, config.EMAIL_RECIPIENTS)
-    
-    actions = manager.process_repos()
-    notifier.notify_actions(actions)
-    
-    return 'OK', 200
+    if request.method == "GET" and request.path == "/metrics":
+        return _metrics_response()
+    return _run_cleanup()
 
 @functions_framework.http
 def purge_branches(request):
     """Monthly branch purging function"""
-    config = Config.from_env()
-    github = GitHubClient(config.GITHUB_TOKEN)
-    manager = BranchManager(github, config)
-    notifier = Notifier(config.SLACK_WEBHOOK_URL, config.EMAIL_RECIPIENTS)
-    
-    actions = manager.process_repos()
-    notifier.notify_actions(actions)
-    
-    return 'OK', 200 
\ No newline at end of file
+    if request.method == "GET" and request.path == "/metrics":
+        return _metrics_response()
+    return _run_cleanup()
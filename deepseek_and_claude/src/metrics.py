@@ -0,0 +1,268 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+import bisect
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latencies in seconds; GitHub answers most reads well under a second
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Segments naming an object, by the collection they follow
+_PLACEHOLDERS = {
+    "repos": "{owner}", "orgs": "{org}", "users": "{user}",
+    "branches": "{branch}", "git/refs": "{ref}", "git/ref": "{ref}", "git/matching-refs": "{ref}",
+    "commits": "{sha}", "git/commits": "{sha}", "git/tags": "{sha}",
+    "pulls": "{number}", "issues": "{number}", "releases": "{id}",
+}
+# Branch and ref names contain slashes, so they take the rest of the path
+_REST_OF_PATH = {"branches", "git/refs", "git/ref", "git/matching-refs"}
+
+
+def endpoint(url: str) -> str:
+    """Reduces a GitHub API URL to its endpoint, e.g. /repos/{owner}/{repo}/commits/{sha}"""
+    path = urlsplit(url).path
+    if path.startswith("/api/v3/"):
+        path = path[len("/api/v3"):]
+    elif path == "/api/graphql":
+        path = "/graphql"
+    segments = [segment for segment in path.split("/") if segment]
+    template: List[str] = []
+    i = 0
+    while i < len(segments):
+        collection = segments[i]
+        if collection == "git" and i + 1 < len(segments):
+            i += 1
+            collection = f"git/{segments[i]}"
+        template.append(collection)
+        i += 1
+        if i >= len(segments):
+            break
+        if collection == "repos":
+            template.extend(("{owner}", "{repo}"))
+            i += 2
+        elif collection in _REST_OF_PATH:
+            template.append(_PLACEHOLDERS[collection])
+            break
+        elif collection in _PLACEHOLDERS:
+            template.append(_PLACEHOLDERS[collection])
+            i += 1
+    return "/" + "/".join(template)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class MetricFamily:
+    """A metric and its samples, one per combination of label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labels) or 'none'}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _label_text(self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._label_text(key)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(MetricFamily):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(MetricFamily):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(MetricFamily):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._observations: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._observations.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._observations[key] = (counts, total + value)
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            observed = self._observations.get(self._key(labels))
+        return sum(observed[0]) if observed else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            observations = sorted((key, (list(counts), total)) for key, (counts, total) in self._observations.items())
+        for key, (counts, total) in observations:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{self._label_text(key, [('le', _format_value(bound))])} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self._label_text(key)} {cumulative}"
+
+
+class Metrics:
+    """API cost and timing metrics in the Prometheus text format.
+
+    Kept for the lifetime of an instance, so counters add up over its warm
+    invocations. On the async path each phase is timed once per repository,
+    so phase durations add up over the repositories processed concurrently.
+    """
+
+    def __init__(self, namespace: str = "github_branch_cleaner"):
+        self.github_requests = Counter(
+            f"{namespace}_github_requests_total", "GitHub API requests sent, by endpoint and response status.",
+            ("method", "endpoint", "status"))
+        self.github_request_duration = Histogram(
+            f"{namespace}_github_request_duration_seconds", "GitHub API request latency.", ("method", "endpoint"))
+        self.rate_limit_remaining = Gauge(
+            f"{namespace}_github_rate_limit_remaining", "Requests left in the current GitHub rate limit window.",
+            ("resource",))
+        self.rate_limit_reset = Gauge(
+            f"{namespace}_github_rate_limit_reset_timestamp_seconds",
+            "When the current GitHub rate limit window resets, in epoch seconds.", ("resource",))
+        self.slack_requests = Counter(
+            f"{namespace}_slack_requests_total", "Slack webhook calls made, by response status.", ("status",))
+        self.slack_request_duration = Histogram(
+            f"{namespace}_slack_request_duration_seconds", "Slack webhook call latency.")
+        self.branches_evaluated = Counter(
+            f"{namespace}_branches_evaluated_total", "Branches evaluated by each predicate, by outcome.",
+            ("predicate", "result"))
+        self.phase_duration = Counter(
+            f"{namespace}_phase_duration_seconds_total", "Time spent in each phase, summed over repositories.", ("phase",))
+        self._families: List[MetricFamily] = [
+            self.github_requests, self.github_request_duration, self.rate_limit_remaining, self.rate_limit_reset,
+            self.slack_requests, self.slack_request_duration, self.branches_evaluated, self.phase_duration,
+        ]
+        self._write_lock = threading.Lock()
+
+    def observe_github_response(self, method: str, url: str, status: int, headers: Mapping[str, str],
+                                seconds: float) -> None:
+        path = endpoint(url)
+        self.github_requests.inc(method=method, endpoint=path, status=status)
+        self.github_request_duration.observe(seconds, method=method, endpoint=path)
+        headers = {k.lower(): v for k, v in headers.items()}
+        resource = headers.get("x-ratelimit-resource") or ("graphql" if path == "/graphql" else "core")
+        try:
+            if "x-ratelimit-remaining" in headers:
+                self.rate_limit_remaining.set(float(headers["x-ratelimit-remaining"]), resource=resource)
+            if "x-ratelimit-reset" in headers:
+                self.rate_limit_reset.set(float(headers["x-ratelimit-reset"]), resource=resource)
+        except ValueError:
+            logger.debug(f"Ignoring malformed rate limit headers from {path}")
+
+    def evaluated(self, predicate: str, result: bool) -> bool:
+        """Counts a predicate evaluation and returns its result"""
+        self.branches_evaluated.inc(predicate=predicate, result="true" if result else "false")
+        return result
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_duration.inc(time.perf_counter() - start, phase=name)
+
+    def render(self) -> str:
+        return "\n".join(family.render() for family in self._families) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically replaces path, for the node exporter's textfile collector"""
+        directory = os.path.dirname(path) or "."
+        with self._write_lock:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(self.render())
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+def install_github_metrics(metrics: Metrics) -> None:
+    """Records every PyGithub request in this process; install it before the HTTP cache"""
+    from github.Requester import Requester
+    from .http_cache import injected_connection_classes
+
+    def metered(base):
+        class MeteredConnection(base):
+            def getresponse(self):
+                start = time.perf_counter()
+                response = super().getresponse()
+                metrics.observe_github_response(self.verb, self.url, response.status, response.headers,
+                                                time.perf_counter() - start)
+                return response
+
+        MeteredConnection.__name__ = f"Metered{base.__name__}"
+        return MeteredConnection
+
+    http_class, https_class = injected_connection_classes()
+    Requester.injectConnectionClasses(metered(http_class), metered(https_class))
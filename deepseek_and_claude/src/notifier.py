@@ -1,12 +1,26 @@
-import requests
+from __future__ import annotations
 import logging
-from typing import List, Tuple
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .metrics import Metrics
 
 class Notifier:
-    def __init__(self, slack_webhook: str, email_recipients: List[str]):
+    def __init__(self, slack_webhook: str, email_recipients: List[str], metrics: Optional[Metrics] = None):
         self.slack_webhook = slack_webhook
         self.email_recipients = email_recipients
+        self.metrics = metrics
         self.logger = logging.getLogger(__name__)
+        self._session = None
+
+    @property
+    def session(self):
+        """HTTP session, created on first use and kept so warm invocations reuse its connections"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
     
     def notify_actions(self, actions: List[Tuple[str, str, str]]):
         if not actions:
@@ -22,10 +36,18 @@ class Notifier:
             self._send_email(message)
     
     def _send_slack(self, message: str):
+        start = time.perf_counter()
+        status = "error"
         try:
-            requests.post(self.slack_webhook, json={"text": message})
+            status = self.session.post(self.slack_webhook, json={"text": message}, timeout=10).status_code
         except Exception as e:
             self.logger.error(f"Failed to send Slack notification: {e}")
+        finally:
+            if self.metrics is not None:
+                seconds = time.perf_counter() - start
+                self.metrics.slack_requests.inc(status=status)
+                self.metrics.slack_request_duration.observe(seconds)
+                self.metrics.phase_duration.inc(seconds, phase="notify")
     
     def _send_email(self, message: str):
         # TODO: Implement email sending logic (e.g., using sendgrid)
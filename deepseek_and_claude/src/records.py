@@ -0,0 +1,56 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from github.Branch import Branch
+
+
+class BranchRecord:
+    """A branch reduced to the fields the checks use.
+
+    Branches are converted as soon as they are listed, so neither PyGithub
+    objects (with their raw payloads and headers) nor REST JSON are kept for
+    the rest of the run. The last activity is stored as epoch seconds; for a
+    branch listed through PyGithub it is read from the listing's commit on
+    first use, after which the commit is dropped.
+    """
+
+    __slots__ = ("name", "sha", "_last_activity", "_commit")
+
+    def __init__(self, name: str, sha: str, last_activity: Optional[datetime] = None):
+        self.name = name
+        self.sha = sha
+        self._last_activity: Optional[float] = None
+        self._commit: Any = None
+        if last_activity is not None:
+            self.last_activity = last_activity
+
+    @classmethod
+    def from_pygithub(cls, branch: Branch) -> BranchRecord:
+        record = cls(branch.name, branch.commit.sha)
+        record._commit = branch.commit
+        return record
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> BranchRecord:
+        return cls(data["name"], data["commit"]["sha"])
+
+    @property
+    def last_activity(self) -> Optional[datetime]:
+        if self._commit is not None:
+            # Completes the commit (one request), as reading it from the Branch did
+            self.last_activity = self._commit.commit.author.date
+        if self._last_activity is None:
+            return None
+        return datetime.fromtimestamp(self._last_activity, timezone.utc)
+
+    @last_activity.setter
+    def last_activity(self, value: datetime) -> None:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        self._last_activity = value.timestamp()
+        self._commit = None
+
+    def __repr__(self) -> str:
+        return f"BranchRecord(name={self.name!r}, sha={self.sha!r})"
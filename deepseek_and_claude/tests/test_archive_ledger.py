@@ -0,0 +1,252 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+import pytest
+from src.archive_ledger import MAX_BATCH_WRITES, ArchiveLedger, AsyncArchiveLedger, document_id
+from src.branch_manager import BranchManager
+from src.config import Config
+from src.records import BranchRecord
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, fields):
+        self.id = doc_id
+        self.exists = fields is not None
+        self._fields = fields or {}
+
+    def get(self, field):
+        return self._fields[field]
+
+
+class FakeDocument:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+
+    def document(self, doc_id):
+        return FakeDocument(self, doc_id)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, fields):
+        self.writes.append((ref, fields))
+
+    def delete(self, ref):
+        self.writes.append((ref, None))
+
+    def commit(self):
+        assert len(self.writes) <= MAX_BATCH_WRITES
+        self.db.commits += 1
+        for ref, fields in self.writes:
+            docs = self.db.data.setdefault(ref.collection.name, {})
+            if fields is None:
+                docs.pop(ref.id, None)
+            else:
+                docs[ref.id] = dict(fields)
+
+
+class FakeFirestore:
+    """In-memory stand-in for the parts of firestore.Client the ledger uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.reads = 0
+        self.commits = 0
+
+    def collection(self, name):
+        return FakeCollection(name)
+
+    def get_all(self, refs):
+        self.reads += 1
+        for ref in refs:
+            yield FakeSnapshot(ref.id, self.data.get(ref.collection.name, {}).get(ref.id))
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+class FakeAsyncFirestore(FakeFirestore):
+    """Same, with the coroutine API of firestore.AsyncClient"""
+
+    async def get_all(self, refs):
+        for snapshot in FakeFirestore.get_all(self, refs):
+            yield snapshot
+
+    def batch(self):
+        batch = FakeBatch(self)
+        commit = batch.commit
+
+        async def commit_async():
+            commit()
+        batch.commit = commit_async
+        return batch
+
+
+@pytest.fixture
+def db():
+    return FakeFirestore()
+
+
+def days_ago(days):
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+class TestArchiveLedger:
+    def test_writes_are_batched(self, db):
+        ledger = ArchiveLedger(db)
+        for i in range(MAX_BATCH_WRITES + 10):
+            ledger.record_archived("repo", f"archived/{i}")
+        ledger.record_deleted("repo", "archived/0")
+        assert db.commits == 0
+
+        assert ledger.flush() == 2
+        assert len(db.data["archived_branches"]) == MAX_BATCH_WRITES + 9
+        assert ledger.flush() == 0
+
+    def test_archive_dates_for_a_repo_take_one_read(self, db):
+        ledger = ArchiveLedger(db)
+        archived_at = days_ago(3)
+        ledger.record_archived("repo", "archived/a", archived_at)
+        ledger.record_archived("other", "archived/b", archived_at)
+        ledger.flush()
+
+        dates = ledger.archive_dates("repo", ["archived/a", "archived/b"])
+
+        assert dates == {"archived/a": archived_at}
+        assert db.reads == 1
+        assert db.data["archived_branches"][document_id("repo", "archived/a")]["repo"] == "repo"
+
+    def test_branch_names_with_slashes(self, db):
+        ledger = ArchiveLedger(db)
+        archived_at = days_ago(3)
+        ledger.record_archived("repo", "archived/feature/x", archived_at)
+        ledger.record_archived("repo", "archived/feature%2Fx", archived_at)
+        ledger.flush()
+
+        assert all("/" not in doc_id for doc_id in db.data["archived_branches"])
+        assert len(db.data["archived_branches"]) == 2
+        assert ledger.archive_dates("repo", ["archived/feature/x"]) == {"archived/feature/x": archived_at}
+
+    def test_async_ledger(self):
+        db = FakeAsyncFirestore()
+        ledger = AsyncArchiveLedger(db)
+        archived_at = days_ago(3)
+
+        async def run():
+            ledger.record_archived("repo", "archived/a", archived_at)
+            await ledger.flush()
+            return await ledger.archive_dates("repo", ["archived/a", "archived/missing"])
+
+        assert asyncio.run(run()) == {"archived/a": archived_at}
+        # Not usable where the blocking ledger is expected
+        assert not isinstance(ledger, ArchiveLedger)
+
+
+class TestBranchManagerPurge:
+    @pytest.fixture
+    def manager(self, db):
+        config = Config(GITHUB_TOKEN="token", GITHUB_ORG="org", RETENTION_DAYS=60)
+        manager = BranchManager(MagicMock(), config)
+        manager._db = db
+        return manager
+
+    def test_purge_decisions_use_one_read_per_repo(self, manager, db):
+        manager.ledger.record_archived("repo", "archived/old", days_ago(90))
+        manager.ledger.record_archived("repo", "archived/recent", days_ago(10))
+        manager.ledger.flush()
+        repo = MagicMock()
+        repo.name = "repo"
+        manager.github.get_branches.return_value = [
+            BranchRecord(name, "0" * 40)
+            for name in ("master", "archived/old", "archived/recent", "archived/untracked")
+        ]
+
+        actions = manager._process_repo(repo)
+
+        assert actions == [("repo", "archived/old", "purge")]
+        assert db.reads == 1
+
+    def test_purge_decisions_are_counted(self, manager):
+        manager.ledger.record_archived("repo", "archived/old", days_ago(90))
+        manager.ledger.record_archived("repo", "archived/recent", days_ago(10))
+        manager.ledger.flush()
+        repo = MagicMock()
+        repo.name = "repo"
+        manager.github.get_branches.return_value = [
+            BranchRecord(name, "0" * 40)
+            for name in ("master", "archived/old", "archived/recent", "archived/untracked")
+        ]
+
+        manager._process_repo(repo)
+
+        evaluated = manager.metrics.branches_evaluated
+        assert evaluated.value(predicate="protected", result="true") == 1
+        assert evaluated.value(predicate="ledger_record", result="false") == 1
+        assert evaluated.value(predicate="retention", result="true") == 1
+        assert evaluated.value(predicate="retention", result="false") == 1
+        assert manager.metrics.phase_duration.value(phase="list") > 0
+
+
+class TestApplyActions:
+    @pytest.fixture
+    def manager(self, db):
+        config = Config(GITHUB_TOKEN="token", GITHUB_ORG="org", RETENTION_DAYS=60, APPLY_ACTIONS=True)
+        manager = BranchManager(MagicMock(), config)
+        manager._db = db
+        manager.ledger.record_archived("repo", "archived/old", days_ago(90))
+        manager.ledger.flush()
+        return manager
+
+    @pytest.fixture
+    def repo(self):
+        repo = MagicMock()
+        repo.name = "repo"
+        return repo
+
+    def test_actions_are_recorded_in_one_flush(self, manager, repo, db):
+        manager.github.get_branches.return_value = [
+            BranchRecord(name, "0" * 40) for name in ("feature/done", "feature/broken", "archived/old")
+        ]
+        manager._should_archive = MagicMock(return_value=True)
+        manager.github.archive_branch.side_effect = lambda repo, branch, prefix: branch.name == "feature/done"
+        manager.github.delete_branch.return_value = True
+
+        actions = manager._process_repo(repo)
+
+        assert actions == [("repo", "feature/done", "archive"), ("repo", "archived/old", "purge")]
+        assert set(db.data["archived_branches"]) == {document_id("repo", "archived/feature/done")}
+        assert db.commits == 2
+
+    def test_actions_are_only_reported_by_default(self, manager, repo, db):
+        manager.config.APPLY_ACTIONS = False
+        manager.github.get_branches.return_value = [BranchRecord("archived/old", "0" * 40)]
+
+        assert manager._process_repo(repo) == [("repo", "archived/old", "purge")]
+        manager.github.delete_branch.assert_not_called()
+        assert db.commits == 1
+
+    def test_async_actions_are_recorded_in_one_flush(self, manager):
+        manager.config.FIRESTORE_ASYNC = True
+        manager._async_ledger = AsyncArchiveLedger(FakeAsyncFirestore())
+        client = MagicMock()
+
+        async def archive_branch(repo, branch, prefix):
+            return True
+        client.archive_branch = archive_branch
+        repo = {"name": "repo", "full_name": "org/repo"}
+        decided = [(BranchRecord("feature/a", "0" * 40), "archive"), (BranchRecord("feature/b", "1" * 40), "archive")]
+
+        actions = asyncio.run(manager._apply_actions_async(client, repo, decided))
+
+        assert actions == [("repo", "feature/a", "archive"), ("repo", "feature/b", "archive")]
+        assert manager.async_ledger.client.commits == 1
+        assert len(manager.async_ledger.client.data["archived_branches"]) == 2
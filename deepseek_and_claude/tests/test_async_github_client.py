@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs, urlsplit
+import aiohttp
+import pytest
+from src.async_github_client import AsyncGitHubClient
+from src.branch_manager import BranchManager
+from src.config import Config
+from src.records import BranchRecord
+
+# Items per page, small so every listing below spans several pages
+PAGE_SIZE = 2
+OLD = "2020-01-01T00:00:00Z"
+
+SHAS = {
+    "master": "0" * 40,
+    "feature/done": "a" * 40,
+    "feature/open": "b" * 40,
+    "feature/tagged": "c" * 40,
+    "feature/fresh": "d" * 40,
+    "feature/gone": "e" * 40,
+    "archived/old": "f" * 40,
+}
+TAG_OBJECT = "9" * 40
+
+LISTINGS = {
+    "/orgs/acme/repos": [
+        {"name": name, "full_name": f"acme/{name}"} for name in ("app", "locked", "empty")
+    ],
+    "/repos/acme/app/branches": [{"name": name, "commit": {"sha": sha}} for name, sha in SHAS.items()],
+    "/repos/acme/empty/branches": [],
+    "/repos/acme/app/git/matching-refs/tags/": [
+        {"ref": "refs/tags/notes-1", "object": {"type": "commit", "sha": SHAS["feature/done"]}},
+        {"ref": "refs/tags/v0.1", "object": {"type": "commit", "sha": "1" * 40}},
+        {"ref": "refs/tags/docs", "object": {"type": "commit", "sha": "2" * 40}},
+        # Annotated, on the last page
+        {"ref": "refs/tags/release-1", "object": {"type": "tag", "sha": TAG_OBJECT}},
+    ],
+}
+# (base, head) of merged pull requests, and heads of open ones
+MERGED = {("master", "feature/done"), ("master", "feature/open"), ("master", "feature/tagged")}
+OPEN = {"feature/open"}
+
+
+class GitHubStandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the REST endpoints the async client uses; paginates with Link headers"""
+    requests = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        GitHubStandIn.requests.append(url.path)
+        if url.path.startswith("/repos/acme/locked/"):
+            return self._send(403, {"message": "Resource not accessible by integration"})
+        if url.path in LISTINGS:
+            return self._send_page(url.path, LISTINGS[url.path], int(query.get("page", 1)))
+        if url.path.startswith("/repos/acme/app/commits/"):
+            sha = url.path.rsplit("/", 1)[1]
+            if sha == SHAS["feature/gone"]:
+                return self._send(404, {"message": "No commit found for SHA"})
+            date = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if sha == SHAS["feature/fresh"] else OLD
+            return self._send(200, {"sha": sha, "commit": {"author": {"date": date}}})
+        if url.path == "/repos/acme/app/pulls":
+            head = query["head"].split(":", 1)[1]
+            if query["state"] == "open":
+                pulls = [{"number": 1}] if head in OPEN else []
+            else:
+                pulls = [{"number": 2, "merged_at": OLD}] if (query["base"], head) in MERGED else []
+            return self._send_page(url.path, pulls, int(query.get("page", 1)))
+        if url.path == f"/repos/acme/app/git/tags/{TAG_OBJECT}":
+            return self._send(200, {"object": {"type": "commit", "sha": SHAS["feature/tagged"]}})
+        self._send(404, {"message": "Not Found"})
+
+    def _send_page(self, path, items, page):
+        start = (page - 1) * PAGE_SIZE
+        links = {}
+        if start + PAGE_SIZE < len(items):
+            links["Link"] = f'<http://{self.headers["Host"]}{path}?page={page + 1}>; rel="next"'
+        self._send(200, items[start:start + PAGE_SIZE], links)
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    GitHubStandIn.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GitHubStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+APP = {"name": "app", "full_name": "acme/app"}
+LOCKED = {"name": "locked", "full_name": "acme/locked"}
+
+
+def run(base_url, check):
+    """Runs check(client) on a fresh event loop, with a client bound to it"""
+    async def main():
+        async with AsyncGitHubClient("token", base_url=base_url) as client:
+            return await check(client)
+    return asyncio.run(main())
+
+
+class TestPagination:
+    def test_listings_follow_next_links(self, base_url):
+        repos, branches = run(base_url, lambda client: asyncio.gather(
+            client.get_org_repos("acme"), client.get_branches(APP)))
+
+        assert [repo["name"] for repo in repos] == ["app", "locked", "empty"]
+        assert [(branch.name, branch.sha) for branch in branches] == list(SHAS.items())
+        assert GitHubStandIn.requests.count("/repos/acme/app/branches") == 4
+
+    def test_tag_index_reads_every_page(self, base_url):
+        async def check(client):
+            return [await client.has_critical_tags(APP, BranchRecord(name, SHAS[name]), ["v*", "release-*"])
+                    for name in ("feature/tagged", "feature/done")]
+
+        assert run(base_url, check) == [True, False]
+        assert GitHubStandIn.requests.count("/repos/acme/app/git/matching-refs/tags/") == 2
+
+
+class TestErrorResponses:
+    def test_not_found(self, base_url):
+        async def check(client):
+            repos = await client.get_org_repos("missing")
+            last_activity = await client.get_branch_last_activity(
+                APP, BranchRecord("feature/gone", SHAS["feature/gone"]))
+            return repos, last_activity
+
+        repos, last_activity = run(base_url, check)
+
+        assert repos == []
+        # Unknown activity counts as recent, so the branch is not archived
+        assert datetime.now(timezone.utc) - last_activity < timedelta(minutes=1)
+
+    def test_forbidden(self, base_url):
+        branch = BranchRecord("feature/x", "3" * 40)
+
+        async def check(client):
+            with pytest.raises(aiohttp.ClientResponseError) as error:
+                await client.get_branches(LOCKED)
+            return (error.value.status,
+                    await client.is_branch_merged(LOCKED, branch, ["master"]),
+                    await client.has_open_prs(LOCKED, branch.name),
+                    await client.has_critical_tags(LOCKED, branch, ["v*"]))
+
+        # Checks that cannot be made rule the branch out
+        assert run(base_url, check) == (403, False, True, True)
+
+
+class TestProcessReposAsync:
+    def test_sweeps_the_organization(self, base_url):
+        config = Config(GITHUB_TOKEN="token", GITHUB_ORG="acme", PROTECTED_BRANCHES=["master"], RETENTION_DAYS=60)
+        manager = BranchManager(MagicMock(), config)
+        manager._ledger = MagicMock()
+        manager._ledger.archive_dates.return_value = {
+            "archived/old": datetime.now(timezone.utc) - timedelta(days=90)
+        }
+
+        actions = run(base_url, manager.process_repos_async)
+
+        assert sorted(actions) == [("app", "archived/old", "purge"), ("app", "feature/done", "archive")]
+        manager._ledger.archive_dates.assert_called_once_with("app", ["archived/old"])
+        assert manager.metrics.branches_evaluated.value(predicate="critical_tags", result="true") == 1
+
+    def test_phases_are_timed_once_per_repository(self, base_url):
+        config = Config(GITHUB_TOKEN="token", GITHUB_ORG="acme", PROTECTED_BRANCHES=["master"], RETENTION_DAYS=60)
+        manager = BranchManager(MagicMock(), config)
+        manager._ledger = MagicMock()
+        manager._ledger.archive_dates.return_value = {}
+        phases = []
+        phase = manager.metrics.phase
+
+        def record_phase(name):
+            phases.append(name)
+            return phase(name)
+        manager.metrics.phase = record_phase
+
+        run(base_url, manager.process_repos_async)
+
+        # The branches of a repository are checked concurrently, under one timing
+        assert phases.count("classify") == 2
+        assert manager.metrics.branches_evaluated.value(predicate="inactive", result="true") > 1
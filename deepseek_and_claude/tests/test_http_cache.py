@@ -0,0 +1,108 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from github import Auth, Github
+from src.http_cache import HttpCache, install_http_cache, uninstall_http_cache
+
+REPO = {"name": "app", "full_name": "acme/app", "url": ""}
+
+
+class ConditionalStandIn(BaseHTTPRequestHandler):
+    """Local stand-in for GitHub that answers If-None-Match with 304"""
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        conditional = self.headers.get("If-None-Match")
+        ConditionalStandIn.requests.append(conditional)
+        if conditional == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.send_header("X-RateLimit-Remaining", "4999")
+            self.send_header("X-RateLimit-Limit", "5000")
+            self.end_headers()
+            return
+        payload = json.dumps(REPO).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", self.etag)
+        self.send_header("X-RateLimit-Remaining", "4998")
+        self.send_header("X-RateLimit-Limit", "5000")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    ConditionalStandIn.requests = []
+    ConditionalStandIn.etag = '"v1"'
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ConditionalStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.sqlite3"))
+    install_http_cache(cache)
+    yield cache
+    uninstall_http_cache()
+    cache.close()
+
+
+class TestHttpCache:
+    def test_put_and_get(self, tmp_path):
+        cache = HttpCache(str(tmp_path / "cache.sqlite3"))
+        key = HttpCache.key("https://api.github.com/repos/acme/app")
+        cache.put(key, "https://api.github.com/repos/acme/app",
+                  {"ETag": '"abc"', "X-RateLimit-Remaining": "10", "Link": "<next>"}, '{"a": 1}')
+
+        entry = cache.get(key)
+
+        assert entry.etag == '"abc"'
+        assert entry.body == '{"a": 1}'
+        # Rate limit headers are taken from each live response instead
+        assert "X-RateLimit-Remaining" not in entry.headers
+        assert entry.headers["Link"] == "<next>"
+        assert cache.get(HttpCache.key("https://api.github.com/repos/acme/other")) is None
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        cache = HttpCache(str(tmp_path / "cache.sqlite3"), max_bytes=400)
+        for name in ("a", "b", "c"):
+            cache.put(name, name, {"ETag": name}, "x" * 100)
+        cache.get("a")
+        cache.put("d", "d", {"ETag": "d"}, "x" * 100)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.size <= 400
+
+
+class TestConditionalRequests:
+    def test_not_modified_is_served_from_the_cache(self, base_url, cache):
+        github = Github(auth=Auth.Token("token"), base_url=base_url, seconds_between_requests=0)
+
+        first = github.get_repo("acme/app").full_name
+        second = github.get_repo("acme/app").full_name
+
+        assert first == second == "acme/app"
+        assert ConditionalStandIn.requests == [None, '"v1"']
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert github.requester.rate_limiting == (4999, 5000)
+
+    def test_changed_resource_is_fetched_again(self, base_url, cache):
+        github = Github(auth=Auth.Token("token"), base_url=base_url, seconds_between_requests=0)
+        github.get_repo("acme/app")
+        ConditionalStandIn.etag = '"v2"'
+
+        github.get_repo("acme/app")
+
+        assert cache.hits == 0
+        assert len(cache) == 1
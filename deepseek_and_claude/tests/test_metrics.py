@@ -0,0 +1,86 @@
+import pytest
+from src.metrics import Metrics, endpoint
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://api.github.com/orgs/acme/repos?per_page=100", "/orgs/{org}/repos"),
+    ("https://api.github.com/repos/acme/app/branches?page=2", "/repos/{owner}/{repo}/branches"),
+    ("https://api.github.com/repos/acme/app/commits/abc123", "/repos/{owner}/{repo}/commits/{sha}"),
+    ("https://api.github.com/repos/acme/app/git/refs/heads/feature/x", "/repos/{owner}/{repo}/git/refs/{ref}"),
+    ("https://ghe.example.com/api/v3/repos/acme/app/git/matching-refs/tags/", "/repos/{owner}/{repo}/git/matching-refs/{ref}"),
+])
+def test_endpoint(url, expected):
+    assert endpoint(url) == expected
+
+
+def test_observe_github_response_renders_counts_and_rate_limit(tmp_path):
+    metrics = Metrics()
+    headers = {"X-RateLimit-Remaining": "4321", "X-RateLimit-Reset": "1700000000", "X-RateLimit-Resource": "core"}
+    metrics.observe_github_response("GET", "https://api.github.com/repos/acme/app/branches", 200, headers, 0.2)
+    metrics.observe_github_response("GET", "https://api.github.com/repos/acme/app/branches", 304, headers, 0.05)
+    path = tmp_path / "cleaner.prom"
+
+    metrics.write_textfile(str(path))
+
+    text = path.read_text()
+    assert ('github_branch_cleaner_github_requests_total'
+            '{method="GET",endpoint="/repos/{owner}/{repo}/branches",status="304"} 1') in text
+    assert 'github_branch_cleaner_github_rate_limit_remaining{resource="core"} 4321' in text
+    assert ('github_branch_cleaner_github_request_duration_seconds_bucket'
+            '{method="GET",endpoint="/repos/{owner}/{repo}/branches",le="0.25"} 2') in text
+
+
+def test_render_exports_every_family_with_help_and_type():
+    metrics = Metrics(namespace="test")
+    metrics.evaluated("merged", True)
+    metrics.evaluated("merged", True)
+    metrics.phase_duration.inc(1.5, phase="list")
+
+    text = metrics.render()
+
+    assert text.endswith("\n")
+    assert "# HELP test_branches_evaluated_total Branches evaluated by each predicate, by outcome." in text
+    assert "# TYPE test_branches_evaluated_total counter" in text
+    assert "# TYPE test_github_rate_limit_remaining gauge" in text
+    assert "# TYPE test_slack_request_duration_seconds histogram" in text
+    assert 'test_branches_evaluated_total{predicate="merged",result="true"} 2' in text.splitlines()
+    assert 'test_phase_duration_seconds_total{phase="list"} 1.5' in text.splitlines()
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics(namespace="test")
+    for seconds in (0.01, 0.3, 60):
+        metrics.slack_request_duration.observe(seconds)
+
+    lines = metrics.render().splitlines()
+
+    assert 'test_slack_request_duration_seconds_bucket{le="0.025"} 1' in lines
+    assert 'test_slack_request_duration_seconds_bucket{le="0.5"} 2' in lines
+    assert 'test_slack_request_duration_seconds_bucket{le="30"} 2' in lines
+    assert 'test_slack_request_duration_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_slack_request_duration_seconds_sum 60.31" in lines
+    assert "test_slack_request_duration_seconds_count 3" in lines
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics(namespace="test")
+    metrics.branches_evaluated.inc(predicate='say "hi"\\\n', result="true")
+
+    assert 'test_branches_evaluated_total{predicate="say \\"hi\\"\\\\\\n",result="true"} 1' in metrics.render()
+
+
+def test_labels_must_match():
+    with pytest.raises(ValueError):
+        Metrics().phase_duration.inc(1.0, step="list")
+
+
+def test_write_textfile_replaces_the_file(tmp_path):
+    metrics = Metrics()
+    path = tmp_path / "metrics" / "cleaner.prom"
+    metrics.write_textfile(str(path))
+    metrics.evaluated("protected", False)
+
+    metrics.write_textfile(str(path))
+
+    assert path.read_text() == metrics.render()
+    assert [p.name for p in path.parent.iterdir()] == ["cleaner.prom"]